@@ -0,0 +1,270 @@
+"""
+Offline spending insights for many users.
+
+Reads one transactions file per user (a `/api/spending-insights` request body,
+rows or columnar encoding; the user id is the file name without `.json`) and
+writes one NDJSON line per user to the output file:
+
+    {"user_id": "u123", "insights": {...}}
+    {"user_id": "u124", "error": "..."}
+
+Parsing, validation, aggregation and prompt rendering run in a pool of worker
+processes; the LLM step runs in this process with bounded concurrency through
+the scheduled client at batch priority. The output file is the checkpoint:
+run the same command again after a crash and users that already have
+insights are skipped, failed users are retried. A failed LLM call (e.g. an
+outage) is written as an error line rather than as fallback insights, so
+those users are retried too.
+
+    python -m app.batch data/users/ --out insights.ndjson [--workers 4] [--concurrency 8] [--restart]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.models import get_llm_client
+from app.responses import dumps
+from app.services.analytics import SpendingAggregates, summarize_transactions
+from app.services.insights_service import InsightsService
+from app.services.prompt_templates import get_spending_insights_prompt
+
+logger = logging.getLogger(__name__)
+
+# fsync the output after this many lines (every line is flushed to the OS)
+SYNC_EVERY = 200
+PROGRESS_INTERVAL_SECONDS = 10.0
+
+
+@dataclass
+class BatchSummary:
+    """Counts for one batch run."""
+    total: int
+    skipped: int
+    succeeded: int
+    failed: int
+    seconds: float
+
+    @property
+    def users_per_second(self) -> float:
+        return (self.succeeded + self.failed) / self.seconds if self.seconds else 0.0
+
+
+def find_inputs(paths: Iterable[str]) -> Dict[str, str]:
+    """
+    Map user ids to input files.
+
+    Args:
+        paths: Files, or directories whose `*.json` files are read
+
+    Raises:
+        ValueError: When two files have the same user id
+    """
+    inputs: Dict[str, str] = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+        else:
+            files = [path]
+        for file in files:
+            user_id = os.path.splitext(os.path.basename(file))[0]
+            if user_id in inputs:
+                raise ValueError(f"Duplicate user id {user_id}: {inputs[user_id]} and {file}")
+            inputs[user_id] = file
+    return inputs
+
+
+def prepare_user(path: str) -> Tuple[str, SpendingAggregates]:
+    """
+    Validate one user's file and build the insights prompt (runs in a worker process).
+
+    Raises:
+        ValueError: When the file cannot be read or is not a valid request body
+    """
+    from app.routes.insights import InsightsRequest
+
+    try:
+        with open(path, "rb") as f:
+            request = InsightsRequest.model_validate_json(f.read())
+    except OSError as e:
+        raise ValueError(f"Cannot read {path}: {e.strerror}") from None
+    except ValidationError as e:
+        # Re-raised as a plain ValueError: pydantic's errors do not pickle back from the worker
+        details = "; ".join(f"{'.'.join(map(str, error['loc'])) or 'body'}: {error['msg']}" for error in e.errors())
+        raise ValueError(f"Invalid request body in {path}: {details}") from None
+    transactions = request.transaction_data()
+    aggregates = summarize_transactions(transactions)
+    return get_spending_insights_prompt(transactions, aggregates), aggregates
+
+
+def load_checkpoint(out_path: str) -> Set[str]:
+    """
+    Return the users that already have insights in the output file.
+
+    A partly written last line (the run was killed mid-write) is truncated,
+    and error lines are dropped so those users are retried.
+    """
+    if not os.path.exists(out_path):
+        return set()
+    done: Set[str] = set()
+    kept: List[bytes] = []
+    changed = False
+    with open(out_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                changed = True
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                changed = True
+                continue
+            if "insights" in record:
+                done.add(record["user_id"])
+                kept.append(line)
+            else:
+                changed = True
+    if changed:
+        partial = out_path + ".tmp"
+        with open(partial, "wb") as f:
+            f.writelines(kept)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, out_path)
+    return done
+
+
+async def run_batch(
+    paths: Iterable[str],
+    out_path: str,
+    workers: int = 0,
+    concurrency: int = 0,
+    restart: bool = False,
+    executor: Executor = None
+) -> BatchSummary:
+    """
+    Generate spending insights for every input file, resuming from the output file.
+
+    Args:
+        paths: Input files or directories
+        out_path: NDJSON output (and checkpoint) file
+        workers: Analytics processes (default settings.batch_workers; 0 = one per CPU)
+        concurrency: Users in the LLM step at once (default settings.batch_llm_concurrency)
+        restart: Ignore and overwrite existing output
+        executor: Run the analytics here instead of a new process pool
+
+    Returns:
+        Counts for the run
+    """
+    workers = workers or settings.batch_workers or os.cpu_count() or 1
+    concurrency = concurrency or settings.batch_llm_concurrency
+    inputs = find_inputs(paths)
+    if restart and os.path.exists(out_path):
+        os.remove(out_path)
+    done = load_checkpoint(out_path)
+    todo = [(user_id, path) for user_id, path in inputs.items() if user_id not in done]
+    summary = BatchSummary(total=len(inputs), skipped=len(inputs) - len(todo), succeeded=0, failed=0, seconds=0.0)
+    logger.info(f"{len(todo)} users to analyse ({summary.skipped} already done), {workers} workers")
+
+    service = InsightsService(get_llm_client(purpose="batch"))
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    # Keep every worker busy while `concurrency` users wait on the LLM, without queueing all users at once
+    slots = asyncio.Semaphore(workers * 2 + concurrency)
+    llm_slots = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    last_progress = started
+
+    out = open(out_path, "ab")
+    unsynced = 0
+
+    def write(record: Dict) -> None:
+        nonlocal unsynced
+        out.write(dumps(record) + b"\n")
+        out.flush()
+        unsynced += 1
+        if unsynced >= SYNC_EVERY:
+            os.fsync(out.fileno())
+            unsynced = 0
+
+    async def analyse(user_id: str, path: str) -> None:
+        nonlocal last_progress
+        try:
+            try:
+                prompt, aggregates = await loop.run_in_executor(executor, prepare_user, path)
+            except ValueError as e:
+                logger.warning(f"Skipping user {user_id}: {e}")
+                write({"user_id": user_id, "error": str(e)})
+                summary.failed += 1
+                return
+            try:
+                async with llm_slots:
+                    insights = await service.complete_insights(prompt, aggregates, raise_errors=True)
+            except Exception as e:
+                logger.warning(f"Insights failed for user {user_id}: {e}")
+                write({"user_id": user_id, "error": f"Insights failed: {e}"})
+                summary.failed += 1
+                return
+            write({"user_id": user_id, "insights": insights})
+            summary.succeeded += 1
+        finally:
+            slots.release()
+        now = time.perf_counter()
+        if now - last_progress >= PROGRESS_INTERVAL_SECONDS:
+            last_progress = now
+            finished = summary.succeeded + summary.failed
+            logger.info(f"{finished}/{len(todo)} users, {finished / (now - started):.0f} users/s")
+
+    tasks = set()
+    try:
+        for user_id, path in todo:
+            await slots.acquire()
+            task = asyncio.create_task(analyse(user_id, path))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+    summary.seconds = time.perf_counter() - started
+    return summary
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="per-user JSON files or directories of them")
+    parser.add_argument("--out", required=True, help="NDJSON output file, also used to resume")
+    parser.add_argument("--workers", type=int, default=0, help="analytics processes (default: one per CPU)")
+    parser.add_argument("--concurrency", type=int, default=0, help="users in the LLM step at once")
+    parser.add_argument("--restart", action="store_true", help="overwrite the output instead of resuming")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=settings.log_level, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        summary = asyncio.run(run_batch(args.inputs, args.out, args.workers, args.concurrency, args.restart))
+    except ValueError as e:
+        parser.error(str(e))
+    print(
+        f"{summary.succeeded} succeeded, {summary.failed} failed, {summary.skipped} already done "
+        f"in {summary.seconds:.1f}s ({summary.users_per_second:.0f} users/s) -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import Dict, List, Literal
 
 
 class Settings(BaseSettings):
@@ -11,15 +11,139 @@ class Settings(BaseSettings):
     # Groq API settings
     groq_api_key: str = ""
     groq_model: str = "llama-3.3-70b-versatile"
+    groq_base_url: str = ""  # e.g. the load-test stand-in (loadtest/llm_standin.py); empty uses api.groq.com
+    groq_rate_limit_enabled: bool = True
+    groq_requests_per_minute: int = 30
+    groq_tokens_per_minute: int = 6000  # corrected from x-ratelimit-limit-tokens
+    groq_rate_limit_headroom: float = 0.95  # share of the quota to use
+    groq_request_deadline_seconds: float = 30.0  # pacing + 429 retries must fit in this
+    groq_max_retries: int = 4
     
     # Ollama settings
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "granite-code"
+    ollama_schema_format: bool = False  # send the full JSON schema as "format" (Ollama >= 0.5)
     
     # Application settings
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     log_level: str = "INFO"
+    metrics_enabled: bool = True  # route and LLM call metrics on /metrics
+    
+    # Tracing: spans from the HTTP middleware through services to LLM calls
+    tracing_enabled: bool = True
+    tracing_sample_ratio: float = 1.0  # share of new traces recorded; an incoming traceparent's flag wins
+    tracing_ring_buffer_traces: int = 200  # recent traces kept for /debug/traces
+    tracing_otlp_dir: str = ""  # append OTLP JSON traces to files here when set
+    tracing_max_open_traces: int = 10_000  # unfinished traces tracked; the oldest are dropped beyond this
+    tracing_debug_endpoint: bool = False  # serve /debug/traces (also needs ADMIN_TOKEN)
+    
+    # Admin endpoints (/admin/*) and on-demand profiling; both are off while the token is empty
+    admin_token: str = ""  # sent as X-Admin-Token
+    profiling_sample_ratio: float = 0.0  # share of requests profiled without being asked
+    profiling_mode: Literal["sample", "cprofile"] = "sample"
+    profiling_interval_ms: float = 5.0  # stack sampling interval
+    profiling_dir: str = "profiles"
+    profiling_max_profiles: int = 50  # oldest profiles are deleted beyond this
+    
+    # Chat memory settings
+    chat_memory_backend: Literal["memory", "sqlite"] = "memory"
+    chat_memory_sqlite_path: str = "chat_sessions.db"
+    chat_session_ttl_seconds: int = 3600
+    chat_max_sessions: int = 10000
+    chat_history_turns: int = 6  # user/assistant exchanges kept verbatim
+    chat_history_token_budget: int = 3000  # prompt + history tokens per request
+    chat_summary_max_tokens: int = 256
+    
+    # WebSocket chat streaming
+    ws_frame_max_chars: int = 256  # flush a frame once it holds this many characters
+    ws_frame_max_delay_ms: int = 50  # ... or once its oldest chunk is this old
+    ws_max_conversations: int = 4  # concurrent generations per connection
+    
+    # Local retrieval tier for common chat questions
+    retrieval_enabled: bool = True
+    retrieval_corpus_path: str = ""  # defaults to app/data/finance_answers.json
+    retrieval_index_path: str = ""  # precomputed index (python -m app.services.retrieval)
+    retrieval_answer_threshold: float = 0.75  # answer directly at or above this similarity
+    retrieval_grounding_threshold: float = 0.15  # pass passages to the LLM at or above this
+    retrieval_top_k: int = 3
+    
+    # Semantic cache for stateless chat answers (paraphrases share an entry)
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.85  # minimum cosine similarity for a hit
+    semantic_cache_max_entries: int = 2048
+    semantic_cache_max_bytes: int = 16 * 1024 * 1024
+    semantic_cache_ttl_seconds: int = 86400
+    
+    # Cache store for semantic cache entries and budget/insights results. "sqlite"
+    # shares one WAL-mode database between the uvicorn workers of a host.
+    cache_backend: Literal["memory", "sqlite"] = "memory"
+    cache_sqlite_path: str = "response_cache.db"
+    cache_sqlite_busy_timeout_ms: int = 50  # longer waits for the write lock drop the write
+    cache_max_entries: int = 10000
+    cache_max_bytes: int = 64 * 1024 * 1024
+    analytics_cache_enabled: bool = True  # reuse budget summaries and insights for identical input
+    analytics_cache_ttl_seconds: int = 3600
+    
+    # Warm restarts: caches are snapshotted to disk and restored on startup, and the
+    # most frequent chat questions are warmed up before /ready reports ready
+    snapshot_path: str = ""  # e.g. warm_state.snap; empty disables snapshots
+    snapshot_interval_seconds: float = 300.0
+    warmup_top_n: int = 20  # most frequent stateless chat questions to replay (0 disables)
+    warmup_concurrency: int = 2
+    warmup_timeout_seconds: float = 60.0  # /ready turns ready after this even if warm-up is unfinished
+    prompt_stats_max_prompts: int = 5000  # questions tracked for warm-up
+    
+    # Streamed spending insights uploads (/api/spending-insights/stream)
+    stream_upload_max_bytes: int = 512 * 1024 * 1024
+    stream_upload_max_rows: int = 5_000_000
+    stream_upload_max_row_bytes: int = 64 * 1024
+    stream_upload_prompt_rows: int = 200  # rows quoted in the LLM prompt; totals cover every row
+    
+    # Response compression (brotli when installed and accepted, else gzip)
+    compression_minimum_size: int = 1024  # bytes; smaller responses are sent as-is (0 disables)
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    
+    # Health probes: /live and /ready are answered from state checked in the background
+    health_probe_backends: List[str] = []  # e.g. ["groq"]; empty probes Groq in prod with a key
+    health_probe_interval_seconds: float = 15.0
+    health_probe_timeout_seconds: float = 3.0
+    health_probe_failures: int = 2  # consecutive failed checks before /ready reports a backend down
+    health_max_llm_queue_depth: int = 100  # /ready reports saturated at this many queued LLM calls
+    
+    # Background jobs (/api/jobs/*)
+    job_workers: int = 4  # concurrent jobs
+    job_max_queue: int = 1000
+    job_result_ttl_seconds: int = 3600  # how long finished jobs stay retrievable
+    job_max_retained: int = 1000  # finished jobs kept; least recently used dropped first
+    
+    # Budget what-if scenarios (/api/budget-scenarios)
+    budget_scenarios_max_count: int = 50_000  # scenarios evaluated per request (explicit + grid combinations)
+    
+    # Cash-flow forecasts (/api/forecast and "forecast" in /api/generate)
+    forecast_max_paths: int = 50_000  # Monte Carlo paths per request
+    
+    # Offline batch analysis (python -m app.batch)
+    batch_workers: int = 0  # analytics processes; 0 = one per CPU
+    batch_llm_concurrency: int = 8  # users in the LLM step at once
+    
+    # Composite dashboard (/api/dashboard)
+    dashboard_deadline_seconds: float = 20.0  # slower sections fall back to deterministic output
+    
+    # LLM scheduler: priority classes (chat > budget > insights > batch) with
+    # weighted fair queueing across tenants (X-Tenant-ID or hashed X-API-Key)
+    llm_scheduler_enabled: bool = True
+    llm_max_concurrency: int = 8  # concurrent upstream LLM calls
+    llm_tenant_weights: Dict[str, float] = {}  # e.g. {"acme": 2.0}; default weight 1
+    
+    # Mock client settings (per-chunk delay makes streaming load tests realistic)
+    mock_stream_delay_ms: float = 0.0
+    
+    # LLM traffic cassettes: record real calls, or replay them offline for reproducible runs
+    llm_cassette_mode: Literal["off", "record", "replay"] = "off"
+    llm_cassette_dir: str = "cassettes"
+    llm_cassette_time_scale: float = 1.0  # replay timing: 1 = as recorded, 0 = instant
     
     class Config:
         env_file = ".env"
@@ -1,12 +1,31 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
+import asyncio
 import logging
 import os
+import time
 
 from app.config import settings
-from app.routes import budget_router, insights_router, nlu_router, generate_router
+from app.metrics import http_request_duration_seconds, http_requests_in_flight
+from app.profiling import create_profiler, get_profile_store, profiling_mode_for
+from app.responses import CompressionMiddleware, FastJSONResponse
+from app.services.health import ProbeMiddleware, get_prober
+from app.tracing import current_span, get_tracer
+from app.models.scheduler import current_tenant, tenant_from_headers
+from app.routes import (
+    budget_router,
+    insights_router,
+    nlu_router,
+    generate_router,
+    chat_ws_router,
+    jobs_router,
+    dashboard_router,
+    forecast_router,
+    debug_router,
+    admin_router,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -22,7 +41,8 @@ app = FastAPI(
     description="AI-powered personal finance assistant with budget analysis, spending insights, and persona-aware advice",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -34,11 +54,142 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (inside the timing middlewares, so its cost is measured)
+if settings.compression_minimum_size > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality
+    )
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Profile the request when an admin asks for it (X-Profile) or it is picked by sampling."""
+    mode = profiling_mode_for(request.headers)
+    store = get_profile_store() if mode else None
+    if store is None or not store.try_begin():
+        return await call_next(request)
+    profile_id = None
+    try:
+        profiler = create_profiler(mode)
+        started = time.perf_counter()
+        profiler.start()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            artifact, summary = profiler.stop()
+            route = request.scope.get("route")
+            meta = {
+                "mode": mode,
+                "method": request.method,
+                "path": request.url.path,
+                "route": getattr(route, "path", None),
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "created_at": time.time(),
+                "summary": summary,
+            }
+            try:
+                profile_id = await asyncio.to_thread(store.save, meta, artifact, profiler.extension)
+                logger.info(f"Profiled {request.method} {request.url.path} ({mode}): {profile_id}")
+            except Exception as e:
+                # A full disk must not turn a served request into a 500
+                logger.warning(f"Saving profile of {request.method} {request.url.path} failed: {e}")
+    finally:
+        store.end()
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time each request, labelled by its route template rather than the raw path."""
+    if not settings.metrics_enabled:
+        return await call_next(request)
+    http_requests_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        route = request.scope.get("route")
+        http_request_duration_seconds.observe(
+            time.perf_counter() - started,
+            route=getattr(route, "path", "unmatched"),
+            method=request.method,
+            status=str(status)
+        )
+
+
+@app.middleware("http")
+async def assign_tenant(request: Request, call_next):
+    """Attribute LLM calls made while serving a request to its tenant."""
+    token = current_tenant.set(tenant_from_headers(request.headers))
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
+
+
+# Scrapes and trace lookups would otherwise crowd real requests out of the ring buffer
+UNTRACED_PATH_PREFIXES = ("/metrics", "/debug/", "/static/")
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open the root span of each request, continuing an incoming W3C traceparent."""
+    if not settings.tracing_enabled or request.url.path.startswith(UNTRACED_PATH_PREFIXES):
+        return await call_next(request)
+    tracer = get_tracer()
+    span = tracer.start_span(
+        f"{request.method} {request.url.path}",
+        kind="server",
+        attributes={"http.method": request.method, "http.target": request.url.path},
+        traceparent=request.headers.get("traceparent"),
+        new_trace=True
+    )
+    token = current_span.set(span)
+    try:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        if span.sampled:
+            response.headers["X-Trace-Id"] = span.trace_id
+        return response
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        current_span.reset(token)
+        route = request.scope.get("route")
+        if route is not None and span.sampled:
+            span.name = f"{request.method} {route.path}"
+            span.set_attribute("http.route", route.path)
+        tracer.end_span(span)
+
+
+# Liveness and readiness probes are answered first, from memory
+app.add_middleware(ProbeMiddleware)
+
+
 # Include routers
 app.include_router(budget_router, tags=["Budget"])
 app.include_router(insights_router, tags=["Insights"])
 app.include_router(nlu_router, tags=["NLU"])
 app.include_router(generate_router, tags=["Generate"])
+app.include_router(chat_ws_router, tags=["Chat"])
+app.include_router(jobs_router, tags=["Jobs"])
+app.include_router(dashboard_router, tags=["Dashboard"])
+app.include_router(forecast_router, tags=["Forecast"])
+app.include_router(debug_router, tags=["Debug"])
+app.include_router(admin_router, tags=["Admin"])
 
 # Mount static files (frontend)
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
@@ -62,18 +213,26 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    from app.models import ModelFactory
-    
-    client = ModelFactory.get_client()
+    """Health check endpoint (answered from memory; probes should use /live and /ready)."""
+    prober = get_prober()
+    ready, _ = prober.readiness()
     
     return {
         "status": "healthy",
+        "ready": ready,
         "environment": settings.app_env,
-        "model": client.model_name
+        "model": prober.model_name
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose application metrics in the Prometheus text format."""
+    from app.metrics import registry
+    
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/chat.html")
 async def serve_chat():
     """Serve chat page."""
@@ -121,12 +280,31 @@ async def startup_event():
     from app.models import ModelFactory
     client = ModelFactory.get_client()
     logger.info(f"Using LLM model: {client.model_name}")
+    
+    # Start the background job workers
+    from app.services.jobs import get_job_manager
+    await get_job_manager().start()
+    
+    # Restore cached state, then warm up before /ready reports ready
+    from app.services.warm_start import get_warm_start
+    await get_warm_start().start()
+    
+    # Check the LLM backends in the background for /ready
+    await get_prober().start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
     logger.info("Shutting down Personal Finance Chatbot API")
+    
+    from app.services.jobs import get_job_manager
+    await get_job_manager().stop()
+    
+    await get_prober().stop()
+    
+    from app.services.warm_start import get_warm_start
+    await get_warm_start().stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,360 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters are plain dictionaries guarded by a lock, so recording a sample
+costs a dictionary update and nothing is exported until /metrics is scraped.
+Histograms keep per-bucket counts and only accumulate them when rendered.
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to slow LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """Render a Prometheus label set such as {purpose="chat"}."""
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for the given label values."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def reset(self) -> None:
+        """Drop all recorded samples (useful for testing)."""
+        with self._lock:
+            self._values.clear()
+
+    def collect(self) -> List[str]:
+        """Return the exposition lines for this metric."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down (queue depth, in-flight requests)."""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrement the gauge for the given label values."""
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Distribution of observed values (latencies, sizes) in fixed buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last slot is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for the given label values."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels: str) -> int:
+        """Number of observations for the given label values."""
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels: str) -> float:
+        """Sum of observations for the given label values."""
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def reset(self) -> None:
+        """Drop all recorded samples (useful for testing)."""
+        with self._lock:
+            self._values.clear()
+
+    def collect(self) -> List[str]:
+        """Return the exposition lines (cumulative buckets, sum and count)."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labelnames, key + (le,))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Register a metric, returning the existing one if the name is taken."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Create (or fetch) a registered counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        """Create (or fetch) a registered gauge."""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Create (or fetch) a registered histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str):
+        """Return a registered metric by name, or None."""
+        return self._metrics.get(name)
+
+    def reset(self) -> None:
+        """Reset every registered metric (useful for testing)."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].collect())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry instance
+registry = MetricsRegistry()
+
+# JSON parsing outcomes per purpose: "fast" (plain json.loads), "recovered"
+# (needed fence stripping / brace hunting) or "failed".
+json_parse_total = registry.counter(
+    "llm_json_parse_total",
+    "LLM responses parsed as JSON, by purpose and outcome",
+    ("purpose", "outcome"),
+)
+
+# Deterministic fallbacks taken by each service after an LLM failure.
+service_fallback_total = registry.counter(
+    "service_fallback_total",
+    "Fallback activations per service",
+    ("service",),
+)
+
+# Retrieval tier outcomes for chat: "answered" (no LLM call), "grounded"
+# (passages added to the prompt) or "miss".
+retrieval_total = registry.counter(
+    "chat_retrieval_total",
+    "Chat retrieval lookups by outcome",
+    ("outcome",),
+)
+
+# Semantic answer cache for stateless chat: hit rate, lookup cost and the
+# prompt + completion tokens served without an LLM call.
+semantic_cache_lookups_total = registry.counter(
+    "chat_semantic_cache_lookups_total",
+    "Semantic cache lookups by outcome",
+    ("outcome",),
+)
+semantic_cache_lookup_seconds_total = registry.counter(
+    "chat_semantic_cache_lookup_seconds_total",
+    "Total time spent in semantic cache lookups",
+)
+semantic_cache_tokens_saved_total = registry.counter(
+    "chat_semantic_cache_tokens_saved_total",
+    "Estimated LLM tokens saved by semantic cache hits",
+)
+semantic_cache_evictions_total = registry.counter(
+    "chat_semantic_cache_evictions_total",
+    "Semantic cache evictions by reason",
+    ("reason",),
+)
+
+# Key-value cache store (per process or shared by the workers of a host) for
+# semantic cache entries and budget/insights results.
+cache_store_lookups_total = registry.counter(
+    "cache_store_lookups_total",
+    "Cache store lookups by namespace and outcome",
+    ("namespace", "outcome"),
+)
+cache_store_evictions_total = registry.counter(
+    "cache_store_evictions_total",
+    "Cache store evictions by reason",
+    ("reason",),
+)
+
+# LLM scheduler: queue depth and waiting time per priority class, in-flight
+# upstream calls and estimated tokens charged per class and tenant.
+scheduler_queue_depth = registry.gauge(
+    "llm_scheduler_queue_depth",
+    "LLM calls waiting for a slot, by priority class",
+    ("priority_class",),
+)
+scheduler_in_flight = registry.gauge(
+    "llm_scheduler_in_flight",
+    "LLM calls currently holding a slot",
+)
+scheduler_requests_total = registry.counter(
+    "llm_scheduler_requests_total",
+    "LLM calls admitted by the scheduler, by priority class",
+    ("priority_class",),
+)
+scheduler_wait_seconds_total = registry.counter(
+    "llm_scheduler_wait_seconds_total",
+    "Total time LLM calls spent queued, by priority class",
+    ("priority_class",),
+)
+scheduler_tokens_total = registry.counter(
+    "llm_scheduler_tokens_total",
+    "Estimated prompt + completion tokens per priority class and tenant",
+    ("priority_class", "tenant"),
+)
+
+# Client-side Groq rate limiting: dispatch outcomes ("immediate", "delayed",
+# "rejected"), time spent pacing, 429 retries and the token budget left.
+rate_limit_total = registry.counter(
+    "groq_rate_limit_total",
+    "Groq calls by rate limiter outcome",
+    ("outcome",),
+)
+rate_limit_wait_seconds_total = registry.counter(
+    "groq_rate_limit_wait_seconds_total",
+    "Total time Groq calls were delayed to stay within the budget",
+)
+rate_limit_retries_total = registry.counter(
+    "groq_rate_limit_retries_total",
+    "Groq 429 responses retried after backoff",
+)
+rate_limit_tokens_available = registry.gauge(
+    "groq_rate_limit_tokens_available",
+    "Tokens left in the local tokens-per-minute budget (negative while paced)",
+)
+
+
+# HTTP routes: latency per route template (so /api/jobs/{job_id} is one
+# series), method and status, and requests being served.
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, method and status",
+    ("route", "method", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+
+# LLM calls, recorded by the instrumentation every BaseLLMClient subclass gets
+# (see app/models/instrumentation.py). Tokens are the provider's usage when it
+# reports one and an estimate otherwise.
+llm_requests_total = registry.counter(
+    "llm_requests_total",
+    "LLM calls by backend, model, purpose and outcome (ok, error, cancelled)",
+    ("backend", "model", "purpose", "outcome"),
+)
+llm_request_duration_seconds = registry.histogram(
+    "llm_request_duration_seconds",
+    "LLM call latency until the full response (or end of stream)",
+    ("backend", "model", "purpose"),
+)
+llm_time_to_first_token_seconds = registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time until the first streamed chunk (the full response when not streaming)",
+    ("backend", "model", "purpose"),
+)
+llm_tokens_total = registry.counter(
+    "llm_tokens_total",
+    "LLM tokens by backend, model, purpose and direction (input/output)",
+    ("backend", "model", "purpose", "direction"),
+)
+llm_in_flight = registry.gauge(
+    "llm_in_flight",
+    "LLM calls in progress (including open streams), by backend",
+    ("backend",),
+)
+
+
+def record_fallback(service: str) -> None:
+    """Count a fallback activation for a service."""
+    service_fallback_total.inc(service=service)
@@ -1,30 +1,52 @@
 from abc import ABC, abstractmethod
-from typing import Union, AsyncIterator
+from typing import Union, AsyncIterator, Optional, Dict, Any, List
+from app.models.instrumentation import instrument_generate
 
 
 class BaseLLMClient(ABC):
     """Abstract base class for all LLM clients."""
-    
+
+    # Backend label for metrics (defaults to the lower-cased class name)
+    backend: str = ""
+    # Wrappers that delegate to another client set this to False so the
+    # call is measured once, by the client that actually serves it
+    instrumented: bool = True
+
+    def __init_subclass__(cls, **kwargs):
+        """Instrument the `generate` of every concrete client class."""
+        super().__init_subclass__(**kwargs)
+        if not cls.backend:
+            cls.backend = cls.__name__.lower()
+        generate = cls.__dict__.get("generate")
+        if cls.instrumented and generate is not None and not getattr(generate, "__instrumented__", False):
+            cls.generate = instrument_generate(generate)
+
     @abstractmethod
     async def generate(
         self,
         prompt: str,
         max_tokens: int = 512,
-        stream: bool = False
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> Union[str, AsyncIterator[str]]:
         """
         Generate a response from the LLM.
-        
+
         Args:
             prompt: The input prompt
             max_tokens: Maximum tokens to generate
             stream: Whether to stream the response
-            
+            response_schema: Optional JSON schema for the output. Clients with a
+                native JSON mode must enable it so the response is a bare JSON object.
+            history: Optional prior conversation as chat messages ({"role", "content"}),
+                oldest first. The prompt is sent as the final user message.
+
         Returns:
             Either a complete string response or an async iterator for streaming
         """
         pass
-    
+
     @property
     @abstractmethod
     def model_name(self) -> str:
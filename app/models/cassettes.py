@@ -0,0 +1,250 @@
+"""
+Record and replay LLM traffic.
+
+`RecordingLLMClient` wraps a real client and saves every completed call (the
+request, the response chunks and the time before each chunk) as a cassette.
+`ReplayLLMClient` serves cassettes back without any network access, with the
+recorded timing, scaled timing or none, so benchmark and latency regression
+runs see the same LLM output every time.
+
+Cassettes are content-addressed: one gzip-compressed JSON file per request,
+named by the SHA-256 of the prompt, history, max_tokens and response schema
+(`<dir>/<2 hex>/<64 hex>.json.gz`). Recording the same request again replaces
+the cassette. Streamed and non-streamed calls share a cassette: a streamed
+recording replays non-streamed as the joined text after the total time, and a
+non-streamed recording replays as a stream of one chunk.
+
+Set LLM_CASSETTE_MODE=record or replay to route every client returned by
+`get_llm_client` through these wrappers.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from app.models.base_model import BaseLLMClient
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(LookupError):
+    """Raised on replay when no cassette matches the request."""
+
+
+def cassette_key(
+    prompt: str,
+    max_tokens: int = 512,
+    response_schema: Optional[Dict[str, Any]] = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> str:
+    """Content address of a request (independent of streaming and of the backend)."""
+    request = {
+        "prompt": prompt,
+        "max_tokens": max_tokens,
+        "response_schema": response_schema,
+        "history": [{"role": m["role"], "content": m["content"]} for m in history or []],
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """Directory of gzip-compressed cassettes addressed by request key."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(self.path_for(key), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, cassette: Dict[str, Any]) -> None:
+        """Write a cassette atomically, so concurrent replays never read a partial file."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(json.dumps(cassette, separators=(",", ":")).encode("utf-8"), mtime=0)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def keys(self) -> List[str]:
+        """Keys of all stored cassettes."""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            found.extend(name[:-len(".json.gz")] for name in files if name.endswith(".json.gz"))
+        return sorted(found)
+
+
+class RecordingLLMClient(BaseLLMClient):
+    """Client wrapper that records every completed call to a cassette store."""
+
+    instrumented = False
+
+    def __init__(self, client: BaseLLMClient, store: CassetteStore):
+        self.client = client
+        self.store = store
+
+    @property
+    def model_name(self) -> str:
+        return self.client.model_name
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        key = cassette_key(prompt, max_tokens, response_schema, history)
+        request = {"prompt": prompt, "max_tokens": max_tokens, "response_schema": response_schema, "history": history}
+        started = time.perf_counter()
+        response = await self.client.generate(
+            prompt,
+            max_tokens=max_tokens,
+            stream=stream,
+            response_schema=response_schema,
+            history=history
+        )
+        if not stream:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            await self._save(key, request, False, [response], [elapsed_ms])
+            return response
+        return self._record_stream(key, request, response, started)
+
+    async def _record_stream(
+        self,
+        key: str,
+        request: Dict[str, Any],
+        chunks: AsyncIterator[str],
+        started: float
+    ) -> AsyncIterator[str]:
+        """Relay a stream, saving it only if it runs to completion."""
+        recorded: List[str] = []
+        delays_ms: List[float] = []
+        last = started
+        try:
+            async for chunk in chunks:
+                now = time.perf_counter()
+                recorded.append(chunk)
+                delays_ms.append((now - last) * 1000)
+                last = now
+                yield chunk
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await self._save(key, request, True, recorded, delays_ms)
+
+    async def _save(
+        self,
+        key: str,
+        request: Dict[str, Any],
+        streamed: bool,
+        chunks: List[str],
+        delays_ms: List[float]
+    ) -> None:
+        cassette = {
+            "version": CASSETTE_VERSION,
+            "key": key,
+            "request": request,
+            "backend": getattr(self.client, "backend", ""),
+            "model": self.client.model_name,
+            "streamed": streamed,
+            "chunks": chunks,
+            "delays_ms": [round(delay, 2) for delay in delays_ms],
+            "recorded_at": time.time(),
+        }
+        try:
+            await asyncio.to_thread(self.store.save, key, cassette)
+        except OSError as e:
+            logger.warning(f"Could not record LLM cassette {key[:12]}: {e}")
+
+
+class ReplayLLMClient(BaseLLMClient):
+    """Client that answers from recorded cassettes, optionally with their timing."""
+
+    backend = "replay"
+
+    def __init__(
+        self,
+        store: CassetteStore,
+        time_scale: float = 1.0,
+        fallback: Optional[BaseLLMClient] = None
+    ):
+        """
+        Args:
+            store: Cassettes to serve
+            time_scale: Multiplier for recorded delays (1 = as recorded, 0 = no waiting)
+            fallback: Client for requests without a cassette (default: raise CassetteMiss)
+        """
+        self.store = store
+        self.time_scale = time_scale
+        self.fallback = fallback
+        self._cache: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def model_name(self) -> str:
+        return "replay"
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        key = cassette_key(prompt, max_tokens, response_schema, history)
+        cassette = await self._load(key)
+        if cassette is None:
+            if self.fallback is None:
+                raise CassetteMiss(f"No LLM cassette for request {key[:12]}")
+            return await self.fallback.generate(
+                prompt,
+                max_tokens=max_tokens,
+                stream=stream,
+                response_schema=response_schema,
+                history=history
+            )
+
+        chunks, delays_ms = cassette["chunks"], cassette["delays_ms"]
+        if stream:
+            return self._replay_stream(chunks, delays_ms)
+        await self._sleep(sum(delays_ms))
+        return "".join(chunks)
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        cassette = self._cache.get(key)
+        if cassette is None:
+            cassette = await asyncio.to_thread(self.store.load, key)
+            if cassette is not None:
+                self._cache[key] = cassette
+        return cassette
+
+    async def _replay_stream(self, chunks: List[str], delays_ms: List[float]) -> AsyncIterator[str]:
+        for chunk, delay_ms in zip(chunks, delays_ms):
+            await self._sleep(delay_ms)
+            yield chunk
+
+    async def _sleep(self, delay_ms: float) -> None:
+        if self.time_scale > 0 and delay_ms > 0:
+            await asyncio.sleep(delay_ms * self.time_scale / 1000)
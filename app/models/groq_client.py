@@ -1,78 +1,178 @@
-from typing import Union, AsyncIterator
-from groq import AsyncGroq
+from typing import Union, AsyncIterator, Optional, Dict, Any, List, Tuple
+from groq import AsyncGroq, RateLimitError
 from app.models.base_model import BaseLLMClient
+from app.models.instrumentation import report_usage
+from app.models.rate_limit import (
+    RateLimitExceeded,
+    RateLimiter,
+    backoff_delay,
+    get_rate_limiter,
+    retry_after_seconds,
+)
+from app.models.tokens import CHARS_PER_TOKEN, estimate_messages_tokens
+from app.metrics import rate_limit_retries_total
+from app.tracing import span
 from app.config import settings
 
 
+SYSTEM_PROMPT = "You are a helpful personal finance assistant. Always provide accurate, actionable financial advice."
+
+
 class GroqClient(BaseLLMClient):
     """Groq Llama 3.3 70B Versatile client for production use."""
-    
+
+    backend = "groq"
+
     def __init__(self):
         if not settings.groq_api_key:
             raise ValueError("GROQ_API_KEY is required for Groq client")
-        
-        self.client = AsyncGroq(api_key=settings.groq_api_key)
+
+        self.rate_limiter: Optional[RateLimiter] = None
+        base_url = settings.groq_base_url or None
+        if settings.groq_rate_limit_enabled:
+            # 429s are retried by _create within the request deadline, not by the SDK
+            self.client = AsyncGroq(api_key=settings.groq_api_key, base_url=base_url, max_retries=0)
+            self.rate_limiter = get_rate_limiter()
+        else:
+            self.client = AsyncGroq(api_key=settings.groq_api_key, base_url=base_url)
         self._model_name = settings.groq_model
-    
+
     async def generate(
         self,
         prompt: str,
         max_tokens: int = 512,
-        stream: bool = False
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> Union[str, AsyncIterator[str]]:
         """Generate response using Groq API."""
-        
+
         try:
             if stream:
-                return self._stream_generate(prompt, max_tokens)
+                return self._stream_generate(prompt, max_tokens, response_schema, history)
             else:
-                return await self._non_stream_generate(prompt, max_tokens)
+                return await self._non_stream_generate(prompt, max_tokens, response_schema, history)
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             raise RuntimeError(f"Groq API error: {str(e)}")
-    
-    async def _non_stream_generate(self, prompt: str, max_tokens: int) -> str:
+
+    def _build_messages(
+        self,
+        prompt: str,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Dict[str, str]]:
+        """Build the chat messages: system prompt, prior conversation, then the prompt."""
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if history:
+            messages.extend(
+                {"role": message["role"], "content": message["content"]}
+                for message in history
+            )
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _request_options(self, response_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Extra request options; a schema switches on Groq's JSON mode."""
+        if response_schema is None:
+            return {}
+        # Groq's JSON mode guarantees a syntactically valid JSON object; the
+        # expected shape is spelled out in the prompt itself.
+        return {"response_format": {"type": "json_object"}}
+
+    async def _non_stream_generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
         """Non-streaming generation."""
-        response = await self.client.chat.completions.create(
-            model=self._model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful personal finance assistant. Always provide accurate, actionable financial advice."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            max_tokens=max_tokens,
-            temperature=0.7,
+        response, reserved = await self._create(
+            self._build_messages(prompt, history),
+            max_tokens,
+            **self._request_options(response_schema),
         )
-        
+
+        usage = getattr(response, "usage", None)
+        if getattr(usage, "completion_tokens", None) is not None:
+            report_usage(usage.prompt_tokens, usage.completion_tokens)
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(reserved, usage.total_tokens if usage else reserved)
         return response.choices[0].message.content
-    
-    async def _stream_generate(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+
+    async def _stream_generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
         """Streaming generation."""
-        stream = await self.client.chat.completions.create(
-            model=self._model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful personal finance assistant. Always provide accurate, actionable financial advice."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            max_tokens=max_tokens,
-            temperature=0.7,
+        messages = self._build_messages(prompt, history)
+        stream, reserved = await self._create(
+            messages,
+            max_tokens,
             stream=True,
+            **self._request_options(response_schema),
         )
-        
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-    
+
+        output_chars = 0
+        try:
+            async for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    output_chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Runs when the consumer stops early (e.g. a cancelled chat), so the
+            # HTTP response is released instead of streaming to completion
+            await stream.close()
+            if self.rate_limiter is not None:
+                used = estimate_messages_tokens(messages) + (output_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+                self.rate_limiter.settle(reserved, used)
+
+    async def _create(self, messages: List[Dict[str, str]], max_tokens: int, **options) -> Tuple[Any, int]:
+        """
+        Send a chat completion request within the rate limit budget.
+
+        The estimated prompt + output tokens are reserved before dispatch (waiting
+        if the budget is short), and 429 responses are retried with jittered
+        backoff as long as the request deadline allows.
+
+        Returns:
+            The parsed completion (or stream) and the number of tokens reserved
+        """
+        request = dict(model=self._model_name, messages=messages, max_tokens=max_tokens, temperature=0.7, **options)
+        limiter = self.rate_limiter
+        if limiter is None:
+            return await self.client.chat.completions.create(**request), 0
+
+        estimated = estimate_messages_tokens(messages) + max_tokens
+        deadline = limiter.now() + settings.groq_request_deadline_seconds
+        attempt = 0
+        while True:
+            with span("groq.rate_limit", tokens=estimated, attempt=attempt):
+                reserved = await limiter.acquire(estimated, deadline)
+            try:
+                raw = await self.client.chat.completions.with_raw_response.create(**request)
+            except RateLimitError as e:
+                # A rejected request uses no budget, but every caller waits out the reset
+                limiter.settle(reserved, 0)
+                limiter.observe(e.response.headers)
+                delay = backoff_delay(attempt, retry_after_seconds(e.response.headers))
+                if attempt >= settings.groq_max_retries or limiter.now() + delay > deadline:
+                    raise RateLimitExceeded(f"Groq rate limit exceeded: {e}", retry_after=delay)
+                limiter.block_for(delay)
+                rate_limit_retries_total.inc()
+                attempt += 1
+                continue
+            except Exception:
+                limiter.settle(reserved, 0)
+                raise
+
+            limiter.observe(raw.headers)
+            return await raw.parse(), reserved
+
     @property
     def model_name(self) -> str:
         # Return custom display name for branding purposes
@@ -0,0 +1,203 @@
+"""
+Metrics and tracing instrumentation for LLM clients.
+
+`BaseLLMClient.__init_subclass__` wraps the `generate` of every client class
+with `instrument_generate`, so current and future backends report latency,
+time to first token, token counts and in-flight calls, and open an
+"llm.generate" span in sampled traces, without any code of their own. With
+metrics disabled and no sampled trace the wrapper is a couple of lookups.
+
+The purpose label comes from the `llm_purpose` context variable, which the
+wrappers returned by `get_llm_client` set for the duration of a call.
+"""
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.config import settings
+from app.metrics import (
+    llm_in_flight,
+    llm_request_duration_seconds,
+    llm_requests_total,
+    llm_time_to_first_token_seconds,
+    llm_tokens_total,
+)
+from app.models.tokens import CHARS_PER_TOKEN, estimate_messages_tokens, estimate_tokens
+from app.tracing import Span, current_span, get_tracer
+
+llm_purpose: ContextVar[str] = ContextVar("llm_purpose", default="general")
+
+# Set while an instrumented call is running, so a subclass calling
+# super().generate() is only counted once
+_in_call: ContextVar[bool] = ContextVar("llm_instrumented_call", default=False)
+
+# Usage reported by the backend for the current call, if any
+_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage", default=None)
+
+
+def report_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    """Record the provider's token usage for the call in progress (replaces the estimate)."""
+    usage = _usage.get()
+    if usage is not None:
+        usage["input"] = prompt_tokens
+        usage["output"] = completion_tokens
+
+
+def backend_labels(client: Any) -> Dict[str, str]:
+    """Backend, model and purpose labels for a call made by `client`."""
+    return {
+        "backend": client.backend,
+        "model": getattr(client, "_model_name", None) or client.model_name,
+        "purpose": llm_purpose.get(),
+    }
+
+
+def instrument_generate(generate):
+    """Wrap a client's `generate` coroutine with call metrics and an "llm.generate" span."""
+
+    @functools.wraps(generate)
+    async def instrumented(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[list] = None
+    ):
+        parent = current_span.get()
+        traced = parent is not None and parent.sampled
+        if _in_call.get() or not (settings.metrics_enabled or traced):
+            return await generate(
+                self, prompt, max_tokens=max_tokens, stream=stream, response_schema=response_schema, history=history
+            )
+
+        call = _Call(self, settings.metrics_enabled)
+        call.usage["input"] = estimate_tokens(prompt) + estimate_messages_tokens(history or [])
+        if traced:
+            call.span = get_tracer().start_span(
+                "llm.generate",
+                kind="client",
+                attributes=dict(call.labels, stream=stream, max_tokens=max_tokens)
+            )
+        in_call = _in_call.set(True)
+        usage_token = _usage.set(call.usage)
+        span_token = current_span.set(call.span) if call.span is not None else None
+        try:
+            response = await generate(
+                self, prompt, max_tokens=max_tokens, stream=stream, response_schema=response_schema, history=history
+            )
+        except asyncio.CancelledError:
+            call.finish("cancelled")
+            raise
+        except BaseException as e:
+            call.finish("error", e)
+            raise
+        finally:
+            if span_token is not None:
+                current_span.reset(span_token)
+            _usage.reset(usage_token)
+            _in_call.reset(in_call)
+
+        if not stream:
+            call.first_token()
+            if call.usage["output"] == 0:
+                call.usage["output"] = estimate_tokens(response)
+            call.finish("ok")
+            return response
+        return _ObservedStream(response, call)
+
+    instrumented.__instrumented__ = True
+    return instrumented
+
+
+class _Call:
+    """Bookkeeping for one instrumented LLM call."""
+
+    __slots__ = ("labels", "usage", "started", "span", "record_metrics")
+
+    def __init__(self, client: Any, record_metrics: bool):
+        self.labels = backend_labels(client)
+        self.usage = {"input": 0, "output": 0}
+        self.record_metrics = record_metrics
+        self.span: Optional[Span] = None
+        self.started = time.perf_counter()
+        if record_metrics:
+            llm_in_flight.inc(backend=self.labels["backend"])
+
+    def first_token(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        if self.record_metrics:
+            llm_time_to_first_token_seconds.observe(elapsed, **self.labels)
+        if self.span is not None:
+            self.span.set_attribute("llm.time_to_first_token_ms", round(elapsed * 1000, 3))
+
+    def finish(self, outcome: str, error: Optional[BaseException] = None) -> None:
+        labels, usage = self.labels, self.usage
+        if self.record_metrics:
+            llm_in_flight.dec(backend=labels["backend"])
+            llm_request_duration_seconds.observe(time.perf_counter() - self.started, **labels)
+            llm_requests_total.inc(outcome=outcome, **labels)
+            llm_tokens_total.inc(usage["input"], direction="input", **labels)
+            llm_tokens_total.inc(usage["output"], direction="output", **labels)
+        if self.span is not None:
+            self.span.set_attribute("llm.input_tokens", usage["input"])
+            self.span.set_attribute("llm.output_tokens", usage["output"])
+            if error is not None:
+                self.span.record_error(error)
+            get_tracer().end_span(self.span)
+
+
+class _ObservedStream:
+    """
+    Relay a stream, timing the first chunk and the end of the stream.
+
+    The call is finished in `aclose`, which also runs for a stream closed
+    before its first chunk was read, so the in-flight gauge and the span never
+    outlive an abandoned stream.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str], call: _Call):
+        self._chunks = chunks
+        self._call = call
+        self._output_chars = 0
+        self._closed = False
+
+    def __aiter__(self) -> "_ObservedStream":
+        return self
+
+    async def __anext__(self) -> str:
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            await self._finish("ok")
+            raise
+        except asyncio.CancelledError:
+            await self._finish("cancelled")
+            raise
+        except BaseException as e:
+            await self._finish("error", e)
+            raise
+        if self._output_chars == 0 and chunk:
+            self._call.first_token()
+        self._output_chars += len(chunk)
+        return chunk
+
+    async def aclose(self) -> None:
+        """Close the stream; one closed before the end (e.g. a cancelled chat) counts as cancelled."""
+        await self._finish("cancelled")
+
+    async def _finish(self, outcome: str, error: Optional[BaseException] = None) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            aclose = getattr(self._chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        finally:
+            self._call.usage["output"] = (self._output_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+            self._call.finish(outcome, error)
@@ -1,7 +1,9 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 from app.models.base_model import BaseLLMClient
-from app.models.groq_client import GroqClient
-from app.models.ollama_granite import OllamaGraniteClient
-from app.models.fallback_mock import FallbackMockClient
+from app.models.instrumentation import llm_purpose
+from app.models.cassettes import CassetteStore, RecordingLLMClient, ReplayLLMClient
+from app.models.registry import create_backend
+from app.models.scheduler import ScheduledLLMClient, priority_class_for
 from app.config import settings
 import logging
 
@@ -14,6 +16,7 @@ class ModelFactory:
     _groq_instance: BaseLLMClient = None
     _granite_instance: BaseLLMClient = None
     _mock_instance: BaseLLMClient = None
+    _cassette_instance: BaseLLMClient = None
     
     @classmethod
     def get_client(cls, purpose: str = "general") -> BaseLLMClient:
@@ -22,6 +25,8 @@ class ModelFactory:
         
         In prod mode: All purposes use Groq (chat, budget, insights, general)
         In local mode: Always returns Mock client regardless of purpose.
+        With LLM_CASSETTE_MODE=record the client is wrapped to record its calls;
+        with LLM_CASSETTE_MODE=replay recorded calls are served instead.
         
         Args:
             purpose: The intended use case - "chat", "budget_summary", "spending_insights", or "general"
@@ -29,11 +34,30 @@ class ModelFactory:
         Returns:
             BaseLLMClient instance appropriate for the environment
         """
+        if settings.llm_cassette_mode == "replay":
+            if cls._cassette_instance is None:
+                logger.info(f"Replaying LLM cassettes from {settings.llm_cassette_dir}")
+                cls._cassette_instance = ReplayLLMClient(
+                    CassetteStore(settings.llm_cassette_dir), settings.llm_cassette_time_scale
+                )
+            return cls._cassette_instance
+        
+        client = cls._get_backend_client(purpose)
+        if settings.llm_cassette_mode == "record":
+            if cls._cassette_instance is None or cls._cassette_instance.client is not client:
+                logger.info(f"Recording LLM cassettes to {settings.llm_cassette_dir}")
+                cls._cassette_instance = RecordingLLMClient(client, CassetteStore(settings.llm_cassette_dir))
+            return cls._cassette_instance
+        return client
+    
+    @classmethod
+    def _get_backend_client(cls, purpose: str) -> BaseLLMClient:
+        """Groq in prod mode (Mock without a usable API key), Mock in local mode."""
         # Local mode - always use mock
         if settings.app_env == "local":
             if cls._mock_instance is None:
                 logger.info("Using Mock LLM client (local mode)")
-                cls._mock_instance = FallbackMockClient()
+                cls._mock_instance = create_backend("mock")
             return cls._mock_instance
         
         # Production mode - all purposes use Groq
@@ -42,18 +66,18 @@ class ModelFactory:
             if settings.groq_api_key:
                 try:
                     logger.info(f"Initializing Groq client for {purpose}")
-                    cls._groq_instance = GroqClient()
+                    cls._groq_instance = create_backend("groq")
                     logger.info("Successfully initialized Groq client")
                 except Exception as e:
                     logger.error(f"Failed to initialize Groq client: {e}")
                     logger.warning(f"Falling back to Mock client for {purpose}")
                     if cls._mock_instance is None:
-                        cls._mock_instance = FallbackMockClient()
+                        cls._mock_instance = create_backend("mock")
                     return cls._mock_instance
             else:
                 logger.warning(f"No Groq API key found for {purpose}, using Mock client")
                 if cls._mock_instance is None:
-                    cls._mock_instance = FallbackMockClient()
+                    cls._mock_instance = create_backend("mock")
                 return cls._mock_instance
         return cls._groq_instance
     
@@ -63,17 +87,59 @@ class ModelFactory:
         cls._groq_instance = None
         cls._granite_instance = None
         cls._mock_instance = None
+        cls._cassette_instance = None
+
+
+class PurposeLLMClient(BaseLLMClient):
+    """Client wrapper that labels call metrics with the purpose (used without the scheduler)."""
+
+    instrumented = False
+
+    def __init__(self, client: BaseLLMClient, purpose: str):
+        self.client = client
+        self.purpose = purpose
+
+    @property
+    def model_name(self) -> str:
+        return self.client.model_name
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        token = llm_purpose.set(self.purpose)
+        try:
+            return await self.client.generate(
+                prompt,
+                max_tokens=max_tokens,
+                stream=stream,
+                response_schema=response_schema,
+                history=history
+            )
+        finally:
+            llm_purpose.reset(token)
 
 
 def get_llm_client(purpose: str = "general") -> BaseLLMClient:
     """
     Dependency injection function for FastAPI with purpose-based routing.
     
+    Calls go through the LLM scheduler, which orders them by the priority
+    class of the purpose and shares capacity fairly between tenants.
+    
     Args:
-        purpose: The intended use case - "chat", "budget_summary", "spending_insights", or "general"
+        purpose: The intended use case - "chat", "budget_summary", "spending_insights",
+            "batch", or "general"
     
     Returns:
         BaseLLMClient instance appropriate for the purpose
     """
-    return ModelFactory.get_client(purpose=purpose)
+    client = ModelFactory.get_client(purpose=purpose)
+    if not settings.llm_scheduler_enabled:
+        return PurposeLLMClient(client, purpose) if settings.metrics_enabled else client
+    return ScheduledLLMClient(client, priority_class_for(purpose), purpose=purpose)
 
@@ -1,4 +1,5 @@
-from typing import Union, AsyncIterator
+import json
+from typing import Union, AsyncIterator, Optional, Dict, Any, List
 import httpx
 from app.models.base_model import BaseLLMClient
 from app.config import settings
@@ -6,75 +7,106 @@ from app.config import settings
 
 class OllamaGraniteClient(BaseLLMClient):
     """IBM Granite client via Ollama for production use."""
-    
+
+    backend = "ollama"
+
     def __init__(self):
         self.base_url = settings.ollama_base_url
         self._model_name = settings.ollama_model
         self.client = httpx.AsyncClient(timeout=60.0)
-    
+
     async def generate(
         self,
         prompt: str,
         max_tokens: int = 512,
-        stream: bool = False
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> Union[str, AsyncIterator[str]]:
         """Generate response using Ollama API."""
-        
+
         try:
             if stream:
-                return self._stream_generate(prompt, max_tokens)
+                return self._stream_generate(prompt, max_tokens, response_schema, history)
             else:
-                return await self._non_stream_generate(prompt, max_tokens)
+                return await self._non_stream_generate(prompt, max_tokens, response_schema, history)
         except Exception as e:
             raise RuntimeError(f"Ollama API error: {str(e)}")
-    
-    async def _non_stream_generate(self, prompt: str, max_tokens: int) -> str:
-        """Non-streaming generation."""
-        url = f"{self.base_url}/api/generate"
-        
+
+    def _build_payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        stream: bool,
+        response_schema: Optional[Dict[str, Any]],
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
+        """Build the /api/generate payload, enabling JSON output when a schema is given."""
         payload = {
             "model": self._model_name,
-            "prompt": prompt,
-            "stream": False,
+            "prompt": self._render_prompt(prompt, history),
+            "stream": stream,
             "options": {
                 "num_predict": max_tokens,
                 "temperature": 0.7,
             }
         }
-        
+        if response_schema is not None:
+            # Ollama >= 0.5 accepts a full JSON schema; older servers only "json"
+            payload["format"] = response_schema if settings.ollama_schema_format else "json"
+        return payload
+
+    def _render_prompt(self, prompt: str, history: Optional[List[Dict[str, str]]]) -> str:
+        """Prepend prior conversation as a transcript (/api/generate takes a single prompt)."""
+        if not history:
+            return prompt
+        speakers = {"user": "User", "assistant": "Assistant", "system": "Context"}
+        transcript = "\n".join(
+            f"{speakers.get(message['role'], message['role'])}: {message['content']}"
+            for message in history
+        )
+        return f"CONVERSATION SO FAR:\n{transcript}\n\n{prompt}"
+
+    async def _non_stream_generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """Non-streaming generation."""
+        url = f"{self.base_url}/api/generate"
+        payload = self._build_payload(prompt, max_tokens, False, response_schema, history)
+
         response = await self.client.post(url, json=payload)
         response.raise_for_status()
-        
+
         result = response.json()
         return result.get("response", "")
-    
-    async def _stream_generate(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+
+    async def _stream_generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
         """Streaming generation."""
         url = f"{self.base_url}/api/generate"
-        
-        payload = {
-            "model": self._model_name,
-            "prompt": prompt,
-            "stream": True,
-            "options": {
-                "num_predict": max_tokens,
-                "temperature": 0.7,
-            }
-        }
-        
+        payload = self._build_payload(prompt, max_tokens, True, response_schema, history)
+
         async with self.client.stream("POST", url, json=payload) as response:
             response.raise_for_status()
             async for line in response.aiter_lines():
                 if line:
-                    import json
                     data = json.loads(line)
                     if "response" in data:
                         yield data["response"]
-    
+
     @property
     def model_name(self) -> str:
         return self._model_name
-    
+
     async def close(self):
         """Close the HTTP client."""
         await self.client.aclose()
@@ -0,0 +1,239 @@
+"""
+Client-side rate limiting for the Groq API.
+
+Two token buckets track the requests-per-minute and tokens-per-minute budgets.
+Each call reserves its estimated tokens up front; when the bucket is short,
+the reservation goes into debt and the caller sleeps until it is paid off, so
+concurrent callers are paced at the refill rate instead of bursting into 429s
+and backing off together. Budgets are corrected from the `x-ratelimit-*`
+headers Groq returns on every response.
+"""
+import asyncio
+import random
+import re
+import time
+from typing import Awaitable, Callable, Mapping, Optional
+
+from app.config import settings
+from app.metrics import rate_limit_tokens_available, rate_limit_total, rate_limit_wait_seconds_total
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a call cannot be made within its deadline without exceeding the budget."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Groq reset duration such as "7.66s", "2m59.56s" or "120ms" into seconds.
+
+    Plain numbers (as in Retry-After) are taken as seconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = 0.5, cap: float = 20.0) -> float:
+    """
+    Jittered exponential backoff for a retry.
+
+    The server's retry-after (if any) is a floor; on top of it a random share
+    of the exponential step spreads retries out so callers do not return in
+    lockstep.
+    """
+    step = min(cap, base * (2 ** attempt))
+    return (retry_after or 0.0) + random.uniform(0.5 * step, step)
+
+
+class TokenBucket:
+    """Continuously refilling bucket whose level may go negative (reserved debt)."""
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = refill_per_second
+        self.level = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """Current level (negative while reservations are outstanding)."""
+        self._refill()
+        return self.level
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` could be taken without going into debt."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        deficit = amount - self.level
+        return max(0.0, deficit / self.rate) if self.rate > 0 else (0.0 if deficit <= 0 else float("inf"))
+
+    def take(self, amount: float) -> None:
+        """Reserve `amount` (capped at capacity), possibly going into debt."""
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        """Return unused reservation."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def resize(self, capacity: float, refill_per_second: float) -> None:
+        """Change the budget, keeping the current level within the new capacity."""
+        self._refill()
+        self.capacity = capacity
+        self.rate = refill_per_second
+        self.level = min(self.level, capacity)
+
+
+class RateLimiter:
+    """Requests/minute and tokens/minute budgets shared by every Groq call."""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        headroom: float = 0.95,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        self.headroom = headroom
+        self._clock = clock
+        self._sleep = sleep
+        self.requests = TokenBucket(requests_per_minute * headroom, requests_per_minute * headroom / 60, clock)
+        self.tokens = TokenBucket(tokens_per_minute * headroom, tokens_per_minute * headroom / 60, clock)
+        self.blocked_until = 0.0
+
+    def now(self) -> float:
+        return self._clock()
+
+    async def acquire(self, tokens: int, deadline: float) -> int:
+        """
+        Reserve one request and `tokens` tokens, waiting until the budget allows it.
+
+        Args:
+            tokens: Estimated prompt + output tokens of the call
+            deadline: Clock time by which the call must be dispatched
+
+        Returns:
+            The number of tokens reserved (settle it with `settle`)
+
+        Raises:
+            RateLimitExceeded: If the budget cannot cover the call before the deadline
+        """
+        now = self._clock()
+        wait = max(
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens),
+            self.blocked_until - now,
+            0.0
+        )
+        if now + wait > deadline:
+            rate_limit_total.inc(outcome="rejected")
+            raise RateLimitExceeded(f"Groq rate limit budget exhausted (retry in {wait:.1f}s)", retry_after=wait)
+
+        reserved = int(min(tokens, self.tokens.capacity))
+        self.requests.take(1)
+        self.tokens.take(reserved)
+        rate_limit_tokens_available.set(self.tokens.available())
+        if wait > 0:
+            rate_limit_total.inc(outcome="delayed")
+            rate_limit_wait_seconds_total.inc(wait)
+            try:
+                await self._sleep(wait)
+            except asyncio.CancelledError:
+                # The call will not be made: hand the reservation to the callers behind it
+                self.requests.give(1)
+                self.tokens.give(reserved)
+                rate_limit_tokens_available.set(self.tokens.available())
+                raise
+        else:
+            rate_limit_total.inc(outcome="immediate")
+        return reserved
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Correct a reservation once the actual token usage is known."""
+        if actual < reserved:
+            self.tokens.give(reserved - actual)
+        elif actual > reserved:
+            self.tokens.take(actual - reserved)
+        rate_limit_tokens_available.set(self.tokens.available())
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """
+        Sync the budgets with Groq's rate-limit headers.
+
+        `x-ratelimit-limit-tokens` is the tokens-per-minute quota and
+        `x-ratelimit-remaining-tokens` what is left of it; the local level never
+        exceeds what the server reports. `x-ratelimit-*-requests` is a daily
+        quota, so it only blocks calls once exhausted.
+        """
+        limit_tokens = _number(headers.get("x-ratelimit-limit-tokens"))
+        if limit_tokens:
+            budget = limit_tokens * self.headroom
+            self.tokens.resize(budget, budget / 60)
+        remaining_tokens = _number(headers.get("x-ratelimit-remaining-tokens"))
+        if remaining_tokens is not None and remaining_tokens < self.tokens.available():
+            self.tokens.level = remaining_tokens
+
+        remaining_requests = _number(headers.get("x-ratelimit-remaining-requests"))
+        if remaining_requests is not None and remaining_requests <= 0:
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests")) or 60.0
+            self.block_for(reset)
+        rate_limit_tokens_available.set(self.tokens.available())
+
+    def block_for(self, seconds: float) -> None:
+        """Hold every call for `seconds` (after a 429 or an exhausted daily quota)."""
+        self.blocked_until = max(self.blocked_until, self._clock() + seconds)
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Server-suggested wait from a 429: Retry-After, else the token reset time."""
+    return parse_duration(headers.get("retry-after")) or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide Groq rate limiter configured from settings."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            settings.groq_requests_per_minute,
+            settings.groq_tokens_per_minute,
+            headroom=settings.groq_rate_limit_headroom
+        )
+    return _rate_limiter
+
+
+def reset_rate_limiter() -> None:
+    """Drop the process-wide rate limiter (useful for testing)."""
+    global _rate_limiter
+    _rate_limiter = None
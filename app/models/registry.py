@@ -0,0 +1,65 @@
+"""
+Registry of LLM backends, imported on first use.
+
+Backends are registered by name with the dotted path of their client class,
+so the `groq` SDK and `httpx` are only imported when a Groq or Ollama client
+is actually created. In local mode the app starts without loading either,
+which keeps cold starts of scale-to-zero containers short.
+"""
+import importlib
+import threading
+from typing import Dict, Type
+
+from app.models.base_model import BaseLLMClient
+
+_BACKENDS: Dict[str, str] = {
+    "groq": "app.models.groq_client:GroqClient",
+    "ollama": "app.models.ollama_granite:OllamaGraniteClient",
+    "mock": "app.models.fallback_mock:FallbackMockClient",
+}
+
+_loaded: Dict[str, Type[BaseLLMClient]] = {}
+_lock = threading.Lock()
+
+
+def register_backend(name: str, path: str) -> None:
+    """
+    Register a backend client class.
+
+    Args:
+        name: Backend name used with `create_backend`
+        path: "package.module:ClassName" of a BaseLLMClient subclass
+    """
+    with _lock:
+        _BACKENDS[name] = path
+        _loaded.pop(name, None)
+
+
+def available_backends() -> Dict[str, str]:
+    """Registered backend names and their class paths."""
+    return dict(_BACKENDS)
+
+
+def backend_class(name: str) -> Type[BaseLLMClient]:
+    """
+    Import (once) and return the client class of a backend.
+
+    Raises:
+        KeyError: If no backend is registered under `name`
+        ImportError: If the backend's module or its dependencies cannot be imported
+    """
+    cls = _loaded.get(name)
+    if cls is not None:
+        return cls
+    with _lock:
+        if name not in _BACKENDS:
+            raise KeyError(f"Unknown LLM backend: {name!r} (registered: {', '.join(sorted(_BACKENDS))})")
+        module_name, _, class_name = _BACKENDS[name].partition(":")
+        cls = getattr(importlib.import_module(module_name), class_name)
+        _loaded[name] = cls
+        return cls
+
+
+def create_backend(name: str, **kwargs) -> BaseLLMClient:
+    """Create a client for a registered backend."""
+    return backend_class(name)(**kwargs)
@@ -0,0 +1,391 @@
+"""
+Priority and fair-share scheduling of LLM calls.
+
+Every call made through `get_llm_client` takes one of a fixed number of
+upstream slots. When the slots are busy, waiting calls are served by strict
+priority class (interactive chat > budget > insights > batch) and, within a
+class, by weighted fair queueing across tenants: each call is charged its
+estimated token cost (prompt + history + max_tokens) divided by the tenant's
+weight, so one tenant's batch of large requests cannot crowd out the others.
+
+The tenant comes from the request (see `tenant_from_headers`) and is carried
+in a context variable, so services do not need to pass it around.
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple, Union
+
+from app.config import settings
+from app.metrics import (
+    scheduler_in_flight,
+    scheduler_queue_depth,
+    scheduler_requests_total,
+    scheduler_tokens_total,
+    scheduler_wait_seconds_total,
+)
+from app.models.base_model import BaseLLMClient
+from app.models.instrumentation import llm_purpose
+from app.models.tokens import CHARS_PER_TOKEN, estimate_messages_tokens, estimate_tokens
+from app.tracing import span
+
+# Highest priority first
+PRIORITY_CLASSES = ("interactive", "budget", "insights", "batch")
+
+# Purpose passed to get_llm_client -> priority class
+PURPOSE_CLASSES = {
+    "chat": "interactive",
+    "general": "interactive",
+    "budget_summary": "budget",
+    "spending_insights": "insights",
+    "batch": "batch",
+}
+
+DEFAULT_TENANT = "anonymous"
+
+# Metric label for tenants without a configured weight, so client-chosen
+# tenant ids cannot grow the label set without bound
+OTHER_TENANT = "other"
+
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+
+def tenant_from_headers(headers: Mapping[str, str]) -> str:
+    """
+    Identify the tenant of a request.
+
+    An explicit X-Tenant-ID wins; otherwise the API key is hashed so raw
+    keys never end up in metrics or logs.
+    """
+    tenant = headers.get("x-tenant-id")
+    if tenant:
+        return tenant[:64]
+    api_key = headers.get("x-api-key")
+    if api_key:
+        return "key-" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return DEFAULT_TENANT
+
+
+def priority_class_for(purpose: str) -> str:
+    """Map a client purpose to its priority class (unknown purposes are interactive)."""
+    return PURPOSE_CLASSES.get(purpose, "interactive")
+
+
+@dataclass(order=True)
+class _Waiter:
+    """A call waiting for a slot, ordered by its virtual finish tag."""
+    finish_tag: float
+    sequence: int
+    start_tag: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class LLMScheduler:
+    """Slot-limited scheduler with priority classes and per-tenant fair queueing."""
+
+    def __init__(self, max_concurrency: int = 8, tenant_weights: Optional[Dict[str, float]] = None):
+        self.max_concurrency = max_concurrency
+        self.tenant_weights = tenant_weights or {}
+        self._active = 0
+        self._queues: Dict[str, List[_Waiter]] = {name: [] for name in PRIORITY_CLASSES}
+        self._depth: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self._virtual_time: Dict[str, float] = {name: 0.0 for name in PRIORITY_CLASSES}
+        self._tenant_finish: Dict[Tuple[str, str], float] = {}
+        self._sequence = itertools.count()
+        self.requests: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self.wait_seconds: Dict[str, float] = {name: 0.0 for name in PRIORITY_CLASSES}
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently holding a slot."""
+        return self._active
+
+    def queue_depth(self, priority_class: Optional[str] = None) -> int:
+        """Waiting calls in one class, or in all classes."""
+        if priority_class is not None:
+            return self._depth[priority_class]
+        return sum(self._depth.values())
+
+    def weight(self, tenant: str) -> float:
+        """Fair-share weight of a tenant (default 1)."""
+        return max(float(self.tenant_weights.get(tenant, 1.0)), 1e-6)
+
+    def metric_tenant(self, tenant: str) -> str:
+        """Tenant label for metrics: configured tenants by name, everyone else as "other"."""
+        if tenant in self.tenant_weights or tenant == DEFAULT_TENANT:
+            return tenant
+        return OTHER_TENANT
+
+    def _tag(self, priority_class: str, tenant: str, cost: float) -> Tuple[float, float]:
+        """Assign start and finish tags and advance the tenant's finish time."""
+        key = (priority_class, tenant)
+        start = max(self._virtual_time[priority_class], self._tenant_finish.get(key, 0.0))
+        finish = start + cost / self.weight(tenant)
+        self._tenant_finish[key] = finish
+        return start, finish
+
+    async def acquire(self, priority_class: str, tenant: str, cost: float) -> float:
+        """
+        Wait for a slot.
+
+        Args:
+            priority_class: One of PRIORITY_CLASSES
+            tenant: Tenant the call is charged to
+            cost: Estimated tokens of the call
+
+        Returns:
+            Seconds spent waiting
+        """
+        start_tag, finish_tag = self._tag(priority_class, tenant, cost)
+        if self._active < self.max_concurrency and self.queue_depth() == 0:
+            self._admit(priority_class, start_tag, 0.0)
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(finish_tag, next(self._sequence), start_tag, loop.create_future())
+        heapq.heappush(self._queues[priority_class], waiter)
+        self._set_depth(priority_class, 1)
+        enqueued = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot was granted just as the caller went away
+                self.release()
+            else:
+                self._set_depth(priority_class, -1)
+            raise
+        waited = time.perf_counter() - enqueued
+        self._record_wait(priority_class, waited)
+        return waited
+
+    def release(self) -> None:
+        """Return a slot, admit the next waiting call and forget idle tenants."""
+        self._active -= 1
+        scheduler_in_flight.set(self._active)
+        self._dispatch()
+        self._prune()
+
+    def settle(self, priority_class: str, tenant: str, estimated: float, actual: float) -> None:
+        """Record the tokens a call used and correct its fair-share charge."""
+        scheduler_tokens_total.inc(actual, priority_class=priority_class, tenant=self.metric_tenant(tenant))
+        key = (priority_class, tenant)
+        virtual_time = self._virtual_time[priority_class]
+        corrected = self._tenant_finish.get(key, virtual_time) + (actual - estimated) / self.weight(tenant)
+        if corrected > virtual_time:
+            self._tenant_finish[key] = corrected
+        else:
+            self._tenant_finish.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth, admitted calls and mean wait per class."""
+        return {
+            "in_flight": self._active,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                name: {
+                    "queue_depth": self._depth[name],
+                    "requests": self.requests[name],
+                    "avg_wait_ms": round(self.wait_seconds[name] / self.requests[name] * 1000, 2)
+                    if self.requests[name] else 0.0,
+                }
+                for name in PRIORITY_CLASSES
+            },
+        }
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the highest-priority, lowest-finish-tag waiters."""
+        while self._active < self.max_concurrency:
+            waiter, priority_class = self._next_waiter()
+            if waiter is None:
+                return
+            self._set_depth(priority_class, -1)
+            self._admit(priority_class, waiter.start_tag, None)
+            waiter.future.set_result(None)
+
+    def _prune(self) -> None:
+        """
+        Forget finish times that can no longer delay anyone.
+
+        That is every finish time at or below its class's virtual time, and all
+        of a class's finish times once nothing is queued in it (fair share is
+        only kept within a busy period), so the table stays bounded by the
+        tenants actually contending for slots.
+        """
+        stale = [
+            key for key, finish in self._tenant_finish.items()
+            if finish <= self._virtual_time[key[0]] or not self._depth[key[0]]
+        ]
+        for key in stale:
+            del self._tenant_finish[key]
+
+    def _next_waiter(self) -> Tuple[Optional[_Waiter], Optional[str]]:
+        for priority_class in PRIORITY_CLASSES:
+            queue = self._queues[priority_class]
+            while queue:
+                waiter = heapq.heappop(queue)
+                if not waiter.future.done():
+                    return waiter, priority_class
+        return None, None
+
+    def _admit(self, priority_class: str, start_tag: float, waited: Optional[float]) -> None:
+        self._active += 1
+        scheduler_in_flight.set(self._active)
+        self._virtual_time[priority_class] = max(self._virtual_time[priority_class], start_tag)
+        if waited is not None:
+            self._record_wait(priority_class, waited)
+
+    def _record_wait(self, priority_class: str, waited: float) -> None:
+        self.requests[priority_class] += 1
+        self.wait_seconds[priority_class] += waited
+        scheduler_requests_total.inc(priority_class=priority_class)
+        scheduler_wait_seconds_total.inc(waited, priority_class=priority_class)
+
+    def _set_depth(self, priority_class: str, delta: int) -> None:
+        self._depth[priority_class] += delta
+        scheduler_queue_depth.set(self._depth[priority_class], priority_class=priority_class)
+
+
+class ScheduledLLMClient(BaseLLMClient):
+    """Client wrapper that takes a scheduler slot for every call."""
+
+    instrumented = False
+
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        priority_class: str,
+        scheduler: Optional[LLMScheduler] = None,
+        purpose: str = "general"
+    ):
+        self.client = client
+        self.priority_class = priority_class
+        self.purpose = purpose
+        self._scheduler = scheduler
+
+    @property
+    def scheduler(self) -> LLMScheduler:
+        return self._scheduler if self._scheduler is not None else get_scheduler()
+
+    @property
+    def model_name(self) -> str:
+        return self.client.model_name
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        stream: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Union[str, AsyncIterator[str]]:
+        """Generate once a slot is free; streams keep the slot until they are closed."""
+        scheduler = self.scheduler
+        tenant = current_tenant.get()
+        prompt_tokens = estimate_tokens(prompt) + estimate_messages_tokens(history or [])
+        estimated = prompt_tokens + max_tokens
+
+        with span("scheduler.wait", priority_class=self.priority_class, tenant=tenant) as wait_span:
+            waited = await scheduler.acquire(self.priority_class, tenant, estimated)
+            wait_span.set_attribute("wait_ms", round(waited * 1000, 3))
+        purpose_token = llm_purpose.set(self.purpose)
+        try:
+            response = await self.client.generate(
+                prompt,
+                max_tokens=max_tokens,
+                stream=stream,
+                response_schema=response_schema,
+                history=history
+            )
+        except BaseException:
+            scheduler.release()
+            raise
+        finally:
+            llm_purpose.reset(purpose_token)
+
+        if not stream:
+            scheduler.settle(self.priority_class, tenant, estimated, prompt_tokens + estimate_tokens(response))
+            scheduler.release()
+            return response
+        return _SlotStream(response, scheduler, self.priority_class, tenant, prompt_tokens, estimated)
+
+
+class _SlotStream:
+    """
+    Relay a stream, releasing the slot when it ends or is closed.
+
+    A plain async generator would only release in its `finally`, which never
+    runs when the stream is closed before the first chunk is read (e.g. the
+    client disconnects before the response starts); `aclose` here always does.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[str],
+        scheduler: LLMScheduler,
+        priority_class: str,
+        tenant: str,
+        prompt_tokens: int,
+        estimated: int
+    ):
+        self._chunks = chunks
+        self._scheduler = scheduler
+        self._priority_class = priority_class
+        self._tenant = tenant
+        self._prompt_tokens = prompt_tokens
+        self._estimated = estimated
+        self._output_chars = 0
+        self._closed = False
+
+    def __aiter__(self) -> "_SlotStream":
+        return self
+
+    async def __anext__(self) -> str:
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            chunk = await self._chunks.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+        self._output_chars += len(chunk)
+        return chunk
+
+    async def aclose(self) -> None:
+        """Close the upstream stream and give the slot back (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            aclose = getattr(self._chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        finally:
+            self._scheduler.settle(
+                self._priority_class,
+                self._tenant,
+                self._estimated,
+                self._prompt_tokens + (self._output_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+            )
+            self._scheduler.release()
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler configured from settings."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(settings.llm_max_concurrency, settings.llm_tenant_weights)
+    return _scheduler
+
+
+def reset_scheduler() -> None:
+    """Drop the process-wide scheduler (useful for testing)."""
+    global _scheduler
+    _scheduler = None
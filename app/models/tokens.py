@@ -0,0 +1,24 @@
+"""Cheap token estimation used for prompt budgeting before dispatch."""
+
+# Llama-family tokenizers average roughly four characters of English per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Approximate token count (0 for empty text)
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_messages_tokens(messages) -> int:
+    """Estimate tokens for a list of chat messages, including per-message overhead."""
+    return sum(estimate_tokens(message.get("content", "")) + 4 for message in messages)
@@ -0,0 +1,233 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when it carries `X-Profile: sample|cprofile` together
+with the admin token, or when it is picked by PROFILING_SAMPLE_RATIO. Two
+profilers are available:
+
+- "sample": a background thread samples the event loop thread's stack every
+  PROFILING_INTERVAL_MS and writes collapsed stacks (one `frame;frame;... count`
+  line per stack) for flamegraph.pl or speedscope. Stacks that end in the
+  selector are time the loop spent waiting on I/O (e.g. the LLM call).
+- "cprofile": deterministic cProfile, saved as a pstats file with a summary
+  of the top functions by cumulative time.
+
+Both observe the whole event loop thread while the request runs, so a request
+profiled on a busy worker also shows its neighbours' work. Only one request is
+profiled at a time. Artifacts are kept in a bounded ring in PROFILING_DIR and
+listed on /admin/profiles.
+"""
+import hmac
+import io
+import json
+import logging
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# Frames from these files add depth to every stack without telling anything apart
+_SKIP_FILES = ("threading.py",)
+
+
+def is_admin(headers: Mapping[str, str]) -> bool:
+    """Whether the request carries the configured admin token (never true when unset)."""
+    token = headers.get("x-admin-token", "")
+    return bool(settings.admin_token) and hmac.compare_digest(token.encode(), settings.admin_token.encode())
+
+
+def profiling_mode_for(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Decide whether to profile a request.
+
+    Returns:
+        "sample" or "cprofile", or None to run the request unprofiled
+    """
+    requested = headers.get("x-profile")
+    if requested and is_admin(headers):
+        return requested if requested in PROFILE_MODES else settings.profiling_mode
+    if settings.profiling_sample_ratio > 0 and random.random() < settings.profiling_sample_ratio:
+        return settings.profiling_mode
+    return None
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a background thread."""
+
+    extension = "collapsed"
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Tuple[bytes, Dict[str, Any]]:
+        """Stop sampling and return the collapsed stacks and a summary."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        leaf_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        summary = {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in leaf_counts.most_common(15)],
+        }
+        return ("\n".join(lines) + "\n").encode(), summary
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        if filename not in _SKIP_FILES:
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class DeterministicProfiler:
+    """cProfile around the request, saved in the pstats format."""
+
+    extension = "pstats"
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> Tuple[bytes, Dict[str, Any]]:
+        """Stop profiling and return the pstats data and a summary."""
+        import pstats
+
+        self.profile.disable()
+        out = io.StringIO()
+        # Stats takes over the profile's raw stats, which are what dump_stats would write
+        stats = pstats.Stats(self.profile, stream=out)
+        raw = marshal.dumps(stats.stats)
+        stats.sort_stats("cumulative").print_stats(15)
+        summary = {"total_calls": stats.total_calls, "top_cumulative": out.getvalue().strip().splitlines()[-20:]}
+        return raw, summary
+
+
+class ProfileStore:
+    """Bounded on-disk ring of profile artifacts with a JSON metadata file each."""
+
+    def __init__(self, directory: str, max_profiles: int = 50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._busy = threading.Lock()
+        self._last_ns = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def try_begin(self) -> bool:
+        """Reserve the profiler; False if another request is being profiled."""
+        return self._busy.acquire(blocking=False)
+
+    def end(self) -> None:
+        self._busy.release()
+
+    def save(self, meta: Dict[str, Any], artifact: bytes, extension: str) -> str:
+        """Write a profile and evict the oldest beyond `max_profiles`; returns its id."""
+        # Ids sort by creation time, which the ring relies on for eviction
+        self._last_ns = max(time.time_ns(), self._last_ns + 1)
+        profile_id = f"{self._last_ns}-{uuid.uuid4().hex[:8]}"
+        artifact_name = f"{profile_id}.{extension}"
+        with open(os.path.join(self.directory, artifact_name), "wb") as f:
+            f.write(artifact)
+        meta = dict(meta, id=profile_id, artifact=artifact_name, size_bytes=len(artifact))
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self._evict()
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of stored profiles, newest first."""
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Metadata and artifact path of a profile, or None."""
+        if not re.fullmatch(r"[0-9]+-[0-9a-f]{8}", profile_id):
+            return None
+        meta_path = os.path.join(self.directory, f"{profile_id}.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta, os.path.join(self.directory, meta["artifact"])
+
+    def _evict(self) -> None:
+        ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+            for name in os.listdir(self.directory):
+                if name.startswith(profile_id + "."):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+
+def create_profiler(mode: str):
+    """Profiler for a mode, sampling the calling (event loop) thread."""
+    if mode == "cprofile":
+        # cProfile and pstats are only loaded when a request asks for them
+        import cProfile
+
+        return DeterministicProfiler(cProfile.Profile())
+    return SamplingProfiler(settings.profiling_interval_ms / 1000)
+
+
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Return the process-wide profile store configured from settings."""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_profiles)
+    return _profile_store
+
+
+def reset_profile_store() -> None:
+    """Drop the process-wide profile store (useful for testing)."""
+    global _profile_store
+    _profile_store = None
@@ -3,5 +3,13 @@ from app.routes.budget import router as budget_router
 from app.routes.insights import router as insights_router
 from app.routes.nlu import router as nlu_router
 from app.routes.generate import router as generate_router
+from app.routes.chat_ws import router as chat_ws_router
+from app.routes.jobs import router as jobs_router
+from app.routes.dashboard import router as dashboard_router
+from app.routes.forecast import router as forecast_router
+from app.routes.debug import router as debug_router
+from app.routes.admin import router as admin_router
 
-__all__ = ["budget_router", "insights_router", "nlu_router", "generate_router"]
+__all__ = ["budget_router", "insights_router", "nlu_router", "generate_router", "chat_ws_router", "jobs_router",
+           "dashboard_router", "forecast_router", "debug_router",
+           "admin_router"]
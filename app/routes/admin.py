@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from app.config import settings
+from app.profiling import get_profile_store, is_admin
+
+router = APIRouter()
+
+
+async def require_admin(request: Request) -> None:
+    """Dependency for admin-only routes: 404 while ADMIN_TOKEN is unset, 403 for a wrong X-Admin-Token."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """
+    Stored request profiles, newest first.
+
+    Profile a request by sending `X-Profile: sample` (collapsed stacks for
+    flamegraphs) or `X-Profile: cprofile` (pstats) with `X-Admin-Token`; the
+    response's `X-Profile-Id` header names the profile.
+    """
+    return {"profiles": get_profile_store().list()}
+
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """Download a profile artifact (`.collapsed` text or `.pstats` for `pstats.Stats`)."""
+    found = get_profile_store().get(profile_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Profile not found or evicted")
+    meta, path = found
+    return FileResponse(path, filename=meta["artifact"], media_type="application/octet-stream")
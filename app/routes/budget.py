@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import Dict
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
 from app.models import get_llm_client, BaseLLMClient
 from app.services.budget_service import BudgetService
+from app.responses import FastJSONResponse
+from app.routes.traced_route import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 class BudgetRequest(BaseModel):
@@ -52,6 +54,97 @@ async def create_budget_summary(
     try:
         service = BudgetService(llm_client)
         summary = await service.generate_summary(request.income, request.expenses)
-        return summary
+        # Already in BudgetResponse shape: skip re-validation
+        return FastJSONResponse(summary)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating budget summary: {str(e)}")
+
+
+class BudgetScenarioRequest(BaseModel):
+    """Request model for what-if budget scenarios (monthly amounts, fractional changes)."""
+    income: Dict[str, float]
+    expenses: Dict[str, float]
+    scenarios: List[Dict[str, float]] = []
+    grid: Dict[str, List[float]] = {}
+    savings_goal: Optional[float] = Field(None, gt=0)
+    current_savings: float = 0.0
+    rank_by: Literal["savings_rate", "months_to_goal"] = "savings_rate"
+    top_n: int = Field(3, ge=1, le=10)
+
+    @model_validator(mode="after")
+    def check_scenarios(self) -> "BudgetScenarioRequest":
+        if not self.scenarios and not self.grid:
+            raise ValueError("Provide scenarios, a grid, or both")
+        if self.rank_by == "months_to_goal" and self.savings_goal is None:
+            raise ValueError("rank_by months_to_goal needs a savings_goal")
+        return self
+
+
+class ScenarioFigures(BaseModel):
+    """Monthly figures of a budget with or without changes."""
+    total_income: float
+    total_expenses: float
+    savings: float
+    savings_rate: float
+    category_percentages: Dict[str, float]
+    months_to_goal: Optional[int]
+
+
+class ScenarioResult(ScenarioFigures):
+    """One of the best scenarios."""
+    changes: Dict[str, float]
+    description: str
+    commentary: str
+
+
+class BudgetScenarioResponse(BaseModel):
+    """Response model for what-if budget scenarios."""
+    evaluated: int
+    baseline: ScenarioFigures
+    scenarios: List[ScenarioResult]
+
+
+@router.post("/api/budget-scenarios", response_model=BudgetScenarioResponse)
+async def compare_budget_scenarios(
+    request: BudgetScenarioRequest
+):
+    """
+    Evaluate what-if changes to a monthly budget and comment on the best ones.
+    
+    Each scenario maps income or expense categories to fractional changes
+    (-0.2 = cut by 20%); `grid` lists candidate changes per category and every
+    combination is evaluated. All scenarios are evaluated in one vectorized pass,
+    and only the best `top_n` go to the LLM for commentary.
+    
+    Example request:
+    ```json
+    {
+      "income": {"Salary": 5000},
+      "expenses": {"Rent": 1500, "Dining": 400, "Groceries": 350},
+      "scenarios": [{"Dining": -0.2, "Rent": 0.05}],
+      "grid": {"Dining": [-0.5, -0.25, 0], "Groceries": [-0.1, 0]},
+      "savings_goal": 10000,
+      "rank_by": "months_to_goal"
+    }
+    ```
+    """
+    llm_client = get_llm_client(purpose="budget_summary")
+    
+    try:
+        service = BudgetService(llm_client)
+        result = await service.compare_scenarios(
+            request.income,
+            request.expenses,
+            scenarios=request.scenarios,
+            grid=request.grid,
+            savings_goal=request.savings_goal,
+            current_savings=request.current_savings,
+            rank_by=request.rank_by,
+            top_n=request.top_n
+        )
+        # Already in BudgetScenarioResponse shape: skip re-validation
+        return FastJSONResponse(result)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error comparing budget scenarios: {str(e)}")
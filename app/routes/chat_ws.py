@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Any, Optional, Set
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, ValidationError
+from app.config import settings
+from app.models import get_llm_client
+from app.models.scheduler import current_tenant, tenant_from_headers
+from app.services.chat_service import ChatService
+from app.services.streaming import coalesce_chunks, JSONFieldStreamer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Longest generation a client may ask for in one conversation
+MAX_COMPLETION_TOKENS = 4096
+
+
+class ChatStartMessage(BaseModel):
+    """Client message starting a generation."""
+    type: str
+    id: str = Field(max_length=64)
+    prompt: str
+    persona: Optional[str] = None
+    max_tokens: int = Field(default=512, ge=1, le=MAX_COMPLETION_TOKENS)
+    session_id: Optional[str] = Field(default=None, max_length=128)
+
+
+class ChatConnection:
+    """One WebSocket connection multiplexing several conversations."""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.closed = False
+        self._send_lock = asyncio.Lock()
+        self._notifications: Set[asyncio.Task] = set()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Send a JSON frame; frames from concurrent conversations never interleave."""
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _send_quietly(self, message: Dict[str, Any]) -> None:
+        """Send a frame, ignoring a connection that has already closed."""
+        try:
+            await self.send(message)
+        except Exception:
+            pass
+
+    def start(self, message: ChatStartMessage) -> None:
+        """Start a generation task for a conversation id."""
+        task = asyncio.create_task(self._run(message))
+        self.tasks[message.id] = task
+
+        def forget(finished: asyncio.Task) -> None:
+            if self.tasks.get(message.id) is finished:
+                del self.tasks[message.id]
+            # Sent from here so tasks cancelled before they first ran are reported too
+            if finished.cancelled() and not self.closed:
+                notification = asyncio.create_task(self._send_quietly({"type": "cancelled", "id": message.id}))
+                self._notifications.add(notification)
+                notification.add_done_callback(self._notifications.discard)
+
+        task.add_done_callback(forget)
+
+    def cancel(self, conversation_id: str) -> bool:
+        """Cancel a running generation; closing its stream aborts the upstream request."""
+        task = self.tasks.get(conversation_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def close(self) -> None:
+        """Cancel every running generation (the socket has gone away)."""
+        self.closed = True
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, message: ChatStartMessage) -> None:
+        """Stream one answer as coalesced delta frames, then a final done frame."""
+        conversation_id = message.id
+        llm_client = get_llm_client(purpose="chat")
+        service = ChatService(llm_client)
+        raw_chunks = []
+        stream = None
+
+        try:
+            turn = service.prepare(message.prompt, message.persona, message.session_id)
+            result = service.answer_locally(turn)
+            if result is not None:
+                # Retrieval or semantic cache answer: no generation to stream
+                await self.send({"type": "delta", "id": conversation_id, "text": result["answer"]})
+                await self.send({"type": "done", "id": conversation_id, **result})
+                return
+
+            stream = await service.stream(turn, max_tokens=message.max_tokens)
+
+            async def recorded():
+                async for chunk in stream:
+                    raw_chunks.append(chunk)
+                    yield chunk
+
+            # Deltas carry only the decoded "answer" text, not the JSON wrapper
+            answer_field = JSONFieldStreamer("answer")
+            frames = coalesce_chunks(
+                recorded(),
+                max_chars=settings.ws_frame_max_chars,
+                max_delay=settings.ws_frame_max_delay_ms / 1000
+            )
+            async for frame in frames:
+                text = answer_field.feed(frame)
+                if text:
+                    await self.send({"type": "delta", "id": conversation_id, "text": text})
+
+            result = service.complete(turn, "".join(raw_chunks))
+            await self.send({"type": "done", "id": conversation_id, **result})
+
+        except Exception as e:
+            logger.error(f"Error streaming chat {conversation_id}: {e}")
+            await self._send_quietly({
+                "type": "error",
+                "id": conversation_id,
+                "detail": f"Error generating response: {str(e)}"
+            })
+        finally:
+            # Abort the upstream Groq/Ollama stream if it is still open
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+async def receive_frame(websocket: WebSocket) -> Any:
+    """
+    Receive and decode one JSON frame.
+
+    Raises:
+        ValueError: When the frame is not valid JSON (the connection stays open)
+        WebSocketDisconnect: When the client has gone away
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    text = message.get("text")
+    if text is None:
+        text = (message.get("bytes") or b"").decode("utf-8", errors="replace")
+    return json.loads(text)
+
+
+@router.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Stream chat answers over a WebSocket.
+
+    Client messages:
+    - `{"type": "start", "id": "c1", "prompt": "...", "persona": "student", "session_id": "..."}`
+    - `{"type": "cancel", "id": "c1"}`
+
+    Server messages:
+    - `{"type": "delta", "id": "c1", "text": "..."}` (answer text, coalesced by size/time)
+    - `{"type": "done", "id": "c1", "answer": "...", "model": "...", "meta": {...}}`
+    - `{"type": "cancelled", "id": "c1"}` or `{"type": "error", "id": "c1", "detail": "..."}`
+
+    Several conversations can run concurrently on one connection, each under its own id.
+    """
+    await websocket.accept()
+    # Generation tasks inherit the tenant for scheduling
+    current_tenant.set(tenant_from_headers(websocket.headers))
+    connection = ChatConnection(websocket)
+
+    try:
+        while True:
+            try:
+                data = await receive_frame(websocket)
+            except ValueError:
+                await connection.send({"type": "error", "id": None, "detail": "Malformed message: expected JSON"})
+                continue
+            kind = data.get("type") if isinstance(data, dict) else None
+
+            if kind == "start":
+                try:
+                    message = ChatStartMessage(**data)
+                except ValidationError as e:
+                    await connection.send({"type": "error", "id": data.get("id"), "detail": str(e)})
+                    continue
+                if message.id in connection.tasks:
+                    await connection.send({
+                        "type": "error", "id": message.id, "detail": "Conversation id already active"
+                    })
+                elif len(connection.tasks) >= settings.ws_max_conversations:
+                    await connection.send({
+                        "type": "error", "id": message.id, "detail": "Too many concurrent conversations"
+                    })
+                else:
+                    connection.start(message)
+
+            elif kind == "cancel":
+                if not connection.cancel(str(data.get("id"))):
+                    await connection.send({"type": "error", "id": data.get("id"), "detail": "Unknown conversation id"})
+
+            else:
+                await connection.send({"type": "error", "id": None, "detail": f"Unknown message type: {kind}"})
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await connection.close()
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from app.config import settings
+from app.models import get_llm_client
+from app.responses import FastJSONResponse, dumps
+from app.routes.insights import Transaction
+from app.services.dashboard_service import DashboardService
+from app.routes.traced_route import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+
+class DashboardRequest(BaseModel):
+    """Request model for the composite dashboard."""
+    income: Dict[str, float] = {}
+    expenses: Dict[str, float] = {}
+    transactions: List[Transaction] = []
+    notes: List[str] = Field(default=[], max_length=20)
+    persona: str = "general"
+
+
+class DashboardResponse(BaseModel):
+    """Combined dashboard payload."""
+    aggregates: Dict[str, Any]
+    budget: Optional[Dict[str, Any]] = None
+    insights: Optional[Dict[str, Any]] = None
+    nlu: Optional[List[Dict[str, Any]]] = None
+    meta: Dict[str, Any]
+
+
+def _service() -> DashboardService:
+    return DashboardService(
+        budget_client=get_llm_client(purpose="budget_summary"),
+        insights_client=get_llm_client(purpose="spending_insights"),
+        nlu_client=get_llm_client(purpose="general"),
+        deadline_seconds=settings.dashboard_deadline_seconds
+    )
+
+
+@router.post("/api/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    request: DashboardRequest,
+    stream: bool = Query(default=False)
+):
+    """
+    Budget summary, spending insights and NLU of notes in one call.
+
+    The shared totals are computed once and the analyses run concurrently
+    under `DASHBOARD_DEADLINE_SECONDS`; a section that misses the deadline is
+    replaced with its deterministic fallback and listed in `meta.timed_out`.
+    With `?stream=true` the response is NDJSON, one `{"section", "data"}` line
+    per section as it finishes, ending with `meta`.
+
+    Example request:
+    ```json
+    {
+      "income": {"salary": 5000},
+      "expenses": {"rent": 1500, "food": 600},
+      "transactions": [
+        {"category": "Food", "amount": 45.50, "date": "2024-01-15", "merchant": "Grocery Store"}
+      ],
+      "notes": ["I spent $500 on groceries last week"],
+      "persona": "salaried"
+    }
+    ```
+    """
+    service = _service()
+    transactions = [txn.model_dump() for txn in request.transactions]
+    args = (request.income, request.expenses, transactions, request.notes, request.persona)
+
+    if not stream:
+        return FastJSONResponse(await service.build(*args))
+
+    async def sections():
+        async for name, data in service.stream_sections(*args):
+            yield dumps({"section": name, "data": data}) + b"\n"
+
+    return StreamingResponse(sections(), media_type="application/x-ndjson")
@@ -0,0 +1,63 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.config import settings
+from app.routes.admin import require_admin
+from app.tracing import RingBufferExporter, Span, get_tracer
+
+router = APIRouter()
+
+
+def _ring_buffer() -> RingBufferExporter:
+    exporter = get_tracer().exporter(RingBufferExporter) if settings.tracing_debug_endpoint else None
+    if exporter is None:
+        raise HTTPException(status_code=404, detail="Trace debugging is disabled")
+    return exporter
+
+
+def _summary(spans: List[Span]) -> Dict[str, Any]:
+    """One line per trace: its root span, duration and whether anything failed."""
+    ids = {span.span_id for span in spans}
+    root = min(
+        (span for span in spans if span.parent_id not in ids),
+        key=lambda span: span.start_ns
+    )
+    return {
+        "trace_id": root.trace_id,
+        "name": root.name,
+        "start_unix_ms": root.start_ns / 1e6,
+        "duration_ms": round(root.duration_ms, 3),
+        "span_count": len(spans),
+        "status": "error" if any(span.status == "error" for span in spans) else "ok",
+    }
+
+
+@router.get("/debug/traces", dependencies=[Depends(require_admin)])
+async def list_traces(limit: int = Query(default=50, ge=1, le=500)):
+    """Most recent traces in the in-memory ring buffer, newest first."""
+    return {"traces": [_summary(spans) for spans in _ring_buffer().recent(limit)]}
+
+
+@router.get("/debug/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str):
+    """
+    All spans of a trace in start order, each with its depth in the span tree.
+
+    The `X-Trace-Id` response header of a traced request names its trace.
+    """
+    spans = _ring_buffer().get(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found (not sampled or evicted)")
+
+    parents = {span.span_id: span.parent_id for span in spans}
+
+    def depth(span: Span) -> int:
+        level, parent = 0, span.parent_id
+        while parent in parents:
+            level, parent = level + 1, parents[parent]
+        return level
+
+    ordered = sorted(spans, key=lambda span: span.start_ns)
+    return {
+        **_summary(spans),
+        "spans": [dict(span.to_dict(), depth=depth(span)) for span in ordered],
+    }
@@ -0,0 +1,105 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional
+from app.config import settings
+from app.responses import FastJSONResponse
+from app.routes.insights import InsightsRequest
+from app.routes.traced_route import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+
+class ForecastRequest(InsightsRequest):
+    """Request model for a cash-flow forecast: spending history plus monthly income."""
+    monthly_income: List[float] = Field(min_length=1)
+    starting_balance: float = 0.0
+    savings_goal: Optional[float] = Field(None, gt=0)
+    months: int = Field(24, ge=1, le=60)
+    paths: int = Field(10_000, ge=100)
+    seed: Optional[int] = Field(None, ge=0, lt=2 ** 63)
+
+    @model_validator(mode="after")
+    def check_forecast(self) -> "ForecastRequest":
+        if min(self.monthly_income) < 0:
+            raise ValueError("monthly_income must not be negative")
+        if self.paths > settings.forecast_max_paths:
+            raise ValueError(f"paths must be at most {settings.forecast_max_paths}")
+        return self
+
+
+class ForecastResponse(BaseModel):
+    """Response model for a cash-flow forecast (per-month lists start at month 1)."""
+    months: int
+    paths: int
+    seed: int
+    starting_balance: float
+    expected_income: float
+    expected_expenses: Dict[str, float]
+    balance_percentiles: Dict[str, List[float]]
+    shortfall_probability: float
+    savings_goal: Optional[float] = None
+    goal_probability: Optional[List[float]] = None
+    median_months_to_goal: Optional[int] = None
+    context: List[str]
+
+
+async def run_forecast(request: ForecastRequest):
+    """
+    Fit and simulate a forecast in a worker thread, so the event loop keeps serving.
+
+    Raises:
+        ValueError: When a transaction date does not start with YYYY-MM
+    """
+    # NumPy is loaded on the first forecast rather than at startup
+    from app.services.forecast import forecast_from_history
+
+    return await asyncio.to_thread(
+        forecast_from_history,
+        request.transaction_data(),
+        request.monthly_income,
+        starting_balance=request.starting_balance,
+        months=request.months,
+        paths=request.paths,
+        savings_goal=request.savings_goal,
+        seed=request.seed
+    )
+
+
+@router.post("/api/forecast", response_model=ForecastResponse)
+async def create_forecast(request: ForecastRequest):
+    """
+    Monte Carlo forecast of balance and savings-goal attainment.
+
+    Fits a distribution to each spending category's monthly totals and to the
+    monthly income history (list several months for a variable income), then
+    simulates `paths` futures of `months` months. Returns 5th-95th percentile
+    bands of the end-of-month balance, the chance of reaching `savings_goal` by
+    each month, the chance of the balance dropping below zero, and `context`:
+    the forecast as sentences for grounding advice. Pass `seed` (returned with
+    every forecast) to reproduce a run.
+
+    Example request:
+    ```json
+    {
+      "transactions": [
+        {"category": "Rent", "amount": 1400, "date": "2024-01-01"},
+        {"category": "Food", "amount": 380, "date": "2024-01-20"},
+        {"category": "Rent", "amount": 1400, "date": "2024-02-01"},
+        {"category": "Food", "amount": 455, "date": "2024-02-18"}
+      ],
+      "monthly_income": [4200, 1800, 5100],
+      "starting_balance": 3000,
+      "savings_goal": 10000,
+      "months": 24
+    }
+    ```
+    """
+    from app.services.forecast import forecast_context
+
+    try:
+        forecast = await run_forecast(request)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Already in ForecastResponse shape: skip re-validation
+    return FastJSONResponse({**forecast.to_dict(), "context": forecast_context(forecast)})
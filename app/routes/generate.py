@@ -1,11 +1,14 @@
+import math
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
-import json
 from app.models import get_llm_client, BaseLLMClient
-from app.services.prompt_templates import get_persona_prompt, get_general_prompt
+from app.models.rate_limit import RateLimitExceeded
+from app.services.chat_service import ChatService
+from app.routes.forecast import ForecastRequest, run_forecast
+from app.routes.traced_route import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 class GenerateRequest(BaseModel):
@@ -14,6 +17,8 @@ class GenerateRequest(BaseModel):
     persona: Optional[str] = None
     stream: bool = False
     max_tokens: int = 512
+    session_id: Optional[str] = Field(default=None, max_length=128)
+    forecast: Optional[ForecastRequest] = None
 
 
 class GenerateResponse(BaseModel):
@@ -37,6 +42,13 @@ async def generate_response(
     - freelancer: Freelancer with variable income
     - retiree: Retiree on fixed income
     
+    Pass a client-generated `session_id` to enable multi-turn chat: recent turns
+    are sent verbatim and older ones as a running summary, within a fixed token budget.
+    
+    Pass a `forecast` body (as for `/api/forecast`) to ground the advice in a
+    Monte Carlo forecast of the user's own cash flow, e.g. for a freelancer's
+    variable income. Such answers are not shared through the semantic cache.
+    
     Example request:
     ```json
     {
@@ -62,75 +74,30 @@ async def generate_response(
     # Get chat-specific LLM client (Granite in prod, Mock in local)
     llm_client = get_llm_client(purpose="chat")
     
+    context = None
+    if request.forecast is not None:
+        from app.services.forecast import forecast_context
+        try:
+            context = forecast_context(await run_forecast(request.forecast))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
     try:
-        # Generate appropriate prompt based on persona
-        if request.persona:
-            full_prompt = get_persona_prompt(request.prompt, request.persona)
-        else:
-            full_prompt = get_general_prompt(request.prompt)
-        
-        # Get LLM response
-        response = await llm_client.generate(
-            full_prompt,
+        service = ChatService(llm_client)
+        return await service.answer(
+            request.prompt,
+            persona=request.persona,
             max_tokens=request.max_tokens,
-            stream=request.stream
+            session_id=request.session_id,
+            stream=request.stream,
+            context=context
+        )
+    except RateLimitExceeded as e:
+        # Upstream budget exhausted for longer than the request deadline
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
         )
-        
-        # For now, we don't support streaming in the response
-        # (would need SSE or WebSocket for that)
-        if request.stream:
-            # Collect all chunks
-            chunks = []
-            async for chunk in response:
-                chunks.append(chunk)
-            response = "".join(chunks)
-        
-        # Try to parse JSON response
-        try:
-            parsed = _parse_json_response(response)
-            answer = parsed.get("answer", response)
-            meta = {
-                "persona": request.persona or "general",
-                "confidence": parsed.get("confidence", 0.8)
-            }
-            if "persona_context" in parsed:
-                meta["persona_context"] = parsed["persona_context"]
-        except:
-            # If not JSON, use raw response
-            answer = response
-            meta = {"persona": request.persona or "general"}
-        
-        return {
-            "answer": answer,
-            "model": llm_client.model_name,
-            "meta": meta
-        }
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
-
-
-def _parse_json_response(response: str) -> Dict[str, Any]:
-    """Parse JSON from LLM response, handling potential extra text."""
-    response = response.strip()
-    
-    # Remove markdown code blocks if present
-    if response.startswith("```json"):
-        response = response[7:]
-    if response.startswith("```"):
-        response = response[3:]
-    if response.endswith("```"):
-        response = response[:-3]
-    
-    response = response.strip()
-    
-    # Try to parse
-    try:
-        return json.loads(response)
-    except json.JSONDecodeError:
-        # Try to find JSON object in the text
-        start = response.find("{")
-        end = response.rfind("}") + 1
-        if start != -1 and end > start:
-            return json.loads(response[start:end])
-        raise
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, ValidationError, model_validator
+from typing import List, Dict, Any, Optional
+from app.config import settings
 from app.models import get_llm_client, BaseLLMClient
+from app.services.analytics import SpendingAccumulator, TransactionColumns, Transactions
 from app.services.insights_service import InsightsService
+from app.services.upload_stream import UploadTooLarge, iter_json_array
+from app.responses import FastJSONResponse
+from app.routes.traced_route import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 class Transaction(BaseModel):
@@ -16,9 +21,66 @@ class Transaction(BaseModel):
     description: str = ""
 
 
+class DictionaryColumn(BaseModel):
+    """Dictionary-encoded string column: row i holds `values[codes[i]]`."""
+    values: List[str]
+    codes: List[int]
+
+
+class ColumnarTransactions(BaseModel):
+    """Transactions as column arrays, validated in bulk instead of one object per row."""
+    amounts: List[float]
+    dates: List[str]
+    categories: DictionaryColumn
+    merchants: Optional[DictionaryColumn] = None
+    descriptions: Optional[DictionaryColumn] = None
+
+    @model_validator(mode="after")
+    def check_columns(self) -> "ColumnarTransactions":
+        rows = len(self.amounts)
+        if len(self.dates) != rows:
+            raise ValueError(f"dates has {len(self.dates)} entries, expected {rows}")
+        for name in ("categories", "merchants", "descriptions"):
+            column = getattr(self, name)
+            if column is None:
+                continue
+            if len(column.codes) != rows:
+                raise ValueError(f"{name}.codes has {len(column.codes)} entries, expected {rows}")
+            if column.codes and (min(column.codes) < 0 or max(column.codes) >= len(column.values)):
+                raise ValueError(f"{name}.codes must be indexes into {name}.values")
+        return self
+
+    def to_columns(self) -> TransactionColumns:
+        merchants = self.merchants or DictionaryColumn(values=[], codes=[])
+        descriptions = self.descriptions or DictionaryColumn(values=[], codes=[])
+        return TransactionColumns(
+            amounts=self.amounts,
+            dates=self.dates,
+            categories=self.categories.values,
+            category_codes=self.categories.codes,
+            merchants=merchants.values,
+            merchant_codes=merchants.codes,
+            descriptions=descriptions.values,
+            description_codes=descriptions.codes,
+        )
+
+
 class InsightsRequest(BaseModel):
-    """Request model for spending insights."""
-    transactions: List[Transaction]
+    """Request model for spending insights: row `transactions` or columnar `columns`."""
+    transactions: Optional[List[Transaction]] = None
+    columns: Optional[ColumnarTransactions] = None
+
+    @model_validator(mode="after")
+    def check_one_encoding(self) -> "InsightsRequest":
+        if (self.transactions is None) == (self.columns is None):
+            raise ValueError("Provide either transactions or columns")
+        return self
+
+    def transaction_data(self) -> Transactions:
+        """Transactions as the analytics layer takes them (row dictionaries or columns)."""
+        if self.columns is not None:
+            return self.columns.to_columns()
+        return [txn.model_dump() for txn in self.transactions]
 
 
 class CategoryInsight(BaseModel):
@@ -42,6 +104,10 @@ async def get_spending_insights(
     """
     Analyze spending patterns and provide insights using Groq (prod) or Mock (local).
     
+    Large uploads can send `columns` instead of `transactions`: one array per
+    field, with categories, merchants and descriptions dictionary-encoded
+    (`{"values": [...], "codes": [...]}`). Both encodings give the same result.
+    
     Example request:
     ```json
     {
@@ -63,17 +129,93 @@ async def get_spending_insights(
       ]
     }
     ```
+    
+    Columnar equivalent:
+    ```json
+    {
+      "columns": {
+        "amounts": [45.50, 60.00],
+        "dates": ["2024-01-15", "2024-01-16"],
+        "categories": {"values": ["Food", "Entertainment"], "codes": [0, 1]},
+        "merchants": {"values": ["Grocery Store", "Movie Theater"], "codes": [0, 1]},
+        "descriptions": {"values": ["Weekly groceries", "Movie tickets"], "codes": [0, 1]}
+      }
+    }
+    ```
     """
     # Get insights-specific LLM client (Groq in prod, Mock in local)
     llm_client = get_llm_client(purpose="spending_insights")
     
     try:
-        # Convert Pydantic models to dicts
-        transactions_data = [txn.model_dump() for txn in request.transactions]
+        transactions_data = request.transaction_data()
         
         service = InsightsService(llm_client)
         insights = await service.generate_insights(transactions_data)
         
-        return insights
+        # Already in InsightsResponse shape: skip re-validation
+        return FastJSONResponse(insights)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating insights: {str(e)}")
+
+
+@router.post(
+    "/api/spending-insights/stream",
+    response_model=InsightsResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/InsightsRequest"}}}
+    }}
+)
+async def stream_spending_insights(request: Request):
+    """
+    Spending insights for multi-megabyte uploads, parsed while the body streams in.
+    
+    Takes the row body of `/api/spending-insights` (`{"transactions": [...]}`).
+    Each row is validated and added to the totals as it arrives, then dropped,
+    so memory stays bounded whatever the upload size. The LLM prompt quotes the
+    first `STREAM_UPLOAD_PROMPT_ROWS` rows along with totals over all of them.
+    Bodies over `STREAM_UPLOAD_MAX_BYTES`, with more than
+    `STREAM_UPLOAD_MAX_ROWS` rows or a row over `STREAM_UPLOAD_MAX_ROW_BYTES`
+    are rejected with 413 as soon as the limit is crossed.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.stream_upload_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {settings.stream_upload_max_bytes} bytes")
+    
+    accumulator = SpendingAccumulator()
+    sample = []
+    rows = iter_json_array(
+        request.stream(),
+        "transactions",
+        max_bytes=settings.stream_upload_max_bytes,
+        max_items=settings.stream_upload_max_rows,
+        max_item_bytes=settings.stream_upload_max_row_bytes
+    )
+    try:
+        async for row in rows:
+            txn = Transaction.model_validate(row)
+            accumulator.add(txn.category, txn.amount)
+            if len(sample) < settings.stream_upload_prompt_rows:
+                sample.append(txn.model_dump())
+    except ValidationError as e:
+        index = accumulator.count
+        raise HTTPException(status_code=422, detail=[
+            {**error, "loc": ("body", "transactions", index, *error["loc"])}
+            for error in e.errors(include_url=False, include_context=False)
+        ])
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        await rows.aclose()
+    
+    llm_client = get_llm_client(purpose="spending_insights")
+    try:
+        service = InsightsService(llm_client)
+        insights = await service.generate_insights(sample, accumulator.aggregates())
+        
+        # Already in InsightsResponse shape: skip re-validation
+        return FastJSONResponse(insights)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating insights: {str(e)}")
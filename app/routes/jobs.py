@@ -0,0 +1,150 @@
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from app.routes.budget import BudgetRequest
+from app.routes.insights import InsightsRequest
+from app.routes.nlu import NLURequest
+from app.services.jobs import Job, JobQueueFull, get_job_manager
+from app.responses import FastJSONResponse
+from app.routes.traced_route import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+# Seconds between SSE keep-alive comments while a job is quiet
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+class NLUBatchRequest(BaseModel):
+    """Request model for batch NLU analysis."""
+    items: List[NLURequest] = Field(min_length=1, max_length=500)
+
+
+class JobSubmission(BaseModel):
+    """Response for a submitted job."""
+    job_id: str
+    kind: str
+    status: str
+    deduplicated: bool
+    status_url: str
+    events_url: str
+
+
+class JobResponse(BaseModel):
+    """Current state of a job."""
+    job_id: str
+    kind: str
+    status: str
+    priority: int
+    progress: float
+    message: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+
+
+def _submit(kind: str, payload: Dict[str, Any], priority: Optional[int]) -> JobSubmission:
+    """Queue a job and describe where to follow it."""
+    try:
+        job, deduplicated = get_job_manager().submit(kind, payload, priority)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobSubmission(
+        job_id=job.job_id,
+        kind=job.kind,
+        status=job.status,
+        deduplicated=deduplicated,
+        status_url=f"/api/jobs/{job.job_id}",
+        events_url=f"/api/jobs/{job.job_id}/events"
+    )
+
+
+def _get_job(job_id: str) -> Job:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@router.post("/api/jobs/spending-insights", response_model=JobSubmission, status_code=202)
+async def submit_spending_insights(
+    request: InsightsRequest,
+    priority: Optional[int] = Query(default=None, ge=0, le=9)
+):
+    """
+    Queue spending insights as a background job.
+
+    Takes the same body as `/api/spending-insights` and returns a job id
+    immediately; poll `status_url` or subscribe to `events_url` for the result.
+    """
+    return _submit("spending_insights", request.model_dump(exclude_none=True), priority)
+
+
+@router.post("/api/jobs/budget-summary", response_model=JobSubmission, status_code=202)
+async def submit_budget_summary(
+    request: BudgetRequest,
+    priority: Optional[int] = Query(default=None, ge=0, le=9)
+):
+    """Queue a budget summary (same body as `/api/budget-summary`) as a background job."""
+    return _submit("budget_summary", request.model_dump(), priority)
+
+
+@router.post("/api/jobs/nlu-batch", response_model=JobSubmission, status_code=202)
+async def submit_nlu_batch(
+    request: NLUBatchRequest,
+    priority: Optional[int] = Query(default=None, ge=0, le=9)
+):
+    """
+    Queue NLU analysis of many texts as a background job.
+
+    Example request:
+    ```json
+    {
+      "items": [
+        {"text": "I spent $500 on groceries last week", "persona": "student"},
+        {"text": "Got a $2000 bonus", "persona": "salaried"}
+      ]
+    }
+    ```
+    """
+    return _submit("nlu_batch", request.model_dump(), priority)
+
+
+@router.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Return a job's status, progress and (once finished) its result or error."""
+    # to_dict() is the JobResponse shape; skip re-validating large batch results
+    return FastJSONResponse(_get_job(job_id).to_dict())
+
+
+@router.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Subscribe to a job with Server-Sent Events.
+
+    Emits `progress` events with the job state whenever it changes, then a
+    final `result` or `error` event, after which the stream ends.
+    """
+    job = _get_job(job_id)
+
+    async def events():
+        while True:
+            version = job.version
+            state = job.to_dict()
+            if job.finished:
+                event = "result" if state["error"] is None else "error"
+                yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+                return
+            yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+            while not await job.wait_for_change(version, SSE_KEEPALIVE_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
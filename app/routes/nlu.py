@@ -3,8 +3,10 @@ from pydantic import BaseModel
 from typing import List, Dict, Any
 from app.models import get_llm_client, BaseLLMClient
 from app.services.nlu_service import NLUService
+from app.responses import FastJSONResponse
+from app.routes.traced_route import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 class NLURequest(BaseModel):
@@ -66,6 +68,7 @@ async def analyze_text(
     try:
         service = NLUService(llm_client)
         result = await service.analyze_text(request.text, request.persona)
-        return result
+        # Already in NLUResponse shape: skip re-validation
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in NLU analysis: {str(e)}")
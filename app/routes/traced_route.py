@@ -0,0 +1,36 @@
+"""Route class that traces request validation and the endpoint separately."""
+import functools
+from typing import Callable
+from fastapi.routing import APIRoute
+from app.tracing import current_span, get_tracer
+
+
+class TracedRoute(APIRoute):
+    """
+    APIRoute whose endpoint runs in a "handler" span.
+
+    Everything between the request span's start and the endpoint call (body
+    decoding, Pydantic validation, dependencies) is recorded as a
+    "request.validate" span, so slow validation is visible in the trace.
+    """
+
+    def get_route_handler(self) -> Callable:
+        if not getattr(self.dependant.call, "__traced__", False):
+            self.dependant.call = _traced_endpoint(self.dependant.call, self.path)
+        return super().get_route_handler()
+
+
+def _traced_endpoint(endpoint: Callable, path: str) -> Callable:
+    @functools.wraps(endpoint)
+    async def traced(*args, **kwargs):
+        request_span = current_span.get()
+        if request_span is None or not request_span.sampled:
+            return await endpoint(*args, **kwargs)
+        tracer = get_tracer()
+        validate = tracer.start_span("request.validate", parent=request_span, start_ns=request_span.start_ns)
+        tracer.end_span(validate)
+        with tracer.span("handler", {"route": path}):
+            return await endpoint(*args, **kwargs)
+
+    traced.__traced__ = True
+    return traced
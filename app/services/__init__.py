@@ -2,5 +2,6 @@
 from app.services.budget_service import BudgetService
 from app.services.insights_service import InsightsService
 from app.services.nlu_service import NLUService
+from app.services.chat_service import ChatService
 
-__all__ = ["BudgetService", "InsightsService", "NLUService"]
+__all__ = ["BudgetService", "InsightsService", "NLUService", "ChatService"]
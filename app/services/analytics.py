@@ -0,0 +1,185 @@
+"""
+Deterministic aggregates shared by the budget, insights and dashboard paths.
+
+Totals, savings rate and category shares are computed once in Python and
+passed to the services, which use them in their prompts and in place of the
+LLM's own arithmetic. Transactions arrive either as row dictionaries or as
+`TransactionColumns` (the columnar request encoding), which is summarized in
+bulk without building a dictionary per row.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Tuple, Union
+
+# Transactions below this amount count as "small" for the frequent-purchases check
+SMALL_TRANSACTION_AMOUNT = 20.0
+
+
+@dataclass
+class BudgetAggregates:
+    """Totals derived from income and expense categories."""
+    total_income: float
+    total_expenses: float
+    savings: float
+    savings_rate: float
+    category_percentages: Dict[str, float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class SpendingAggregates:
+    """Totals derived from a list of transactions."""
+    total: float
+    transaction_count: int
+    small_transaction_count: int
+    category_totals: Dict[str, float]
+    top_categories: List[Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class TransactionColumns:
+    """
+    Transactions as parallel columns, with strings dictionary-encoded.
+
+    Row i has amount `amounts[i]`, date `dates[i]`, category
+    `categories[category_codes[i]]` and merchant `merchants[merchant_codes[i]]`
+    (description likewise); a code list left empty means "" for every row.
+    """
+    amounts: List[float]
+    dates: List[str]
+    categories: List[str]
+    category_codes: List[int]
+    merchants: List[str] = field(default_factory=list)
+    merchant_codes: List[int] = field(default_factory=list)
+    descriptions: List[str] = field(default_factory=list)
+    description_codes: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @classmethod
+    def from_wire(cls, columns: Dict[str, Any]) -> "TransactionColumns":
+        """Build from the validated `columns` object of a spending insights request."""
+        merchants = columns.get("merchants") or {}
+        descriptions = columns.get("descriptions") or {}
+        return cls(
+            amounts=columns["amounts"],
+            dates=columns["dates"],
+            categories=columns["categories"]["values"],
+            category_codes=columns["categories"]["codes"],
+            merchants=merchants.get("values", []),
+            merchant_codes=merchants.get("codes", []),
+            descriptions=descriptions.get("values", []),
+            description_codes=descriptions.get("codes", []),
+        )
+
+
+Transactions = Union[List[Dict[str, Any]], TransactionColumns]
+
+
+def summarize_budget(income_data: Dict[str, float], expense_data: Dict[str, float]) -> BudgetAggregates:
+    """
+    Compute budget totals.
+
+    Args:
+        income_data: Dictionary of income sources and amounts
+        expense_data: Dictionary of expense categories and amounts
+
+    Returns:
+        Totals, savings rate (percent of income, 0 without income) and expense shares
+    """
+    total_income = sum(income_data.values())
+    total_expenses = sum(expense_data.values())
+    savings = total_income - total_expenses
+    savings_rate = (savings / total_income * 100) if total_income > 0 else 0
+
+    category_percentages = {}
+    if total_expenses > 0:
+        for category, amount in expense_data.items():
+            category_percentages[category] = amount / total_expenses * 100
+
+    return BudgetAggregates(total_income, total_expenses, savings, savings_rate, category_percentages)
+
+
+def summarize_transactions(transactions: Transactions, top_n: int = 5) -> SpendingAggregates:
+    """
+    Compute spending totals per category.
+
+    Args:
+        transactions: Transaction dictionaries with category and amount, or their columns
+        top_n: Number of largest categories to rank
+
+    Returns:
+        Overall total, category totals and the top categories with their shares
+    """
+    if isinstance(transactions, TransactionColumns):
+        category_totals, small = _column_totals(transactions)
+    else:
+        category_totals = {}
+        small = 0
+        for txn in transactions:
+            category = txn.get("category", "Other")
+            amount = abs(float(txn.get("amount", 0)))
+            category_totals[category] = category_totals.get(category, 0) + amount
+            if amount < SMALL_TRANSACTION_AMOUNT:
+                small += 1
+    return _rank_categories(category_totals, len(transactions), small, top_n)
+
+
+class SpendingAccumulator:
+    """Spending aggregates built one transaction at a time, for uploads parsed as they stream in."""
+
+    def __init__(self):
+        self.category_totals: Dict[str, float] = {}
+        self.count = 0
+        self.small = 0
+
+    def add(self, category: str, amount: float) -> None:
+        amount = abs(float(amount))
+        self.category_totals[category] = self.category_totals.get(category, 0) + amount
+        self.count += 1
+        if amount < SMALL_TRANSACTION_AMOUNT:
+            self.small += 1
+
+    def aggregates(self, top_n: int = 5) -> SpendingAggregates:
+        """The same aggregates summarize_transactions would compute for the rows added so far."""
+        return _rank_categories(dict(self.category_totals), self.count, self.small, top_n)
+
+
+def _column_totals(columns: TransactionColumns) -> Tuple[Dict[str, float], int]:
+    """Category totals and the small-transaction count, accumulated per category code."""
+    amounts = list(map(abs, columns.amounts))
+    code_totals = [0] * len(columns.categories)
+    for code, amount in zip(columns.category_codes, amounts):
+        code_totals[code] += amount
+    small = sum(amount < SMALL_TRANSACTION_AMOUNT for amount in amounts)
+
+    # Only categories that occur, in order of first occurrence like the row path;
+    # repeated dictionary entries are merged
+    category_totals: Dict[str, float] = {}
+    for code in dict.fromkeys(columns.category_codes):
+        category = columns.categories[code]
+        category_totals[category] = category_totals.get(category, 0) + code_totals[code]
+    return category_totals, small
+
+
+def _rank_categories(
+    category_totals: Dict[str, float],
+    transaction_count: int,
+    small: int,
+    top_n: int
+) -> SpendingAggregates:
+    total = sum(category_totals.values())
+    top_categories = []
+    for category, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:top_n]:
+        top_categories.append({
+            "category": category,
+            "amount": amount,
+            "percentage": (amount / total * 100) if total > 0 else 0
+        })
+
+    return SpendingAggregates(total, transaction_count, small, category_totals, top_categories)
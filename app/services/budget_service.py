@@ -1,8 +1,18 @@
-import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
+from app.config import settings
 from app.models.base_model import BaseLLMClient
-from app.services.prompt_templates import get_budget_summary_prompt
+from app.metrics import record_fallback
+from app.services.analytics import BudgetAggregates, summarize_budget
+from app.services.cache_store import cache_key, get_analytics_cache
+from app.services.json_parsing import parse_json_response, string_list
+from app.services.prompt_templates import (
+    get_budget_scenarios_prompt,
+    get_budget_summary_prompt,
+    BUDGET_SCENARIOS_SCHEMA,
+    BUDGET_SUMMARY_SCHEMA,
+)
+from app.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +23,12 @@ class BudgetService:
     def __init__(self, llm_client: BaseLLMClient):
         self.llm_client = llm_client
     
+    @traced("budget.generate_summary")
     async def generate_summary(
         self,
         income_data: Dict[str, float],
-        expense_data: Dict[str, float]
+        expense_data: Dict[str, float],
+        aggregates: Optional[BudgetAggregates] = None
     ) -> Dict[str, Any]:
         """
         Generate budget summary with LLM analysis.
@@ -24,98 +36,176 @@ class BudgetService:
         Args:
             income_data: Dictionary of income sources and amounts
             expense_data: Dictionary of expense categories and amounts
+            aggregates: Precomputed totals (computed here if not given)
         
         Returns:
             Dictionary with budget summary including totals, savings rate, and suggestions
         """
-        # Calculate basic totals
-        total_income = sum(income_data.values())
-        total_expenses = sum(expense_data.values())
+        # Calculate totals once; the LLM contributes the suggestions
+        if aggregates is None:
+            aggregates = summarize_budget(income_data, expense_data)
         
         # Generate prompt
-        prompt = get_budget_summary_prompt(income_data, expense_data)
+        with span("prompt.build"):
+            prompt = get_budget_summary_prompt(income_data, expense_data, aggregates)
+        
+        # Identical input renders an identical prompt; reuse an earlier analysis of it
+        cache = get_analytics_cache()
+        key = cache_key(self.llm_client.model_name, prompt)
+        cached = cache.get("budget", key) if cache is not None else None
+        if cached is not None:
+            return cached
         
         try:
             # Get LLM response
-            response = await self.llm_client.generate(prompt, max_tokens=800, stream=False)
+            response = await self.llm_client.generate(
+                prompt,
+                max_tokens=800,
+                stream=False,
+                response_schema=BUDGET_SUMMARY_SCHEMA
+            )
             
             # Parse JSON response
             summary = self._parse_json_response(response)
             
             # Validate and ensure required fields
-            summary = self._validate_summary(summary, total_income, total_expenses)
+            summary = self._validate_summary(summary, aggregates)
             
+            if cache is not None:
+                cache.set("budget", key, summary, ttl_seconds=settings.analytics_cache_ttl_seconds)
             return summary
             
         except Exception as e:
             logger.error(f"Error generating budget summary: {e}")
+            record_fallback("budget")
             # Return fallback summary
-            return self._generate_fallback_summary(income_data, expense_data)
+            return self._generate_fallback_summary(income_data, expense_data, aggregates)
     
-    def _parse_json_response(self, response: str) -> Dict[str, Any]:
-        """Parse JSON from LLM response, handling potential extra text."""
-        # Try to find JSON in the response
-        response = response.strip()
+    @traced("budget.compare_scenarios")
+    async def compare_scenarios(
+        self,
+        income_data: Dict[str, float],
+        expense_data: Dict[str, float],
+        scenarios: Iterable[Dict[str, float]] = (),
+        grid: Optional[Dict[str, List[float]]] = None,
+        savings_goal: Optional[float] = None,
+        current_savings: float = 0.0,
+        rank_by: str = "savings_rate",
+        top_n: int = 3
+    ) -> Dict[str, Any]:
+        """
+        Evaluate what-if budget scenarios and comment on the best ones.
         
-        # If response starts with ```json, extract the JSON
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
+        Every scenario is evaluated in one vectorized pass; only the best
+        `top_n` are sent to the LLM, in a single call.
         
-        response = response.strip()
+        Args:
+            income_data: Monthly income sources and amounts
+            expense_data: Monthly expense categories and amounts
+            scenarios: Explicit scenarios mapping categories to fractional changes
+            grid: Candidate changes per category; every combination is evaluated
+            savings_goal: Target balance for months_to_goal
+            current_savings: Balance already saved towards the goal
+            rank_by: "savings_rate" (highest first) or "months_to_goal" (soonest first)
+            top_n: Number of scenarios to return
         
-        # Try to parse
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # Try to find JSON object in the text
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            if start != -1 and end > start:
-                return json.loads(response[start:end])
-            raise
+        Returns:
+            Dictionary with the number evaluated, the baseline and the best scenarios
+        
+        Raises:
+            ValueError: For unknown categories, invalid changes or too many scenarios
+        """
+        # NumPy is loaded on the first scenario request rather than at startup
+        import numpy as np
+        from app.services.scenarios import build_changes, describe_changes, evaluate_scenarios
+        
+        categories = [*expense_data, *income_data]
+        with span("scenarios.evaluate") as evaluate_span:
+            changes = build_changes(categories, scenarios, grid, max_count=settings.budget_scenarios_max_count)
+            results = evaluate_scenarios(income_data, expense_data, changes, savings_goal, current_savings)
+            baseline = evaluate_scenarios(
+                income_data, expense_data, np.zeros((1, len(categories))), savings_goal, current_savings
+            ).scenario(0)
+            best = [results.scenario(i) for i in results.rank(rank_by, top_n)]
+            evaluate_span.set_attribute("scenarios", len(results))
+        for scenario in best:
+            scenario["description"] = describe_changes(scenario["changes"])
+        del baseline["changes"]
+        
+        result = {"evaluated": len(results), "baseline": baseline, "scenarios": best}
+        if not best:
+            return result
+        
+        with span("prompt.build"):
+            prompt = get_budget_scenarios_prompt(baseline, best, savings_goal)
+        
+        cache = get_analytics_cache()
+        key = cache_key(self.llm_client.model_name, prompt)
+        comments = cache.get("scenarios", key) if cache is not None else None
+        if comments is None:
+            try:
+                response = await self.llm_client.generate(
+                    prompt,
+                    max_tokens=150 * len(best),
+                    stream=False,
+                    response_schema=BUDGET_SCENARIOS_SCHEMA
+                )
+                comments = string_list(self._parse_json_response(response).get("comments"))
+                if len(comments) != len(best):
+                    raise ValueError(f"Expected {len(best)} scenario comments, got {len(comments)}")
+                if cache is not None:
+                    cache.set("scenarios", key, comments, ttl_seconds=settings.analytics_cache_ttl_seconds)
+            except Exception as e:
+                logger.error(f"Error generating scenario commentary: {e}")
+                record_fallback("scenarios")
+                comments = [self._describe_scenario(scenario, baseline) for scenario in best]
+        
+        for scenario, comment in zip(best, comments):
+            scenario["commentary"] = comment
+        return result
+    
+    def _describe_scenario(self, scenario: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+        """Deterministic commentary for a scenario without LLM."""
+        comment = (
+            f"{scenario['description']} changes monthly savings by {scenario['savings'] - baseline['savings']:+,.2f} "
+            f"for a savings rate of {scenario['savings_rate']:.1f}%"
+        )
+        if scenario["months_to_goal"] is not None:
+            comment += f" and reaches your goal in {scenario['months_to_goal']} months"
+        return comment + "."
     
+    def _parse_json_response(self, response: str) -> Dict[str, Any]:
+        """Parse JSON from LLM response, handling potential extra text."""
+        return parse_json_response(response, purpose="budget_summary")
+
     def _validate_summary(
         self,
         summary: Dict[str, Any],
-        total_income: float,
-        total_expenses: float
+        aggregates: BudgetAggregates
     ) -> Dict[str, Any]:
-        """Validate and ensure all required fields are present."""
-        # Ensure required fields exist
-        if "total_income" not in summary:
-            summary["total_income"] = total_income
-        if "total_expenses" not in summary:
-            summary["total_expenses"] = total_expenses
-        if "savings_rate" not in summary:
-            savings = total_income - total_expenses
-            summary["savings_rate"] = (savings / total_income * 100) if total_income > 0 else 0
-        if "category_percentages" not in summary:
-            summary["category_percentages"] = {}
-        if "suggestion_list" not in summary:
-            summary["suggestion_list"] = []
-        
-        return summary
+        """Return exactly the BudgetResponse fields, so the route can skip re-validation."""
+        # Figures always come from the deterministic aggregates, not the model's arithmetic
+        return {
+            "total_income": aggregates.total_income,
+            "total_expenses": aggregates.total_expenses,
+            "savings_rate": aggregates.savings_rate,
+            "category_percentages": dict(aggregates.category_percentages),
+            "suggestion_list": string_list(summary.get("suggestion_list")),
+        }
     
     def _generate_fallback_summary(
         self,
         income_data: Dict[str, float],
-        expense_data: Dict[str, float]
+        expense_data: Dict[str, float],
+        aggregates: Optional[BudgetAggregates] = None
     ) -> Dict[str, Any]:
         """Generate basic summary without LLM."""
-        total_income = sum(income_data.values())
-        total_expenses = sum(expense_data.values())
-        savings = total_income - total_expenses
-        savings_rate = (savings / total_income * 100) if total_income > 0 else 0
-        
-        # Calculate category percentages
-        category_percentages = {}
-        if total_expenses > 0:
-            for category, amount in expense_data.items():
-                category_percentages[category] = (amount / total_expenses * 100)
+        if aggregates is None:
+            aggregates = summarize_budget(income_data, expense_data)
+        total_income = aggregates.total_income
+        total_expenses = aggregates.total_expenses
+        savings_rate = aggregates.savings_rate
+        category_percentages = dict(aggregates.category_percentages)
         
         # Generate basic suggestions
         suggestions = []
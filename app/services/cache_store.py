@@ -0,0 +1,449 @@
+"""
+Key-value cache stores for LLM answers and analytics results.
+
+`InMemoryCacheStore` lives inside one process, so with `uvicorn --workers N`
+every worker warms its own copy. `SQLiteCacheStore` keeps the entries in one
+SQLite database per host in WAL mode, shared by all workers: readers never
+block each other or the writer, and WAL's shared-memory index (the `-shm`
+file next to the database) lets every process see committed writes at once.
+Each write runs in its own `BEGIN IMMEDIATE` transaction, which takes SQLite's
+single write lock up front, so an insert and the evictions it triggers are
+applied atomically and writers from different workers never interleave.
+Reads stay read-only: a hit's recency is remembered in the process and written
+with its next write, which is the only place entries are evicted. The store is
+called from the event loop, so the busy timeout is kept in the tens of
+milliseconds and a write that cannot get the lock by then is dropped.
+
+Both stores hold JSON values in namespaces ("semantic", "budget", ...),
+expire entries after a TTL and evict the least recently used ones beyond an
+entry count and a byte budget. Cache errors are logged and treated as misses;
+they never fail a request.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.config import settings
+from app.metrics import cache_store_evictions_total, cache_store_lookups_total
+
+logger = logging.getLogger(__name__)
+
+# A hit refreshes an entry's recency at most this often, so hot entries do not
+# turn every read into a write
+TOUCH_INTERVAL_SECONDS = 10.0
+
+# Recency refreshes held for the next write; hits beyond this are not recorded
+MAX_PENDING_TOUCHES = 1024
+
+# Workers starting together wait this long for each other to create the schema
+SETUP_BUSY_TIMEOUT_MS = 5000
+
+# Expired rows removed per write; the rest go on later writes or purge_expired()
+EXPIRED_PER_WRITE = 64
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key for a cacheable computation from its inputs (JSON-serializable)."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StoreStats:
+    """Counters for one store in this process."""
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    errors: int = 0
+    evictions: Dict[str, int] = field(default_factory=dict)
+
+    def record_lookup(self, namespace: str, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        cache_store_lookups_total.inc(namespace=namespace, outcome="hit" if hit else "miss")
+
+    def record_evictions(self, reason: str, count: int) -> None:
+        if count:
+            self.evictions[reason] = self.evictions.get(reason, 0) + count
+            cache_store_evictions_total.inc(count, reason=reason)
+
+
+class InMemoryCacheStore:
+    """Process-local store with TTL expiry, LRU eviction and a memory bound."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = StoreStats()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return a live value, or None if it is unknown or expired."""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[1] <= time.time():
+                self._pop((namespace, key))
+                self.stats.record_evictions("expired", 1)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end((namespace, key))
+        self.stats.record_lookup(namespace, entry is not None)
+        return json.loads(entry[0]) if entry is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries beyond the bounds."""
+        data = json.dumps(value, separators=(",", ":"))
+        if len(data) > self.max_bytes:
+            return
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            lru, memory = self._put((namespace, key), data, expires_at)
+            self.stats.writes += 1
+        self.stats.record_evictions("lru", lru)
+        self.stats.record_evictions("memory", memory)
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove an entry."""
+        with self._lock:
+            self._pop((namespace, key))
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Drop every entry, or those of one namespace."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._pop(entry_key)
+
+    def purge_expired(self) -> int:
+        """Drop expired entries and return how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]
+            for entry_key in expired:
+                self._pop(entry_key)
+        self.stats.record_evictions("expired", len(expired))
+        return len(expired)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Size and this process's hit rate for reporting."""
+        with self._lock:
+            entries, size = len(self._entries), self._bytes
+        return _snapshot(self, entries, size)
+
+    def export_entries(self) -> List[List[Any]]:
+        """Live entries as [namespace, key, JSON value, expires_at], least recently used first."""
+        now = time.time()
+        with self._lock:
+            return [
+                [namespace, key, data, expires_at]
+                for (namespace, key), (data, expires_at) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def import_entries(self, rows: List[List[Any]]) -> int:
+        """Restore entries written by `export_entries`; returns how many were still live."""
+        now = time.time()
+        restored = 0
+        with self._lock:
+            for namespace, key, data, expires_at in rows:
+                if expires_at > now and len(data) <= self.max_bytes:
+                    self._put((namespace, key), data, expires_at)
+                    restored += 1
+        return restored
+
+    def _put(self, entry_key: Tuple[str, str], data: str, expires_at: float) -> Tuple[int, int]:
+        """Insert as most recently used and evict beyond the bounds (lock held); returns the evictions."""
+        self._pop(entry_key)
+        self._entries[entry_key] = (data, expires_at)
+        self._bytes += len(data)
+        lru = memory = 0
+        while len(self._entries) > self.max_entries:
+            self._pop(next(iter(self._entries)))
+            lru += 1
+        while self._bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+            memory += 1
+        return lru, memory
+
+    def _pop(self, entry_key: Tuple[str, str]) -> None:
+        """Remove an entry if present (lock held)."""
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+
+class SQLiteCacheStore:
+    """Store shared by every worker process on a host, in a SQLite database in WAL mode."""
+
+    shared = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 86400,
+        busy_timeout_ms: int = 50
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.busy_timeout_ms = busy_timeout_ms
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[int, float] = {}
+        self.stats = StoreStats()
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """This process's connection (reopened after a fork; lock held or during init)."""
+        if self._conn is None or self._pid != os.getpid():
+            # Autocommit; writes open their own IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout={max(int(self.busy_timeout_ms), SETUP_BUSY_TIMEOUT_MS)}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            # A cache can lose its last writes on power loss; skip the fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={max(self.max_bytes * 2, 1 << 24)}")
+            conn.executescript(
+                "BEGIN IMMEDIATE;"
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " UNIQUE (namespace, key));"
+                "CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed_at);"
+                "CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires_at);"
+                # Running totals kept by triggers, so bounds checks do not scan the table
+                "CREATE TABLE IF NOT EXISTS cache_totals ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL);"
+                "INSERT OR IGNORE INTO cache_totals VALUES (0, 0, 0);"
+                "CREATE TRIGGER IF NOT EXISTS cache_entries_added AFTER INSERT ON cache_entries BEGIN"
+                " UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0; END;"
+                "CREATE TRIGGER IF NOT EXISTS cache_entries_removed AFTER DELETE ON cache_entries BEGIN"
+                " UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0; END;"
+                "COMMIT;"
+            )
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return a live value, or None if it is unknown, expired or unreadable."""
+        now = time.time()
+        value = None
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT seq, value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                if row is not None and row[2] > now:
+                    value = row[1]
+                    if now - row[3] > TOUCH_INTERVAL_SECONDS and len(self._touched) < MAX_PENDING_TOUCHES:
+                        self._touched[row[0]] = now
+        except sqlite3.Error as e:
+            self._error("read", e)
+        self.stats.record_lookup(namespace, value is not None)
+        return json.loads(value) if value is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value and evict beyond the bounds, in one write transaction."""
+        data = json.dumps(value, separators=(",", ":"))
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        try:
+            with self._lock:
+                evicted = self._insert(namespace, key, data, expires_at, now)
+            self.stats.writes += 1
+            for reason, count in evicted.items():
+                self.stats.record_evictions(reason, count)
+        except sqlite3.Error as e:
+            self._error("write", e)
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove an entry."""
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+        except sqlite3.Error as e:
+            self._error("write", e)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Drop every entry, or those of one namespace (for all workers)."""
+        with self._lock:
+            if namespace is None:
+                self._connection().execute("DELETE FROM cache_entries")
+            else:
+                self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self) -> int:
+        """Drop expired entries and return how many were removed."""
+        with self._lock:
+            cursor = self._connection().execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        self.stats.record_evictions("expired", cursor.rowcount)
+        return cursor.rowcount
+
+    def changes_since(self, namespace: str, cursor: int, limit: int = 1000) -> Tuple[int, List[Tuple[str, Any, float]]]:
+        """
+        Live entries of a namespace written after a cursor, oldest first.
+
+        Lets a process keep a local index (such as the semantic cache's) in
+        step with entries other workers have written.
+
+        Args:
+            namespace: Namespace to read
+            cursor: Value returned by the previous call (0 for everything)
+            limit: Maximum number of entries to return
+
+        Returns:
+            The new cursor and (key, value, expires_at) for each entry
+        """
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT seq, key, value, expires_at FROM cache_entries"
+                    " WHERE seq > ? AND namespace = ? AND expires_at > ? ORDER BY seq LIMIT ?",
+                    (cursor, namespace, time.time(), limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return cursor, []
+        if not rows:
+            return cursor, []
+        return rows[-1][0], [(key, json.loads(value), expires_at) for _, key, value, expires_at in rows]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Size of the shared store and this process's hit rate for reporting."""
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT entries, bytes FROM cache_totals WHERE id = 0"
+            ).fetchone()
+        return _snapshot(self, entries, size)
+
+    def close(self) -> None:
+        """Close this process's connection."""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def _insert(self, namespace: str, key: str, data: str, expires_at: float, now: float) -> Dict[str, int]:
+        """Apply pending touches, replace an entry, then drop expired and least recently used rows (lock held)."""
+        conn = self._connection()
+        evicted = {"expired": 0, "lru": 0, "memory": 0}
+        touched, self._touched = self._touched, {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if touched:
+                conn.executemany(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE seq = ?",
+                    [(accessed_at, seq) for seq, accessed_at in touched.items()]
+                )
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute(
+                "INSERT INTO cache_entries (namespace, key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, data, len(data), expires_at, now)
+            )
+            evicted["expired"] = conn.execute(
+                "DELETE FROM cache_entries WHERE seq IN"
+                " (SELECT seq FROM cache_entries WHERE expires_at <= ? LIMIT ?)",
+                (now, EXPIRED_PER_WRITE)
+            ).rowcount
+            while True:
+                entries, size = conn.execute("SELECT entries, bytes FROM cache_totals WHERE id = 0").fetchone()
+                if entries > self.max_entries:
+                    reason, count = "lru", entries - self.max_entries
+                elif size > self.max_bytes:
+                    reason, count = "memory", max(1, entries // 64)
+                else:
+                    break
+                evicted[reason] += conn.execute(
+                    "DELETE FROM cache_entries WHERE seq IN"
+                    " (SELECT seq FROM cache_entries ORDER BY accessed_at LIMIT ?)",
+                    (count,)
+                ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return evicted
+
+    def _error(self, operation: str, error: sqlite3.Error) -> None:
+        self.stats.errors += 1
+        logger.warning(f"Shared cache {operation} failed ({self.path}): {error}")
+
+
+CacheStore = Union[InMemoryCacheStore, SQLiteCacheStore]
+
+
+def _snapshot(store: CacheStore, entries: int, size: int) -> Dict[str, Any]:
+    lookups = store.stats.hits + store.stats.misses
+    return {
+        "backend": "sqlite" if store.shared else "memory",
+        "entries": entries,
+        "bytes": size,
+        "lookups": lookups,
+        "hits": store.stats.hits,
+        "hit_rate": round(store.stats.hits / lookups, 4) if lookups else 0.0,
+        "writes": store.stats.writes,
+        "errors": store.stats.errors,
+        "evictions": dict(store.stats.evictions),
+    }
+
+
+_cache_store: Optional[CacheStore] = None
+_cache_store_lock = threading.Lock()
+
+
+def get_cache_store() -> CacheStore:
+    """Return the process-wide cache store configured from settings."""
+    global _cache_store
+    if _cache_store is None:
+        with _cache_store_lock:
+            if _cache_store is None:
+                if settings.cache_backend == "sqlite":
+                    _cache_store = SQLiteCacheStore(
+                        settings.cache_sqlite_path,
+                        max_entries=settings.cache_max_entries,
+                        max_bytes=settings.cache_max_bytes,
+                        busy_timeout_ms=settings.cache_sqlite_busy_timeout_ms
+                    )
+                else:
+                    _cache_store = InMemoryCacheStore(settings.cache_max_entries, settings.cache_max_bytes)
+    return _cache_store
+
+
+def get_analytics_cache() -> Optional[CacheStore]:
+    """Return the store for budget and insights results, or None when their caching is disabled."""
+    return get_cache_store() if settings.analytics_cache_enabled else None
+
+
+def reset_cache_store() -> None:
+    """Drop the process-wide cache store (useful for testing)."""
+    global _cache_store
+    with _cache_store_lock:
+        if isinstance(_cache_store, SQLiteCacheStore):
+            _cache_store.close()
+        _cache_store = None
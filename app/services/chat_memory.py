@@ -0,0 +1,294 @@
+"""
+Bounded conversational memory for multi-turn chat.
+
+Each session keeps its most recent exchanges verbatim and folds older ones
+into a running summary. Summaries are produced by a background task, so a
+chat request never waits on summarization, and the history sent with a
+prompt is trimmed to a fixed token budget.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Set
+
+from app.config import settings
+from app.metrics import record_fallback
+from app.models.base_model import BaseLLMClient
+from app.models.tokens import estimate_tokens, estimate_messages_tokens
+from app.services.json_parsing import parse_json_response
+from app.services.prompt_templates import get_conversation_summary_prompt, CONVERSATION_SUMMARY_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatSession:
+    """Stored state of one chat conversation."""
+    session_id: str
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    summary: str = ""
+    updated_at: float = field(default_factory=time.time)
+
+
+class InMemorySessionStore:
+    """Process-local session store with TTL expiry and a bounded session count."""
+
+    def __init__(self, ttl_seconds: int, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return a live session, or None if it is unknown or expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session: ChatSession) -> None:
+        """Store a session, evicting the least recently used ones beyond the bound."""
+        session.updated_at = time.time()
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        """Drop expired sessions and return how many were removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if s.updated_at < cutoff]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+
+class SQLiteSessionStore:
+    """SQLite-backed session store so conversations survive restarts."""
+
+    def __init__(self, path: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return a live session, or None if it is unknown or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if time.time() - row[1] > self.ttl_seconds:
+            self.delete(session_id)
+            return None
+        return ChatSession(**json.loads(row[0]))
+
+    def save(self, session: ChatSession) -> None:
+        """Insert or replace a session."""
+        session.updated_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session.session_id, json.dumps(asdict(session)), session.updated_at)
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Drop expired sessions and return how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class ChatMemory:
+    """Builds bounded chat history and maintains rolling summaries."""
+
+    def __init__(
+        self,
+        store,
+        history_turns: int = 6,
+        token_budget: int = 3000,
+        summary_max_tokens: int = 256
+    ):
+        self.store = store
+        self.history_turns = history_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get_history(self, session_id: str, prompt: str) -> List[Dict[str, str]]:
+        """
+        Build the history to send with a prompt.
+
+        Args:
+            session_id: Conversation identifier
+            prompt: The fully rendered prompt for this request
+
+        Returns:
+            Chat messages, oldest first, that fit the token budget with the prompt
+        """
+        session = self.store.get(session_id)
+        if session is None:
+            return []
+
+        budget = self.token_budget - estimate_tokens(prompt)
+        messages: List[Dict[str, str]] = []
+
+        if session.summary:
+            summary_message = {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {session.summary}"
+            }
+            if estimate_messages_tokens([summary_message]) <= budget:
+                messages.append(summary_message)
+                budget -= estimate_messages_tokens([summary_message])
+
+        # Newest turns first until the budget runs out, then restore order
+        recent: List[Dict[str, str]] = []
+        for turn in reversed(session.turns[-2 * self.history_turns:]):
+            cost = estimate_messages_tokens([turn])
+            if cost > budget:
+                break
+            recent.append(turn)
+            budget -= cost
+        recent.reverse()
+
+        # Never start the verbatim window on a dangling assistant reply
+        if recent and recent[0]["role"] == "assistant":
+            recent = recent[1:]
+
+        return messages + recent
+
+    def record_exchange(
+        self,
+        session_id: str,
+        question: str,
+        answer: str,
+        llm_client: BaseLLMClient
+    ) -> None:
+        """Append a user/assistant exchange and schedule summarization if needed."""
+        session = self.store.get(session_id) or ChatSession(session_id=session_id)
+        session.turns.append({"role": "user", "content": question})
+        session.turns.append({"role": "assistant", "content": answer})
+        self.store.save(session)
+
+        if len(session.turns) > 2 * self.history_turns and session_id not in self._summarizing:
+            self._summarizing.add(session_id)
+            task = asyncio.create_task(self._summarize(session_id, llm_client))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str, llm_client: BaseLLMClient) -> None:
+        """Fold turns beyond the verbatim window into the running summary."""
+        try:
+            session = self.store.get(session_id)
+            if session is None:
+                return
+            overflow = session.turns[:-2 * self.history_turns]
+            if not overflow:
+                return
+
+            summary = await self._generate_summary(session.summary, overflow, llm_client)
+
+            # Re-read: more turns may have arrived while the summary was generated
+            session = self.store.get(session_id)
+            if session is None:
+                return
+            session.turns = session.turns[len(overflow):]
+            session.summary = summary
+            self.store.save(session)
+        except Exception as e:
+            logger.error(f"Error summarizing chat session {session_id}: {e}")
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def _generate_summary(
+        self,
+        previous_summary: str,
+        turns: List[Dict[str, str]],
+        llm_client: BaseLLMClient
+    ) -> str:
+        """Ask the LLM for an updated summary, falling back to an extractive one."""
+        prompt = get_conversation_summary_prompt(previous_summary, turns)
+        try:
+            response = await llm_client.generate(
+                prompt,
+                max_tokens=self.summary_max_tokens,
+                stream=False,
+                response_schema=CONVERSATION_SUMMARY_SCHEMA
+            )
+            summary = str(parse_json_response(response, purpose="chat_summary")["summary"])
+        except Exception as e:
+            logger.warning(f"Falling back to extractive chat summary: {e}")
+            record_fallback("chat_summary")
+            questions = [turn["content"] for turn in turns if turn["role"] == "user"]
+            summary = " ".join(filter(None, [previous_summary, "The user also asked: " + "; ".join(questions)]))
+
+        # Keep the summary itself within its token allowance
+        max_chars = self.summary_max_tokens * 4
+        return summary if len(summary) <= max_chars else summary[-max_chars:]
+
+    async def drain(self) -> None:
+        """Wait for in-flight summarization tasks (useful for shutdown and tests)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+_chat_memory: Optional[ChatMemory] = None
+
+
+def get_chat_memory() -> ChatMemory:
+    """Return the process-wide chat memory configured from settings."""
+    global _chat_memory
+    if _chat_memory is None:
+        if settings.chat_memory_backend == "sqlite":
+            store = SQLiteSessionStore(settings.chat_memory_sqlite_path, settings.chat_session_ttl_seconds)
+        else:
+            store = InMemorySessionStore(settings.chat_session_ttl_seconds, settings.chat_max_sessions)
+        _chat_memory = ChatMemory(
+            store,
+            history_turns=settings.chat_history_turns,
+            token_budget=settings.chat_history_token_budget,
+            summary_max_tokens=settings.chat_summary_max_tokens
+        )
+    return _chat_memory
+
+
+def reset_chat_memory() -> None:
+    """Drop the process-wide chat memory (useful for testing)."""
+    global _chat_memory
+    _chat_memory = None
@@ -0,0 +1,254 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from app.config import settings
+from app.metrics import record_fallback, retrieval_total
+from app.models.base_model import BaseLLMClient
+from app.models.tokens import estimate_tokens
+from app.services.chat_memory import ChatMemory, get_chat_memory
+from app.services.json_parsing import parse_json_response
+from app.services.prompt_stats import PromptStats, get_prompt_stats
+from app.services.prompt_templates import (
+    get_persona_prompt,
+    get_general_prompt,
+    PERSONA_ADVICE_SCHEMA,
+    GENERAL_ADVICE_SCHEMA,
+)
+from app.services.retrieval import RetrievalHit, RetrievalIndex, get_retrieval_index
+from app.services.semantic_cache import CacheHit, SemanticCache, get_semantic_cache, meaning_guard
+from app.tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatTurn:
+    """A prepared chat request: rendered prompt, output schema and history."""
+    question: str
+    persona: Optional[str]
+    session_id: Optional[str]
+    prompt: str
+    schema: Dict[str, Any]
+    history: Optional[List[Dict[str, str]]] = None
+    direct_hit: Optional[RetrievalHit] = None  # vetted answer that replaces the LLM call
+    cache_hit: Optional[CacheHit] = None  # earlier answer to a near-identical question
+    context: Optional[List[str]] = None  # figures about the user (e.g. a forecast) quoted in the prompt
+
+    @property
+    def cacheable(self) -> bool:
+        """Stateless answers do not depend on history or the user's own figures and can be shared."""
+        return not self.session_id and not self.context
+
+
+class ChatService:
+    """Service for persona-aware chat answers, streamed or complete."""
+
+    def __init__(
+        self,
+        llm_client: BaseLLMClient,
+        memory: Optional[ChatMemory] = None,
+        retriever: Optional[RetrievalIndex] = None,
+        cache: Optional[SemanticCache] = None,
+        record_access: bool = True
+    ):
+        self.llm_client = llm_client
+        self._memory = memory
+        self.retriever = retriever if retriever is not None else get_retrieval_index()
+        self.cache = cache if cache is not None else get_semantic_cache()
+        # Frequent stateless questions are replayed to warm the cache after a restart
+        self.prompt_stats: Optional[PromptStats] = get_prompt_stats() if record_access else None
+
+    @property
+    def memory(self) -> ChatMemory:
+        """Chat memory used for session-backed conversations."""
+        if self._memory is None:
+            self._memory = get_chat_memory()
+        return self._memory
+
+    def build_prompt(
+        self,
+        question: str,
+        persona: Optional[str],
+        grounding: Optional[List[str]] = None,
+        context: Optional[List[str]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Return the prompt and output schema for a question."""
+        if persona:
+            return get_persona_prompt(question, persona, grounding, context), PERSONA_ADVICE_SCHEMA
+        return get_general_prompt(question, grounding, context), GENERAL_ADVICE_SCHEMA
+
+    def retrieve(self, question: str, persona: Optional[str]) -> Tuple[Optional[RetrievalHit], List[str]]:
+        """
+        Look the question up in the vetted answer index.
+
+        Returns:
+            The hit to answer with directly (if any) and grounding passages otherwise
+        """
+        if self.retriever is None:
+            return None, []
+
+        hits = self.retriever.search(question, persona, top_k=settings.retrieval_top_k)
+        # A negated question or one about specific amounts is not the FAQ it resembles
+        if (
+            hits
+            and hits[0].score >= settings.retrieval_answer_threshold
+            and meaning_guard(question) == meaning_guard(hits[0].question)
+        ):
+            retrieval_total.inc(outcome="answered")
+            return hits[0], []
+
+        grounding = [hit.answer for hit in hits if hit.score >= settings.retrieval_grounding_threshold]
+        retrieval_total.inc(outcome="grounded" if grounding else "miss")
+        return None, grounding
+
+    def prepare(
+        self,
+        question: str,
+        persona: Optional[str] = None,
+        session_id: Optional[str] = None,
+        context: Optional[List[str]] = None
+    ) -> ChatTurn:
+        """Retrieve, check the cache, render the prompt and load history for a chat request."""
+        with span("chat.prepare") as prepare_span:
+            direct_hit, grounding = self.retrieve(question, persona)
+            if context and direct_hit is not None:
+                # A vetted answer cannot speak to the user's own figures; ground the LLM with it instead
+                grounding, direct_hit = [direct_hit.answer], None
+            prompt, schema = self.build_prompt(question, persona, grounding, context)
+            turn = ChatTurn(question, persona, session_id, prompt, schema, direct_hit=direct_hit, context=context)
+            if direct_hit is None and turn.cacheable and self.prompt_stats is not None:
+                self.prompt_stats.record(question, persona)
+            if direct_hit is None and turn.cacheable and self.cache is not None:
+                turn.cache_hit = self.cache.lookup(question, persona)
+            if session_id:
+                turn.history = self.memory.get_history(session_id, prompt)
+            prepare_span.set_attribute("retrieval_hit", direct_hit is not None)
+            prepare_span.set_attribute("cache_hit", turn.cache_hit is not None)
+        return turn
+
+    async def stream(self, turn: ChatTurn, max_tokens: int = 512) -> AsyncIterator[str]:
+        """Open a token stream for a prepared turn."""
+        return await self.llm_client.generate(
+            turn.prompt,
+            max_tokens=max_tokens,
+            stream=True,
+            response_schema=turn.schema,
+            history=turn.history
+        )
+
+    @traced("chat.answer")
+    async def answer(
+        self,
+        question: str,
+        persona: Optional[str] = None,
+        max_tokens: int = 512,
+        session_id: Optional[str] = None,
+        stream: bool = False,
+        context: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a complete chat answer.
+
+        Args:
+            question: User's financial question
+            persona: Optional user persona
+            max_tokens: Maximum tokens to generate
+            session_id: Optional conversation id for multi-turn chat
+            stream: Generate via the streaming API and collect the chunks
+            context: Optional figures about the user to ground the answer (e.g. forecast_context)
+
+        Returns:
+            Dictionary with answer, model and meta
+        """
+        turn = self.prepare(question, persona, session_id, context)
+        local = self.answer_locally(turn)
+        if local is not None:
+            return local
+
+        response = await self.llm_client.generate(
+            turn.prompt,
+            max_tokens=max_tokens,
+            stream=stream,
+            response_schema=turn.schema,
+            history=turn.history
+        )
+
+        if stream:
+            # Collect all chunks
+            chunks = []
+            async for chunk in response:
+                chunks.append(chunk)
+            response = "".join(chunks)
+
+        return self.complete(turn, response)
+
+    def answer_locally(self, turn: ChatTurn) -> Optional[Dict[str, Any]]:
+        """Answer from the retrieval index or the semantic cache, if either matched."""
+        if turn.direct_hit is not None:
+            return self.complete_direct(turn)
+        if turn.cache_hit is not None:
+            return self.complete_cached(turn)
+        return None
+
+    def complete_cached(self, turn: ChatTurn) -> Dict[str, Any]:
+        """Replay a cached answer to a near-identical question."""
+        hit = turn.cache_hit
+        meta = {
+            **hit.result["meta"],
+            "source": "cache",
+            "cache_similarity": round(hit.similarity, 3)
+        }
+        return self._finish(turn, hit.result["answer"], meta, model=hit.result["model"])
+
+    def complete_direct(self, turn: ChatTurn) -> Dict[str, Any]:
+        """Answer from the retrieval index without calling the LLM."""
+        hit = turn.direct_hit
+        meta = {
+            "persona": turn.persona or "general",
+            "confidence": round(hit.score, 3),
+            "source": "retrieval",
+            "retrieval_id": hit.entry_id
+        }
+        return self._finish(turn, hit.answer, meta, model="local-retrieval")
+
+    def complete(self, turn: ChatTurn, response: str) -> Dict[str, Any]:
+        """Parse the raw response and record the exchange in chat memory."""
+        try:
+            parsed = parse_json_response(response, purpose="chat")
+            answer = parsed.get("answer", response)
+            meta = {
+                "persona": turn.persona or "general",
+                "confidence": parsed.get("confidence", 0.8)
+            }
+            if "persona_context" in parsed:
+                meta["persona_context"] = parsed["persona_context"]
+        except ValueError:
+            # If not JSON, use raw response (and do not cache it)
+            record_fallback("chat")
+            answer = response
+            meta = {"persona": turn.persona or "general"}
+            return self._finish(turn, answer, meta, model=self.llm_client.model_name)
+
+        result = self._finish(turn, answer, meta, model=self.llm_client.model_name)
+        if turn.cacheable and self.cache is not None:
+            self.cache.store(
+                turn.question,
+                turn.persona,
+                {"answer": answer, "model": result["model"], "meta": dict(meta)},
+                tokens=estimate_tokens(turn.prompt) + estimate_tokens(response)
+            )
+        return result
+
+    def _finish(self, turn: ChatTurn, answer: str, meta: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """Record the exchange in chat memory and build the response payload."""
+        if turn.session_id:
+            # Summarization of older turns runs in the background
+            self.memory.record_exchange(turn.session_id, turn.question, answer, self.llm_client)
+            meta["session_id"] = turn.session_id
+            meta["history_messages"] = len(turn.history or [])
+
+        return {
+            "answer": answer,
+            "model": model,
+            "meta": meta
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.metrics import record_fallback
+from app.models.base_model import BaseLLMClient
+from app.services.analytics import (
+    BudgetAggregates,
+    SpendingAggregates,
+    summarize_budget,
+    summarize_transactions,
+)
+from app.services.budget_service import BudgetService
+from app.services.insights_service import InsightsService
+from app.services.nlu_service import NLUService
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardService:
+    """Service that fans the dashboard analyses out concurrently under one deadline."""
+
+    def __init__(
+        self,
+        budget_client: BaseLLMClient,
+        insights_client: BaseLLMClient,
+        nlu_client: BaseLLMClient,
+        deadline_seconds: float = 20.0
+    ):
+        self.budget_service = BudgetService(budget_client)
+        self.insights_service = InsightsService(insights_client)
+        self.nlu_service = NLUService(nlu_client)
+        self.deadline_seconds = deadline_seconds
+
+    async def stream_sections(
+        self,
+        income: Dict[str, float],
+        expenses: Dict[str, float],
+        transactions: List[Dict[str, Any]],
+        notes: Optional[List[str]] = None,
+        persona: str = "general"
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yield dashboard sections as they finish.
+
+        Aggregates are computed once and yielded first; the budget summary,
+        spending insights and NLU of the notes then run concurrently. Sections
+        still running at the deadline are cancelled and replaced with their
+        deterministic fallbacks. A final "meta" section reports latencies.
+
+        Args:
+            income: Income sources and amounts
+            expenses: Expense categories and amounts
+            transactions: Transaction dictionaries
+            notes: Free-text notes to analyze with NLU
+            persona: Persona used for NLU
+
+        Returns:
+            Async iterator of (section name, payload)
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        notes = notes or []
+
+        budget_aggregates = summarize_budget(income, expenses) if (income or expenses) else None
+        spending_aggregates = summarize_transactions(transactions) if transactions else None
+        yield "aggregates", {
+            "budget": budget_aggregates.to_dict() if budget_aggregates else None,
+            "spending": spending_aggregates.to_dict() if spending_aggregates else None
+        }
+
+        aggregates = (budget_aggregates, spending_aggregates)
+        coroutines = {}
+        if budget_aggregates is not None:
+            coroutines["budget"] = self.budget_service.generate_summary(income, expenses, budget_aggregates)
+        if spending_aggregates is not None:
+            coroutines["insights"] = self.insights_service.generate_insights(transactions, spending_aggregates)
+        if notes:
+            coroutines["nlu"] = asyncio.gather(*(self.nlu_service.analyze_text(text, persona) for text in notes))
+
+        tasks = {asyncio.ensure_future(coroutine): name for name, coroutine in coroutines.items()}
+        pending = set(tasks)
+        latencies: Dict[str, float] = {}
+        timed_out: List[str] = []
+        deadline = started + self.deadline_seconds
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    name = tasks[task]
+                    latencies[name] = round((loop.time() - started) * 1000, 1)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Dashboard section {name} failed: {e}")
+                        record_fallback("dashboard")
+                        result = self._fallback(name, income, expenses, transactions, notes, aggregates)
+                    yield name, result
+
+            for task in pending:
+                task.cancel()
+            for task in sorted(pending, key=lambda t: tasks[t]):
+                name = tasks[task]
+                logger.warning(f"Dashboard section {name} missed the {self.deadline_seconds}s deadline")
+                timed_out.append(name)
+                record_fallback("dashboard")
+                yield name, self._fallback(name, income, expenses, transactions, notes, aggregates)
+            pending = set()
+        finally:
+            # Client went away mid-stream: stop the remaining analyses
+            for task in pending:
+                task.cancel()
+
+        yield "meta", {
+            "latency_ms": latencies,
+            "timed_out": timed_out,
+            "total_ms": round((loop.time() - started) * 1000, 1)
+        }
+
+    async def build(
+        self,
+        income: Dict[str, float],
+        expenses: Dict[str, float],
+        transactions: List[Dict[str, Any]],
+        notes: Optional[List[str]] = None,
+        persona: str = "general"
+    ) -> Dict[str, Any]:
+        """Run every section and return the combined payload."""
+        payload: Dict[str, Any] = {"budget": None, "insights": None, "nlu": None}
+        async for name, section in self.stream_sections(income, expenses, transactions, notes, persona):
+            payload[name] = section
+        return payload
+
+    def _fallback(
+        self,
+        name: str,
+        income: Dict[str, float],
+        expenses: Dict[str, float],
+        transactions: List[Dict[str, Any]],
+        notes: List[str],
+        aggregates: Tuple[Optional[BudgetAggregates], Optional[SpendingAggregates]]
+    ) -> Any:
+        """Deterministic replacement for a section that failed or timed out."""
+        if name == "budget":
+            return self.budget_service._generate_fallback_summary(income, expenses, aggregates[0])
+        if name == "insights":
+            return self.insights_service._generate_fallback_insights(transactions, aggregates[1])
+        return [self.nlu_service._generate_fallback_nlu(text) for text in notes]
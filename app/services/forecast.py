@@ -0,0 +1,245 @@
+"""
+Monte Carlo forecasts of balance and savings-goal attainment.
+
+Monthly totals per spending category, and monthly income, are each fitted
+with a simple distribution: a month is empty with the observed share of
+empty months (a freelancer's dry month, an annual bill), otherwise lognormal
+with the mean and variance of the non-empty months. Months and categories
+are drawn independently. Thousands of paths are simulated at once as
+(paths x months) NumPy arrays, and the results are summarized as percentile
+bands of the balance, the chance of reaching a savings goal by each month
+and the chance of running out of money. `forecast_context` renders a
+forecast as grounding passages for the advice prompts.
+"""
+import math
+import secrets
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.analytics import TransactionColumns, Transactions
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class MonthlyDistribution:
+    """A monthly amount: zero with probability `p_zero`, else lognormal(mu, sigma)."""
+    p_zero: float
+    mu: float
+    sigma: float
+
+    @property
+    def mean(self) -> float:
+        if self.p_zero >= 1:
+            return 0.0
+        return (1 - self.p_zero) * math.exp(self.mu + self.sigma ** 2 / 2)
+
+    @classmethod
+    def fit(cls, values: Sequence[float]) -> "MonthlyDistribution":
+        """
+        Fit to observed monthly totals (zero or negative months count as empty).
+
+        The lognormal matches the mean and sample variance of the non-empty
+        months; with a single non-empty month it is that amount every time.
+        """
+        values = np.asarray(values, dtype=float)
+        positive = values[values > 0]
+        if not len(values) or not len(positive):
+            return cls(p_zero=1.0, mu=0.0, sigma=0.0)
+        mean = positive.mean()
+        variance = positive.var(ddof=1) if len(positive) > 1 else 0.0
+        sigma_squared = math.log1p(variance / mean ** 2)
+        return cls(
+            p_zero=1 - len(positive) / len(values),
+            mu=math.log(mean) - sigma_squared / 2,
+            sigma=math.sqrt(sigma_squared),
+        )
+
+    def sample_into(self, out: np.ndarray, rng: np.random.Generator) -> None:
+        """Add one draw per element of `out` to it."""
+        if self.p_zero >= 1:
+            return
+        draws = rng.standard_normal(out.shape)
+        draws *= self.sigma
+        draws += self.mu
+        np.exp(draws, out=draws)
+        if self.p_zero > 0:
+            draws[rng.random(out.shape) < self.p_zero] = 0.0
+        out += draws
+
+
+@dataclass
+class Forecast:
+    """Summary of a Monte Carlo run; list entries are per month (month 1 first)."""
+    months: int
+    paths: int
+    seed: int
+    starting_balance: float
+    expected_income: float
+    expected_expenses: Dict[str, float]
+    balance_percentiles: Dict[str, List[float]]
+    shortfall_probability: float
+    savings_goal: Optional[float] = None
+    goal_probability: Optional[List[float]] = None
+    median_months_to_goal: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def monthly_totals(transactions: Transactions) -> Tuple[int, Dict[str, np.ndarray]]:
+    """
+    Spending per category and calendar month.
+
+    Months run from the first to the last month with a transaction; months
+    without spending in a category are zero. Amounts count as spending
+    whatever their sign, as in `summarize_transactions`.
+
+    Returns:
+        Number of months, and each category's monthly totals
+
+    Raises:
+        ValueError: When a date does not start with YYYY-MM
+    """
+    if isinstance(transactions, TransactionColumns):
+        categories = [transactions.categories[code] for code in transactions.category_codes]
+        rows = zip(categories, transactions.dates, transactions.amounts)
+    else:
+        rows = ((txn["category"], txn["date"], txn["amount"]) for txn in transactions)
+
+    totals: Dict[Tuple[str, int], float] = {}
+    for category, date, amount in rows:
+        try:
+            month = int(date[:4]) * 12 + int(date[5:7]) - 1
+        except ValueError:
+            raise ValueError(f"Transaction date {date!r} does not start with YYYY-MM") from None
+        totals[category, month] = totals.get((category, month), 0.0) + abs(float(amount))
+    if not totals:
+        return 0, {}
+
+    first = min(month for _, month in totals)
+    count = max(month for _, month in totals) - first + 1
+    by_category: Dict[str, np.ndarray] = {}
+    for (category, month), amount in totals.items():
+        by_category.setdefault(category, np.zeros(count))[month - first] = amount
+    return count, by_category
+
+
+def simulate(
+    expenses: Dict[str, MonthlyDistribution],
+    income: MonthlyDistribution,
+    starting_balance: float = 0.0,
+    months: int = 24,
+    paths: int = 10_000,
+    savings_goal: Optional[float] = None,
+    seed: Optional[int] = None
+) -> Forecast:
+    """
+    Simulate monthly cash flow along many paths.
+
+    Args:
+        expenses: Fitted monthly spending per category
+        income: Fitted monthly income
+        starting_balance: Balance before month 1
+        months: Forecast horizon
+        paths: Number of simulated paths
+        savings_goal: Target balance for goal_probability
+        seed: RNG seed; the same seed and inputs give the same forecast (random if None)
+
+    Returns:
+        Percentile bands of the end-of-month balance and goal/shortfall probabilities
+    """
+    if seed is None:
+        seed = secrets.randbits(32)
+    rng = np.random.default_rng(seed)
+    shape = (paths, months)
+
+    # Net cash flow per path and month, then the running balance in place
+    spent = np.zeros(shape)
+    for distribution in expenses.values():
+        distribution.sample_into(spent, rng)
+    balance = np.zeros(shape)
+    income.sample_into(balance, rng)
+    balance -= spent
+    del spent
+    np.cumsum(balance, axis=1, out=balance)
+    balance += starting_balance
+
+    bands = np.percentile(balance, PERCENTILES, axis=0)
+    forecast = Forecast(
+        months=months,
+        paths=paths,
+        seed=seed,
+        starting_balance=starting_balance,
+        expected_income=income.mean,
+        expected_expenses={category: distribution.mean for category, distribution in expenses.items()},
+        balance_percentiles={f"p{p}": band.round(2).tolist() for p, band in zip(PERCENTILES, bands)},
+        shortfall_probability=float((balance < 0).any(axis=1).mean()),
+    )
+    if savings_goal is not None:
+        # A path counts from the first month its balance reaches the goal
+        reached = balance >= savings_goal
+        np.logical_or.accumulate(reached, axis=1, out=reached)
+        probability = reached.mean(axis=0)
+        forecast.savings_goal = savings_goal
+        forecast.goal_probability = probability.round(4).tolist()
+        likely = np.flatnonzero(probability >= 0.5)
+        forecast.median_months_to_goal = int(likely[0]) + 1 if len(likely) else None
+    return forecast
+
+
+def forecast_from_history(
+    transactions: Transactions,
+    monthly_income: Sequence[float],
+    starting_balance: float = 0.0,
+    months: int = 24,
+    paths: int = 10_000,
+    savings_goal: Optional[float] = None,
+    seed: Optional[int] = None
+) -> Forecast:
+    """
+    Fit distributions to spending history and monthly income, then simulate.
+
+    Args:
+        transactions: Spending history (row dictionaries or TransactionColumns)
+        monthly_income: Observed monthly income, oldest first (one value for a fixed income)
+
+    Raises:
+        ValueError: When a transaction date does not start with YYYY-MM
+    """
+    _, by_category = monthly_totals(transactions)
+    expenses = {category: MonthlyDistribution.fit(totals) for category, totals in by_category.items()}
+    return simulate(
+        expenses, MonthlyDistribution.fit(monthly_income), starting_balance, months, paths, savings_goal, seed
+    )
+
+
+def forecast_context(forecast: Forecast) -> List[str]:
+    """Render a forecast as grounding passages for the advice prompts."""
+    bands = forecast.balance_percentiles
+    spending = sum(forecast.expected_expenses.values())
+    passages = [
+        f"The user's cash flow was simulated over {forecast.paths:,} paths from their history: expected "
+        f"income {forecast.expected_income:,.2f} and spending {spending:,.2f} per month, starting balance "
+        f"{forecast.starting_balance:,.2f}."
+    ]
+    checkpoints = sorted({m for m in (6, 12, 24, 36, 60) if m < forecast.months} | {forecast.months})
+    passages.append("Forecast balance (median, 5th-95th percentile): " + "; ".join(
+        f"after {m} months {bands['p50'][m - 1]:,.0f} ({bands['p5'][m - 1]:,.0f} to {bands['p95'][m - 1]:,.0f})"
+        for m in checkpoints
+    ) + ".")
+    passages.append(
+        f"Chance the balance drops below zero within {forecast.months} months: "
+        f"{forecast.shortfall_probability:.0%}."
+    )
+    if forecast.goal_probability is not None:
+        goal = (
+            f"Chance of reaching the savings goal of {forecast.savings_goal:,.0f} within {forecast.months} months: "
+            f"{forecast.goal_probability[-1]:.0%}"
+        )
+        if forecast.median_months_to_goal is not None:
+            goal += f"; half of the paths reach it within {forecast.median_months_to_goal} months"
+        passages.append(goal + ".")
+    return passages
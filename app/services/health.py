@@ -0,0 +1,224 @@
+"""
+Liveness and readiness probes.
+
+`/live` only says the process is serving requests. `/ready` combines state
+kept in memory: the latest background check of each LLM backend (Groq's
+model list, Ollama's /api/tags) with its latency, whether the warm-up after a
+restart has finished, and whether the LLM scheduler or the job queue is
+saturated. A probe never calls a backend or creates a client.
+
+`ProbeMiddleware` answers both paths ahead of the rest of the middleware
+stack (tracing, metrics, profiling), so probes cost microseconds and do not
+crowd real requests out of traces and metrics.
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LIVE_PATH = "/live"
+READY_PATH = "/ready"
+
+
+async def probe_groq(client) -> None:
+    """List models with the configured API key (no tokens are spent)."""
+    base_url = (settings.groq_base_url or "https://api.groq.com").rstrip("/")
+    response = await client.get(
+        f"{base_url}/openai/v1/models",
+        headers={"Authorization": f"Bearer {settings.groq_api_key}"}
+    )
+    response.raise_for_status()
+
+
+async def probe_ollama(client) -> None:
+    """List the models Ollama has pulled."""
+    response = await client.get(f"{settings.ollama_base_url.rstrip('/')}/api/tags")
+    response.raise_for_status()
+
+
+# Backend name -> check that raises when the backend is unusable
+PROBES: Dict[str, Callable[[Any], Awaitable[None]]] = {
+    "groq": probe_groq,
+    "ollama": probe_ollama,
+}
+
+
+def default_backends() -> List[str]:
+    """Backends the app calls with the current settings (none in local or replay mode)."""
+    if settings.health_probe_backends:
+        return list(settings.health_probe_backends)
+    if settings.app_env == "prod" and settings.groq_api_key and settings.llm_cassette_mode != "replay":
+        return ["groq"]
+    return []
+
+
+@dataclass
+class BackendHealth:
+    """Result of the latest checks of one backend."""
+    name: str
+    healthy: Optional[bool] = None  # None until the first check finishes
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
+    last_success_at: Optional[float] = None
+    consecutive_failures: int = 0
+    error: Optional[str] = None
+
+
+class HealthProber:
+    """Checks backends in the background and answers probes from the cached results."""
+
+    def __init__(
+        self,
+        backends: List[str],
+        interval_seconds: float = 15.0,
+        timeout_seconds: float = 3.0,
+        failure_threshold: int = 2,
+        max_llm_queue_depth: int = 100
+    ):
+        unknown = [name for name in backends if name not in PROBES]
+        if unknown:
+            raise ValueError(f"No health probe for backends: {', '.join(unknown)}")
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+        self.max_llm_queue_depth = max_llm_queue_depth
+        self.backends: Dict[str, BackendHealth] = {name: BackendHealth(name) for name in backends}
+        self.started_at = time.time()
+        self._model_name: Optional[str] = None
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def model_name(self) -> str:
+        """Name of the default model, resolved once."""
+        if self._model_name is None:
+            from app.models import ModelFactory
+            self._model_name = ModelFactory.get_client().model_name
+        return self._model_name
+
+    async def start(self) -> None:
+        """Run a first check now and keep checking in the background."""
+        if not self.backends:
+            return
+        import httpx
+        self._client = httpx.AsyncClient(timeout=self.timeout_seconds)
+        self._task = asyncio.create_task(self._run(), name="health-prober")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check_all(self) -> None:
+        """Check every backend concurrently and record the results."""
+        await asyncio.gather(*(self._check(health) for health in self.backends.values()))
+
+    async def _check(self, health: BackendHealth) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(PROBES[health.name](self._client), self.timeout_seconds)
+        except Exception as e:
+            health.consecutive_failures += 1
+            health.error = f"{type(e).__name__}: {e}"[:200]
+            # A single failed check does not take the instance out of rotation
+            if health.consecutive_failures >= self.failure_threshold:
+                if health.healthy is not False:
+                    logger.warning(f"LLM backend {health.name} is down: {health.error}")
+                health.healthy = False
+        else:
+            if health.healthy is False:
+                logger.info(f"LLM backend {health.name} is back up")
+            health.healthy = True
+            health.consecutive_failures = 0
+            health.error = None
+            health.last_success_at = time.time()
+        health.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        health.checked_at = time.time()
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.interval_seconds)
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """Whether the instance should receive traffic, and why (from memory only)."""
+        from app.models.scheduler import get_scheduler
+        from app.services.jobs import get_job_manager
+        from app.services.warm_start import get_warm_start
+
+        warm_start = get_warm_start()
+        llm_queue = get_scheduler().queue_depth()
+        job_queue = get_job_manager().queue_depth()
+        saturated = llm_queue >= self.max_llm_queue_depth or job_queue >= settings.job_max_queue
+        backends_up = all(health.healthy for health in self.backends.values())
+        ready = warm_start.ready and backends_up and not saturated
+        return ready, {
+            "ready": ready,
+            "warm_start": warm_start.state,
+            "warmup": dict(warm_start.warmup),
+            "backends": {name: asdict(health) for name, health in self.backends.items()},
+            "saturated": saturated,
+            "llm_queue_depth": llm_queue,
+            "job_queue_depth": job_queue,
+        }
+
+
+class ProbeMiddleware:
+    """ASGI middleware that answers /live and /ready before the rest of the stack."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in (LIVE_PATH, READY_PATH):
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == LIVE_PATH:
+            status, payload = 200, {"status": "alive"}
+        else:
+            ready, payload = get_prober().readiness()
+            status = 200 if ready else 503
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+_prober: Optional[HealthProber] = None
+
+
+def get_prober() -> HealthProber:
+    """Return the process-wide prober configured from settings."""
+    global _prober
+    if _prober is None:
+        _prober = HealthProber(
+            default_backends(),
+            interval_seconds=settings.health_probe_interval_seconds,
+            timeout_seconds=settings.health_probe_timeout_seconds,
+            failure_threshold=settings.health_probe_failures,
+            max_llm_queue_depth=settings.health_max_llm_queue_depth
+        )
+    return _prober
+
+
+def reset_prober() -> None:
+    """Drop the process-wide prober (useful for testing)."""
+    global _prober
+    _prober = None
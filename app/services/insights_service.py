@@ -1,8 +1,13 @@
-import json
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Optional
+from app.config import settings
 from app.models.base_model import BaseLLMClient
-from app.services.prompt_templates import get_spending_insights_prompt
+from app.metrics import record_fallback
+from app.services.analytics import SpendingAggregates, Transactions, summarize_transactions
+from app.services.cache_store import cache_key, get_analytics_cache
+from app.services.json_parsing import parse_json_response, string_list
+from app.services.prompt_templates import get_spending_insights_prompt, SPENDING_INSIGHTS_SCHEMA
+from app.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -13,99 +18,111 @@ class InsightsService:
     def __init__(self, llm_client: BaseLLMClient):
         self.llm_client = llm_client
     
+    @traced("insights.generate_insights")
     async def generate_insights(
         self,
-        transactions: List[Dict[str, Any]]
+        transactions: Transactions,
+        aggregates: Optional[SpendingAggregates] = None
     ) -> Dict[str, Any]:
         """
         Generate spending insights from transaction data.
         
         Args:
-            transactions: List of transaction dictionaries with category, amount, date, etc.
+            transactions: Transaction dictionaries with category, amount, date, etc., or TransactionColumns
+            aggregates: Precomputed category totals (computed here if not given)
         
         Returns:
             Dictionary with top categories, red flags, and recommendations
         """
+        if aggregates is None:
+            aggregates = summarize_transactions(transactions)
+        
         # Generate prompt
-        prompt = get_spending_insights_prompt(transactions)
+        with span("prompt.build"):
+            prompt = get_spending_insights_prompt(transactions, aggregates)
+        
+        return await self.complete_insights(prompt, aggregates)
+    
+    async def complete_insights(
+        self,
+        prompt: str,
+        aggregates: SpendingAggregates,
+        raise_errors: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Generate spending insights for an already-built prompt.
+        
+        The batch CLI builds prompts and aggregates in worker processes and
+        only runs this step in the event loop.
+        
+        Args:
+            prompt: Prompt from get_spending_insights_prompt
+            aggregates: The aggregates the prompt was built from
+            raise_errors: Raise LLM and parsing errors instead of returning the
+                deterministic fallback (the batch CLI retries those users later)
+        
+        Returns:
+            Dictionary with top categories, red flags, and recommendations
+        """
+        # Identical input renders an identical prompt; reuse an earlier analysis of it
+        cache = get_analytics_cache()
+        key = cache_key(self.llm_client.model_name, prompt)
+        cached = cache.get("insights", key) if cache is not None else None
+        if cached is not None:
+            return cached
         
         try:
             # Get LLM response
-            response = await self.llm_client.generate(prompt, max_tokens=1000, stream=False)
+            response = await self.llm_client.generate(
+                prompt,
+                max_tokens=1000,
+                stream=False,
+                response_schema=SPENDING_INSIGHTS_SCHEMA
+            )
             
             # Parse JSON response
             insights = self._parse_json_response(response)
             
             # Validate required fields
-            insights = self._validate_insights(insights)
+            insights = self._validate_insights(insights, aggregates)
             
+            if cache is not None:
+                cache.set("insights", key, insights, ttl_seconds=settings.analytics_cache_ttl_seconds)
             return insights
             
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error generating spending insights: {e}")
+            record_fallback("insights")
             # Return fallback insights
-            return self._generate_fallback_insights(transactions)
+            return self._fallback_from_aggregates(aggregates)
     
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse JSON from LLM response, handling potential extra text."""
-        response = response.strip()
-        
-        # Remove markdown code blocks if present
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        
-        response = response.strip()
-        
-        # Try to parse
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # Try to find JSON object in the text
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            if start != -1 and end > start:
-                return json.loads(response[start:end])
-            raise
-    
-    def _validate_insights(self, insights: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate and ensure all required fields are present."""
-        if "top_categories" not in insights:
-            insights["top_categories"] = []
-        if "red_flags" not in insights:
-            insights["red_flags"] = []
-        if "recommendations" not in insights:
-            insights["recommendations"] = []
-        
-        return insights
+        return parse_json_response(response, purpose="spending_insights")
+
+    def _validate_insights(self, insights: Dict[str, Any], aggregates: SpendingAggregates) -> Dict[str, Any]:
+        """Return exactly the InsightsResponse fields, so the route can skip re-validation."""
+        # Category figures come from the deterministic aggregates
+        return {
+            "top_categories": [dict(cat) for cat in aggregates.top_categories],
+            "red_flags": string_list(insights.get("red_flags")),
+            "recommendations": string_list(insights.get("recommendations")),
+        }
     
     def _generate_fallback_insights(
         self,
-        transactions: List[Dict[str, Any]]
+        transactions: Transactions,
+        aggregates: Optional[SpendingAggregates] = None
     ) -> Dict[str, Any]:
         """Generate basic insights without LLM."""
-        # Aggregate by category
-        category_totals = {}
-        for txn in transactions:
-            category = txn.get("category", "Other")
-            amount = abs(float(txn.get("amount", 0)))
-            category_totals[category] = category_totals.get(category, 0) + amount
-        
-        # Calculate total
-        total = sum(category_totals.values())
-        
-        # Get top categories
-        top_categories = []
-        for category, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:5]:
-            percentage = (amount / total * 100) if total > 0 else 0
-            top_categories.append({
-                "category": category,
-                "amount": amount,
-                "percentage": percentage
-            })
+        if aggregates is None:
+            aggregates = summarize_transactions(transactions)
+        return self._fallback_from_aggregates(aggregates)
+    
+    def _fallback_from_aggregates(self, aggregates: SpendingAggregates) -> Dict[str, Any]:
+        top_categories = [dict(cat) for cat in aggregates.top_categories]
         
         # Generate basic red flags
         red_flags = []
@@ -113,11 +130,12 @@ class InsightsService:
             if cat["percentage"] > 40:
                 red_flags.append(f"{cat['category']} represents {cat['percentage']:.1f}% of spending - consider if this is sustainable")
         
-        if len(transactions) > 10:
+        # Counts come from the aggregates: a streamed upload passes only a sample of its rows
+        if aggregates.transaction_count > 10:
             # Check for frequent small transactions
-            small_txns = [t for t in transactions if abs(float(t.get("amount", 0))) < 20]
-            if len(small_txns) > len(transactions) * 0.3:
-                red_flags.append(f"Many small transactions detected ({len(small_txns)}) - these can add up quickly")
+            if aggregates.small_transaction_count > aggregates.transaction_count * 0.3:
+                small_count = aggregates.small_transaction_count
+                red_flags.append(f"Many small transactions detected ({small_count}) - these can add up quickly")
         
         # Generate basic recommendations
         recommendations = [
@@ -0,0 +1,364 @@
+"""
+Asynchronous jobs for long-running LLM work.
+
+Submitting a job returns its id immediately; a bounded pool of asyncio workers
+runs queued jobs in priority order (lower number first). Clients poll the job
+or subscribe to its progress events, and finished jobs are kept for a TTL
+(at most `max_retained` of them, least recently used dropped first).
+Identical submissions (same tenant, kind and payload) share one job while it
+is queued, running or retained with a successful result.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models import get_llm_client
+from app.models.scheduler import current_tenant
+from app.services.analytics import TransactionColumns
+from app.services.budget_service import BudgetService
+from app.services.insights_service import InsightsService
+from app.services.nlu_service import NLUService
+from app.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Default priority per job kind (lower runs first)
+PRIORITY_BUDGET = 1
+PRIORITY_INSIGHTS = 2
+PRIORITY_BATCH = 3
+
+ProgressCallback = Callable[[float, str], None]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Any]]
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue has no room for another submission."""
+
+
+@dataclass
+class Job:
+    """A unit of background work and its progress."""
+    job_id: str
+    kind: str
+    payload: Optional[Dict[str, Any]]
+    priority: int
+    dedupe_key: str
+    tenant: str = "anonymous"
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+    version: int = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has succeeded or failed."""
+        return self.status in (SUCCEEDED, FAILED)
+
+    def notify(self) -> None:
+        """Wake subscribers waiting for a change."""
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, seen_version: int, timeout: float) -> bool:
+        """Wait until the job moves past `seen_version`; returns False on timeout."""
+        if self.version != seen_version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public representation of the job."""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+        }
+
+
+def dedupe_key(kind: str, payload: Dict[str, Any]) -> str:
+    """Stable key for identical submissions."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{kind}:{canonical}".encode()).hexdigest()
+
+
+class JobManager:
+    """Priority job queue served by a bounded pool of asyncio workers."""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 1000,
+        result_ttl_seconds: float = 3600,
+        max_retained: int = 1000
+    ):
+        self.worker_count = workers
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_retained = max_retained
+        self._handlers: Dict[str, Tuple[JobHandler, int]] = {}
+        self._jobs: Dict[str, Job] = {}
+        # Finished job ids, least recently used first
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._by_key: Dict[str, str] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sequence = 0
+
+    def register(self, kind: str, handler: JobHandler, priority: int = PRIORITY_BATCH) -> None:
+        """Register the coroutine that runs jobs of a kind, and their default priority."""
+        self._handlers[kind] = (handler, priority)
+
+    @property
+    def kinds(self) -> List[str]:
+        """Registered job kinds."""
+        return list(self._handlers)
+
+    async def start(self) -> None:
+        """Start the worker pool on the running event loop."""
+        self._ensure_workers()
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are left unfinished."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+
+    def _ensure_workers(self) -> None:
+        """Create the queue and workers for the current loop if needed."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        # Jobs queued on a previous loop (e.g. between test clients) are requeued
+        for job in self._jobs.values():
+            if job.status == QUEUED:
+                self._enqueue(job)
+
+    def _enqueue(self, job: Job) -> None:
+        self._sequence += 1
+        self._queue.put_nowait((job.priority, self._sequence, job.job_id))
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: Optional[int] = None) -> Tuple[Job, bool]:
+        """
+        Queue a job, or return the existing job for an identical submission.
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serialisable job input
+            priority: Override for the kind's default priority (lower runs first)
+
+        Returns:
+            The job and whether it was deduplicated onto an existing one
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"Unknown job kind: {kind}")
+        self._ensure_workers()
+        self.purge_expired()
+
+        tenant = current_tenant.get()
+        key = dedupe_key(kind, {"tenant": tenant, "payload": payload})
+        existing = self._jobs.get(self._by_key.get(key, ""))
+        if existing is not None and existing.status != FAILED:
+            self._touch(existing)
+            return existing, True
+
+        if self._queue.qsize() >= self.max_queue:
+            raise JobQueueFull("Job queue is full, try again later")
+
+        default_priority = self._handlers[kind][1]
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            kind=kind,
+            payload=payload,
+            priority=default_priority if priority is None else priority,
+            dedupe_key=key,
+            tenant=tenant
+        )
+        self._jobs[job.job_id] = job
+        self._by_key[key] = job.job_id
+        self._enqueue(job)
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job that has not expired."""
+        job = self._jobs.get(job_id)
+        if job is not None and job.expires_at is not None and job.expires_at <= time.time():
+            self._forget(job)
+            return None
+        if job is not None:
+            self._touch(job)
+        return job
+
+    def purge_expired(self) -> int:
+        """Drop finished jobs past their retention TTL."""
+        now = time.time()
+        expired = [job for job in self._jobs.values() if job.expires_at is not None and job.expires_at <= now]
+        for job in expired:
+            self._forget(job)
+        return len(expired)
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _touch(self, job: Job) -> None:
+        if job.job_id in self._finished:
+            self._finished.move_to_end(job.job_id)
+
+    def _retain(self, job: Job) -> None:
+        """Keep a finished job, dropping the least recently used beyond `max_retained`."""
+        self._finished[job.job_id] = None
+        while len(self._finished) > self.max_retained:
+            oldest = self._jobs.get(next(iter(self._finished)))
+            if oldest is None:
+                self._finished.popitem(last=False)
+            else:
+                self._forget(oldest)
+
+    def _forget(self, job: Job) -> None:
+        self._jobs.pop(job.job_id, None)
+        self._finished.pop(job.job_id, None)
+        if self._by_key.get(job.dedupe_key) == job.job_id:
+            del self._by_key[job.dedupe_key]
+
+    async def _worker(self, index: int) -> None:
+        """Run queued jobs one at a time."""
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is not None and job.status == QUEUED:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        """Execute one job and record its outcome."""
+        handler, _ = self._handlers[job.kind]
+        # LLM calls made by the job are charged to the submitting tenant
+        tenant_token = current_tenant.set(job.tenant)
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.notify()
+
+        def progress(fraction: float, message: str = "") -> None:
+            job.progress = max(0.0, min(1.0, fraction))
+            job.message = message
+            job.notify()
+
+        try:
+            with get_tracer().span(f"job {job.kind}", {"job.id": job.job_id, "tenant": job.tenant}, new_trace=True):
+                job.result = await handler(job.payload, progress)
+            job.status = SUCCEEDED
+            job.progress = 1.0
+        except asyncio.CancelledError:
+            # Worker shutdown: leave the job to be requeued on restart
+            job.status = QUEUED
+            job.started_at = None
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.kind}) failed: {e}")
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            current_tenant.reset(tenant_token)
+            if job.finished:
+                job.finished_at = time.time()
+                job.expires_at = job.finished_at + self.result_ttl_seconds
+                # The input is not needed once the result is recorded
+                job.payload = None
+                self._retain(job)
+            job.notify()
+
+
+async def run_spending_insights(payload: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    """Spending insights for {"transactions": [...]} or {"columns": {...}}."""
+    progress(0.1, "Analyzing transactions")
+    service = InsightsService(get_llm_client(purpose="spending_insights"))
+    if "columns" in payload:
+        return await service.generate_insights(TransactionColumns.from_wire(payload["columns"]))
+    return await service.generate_insights(payload["transactions"])
+
+
+async def run_budget_summary(payload: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    """Budget summary for {"income": {...}, "expenses": {...}}."""
+    progress(0.1, "Summarizing budget")
+    service = BudgetService(get_llm_client(purpose="budget_summary"))
+    return await service.generate_summary(payload["income"], payload["expenses"])
+
+
+async def run_nlu_batch(payload: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    """NLU analysis for {"items": [{"text": ..., "persona": ...}, ...]}, reporting per-item progress."""
+    service = NLUService(get_llm_client(purpose="batch"))
+    items = payload["items"]
+    results = []
+    for i, item in enumerate(items):
+        results.append(await service.analyze_text(item["text"], item.get("persona", "general")))
+        progress((i + 1) / len(items), f"Analyzed {i + 1}/{len(items)}")
+    return {"results": results}
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager with the built-in job kinds registered."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            workers=settings.job_workers,
+            max_queue=settings.job_max_queue,
+            result_ttl_seconds=settings.job_result_ttl_seconds,
+            max_retained=settings.job_max_retained
+        )
+        _job_manager.register("budget_summary", run_budget_summary, PRIORITY_BUDGET)
+        _job_manager.register("spending_insights", run_spending_insights, PRIORITY_INSIGHTS)
+        _job_manager.register("nlu_batch", run_nlu_batch, PRIORITY_BATCH)
+    return _job_manager
+
+
+def reset_job_manager() -> None:
+    """Drop the process-wide job manager (useful for testing)."""
+    global _job_manager
+    _job_manager = None
@@ -0,0 +1,90 @@
+"""
+Shared JSON parsing for LLM responses.
+
+Clients run in provider-native JSON mode when a response schema is passed, so
+the common case is a single json.loads call. Fenced or chatty output from
+backends without JSON mode is still recovered, and every outcome is counted.
+"""
+import json
+from typing import Any, Dict, List
+
+from app.metrics import json_parse_total
+from app.tracing import span
+
+
+def parse_json_response(response: str, purpose: str = "general") -> Dict[str, Any]:
+    """
+    Parse a JSON object from an LLM response.
+
+    Args:
+        response: Raw LLM output
+        purpose: Caller purpose used to label parse metrics
+
+    Returns:
+        The parsed JSON object
+
+    Raises:
+        ValueError: If no JSON object can be recovered from the response
+    """
+    with span("json.parse", purpose=purpose) as parse_span:
+        # Fast path: JSON mode output is a bare object
+        try:
+            result = json.loads(response)
+            if isinstance(result, dict):
+                json_parse_total.inc(purpose=purpose, outcome="fast")
+                parse_span.set_attribute("outcome", "fast")
+                return result
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+        try:
+            result = _recover_json_object(response)
+        except ValueError:
+            json_parse_total.inc(purpose=purpose, outcome="failed")
+            raise
+
+        json_parse_total.inc(purpose=purpose, outcome="recovered")
+        parse_span.set_attribute("outcome", "recovered")
+        return result
+
+
+def string_list(value: Any) -> List[str]:
+    """Coerce an LLM-provided list field to a list of strings (anything else becomes empty)."""
+    if not isinstance(value, list):
+        return []
+    return [item if isinstance(item, str) else json.dumps(item) for item in value if item is not None]
+
+
+def _recover_json_object(response: str) -> Dict[str, Any]:
+    """Strip markdown fences and surrounding text, then parse the JSON object."""
+    if not isinstance(response, str):
+        raise ValueError("LLM response is not text")
+
+    response = response.strip()
+
+    # Remove markdown code blocks if present
+    if response.startswith("```json"):
+        response = response[7:]
+    if response.startswith("```"):
+        response = response[3:]
+    if response.endswith("```"):
+        response = response[:-3]
+
+    response = response.strip()
+
+    try:
+        result = json.loads(response)
+    except json.JSONDecodeError:
+        # Try to find JSON object in the text
+        start = response.find("{")
+        end = response.rfind("}") + 1
+        if start == -1 or end <= start:
+            raise ValueError("No JSON object found in LLM response")
+        try:
+            result = json.loads(response[start:end])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in LLM response: {e}") from e
+
+    if not isinstance(result, dict):
+        raise ValueError("LLM response JSON is not an object")
+    return result
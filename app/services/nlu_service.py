@@ -1,8 +1,10 @@
-import json
 import logging
 from typing import Dict, Any
 from app.models.base_model import BaseLLMClient
-from app.services.prompt_templates import get_nlu_prompt
+from app.metrics import record_fallback
+from app.services.json_parsing import parse_json_response, string_list
+from app.services.prompt_templates import get_nlu_prompt, NLU_SCHEMA
+from app.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,7 @@ class NLUService:
     def __init__(self, llm_client: BaseLLMClient):
         self.llm_client = llm_client
     
+    @traced("nlu.analyze_text")
     async def analyze_text(
         self,
         text: str,
@@ -29,11 +32,17 @@ class NLUService:
             Dictionary with sentiment, entities, and keywords
         """
         # Generate prompt
-        prompt = get_nlu_prompt(text)
+        with span("prompt.build"):
+            prompt = get_nlu_prompt(text)
         
         try:
             # Get LLM response
-            response = await self.llm_client.generate(prompt, max_tokens=500, stream=False)
+            response = await self.llm_client.generate(
+                prompt,
+                max_tokens=500,
+                stream=False,
+                response_schema=NLU_SCHEMA
+            )
             
             # Parse JSON response
             result = self._parse_json_response(response)
@@ -45,48 +54,29 @@ class NLUService:
             
         except Exception as e:
             logger.error(f"Error in NLU analysis: {e}")
+            record_fallback("nlu")
             # Return fallback analysis
             return self._generate_fallback_nlu(text)
     
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse JSON from LLM response, handling potential extra text."""
-        response = response.strip()
-        
-        # Remove markdown code blocks if present
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        
-        response = response.strip()
-        
-        # Try to parse
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # Try to find JSON object in the text
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            if start != -1 and end > start:
-                return json.loads(response[start:end])
-            raise
-    
+        return parse_json_response(response, purpose="nlu")
+
     def _validate_nlu_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate and ensure all required fields are present."""
-        if "sentiment" not in result:
-            result["sentiment"] = "neutral"
-        if "entities" not in result:
-            result["entities"] = []
-        if "keywords" not in result:
-            result["keywords"] = []
-        
-        # Ensure sentiment is valid
-        if result["sentiment"] not in ["positive", "negative", "neutral"]:
-            result["sentiment"] = "neutral"
+        """Return exactly the NLUResponse fields, so the route can skip re-validation."""
+        sentiment = result.get("sentiment")
+        entities = result.get("entities")
         
-        return result
+        return {
+            # Ensure sentiment is valid
+            "sentiment": sentiment if sentiment in ("positive", "negative", "neutral") else "neutral",
+            "entities": [
+                {field: str(entity.get(field, "")) for field in ("type", "value", "text")}
+                for entity in (entities if isinstance(entities, list) else [])
+                if isinstance(entity, dict)
+            ],
+            "keywords": string_list(result.get("keywords")),
+        }
     
     def _generate_fallback_nlu(self, text: str) -> Dict[str, Any]:
         """Generate basic NLU analysis without LLM."""
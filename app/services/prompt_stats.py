@@ -0,0 +1,76 @@
+"""
+Access statistics for stateless chat questions.
+
+Counts how often each (persona, question) is asked so a restarted service
+can replay the most frequent ones before it reports ready. The table is
+bounded: past its limit the least frequent half is dropped.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.split())
+
+
+class PromptStats:
+    """Bounded frequency table of (persona, question)."""
+
+    def __init__(self, max_prompts: int = 5000):
+        self.max_prompts = max_prompts
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def record(self, question: str, persona: Optional[str]) -> None:
+        """Count one request for a question."""
+        key = (persona or "", _normalize(question))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if len(self._counts) > self.max_prompts:
+                self._keep_most_frequent(self.max_prompts // 2)
+
+    def top(self, n: int) -> List[Tuple[str, Optional[str], int]]:
+        """The n most frequent questions as (question, persona, count)."""
+        with self._lock:
+            ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(question, persona or None, count) for (persona, question), count in ranked]
+
+    def to_list(self) -> List[List[Any]]:
+        """[persona, question, count] rows for a snapshot."""
+        with self._lock:
+            return [[persona, question, count] for (persona, question), count in self._counts.items()]
+
+    def merge(self, rows: List[List[Any]]) -> None:
+        """Add counts from a snapshot."""
+        with self._lock:
+            for persona, question, count in rows:
+                self._counts[(persona, question)] = self._counts.get((persona, question), 0) + int(count)
+            if len(self._counts) > self.max_prompts:
+                self._keep_most_frequent(self.max_prompts)
+
+    def _keep_most_frequent(self, n: int) -> None:
+        """Drop all but the n most frequent questions (lock held)."""
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        self._counts = dict(ranked[:n])
+
+
+_prompt_stats: Optional[PromptStats] = None
+
+
+def get_prompt_stats() -> PromptStats:
+    """Return the process-wide access statistics."""
+    global _prompt_stats
+    if _prompt_stats is None:
+        _prompt_stats = PromptStats(settings.prompt_stats_max_prompts)
+    return _prompt_stats
+
+
+def reset_prompt_stats() -> None:
+    """Drop the process-wide access statistics (useful for testing)."""
+    global _prompt_stats
+    _prompt_stats = None
@@ -2,25 +2,37 @@
 Prompt templates for strict JSON-only output from LLMs.
 All prompts enforce valid JSON format with explicit schemas.
 """
+from app.services.analytics import TransactionColumns
 
 
-def get_budget_summary_prompt(income_data: dict, expense_data: dict) -> str:
+def get_budget_summary_prompt(income_data: dict, expense_data: dict, aggregates=None) -> str:
     """
     Generate prompt for budget summary analysis.
     
     Args:
         income_data: Dictionary with income sources and amounts
         expense_data: Dictionary with expense categories and amounts
+        aggregates: Optional precomputed BudgetAggregates, so the model does not redo the arithmetic
     
     Returns:
         Prompt string enforcing strict JSON output
     """
+    precomputed = ""
+    if aggregates is not None:
+        shares = ", ".join(f"{name}: {pct:.1f}%" for name, pct in aggregates.category_percentages.items())
+        precomputed = f"""
+PRECOMPUTED TOTALS (use these exact figures):
+Total income: {aggregates.total_income:.2f}
+Total expenses: {aggregates.total_expenses:.2f}
+Savings rate: {aggregates.savings_rate:.1f}%
+Category shares: {shares}
+"""
     return f"""You are a financial analysis assistant. Analyze the following budget data and return ONLY valid JSON.
 
 INPUT DATA:
 Income: {income_data}
 Expenses: {expense_data}
-
+{precomputed}
 REQUIRED OUTPUT FORMAT (JSON ONLY, NO OTHER TEXT):
 {{
   "total_income": <float>,
@@ -67,21 +79,64 @@ CRITICAL RULES:
 OUTPUT (JSON ONLY):"""
 
 
-def get_spending_insights_prompt(transactions: list) -> str:
+def format_transactions(transactions) -> str:
+    """
+    Render transactions for a prompt.
+    
+    Columns render exactly like the equivalent row dictionaries, so both request
+    encodings produce the same prompt (and share analytics cache entries), but
+    without building a dictionary per row.
+    """
+    if not isinstance(transactions, TransactionColumns):
+        return str(transactions)
+    categories = [repr(value) for value in transactions.categories]
+    count = len(transactions)
+    merchants = _column_reprs(transactions.merchants, transactions.merchant_codes, count)
+    descriptions = _column_reprs(transactions.descriptions, transactions.description_codes, count)
+    rows = ", ".join(
+        f"{{'category': {categories[code]}, 'amount': {amount!r}, 'date': {date!r}, "
+        f"'merchant': {merchant}, 'description': {description}}}"
+        for code, amount, date, merchant, description in zip(
+            transactions.category_codes, transactions.amounts, transactions.dates, merchants, descriptions
+        )
+    )
+    return f"[{rows}]"
+
+
+def _column_reprs(dictionary: list, codes: list, count: int):
+    """repr() of each row's value in a dictionary-encoded column, computed once per distinct value."""
+    if not codes:
+        return ["''"] * count
+    reprs = [repr(value) for value in dictionary]
+    return map(reprs.__getitem__, codes)
+
+
+def get_spending_insights_prompt(transactions, aggregates=None) -> str:
     """
     Generate prompt for spending insights analysis.
     
     Args:
-        transactions: List of transaction dictionaries
+        transactions: List of transaction dictionaries, or TransactionColumns
+        aggregates: Optional precomputed SpendingAggregates, so the model does not redo the arithmetic
     
     Returns:
         Prompt string enforcing strict JSON output
     """
+    precomputed = ""
+    if aggregates is not None:
+        ranked = ", ".join(
+            f"{cat['category']}: {cat['amount']:.2f} ({cat['percentage']:.1f}%)" for cat in aggregates.top_categories
+        )
+        precomputed = f"""
+PRECOMPUTED TOTALS (use these exact figures):
+Total spending: {aggregates.total:.2f} across {aggregates.transaction_count} transactions
+Top categories: {ranked}
+"""
     return f"""You are a spending analysis assistant. Analyze the following transactions and return ONLY valid JSON.
 
 INPUT TRANSACTIONS:
-{transactions}
-
+{format_transactions(transactions)}
+{precomputed}
 REQUIRED OUTPUT FORMAT (JSON ONLY, NO OTHER TEXT):
 {{
   "top_categories": [
@@ -207,13 +262,37 @@ CRITICAL RULES:
 OUTPUT (JSON ONLY):"""
 
 
-def get_persona_prompt(question: str, persona: str) -> str:
+def _format_grounding(grounding: list = None) -> str:
+    """Render vetted reference answers as a prompt section (empty if none)."""
+    if not grounding:
+        return ""
+    notes = "\n".join(f"- {passage}" for passage in grounding)
+    return f"""
+REFERENCE NOTES (vetted answers to similar questions; use them where relevant):
+{notes}
+"""
+
+
+def _format_context(context: list = None) -> str:
+    """Render figures computed from the user's own data as a prompt section (empty if none)."""
+    if not context:
+        return ""
+    facts = "\n".join(f"- {passage}" for passage in context)
+    return f"""
+USER'S FINANCIAL PICTURE (computed from their own data; quote these figures, do not invent others):
+{facts}
+"""
+
+
+def get_persona_prompt(question: str, persona: str, grounding: list = None, context: list = None) -> str:
     """
     Generate persona-aware financial advice prompt.
     
     Args:
         question: User's financial question
         persona: User persona (student, salaried, parent, freelancer, retiree)
+        grounding: Optional vetted reference passages to ground the answer
+        context: Optional figures about the user, e.g. from forecast_context
     
     Returns:
         Prompt string for persona-aware response
@@ -226,13 +305,13 @@ def get_persona_prompt(question: str, persona: str) -> str:
         "retiree": "a retiree living on fixed income, managing retirement savings, and healthcare costs"
     }
     
-    context = persona_contexts.get(persona, "an individual seeking financial advice")
+    persona_context = persona_contexts.get(persona, "an individual seeking financial advice")
     
-    return f"""You are a personal finance advisor. The user is {context}.
+    return f"""You are a personal finance advisor. The user is {persona_context}.
 
 USER QUESTION:
 "{question}"
-
+{_format_context(context)}{_format_grounding(grounding)}
 Provide tailored financial advice considering their specific situation. Be practical, empathetic, and actionable.
 
 REQUIRED OUTPUT FORMAT (JSON ONLY, NO OTHER TEXT):
@@ -259,12 +338,14 @@ CRITICAL RULES:
 OUTPUT (JSON ONLY):"""
 
 
-def get_general_prompt(question: str) -> str:
+def get_general_prompt(question: str, grounding: list = None, context: list = None) -> str:
     """
     Generate general financial advice prompt.
     
     Args:
         question: User's financial question
+        grounding: Optional vetted reference passages to ground the answer
+        context: Optional figures about the user, e.g. from forecast_context
     
     Returns:
         Prompt string for general advice
@@ -273,7 +354,7 @@ def get_general_prompt(question: str) -> str:
 
 USER QUESTION:
 "{question}"
-
+{_format_context(context)}{_format_grounding(grounding)}
 Provide clear, practical financial guidance. Use specific examples and numbers when helpful.
 
 REQUIRED OUTPUT FORMAT (JSON ONLY, NO OTHER TEXT):
@@ -296,3 +377,195 @@ CRITICAL RULES:
 5. Be accurate and responsible with financial guidance
 
 OUTPUT (JSON ONLY):"""
+
+
+def get_conversation_summary_prompt(previous_summary: str, turns: list) -> str:
+    """
+    Generate prompt that folds older chat turns into a running summary.
+    
+    Args:
+        previous_summary: Summary of the conversation so far (may be empty)
+        turns: Chat messages ({"role", "content"}) to fold into the summary
+    
+    Returns:
+        Prompt string enforcing strict JSON output
+    """
+    speakers = {"user": "User", "assistant": "Assistant"}
+    transcript = "\n".join(
+        f"{speakers.get(turn['role'], turn['role'])}: {turn['content']}" for turn in turns
+    )
+    
+    return f"""You maintain a running summary of a personal finance conversation.
+Update the summary with the new messages and return ONLY valid JSON.
+
+CURRENT SUMMARY:
+{previous_summary or "(none)"}
+
+NEW MESSAGES:
+{transcript}
+
+REQUIRED OUTPUT FORMAT (JSON ONLY, NO OTHER TEXT):
+{{
+  "summary": "<updated summary>"
+}}
+
+CRITICAL RULES:
+1. Return ONLY valid JSON
+2. NO TEXT before or after the JSON
+3. Keep the user's goals, numbers, constraints and decisions
+4. Drop greetings and repeated advice
+5. Keep the summary under 150 words
+
+OUTPUT (JSON ONLY):"""
+
+
+def _scenario_figures(scenario: dict) -> str:
+    """One line of precomputed figures for a budget scenario."""
+    figures = (
+        f"expenses {scenario['total_expenses']:.2f}, income {scenario['total_income']:.2f}, "
+        f"savings {scenario['savings']:.2f} ({scenario['savings_rate']:.1f}%)"
+    )
+    if scenario.get("months_to_goal") is not None:
+        figures += f", goal reached in {scenario['months_to_goal']} months"
+    return figures
+
+
+def get_budget_scenarios_prompt(baseline: dict, scenarios: list, savings_goal: float = None) -> str:
+    """
+    Generate prompt asking for commentary on the best what-if budget scenarios.
+    
+    Args:
+        baseline: Figures of the unchanged monthly budget
+        scenarios: The best scenarios, each with a "description" of its changes and its figures
+        savings_goal: The user's savings goal, if any
+    
+    Returns:
+        Prompt string enforcing strict JSON output
+    """
+    goal = f"Savings goal: {savings_goal:.2f}\n" if savings_goal is not None else ""
+    listed = "\n".join(
+        f"{i}. {scenario['description']}: {_scenario_figures(scenario)}"
+        for i, scenario in enumerate(scenarios, start=1)
+    )
+    
+    return f"""You are a financial analysis assistant. The user compared what-if changes to their monthly budget.
+Comment on each scenario below and return ONLY valid JSON.
+
+CURRENT BUDGET:
+{_scenario_figures(baseline)}
+{goal}
+BEST SCENARIOS (figures are precomputed; use them exactly):
+{listed}
+
+REQUIRED OUTPUT FORMAT (JSON ONLY, NO OTHER TEXT):
+{{
+  "comments": [
+    "<one or two sentences on scenario 1>",
+    "<one or two sentences on scenario 2>"
+  ]
+}}
+
+CRITICAL RULES:
+1. Return ONLY valid JSON
+2. NO TEXT before or after the JSON
+3. Exactly one comment per scenario, in the order listed
+4. Say how realistic each change is and what trade-off it involves
+5. Do not recompute or change the figures
+
+OUTPUT (JSON ONLY):"""
+
+
+# JSON schemas passed to BaseLLMClient.generate(response_schema=...) so that
+# backends with a native JSON mode constrain their output to these shapes.
+
+BUDGET_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "total_income": {"type": "number"},
+        "total_expenses": {"type": "number"},
+        "savings_rate": {"type": "number"},
+        "category_percentages": {
+            "type": "object",
+            "additionalProperties": {"type": "number"}
+        },
+        "suggestion_list": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["total_income", "total_expenses", "savings_rate", "category_percentages", "suggestion_list"]
+}
+
+BUDGET_SCENARIOS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "comments": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["comments"]
+}
+
+SPENDING_INSIGHTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "top_categories": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string"},
+                    "amount": {"type": "number"},
+                    "percentage": {"type": "number"}
+                },
+                "required": ["category", "amount", "percentage"]
+            }
+        },
+        "red_flags": {"type": "array", "items": {"type": "string"}},
+        "recommendations": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["top_categories", "red_flags", "recommendations"]
+}
+
+NLU_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"type": "string", "enum": ["positive", "negative", "neutral"]},
+        "entities": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "value": {"type": "string"},
+                    "text": {"type": "string"}
+                },
+                "required": ["type", "value", "text"]
+            }
+        },
+        "keywords": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["sentiment", "entities", "keywords"]
+}
+
+PERSONA_ADVICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "persona_context": {"type": "string"},
+        "confidence": {"type": "number"}
+    },
+    "required": ["answer", "persona_context", "confidence"]
+}
+
+GENERAL_ADVICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "confidence": {"type": "number"}
+    },
+    "required": ["answer", "confidence"]
+}
+
+CONVERSATION_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"}
+    },
+    "required": ["summary"]
+}
@@ -0,0 +1,230 @@
+"""
+Local retrieval over a curated corpus of vetted finance answers.
+
+Questions are matched against each entry's canonical question variants with
+hashed TF-IDF vectors and cosine similarity through an inverted index. A close
+match answers the user directly without an LLM call; weaker matches are passed
+to the advice prompts as grounding.
+
+Build a precomputed index file (loaded with RETRIEVAL_INDEX_PATH):
+
+    python -m app.services.retrieval --corpus app/data/finance_answers.json --out finance_index.json
+"""
+import argparse
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "finance_answers.json")
+
+# Number of hash buckets for terms; collisions are rare at this corpus size
+HASH_BUCKETS = 1 << 20
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "best", "better", "by", "can", "do", "does", "for", "from",
+    "good", "how", "i", "if", "in", "is", "it", "me", "much", "my", "of", "on", "or", "should", "so",
+    "that", "the", "to", "way", "ways", "what", "when", "which", "why", "with", "you", "your", "tip", "tips",
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token: str) -> str:
+    """Very light suffix stripping so plurals and verb forms match."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 5 and token.endswith("ing"):
+        return token[:-3]
+    if len(token) > 4 and token.endswith("ed"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split, drop stop words and stem."""
+    return [_stem(t) for t in _TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def _features(text: str) -> Counter:
+    """Hashed unigram and bigram counts for a piece of text."""
+    tokens = tokenize(text)
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return Counter(zlib.crc32(term.encode()) % HASH_BUCKETS for term in terms)
+
+
+@dataclass
+class RetrievalHit:
+    """A corpus entry matched for a query."""
+    entry_id: str
+    answer: str
+    score: float
+    personas: List[str]
+    question: str = ""  # corpus question that matched best
+
+
+class RetrievalIndex:
+    """Hashed TF-IDF inverted index over the questions of an answer corpus."""
+
+    def __init__(
+        self,
+        entries: List[Dict],
+        idf: Dict[int, float],
+        postings: Dict[int, List[Tuple[int, float]]],
+        doc_entries: List[int]
+    ):
+        self.entries = entries
+        self.idf = idf
+        self.postings = postings
+        self.doc_entries = doc_entries
+        # Documents are the corpus questions, in entry order
+        self.doc_questions = [question for entry in entries for question in entry["questions"]]
+        # Terms the corpus never uses weigh as much as its rarest term
+        self.unknown_idf = max(idf.values(), default=1.0)
+
+    @classmethod
+    def build(cls, entries: List[Dict]) -> "RetrievalIndex":
+        """Build the index from corpus entries (id, personas, questions, answer)."""
+        doc_features: List[Counter] = []
+        doc_entries: List[int] = []
+        for entry_index, entry in enumerate(entries):
+            for question in entry["questions"]:
+                doc_features.append(_features(question))
+                doc_entries.append(entry_index)
+
+        document_frequency: Counter = Counter()
+        for features in doc_features:
+            document_frequency.update(features.keys())
+
+        total = len(doc_features)
+        idf = {term: math.log((1 + total) / (1 + df)) + 1.0 for term, df in document_frequency.items()}
+
+        postings: Dict[int, List[Tuple[int, float]]] = {}
+        for doc_index, features in enumerate(doc_features):
+            weights = {term: (1 + math.log(count)) * idf[term] for term, count in features.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                postings.setdefault(term, []).append((doc_index, weight / norm))
+
+        return cls(entries, idf, postings, doc_entries)
+
+    @classmethod
+    def from_corpus(cls, path: str = DEFAULT_CORPUS_PATH) -> "RetrievalIndex":
+        """Build the index from a corpus JSON file."""
+        with open(path, encoding="utf-8") as f:
+            return cls.build(json.load(f))
+
+    @classmethod
+    def load(cls, path: str) -> "RetrievalIndex":
+        """Load a precomputed index written by `save`."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            data["entries"],
+            {int(term): value for term, value in data["idf"].items()},
+            {int(term): [tuple(p) for p in plist] for term, plist in data["postings"].items()},
+            data["doc_entries"]
+        )
+
+    def save(self, path: str) -> None:
+        """Write the index so startup can skip rebuilding it."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "entries": self.entries,
+                "idf": self.idf,
+                "postings": self.postings,
+                "doc_entries": self.doc_entries
+            }, f, separators=(",", ":"))
+
+    def search(self, query: str, persona: Optional[str] = None, top_k: int = 3) -> List[RetrievalHit]:
+        """
+        Find the corpus entries closest to a question.
+
+        Args:
+            query: User question
+            persona: Persona for the request; entries tagged for other personas are skipped
+            top_k: Maximum number of hits to return
+
+        Returns:
+            Hits ordered by cosine similarity (persona-specific entries win ties)
+        """
+        features = _features(query)
+        weights = {
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in features.items()
+            if term in self.idf
+        }
+        if not weights:
+            return []
+
+        # Unknown terms still count towards the query norm, lowering the score: a question
+        # about something the corpus does not cover must not match on its familiar words
+        unknown = sum(
+            (1 + math.log(count)) * self.unknown_idf for term, count in features.items() if term not in self.idf
+        )
+        norm = math.sqrt(sum(w * w for w in weights.values()) + unknown * unknown) or 1.0
+
+        doc_scores: Dict[int, float] = {}
+        for term, weight in weights.items():
+            for doc_index, doc_weight in self.postings.get(term, ()):
+                doc_scores[doc_index] = doc_scores.get(doc_index, 0.0) + weight * doc_weight
+
+        entry_scores: Dict[int, Tuple[float, int]] = {}
+        for doc_index, score in doc_scores.items():
+            entry_index = self.doc_entries[doc_index]
+            if score / norm > entry_scores.get(entry_index, (0.0, 0))[0]:
+                entry_scores[entry_index] = (score / norm, doc_index)
+
+        hits = []
+        for entry_index, (score, doc_index) in entry_scores.items():
+            entry = self.entries[entry_index]
+            personas = entry.get("personas", ["all"])
+            if "all" not in personas and persona not in personas:
+                continue
+            specific = persona in personas
+            hit = RetrievalHit(entry["id"], entry["answer"], score, personas, self.doc_questions[doc_index])
+            hits.append((round(score, 6), specific, hit))
+
+        hits.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [hit for _, _, hit in hits[:top_k]]
+
+
+_retrieval_index: Optional[RetrievalIndex] = None
+
+
+def get_retrieval_index() -> Optional[RetrievalIndex]:
+    """Return the process-wide index, or None when retrieval is disabled."""
+    global _retrieval_index
+    if not settings.retrieval_enabled:
+        return None
+    if _retrieval_index is None:
+        if settings.retrieval_index_path and os.path.exists(settings.retrieval_index_path):
+            _retrieval_index = RetrievalIndex.load(settings.retrieval_index_path)
+        else:
+            _retrieval_index = RetrievalIndex.from_corpus(settings.retrieval_corpus_path or DEFAULT_CORPUS_PATH)
+    return _retrieval_index
+
+
+def reset_retrieval_index() -> None:
+    """Drop the process-wide index (useful for testing)."""
+    global _retrieval_index
+    _retrieval_index = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a precomputed retrieval index")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    index = RetrievalIndex.from_corpus(args.corpus)
+    index.save(args.out)
+    print(f"Indexed {len(index.entries)} entries ({len(index.doc_entries)} questions) -> {args.out}")
@@ -0,0 +1,185 @@
+"""
+Vectorized what-if evaluation of budget variations.
+
+A scenario scales budget categories by fractional changes: {"Dining": -0.2,
+"Rent": 0.05} cuts dining by 20% and raises rent by 5%. Every scenario of a
+request is evaluated in one NumPy pass: a scenarios x categories matrix of
+multipliers times the baseline amounts gives each scenario's totals, savings
+rate, expense shares and months to a savings goal. Amounts are monthly.
+Only the best few scenarios are rendered for the LLM.
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class ScenarioResults:
+    """
+    Figures for every evaluated scenario, one row per scenario.
+
+    `categories` lists the expense categories, then the income categories;
+    `changes` has one column per category. `months_to_goal` is inf where the
+    goal is never reached, and None without a goal.
+    """
+    categories: List[str]
+    expense_count: int
+    changes: np.ndarray
+    total_income: np.ndarray
+    total_expenses: np.ndarray
+    savings: np.ndarray
+    savings_rate: np.ndarray
+    category_percentages: np.ndarray
+    months_to_goal: Optional[np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def rank(self, by: str = "savings_rate", top_n: int = 3) -> List[int]:
+        """
+        Indices of the best scenarios.
+
+        Highest savings rate first (or soonest goal with by="months_to_goal"),
+        then the smallest total change, so of equally good scenarios the least
+        disruptive wins.
+        """
+        disruption = np.abs(self.changes).sum(axis=1)
+        keys = [np.arange(len(self)), disruption, -self.savings_rate]
+        if by == "months_to_goal":
+            keys.append(self.months_to_goal)
+        order = np.lexsort(keys)
+        return order[:top_n].tolist()
+
+    def scenario(self, index: int) -> Dict[str, Any]:
+        """One scenario's figures as plain Python values."""
+        months = None
+        if self.months_to_goal is not None and math.isfinite(self.months_to_goal[index]):
+            months = int(self.months_to_goal[index])
+        return {
+            "changes": {
+                category: round(float(change), 6)
+                for category, change in zip(self.categories, self.changes[index])
+                if change != 0
+            },
+            "total_income": float(self.total_income[index]),
+            "total_expenses": float(self.total_expenses[index]),
+            "savings": float(self.savings[index]),
+            "savings_rate": float(self.savings_rate[index]),
+            "category_percentages": dict(zip(
+                self.categories[:self.expense_count], self.category_percentages[index].tolist()
+            )),
+            "months_to_goal": months,
+        }
+
+
+def describe_changes(changes: Dict[str, float]) -> str:
+    """Human-readable changes, e.g. "Dining -20%, Rent +5%"."""
+    if not changes:
+        return "No change"
+    return ", ".join(f"{category} {change * 100:+.0f}%" for category, change in changes.items())
+
+
+def months_to_goal(savings: np.ndarray, savings_goal: float, current_savings: float = 0.0) -> np.ndarray:
+    """Whole months of saving until the goal is reached (0 if already reached, inf if never)."""
+    remaining = savings_goal - current_savings
+    if remaining <= 0:
+        return np.zeros_like(savings)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(savings > 0, np.ceil(remaining / savings), np.inf)
+
+
+def build_changes(
+    categories: List[str],
+    scenarios: Iterable[Dict[str, float]] = (),
+    grid: Optional[Dict[str, List[float]]] = None,
+    max_count: int = 50_000
+) -> np.ndarray:
+    """
+    The scenarios x categories matrix of fractional changes.
+
+    Args:
+        categories: Column order
+        scenarios: Explicit scenarios, each mapping categories to changes
+        grid: Candidate changes per category; every combination is a scenario
+        max_count: Largest accepted number of scenarios
+
+    Raises:
+        ValueError: For unknown or ambiguous categories, changes below -100%, or too many scenarios
+    """
+    columns = {category: i for i, category in enumerate(categories)}
+    ambiguous = {category for category in categories if categories.count(category) > 1}
+    scenarios = list(scenarios)
+    grid = grid or {}
+    grid_count = math.prod(len(values) for values in grid.values()) if grid else 0
+    if len(scenarios) + grid_count > max_count:
+        raise ValueError(f"{len(scenarios) + grid_count} scenarios requested, at most {max_count} are evaluated")
+    for changes in scenarios + [grid]:
+        for category in changes:
+            if category not in columns:
+                raise ValueError(f"Unknown category {category!r}")
+            if category in ambiguous:
+                raise ValueError(f"{category!r} is both an income and an expense category")
+
+    explicit = np.zeros((len(scenarios), len(categories)))
+    for row, changes in enumerate(scenarios):
+        for category, change in changes.items():
+            explicit[row, columns[category]] = change
+
+    combined = np.zeros((grid_count, len(categories)))
+    if grid:
+        # Cartesian product of the candidate values, built column by column
+        axes = np.indices([len(values) for values in grid.values()]).reshape(len(grid), -1)
+        for axis, (category, values) in zip(axes, grid.items()):
+            combined[:, columns[category]] = np.asarray(values, dtype=float)[axis]
+
+    changes = np.concatenate([explicit, combined])
+    if (changes < -1).any():
+        raise ValueError("Changes must be at least -1 (a 100% cut)")
+    return changes
+
+
+def evaluate_scenarios(
+    income_data: Dict[str, float],
+    expense_data: Dict[str, float],
+    changes: np.ndarray,
+    savings_goal: Optional[float] = None,
+    current_savings: float = 0.0
+) -> ScenarioResults:
+    """
+    Evaluate budget scenarios in one vectorized pass.
+
+    Args:
+        income_data: Monthly income sources and amounts
+        expense_data: Monthly expense categories and amounts
+        changes: Matrix from build_changes, with expense then income categories as columns
+        savings_goal: Target balance for months_to_goal
+        current_savings: Balance already saved towards the goal
+
+    Returns:
+        Figures for every scenario, computed like summarize_budget
+    """
+    expense_count = len(expense_data)
+    baseline = np.fromiter(
+        (*expense_data.values(), *income_data.values()), dtype=float, count=expense_count + len(income_data)
+    )
+    amounts = (1 + changes) * baseline
+    expenses = amounts[:, :expense_count]
+    total_expenses = expenses.sum(axis=1)
+    total_income = amounts[:, expense_count:].sum(axis=1)
+    savings = total_income - total_expenses
+    with np.errstate(divide="ignore", invalid="ignore"):
+        savings_rate = np.where(total_income > 0, savings / total_income * 100, 0.0)
+        shares = np.where(total_expenses[:, None] > 0, expenses / total_expenses[:, None] * 100, 0.0)
+    return ScenarioResults(
+        categories=[*expense_data, *income_data],
+        expense_count=expense_count,
+        changes=changes,
+        total_income=total_income,
+        total_expenses=total_expenses,
+        savings=savings,
+        savings_rate=savings_rate,
+        category_percentages=shares,
+        months_to_goal=None if savings_goal is None else months_to_goal(savings, savings_goal, current_savings),
+    )
@@ -0,0 +1,513 @@
+"""
+Semantic cache for stateless chat answers.
+
+Exact-match caching misses paraphrases ("How can I save money?" vs "ways to
+save money"), so questions are embedded locally as hashed character trigrams
+plus word and word-bigram features and compared by cosine similarity. Those
+features barely notice a "not" or a changed amount, so a hit also requires
+both questions to agree on negation and on the numbers they mention. An approximate nearest
+neighbour index (SimHash signatures split into LSH bands) narrows each lookup
+to a handful of candidates, so the cost stays flat as the cache grows.
+
+Entries are partitioned by persona, evicted least-recently-used and bounded by
+both an entry count and an approximate memory budget.
+
+With a shared cache store (CACHE_BACKEND=sqlite) every stored answer is also
+written to the store, and a local miss first pulls the entries other workers
+have written since the last pull into this process's index, so paraphrases
+hit no matter which worker answered first. The index itself stays per process.
+"""
+import hashlib
+import math
+import re
+from array import array
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.config import settings
+from app.metrics import (
+    semantic_cache_evictions_total,
+    semantic_cache_lookup_seconds_total,
+    semantic_cache_lookups_total,
+    semantic_cache_tokens_saved_total,
+)
+from app.services.cache_store import SQLiteCacheStore, cache_key, get_cache_store
+from app.services.retrieval import tokenize
+
+# Hash buckets for embedding features
+EMBEDDING_DIM = 1 << 16
+
+# Numbers change the meaning of a question ($500 vs $5000), so they weigh more
+NUMBER_WEIGHT = 3.0
+
+# Word bigrams (with start/end markers) make the embedding order sensitive, so
+# "Is a Roth IRA better than a traditional IRA?" does not match its reverse
+BIGRAM_WEIGHT = 3.0
+
+_NEGATION_PATTERN = re.compile(r"\b(?:not|no|never|cannot)\b|n['\u2019]t\b")
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Rough per-entry overhead (dict/list/object headers) for the memory bound
+ENTRY_OVERHEAD_BYTES = 512
+FEATURE_BYTES = 100
+
+Vector = Dict[int, float]
+
+
+def embed(text: str) -> Vector:
+    """
+    Embed text as an L2-normalised sparse vector.
+
+    Features are hashed character trigrams over the normalised question (stop
+    words dropped, light stemming) plus whole-word and word-bigram features.
+    """
+    tokens = tokenize(text)
+    counts: Dict[int, float] = {}
+    for token in tokens:
+        bucket = zlib.crc32(b"w:" + token.encode()) % EMBEDDING_DIM
+        counts[bucket] = counts.get(bucket, 0.0) + (NUMBER_WEIGHT if token.isdigit() else 1.0)
+
+    # Contraction leftovers ("what's" -> "s") would only add noise to the bigrams
+    padded = ["^", *(token for token in tokens if len(token) > 1 or token.isdigit()), "$"]
+    for first, second in zip(padded, padded[1:]):
+        bucket = zlib.crc32(f"b:{first} {second}".encode()) % EMBEDDING_DIM
+        counts[bucket] = counts.get(bucket, 0.0) + BIGRAM_WEIGHT
+
+    normalised = f" {' '.join(tokens)} "
+    for i in range(len(normalised) - 2):
+        bucket = zlib.crc32(normalised[i:i + 3].encode()) % EMBEDDING_DIM
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+
+    norm = math.sqrt(sum(w * w for w in counts.values())) or 1.0
+    return {bucket: w / norm for bucket, w in counts.items()}
+
+
+def meaning_guard(text: str) -> Tuple[bool, Tuple[str, ...]]:
+    """
+    Whether a question is negated, and the numbers it mentions.
+
+    Questions that differ here ask different things however similar their
+    embeddings are ("Should I not invest?", "$500" vs "$5,000").
+    """
+    lowered = text.lower()
+    numbers = sorted(number.replace(",", "") for number in _NUMBER_PATTERN.findall(lowered))
+    return bool(_NEGATION_PATTERN.search(lowered)), tuple(numbers)
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    """Cosine similarity of two normalised sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(bucket, 0.0) for bucket, w in a.items())
+
+
+# SimHash accumulators are packed into one big integer, LANE_BITS per hyperplane,
+# so adding a feature is a single multiply-add instead of a loop over planes
+LANE_BITS = 32
+WEIGHT_SCALE = 1024
+
+
+@lru_cache(maxsize=16384)
+def _plane_mask(bucket: int, planes: int) -> int:
+    """Lane mask of the hyperplanes on whose positive side a feature lies."""
+    digest = b""
+    counter = 0
+    while len(digest) * 8 < planes:
+        digest += hashlib.blake2b(f"{bucket}:{counter}".encode(), digest_size=32).digest()
+        counter += 1
+    mask = 0
+    for plane in range(planes):
+        if (digest[plane // 8] >> (plane % 8)) & 1:
+            mask |= 1 << (plane * LANE_BITS)
+    return mask
+
+
+def simhash_bands(vector: Vector, bands: int, rows: int) -> List[int]:
+    """
+    Compute the LSH band keys of a vector's SimHash signature.
+
+    Each of `bands * rows` random hyperplanes contributes one signature bit;
+    vectors at angle θ agree on a bit with probability 1 - θ/π, so close
+    questions share at least one band with high probability.
+    """
+    planes = bands * rows
+    positive = 0
+    total = 0
+    for bucket, weight in vector.items():
+        quantised = max(1, round(weight * WEIGHT_SCALE))
+        positive += _plane_mask(bucket, planes) * quantised
+        total += quantised
+
+    # Bit is set when the positive side outweighs the negative side
+    lanes = memoryview(positive.to_bytes(planes * LANE_BITS // 8, sys.byteorder)).cast("I")
+    keys = []
+    for band in range(bands):
+        key = 0
+        for plane in range(band * rows, (band + 1) * rows):
+            key = (key << 1) | (2 * lanes[plane] >= total)
+        keys.append(key)
+    return keys
+
+
+@dataclass
+class CacheEntry:
+    """A cached chat answer."""
+    entry_id: int
+    key: str
+    persona: str
+    question: str
+    vector: Vector
+    band_keys: List[int]
+    result: Dict[str, Any]
+    tokens: int
+    size: int
+    expires_at: float
+    guard: Tuple[bool, Tuple[str, ...]]
+
+
+@dataclass
+class CacheHit:
+    """A cache lookup that found a close enough question."""
+    result: Dict[str, Any]
+    similarity: float
+    question: str
+    tokens: int
+
+
+@dataclass
+class CacheStats:
+    """Counters for one cache instance."""
+    hits: int = 0
+    misses: int = 0
+    lookup_seconds: float = 0.0
+    candidates: int = 0
+    tokens_saved: int = 0
+    evictions: Dict[str, int] = field(default_factory=dict)
+
+
+class SemanticCache:
+    """Persona-partitioned similarity cache with LRU eviction and a memory bound."""
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        max_entries: int = 2048,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 86400,
+        bands: int = 16,
+        rows: int = 8,
+        shared: Optional[SQLiteCacheStore] = None
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bands = bands
+        self.rows = rows
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, int], Set[int]] = {}
+        self._keys: Dict[str, int] = {}
+        self._bytes = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+        self.shared = shared
+        self._shared_cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory held by cached entries."""
+        return self._bytes
+
+    def lookup(self, question: str, persona: Optional[str] = None) -> Optional[CacheHit]:
+        """
+        Find a cached answer for a question close enough to this one.
+
+        Args:
+            question: User question
+            persona: Persona of the request; only entries for the same persona match
+
+        Returns:
+            The best hit at or above the similarity threshold, or None
+        """
+        started = time.perf_counter()
+        persona_key = persona or "general"
+        vector = embed(question)
+        band_keys = simhash_bands(vector, self.bands, self.rows)
+        guard = meaning_guard(question)
+        now = time.time()
+
+        best, best_score, candidates = self._search(persona_key, vector, band_keys, guard, now)
+        if (best is None or best_score < self.threshold) and self.shared is not None and self._pull_shared():
+            best, best_score, more = self._search(persona_key, vector, band_keys, guard, now)
+            candidates += more
+
+        with self._lock:
+            hit = best is not None and best_score >= self.threshold
+            if hit and best.entry_id in self._entries:
+                self._entries.move_to_end(best.entry_id)
+
+            elapsed = time.perf_counter() - started
+            self.stats.lookup_seconds += elapsed
+            self.stats.candidates += candidates
+            if hit:
+                self.stats.hits += 1
+                self.stats.tokens_saved += best.tokens
+            else:
+                self.stats.misses += 1
+
+        semantic_cache_lookups_total.inc(outcome="hit" if hit else "miss")
+        semantic_cache_lookup_seconds_total.inc(elapsed)
+        if not hit:
+            return None
+        semantic_cache_tokens_saved_total.inc(best.tokens)
+        return CacheHit(best.result, best_score, best.question, best.tokens)
+
+    def store(self, question: str, persona: Optional[str], result: Dict[str, Any], tokens: int = 0) -> None:
+        """
+        Cache the answer to a question.
+
+        Args:
+            question: User question
+            persona: Persona of the request
+            result: Response payload (answer, model, meta) to replay on a hit
+            tokens: Estimated prompt + completion tokens a hit saves
+        """
+        persona_key = persona or "general"
+        key = cache_key(persona_key, question)
+        expires_at = time.time() + self.ttl_seconds
+        if self._insert(key, persona_key, question, result, tokens, expires_at) and self.shared is not None:
+            self.shared.set(
+                "semantic",
+                key,
+                {"persona": persona_key, "question": question, "result": result, "tokens": tokens},
+                ttl_seconds=self.ttl_seconds
+            )
+
+    def _search(
+        self,
+        persona_key: str,
+        vector: Vector,
+        band_keys: List[int],
+        guard: Tuple[bool, Tuple[str, ...]],
+        now: float
+    ) -> Tuple[Optional[CacheEntry], float, int]:
+        """Best entry among the band candidates with the same meaning guard, its similarity and the candidate count."""
+        best: Optional[CacheEntry] = None
+        best_score = 0.0
+        with self._lock:
+            candidates: Set[int] = set()
+            for band, key in enumerate(band_keys):
+                candidates.update(self._buckets.get((persona_key, band, key), ()))
+
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry, reason="expired")
+                    continue
+                if entry.guard != guard:
+                    continue
+                score = cosine(vector, entry.vector)
+                if score > best_score:
+                    best, best_score = entry, score
+        return best, best_score, len(candidates)
+
+    def _insert(
+        self,
+        key: str,
+        persona_key: str,
+        question: str,
+        result: Dict[str, Any],
+        tokens: int,
+        expires_at: float,
+        vector: Optional[Vector] = None,
+        band_keys: Optional[List[int]] = None
+    ) -> bool:
+        """Index an entry, replacing one for the same question; False if it is too large to keep."""
+        if vector is None:
+            vector = embed(question)
+        if band_keys is None:
+            band_keys = simhash_bands(vector, self.bands, self.rows)
+        size = (
+            ENTRY_OVERHEAD_BYTES
+            + len(question)
+            + len(str(result.get("answer", "")))
+            + FEATURE_BYTES * len(vector)
+        )
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._keys.get(key)
+            if previous is not None:
+                self._remove(self._entries[previous], reason=None)
+            entry = CacheEntry(
+                entry_id=self._next_id,
+                key=key,
+                persona=persona_key,
+                question=question,
+                vector=vector,
+                band_keys=band_keys,
+                result=result,
+                tokens=tokens,
+                size=size,
+                expires_at=expires_at,
+                guard=meaning_guard(question)
+            )
+            self._next_id += 1
+            self._entries[entry.entry_id] = entry
+            self._keys[key] = entry.entry_id
+            for band, band_key in enumerate(band_keys):
+                self._buckets.setdefault((persona_key, band, band_key), set()).add(entry.entry_id)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries.values())), reason="lru")
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries.values())), reason="memory")
+        return True
+
+    def _pull_shared(self) -> int:
+        """Index entries other workers wrote to the shared store since the last pull."""
+        cursor, changes = self.shared.changes_since("semantic", self._shared_cursor, limit=self.max_entries)
+        self._shared_cursor = cursor
+        added = 0
+        for key, value, expires_at in changes:
+            if key in self._keys:
+                continue
+            if self._insert(key, value["persona"], value["question"], value["result"], value["tokens"], expires_at):
+                added += 1
+        return added
+
+    def export_entries(self) -> Tuple[Dict[str, Any], "array[int]", "array[float]"]:
+        """
+        Live entries for a snapshot, least recently used first.
+
+        Returns:
+            Entry metadata (with each entry's slice of the feature arrays), the
+            vectors' buckets as uint32 and their weights as float32
+        """
+        buckets, weights = array("I"), array("f")
+        entries = []
+        now = time.time()
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.expires_at <= now:
+                    continue
+                entries.append({
+                    "key": entry.key,
+                    "persona": entry.persona,
+                    "question": entry.question,
+                    "result": entry.result,
+                    "tokens": entry.tokens,
+                    "expires_at": entry.expires_at,
+                    "band_keys": entry.band_keys,
+                    "features": [len(buckets), len(entry.vector)],
+                })
+                buckets.extend(entry.vector.keys())
+                weights.extend(entry.vector.values())
+        return {"bands": self.bands, "rows": self.rows, "entries": entries}, buckets, weights
+
+    def import_entries(self, exported: Dict[str, Any], buckets: Sequence[int], weights: Sequence[float]) -> int:
+        """
+        Index entries from `export_entries` without re-embedding their questions.
+
+        Returns:
+            Number of entries restored (expired and already present ones are skipped)
+        """
+        same_bands = (exported["bands"], exported["rows"]) == (self.bands, self.rows)
+        now = time.time()
+        restored = 0
+        for item in exported["entries"]:
+            if item["expires_at"] <= now or item["key"] in self._keys:
+                continue
+            start, count = item["features"]
+            vector = dict(zip(buckets[start:start + count], weights[start:start + count]))
+            if self._insert(
+                item["key"],
+                item["persona"],
+                item["question"],
+                item["result"],
+                item["tokens"],
+                item["expires_at"],
+                vector=vector,
+                band_keys=item["band_keys"] if same_bands else None
+            ):
+                restored += 1
+        return restored
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._keys.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit rate, lookup cost and size figures for reporting."""
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "lookups": lookups,
+            "hits": self.stats.hits,
+            "hit_rate": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            "avg_lookup_us": round(self.stats.lookup_seconds / lookups * 1e6, 1) if lookups else 0.0,
+            "avg_candidates": round(self.stats.candidates / lookups, 2) if lookups else 0.0,
+            "tokens_saved": self.stats.tokens_saved,
+            "evictions": dict(self.stats.evictions),
+        }
+
+    def _remove(self, entry: CacheEntry, reason: Optional[str]) -> None:
+        """Unlink an entry from the LRU list and band buckets (lock held); reason None is not an eviction."""
+        del self._entries[entry.entry_id]
+        if self._keys.get(entry.key) == entry.entry_id:
+            del self._keys[entry.key]
+        for band, key in enumerate(entry.band_keys):
+            bucket_key = (entry.persona, band, key)
+            members = self._buckets.get(bucket_key)
+            if members is not None:
+                members.discard(entry.entry_id)
+                if not members:
+                    del self._buckets[bucket_key]
+        self._bytes -= entry.size
+        if reason is None:
+            return
+        self.stats.evictions[reason] = self.stats.evictions.get(reason, 0) + 1
+        semantic_cache_evictions_total.inc(reason=reason)
+
+
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Return the process-wide cache, or None when caching is disabled."""
+    global _semantic_cache
+    if not settings.semantic_cache_enabled:
+        return None
+    if _semantic_cache is None:
+        store = get_cache_store()
+        _semantic_cache = SemanticCache(
+            threshold=settings.semantic_cache_threshold,
+            max_entries=settings.semantic_cache_max_entries,
+            max_bytes=settings.semantic_cache_max_bytes,
+            ttl_seconds=settings.semantic_cache_ttl_seconds,
+            shared=store if isinstance(store, SQLiteCacheStore) else None
+        )
+    return _semantic_cache
+
+
+def reset_semantic_cache() -> None:
+    """Drop the process-wide cache (useful for testing)."""
+    global _semantic_cache
+    _semantic_cache = None
@@ -0,0 +1,176 @@
+"""
+Helpers for streaming LLM output to clients.
+
+`coalesce_chunks` batches small token chunks into frames by size or age, and
+`JSONFieldStreamer` pulls the text of one string field (e.g. "answer") out of
+a JSON object while it is still being generated.
+"""
+import asyncio
+from typing import AsyncIterator, Optional
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[str],
+    max_chars: int = 256,
+    max_delay: float = 0.05
+) -> AsyncIterator[str]:
+    """
+    Merge a stream of small chunks into larger frames.
+
+    A frame is emitted once it reaches `max_chars` or once its first chunk is
+    `max_delay` seconds old, whichever comes first, so a slow upstream still
+    produces timely output.
+
+    Args:
+        chunks: Source stream of text chunks
+        max_chars: Frame size that triggers an immediate flush
+        max_delay: Maximum seconds a chunk may wait in the buffer
+
+    Returns:
+        Async iterator of coalesced frames
+    """
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer = []
+    size = 0
+    deadline = 0.0
+    pending: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if not done:
+                # Oldest buffered chunk hit max_delay while upstream is quiet
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+
+            if not chunk:
+                continue
+            if not buffer:
+                deadline = loop.time() + max_delay
+            buffer.append(chunk)
+            size += len(chunk)
+
+            if size >= max_chars:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        # Closing the source aborts the upstream HTTP stream
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONFieldStreamer:
+    """
+    Incrementally extract the value of a top-level string field from streamed JSON.
+
+    Feed raw chunks as they arrive; `feed` returns the newly decoded characters
+    of the field value. Escape sequences split across chunks are handled.
+    """
+
+    def __init__(self, field: str = "answer"):
+        self._key = f'"{field}"'
+        self._text = ""
+        self._pos = 0
+        self._state = "search"  # search -> colon -> quote -> value -> done
+        self._escape = ""
+
+    @property
+    def finished(self) -> bool:
+        """Whether the closing quote of the field value has been seen."""
+        return self._state == "done"
+
+    @property
+    def found(self) -> bool:
+        """Whether the field value has started."""
+        return self._state in ("value", "done")
+
+    def feed(self, chunk: str) -> str:
+        """Consume a raw chunk and return newly decoded field text."""
+        self._text += chunk
+        out = []
+        text = self._text
+
+        while self._pos < len(text) and self._state != "done":
+            if self._state == "search":
+                index = text.find(self._key, self._pos)
+                if index == -1:
+                    # Keep enough tail to match a key split across chunks
+                    self._pos = max(self._pos, len(text) - len(self._key) + 1)
+                    break
+                self._pos = index + len(self._key)
+                self._state = "colon"
+            elif self._state == "colon":
+                char = text[self._pos]
+                self._pos += 1
+                if char == ":":
+                    self._state = "quote"
+                elif not char.isspace():
+                    self._state = "search"
+            elif self._state == "quote":
+                char = text[self._pos]
+                self._pos += 1
+                if char == '"':
+                    self._state = "value"
+                elif not char.isspace():
+                    # Field is not a string; keep looking for a later occurrence
+                    self._state = "search"
+            else:
+                char = text[self._pos]
+                self._pos += 1
+                if self._escape:
+                    self._escape += char
+                    decoded = self._decode_escape()
+                    if decoded is not None:
+                        out.append(decoded)
+                        self._escape = ""
+                elif char == "\\":
+                    self._escape = "\\"
+                elif char == '"':
+                    self._state = "done"
+                else:
+                    out.append(char)
+
+        # Drop consumed text so long streams do not accumulate
+        if self._pos > 4096:
+            self._text = self._text[self._pos:]
+            self._pos = 0
+
+        return "".join(out)
+
+    def _decode_escape(self) -> Optional[str]:
+        """Decode a complete escape sequence, or return None if more input is needed."""
+        kind = self._escape[1]
+        if kind != "u":
+            return _ESCAPES.get(kind, kind)
+        if len(self._escape) < 6:
+            return None
+        try:
+            return chr(int(self._escape[2:6], 16))
+        except ValueError:
+            return ""
@@ -0,0 +1,154 @@
+"""
+Incremental parsing of large JSON request bodies.
+
+`iter_json_array` reads a body such as `{"transactions": [{...}, {...}]}`
+from the request stream and yields the items of one top-level array as soon
+as each is complete, so a handler can validate and aggregate rows while the
+upload is still arriving. Only the unparsed tail of the body is buffered:
+memory is bounded by the largest single item (`max_item_bytes`) however
+large the body is.
+"""
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class UploadTooLarge(Exception):
+    """The body exceeds a configured limit (bytes, items or item size)."""
+
+
+class _StreamReader:
+    """Buffered access to JSON values of a body that arrives in chunks."""
+
+    def __init__(self, chunks: AsyncIterator[bytes], max_bytes: int, max_item_bytes: int):
+        self._chunks = chunks.__aiter__()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.buffer = ""
+        self.pos = 0
+        self.received = 0
+        self.eof = False
+
+    async def fill(self) -> bool:
+        """Append the next chunk to the unparsed tail; False once the body is exhausted."""
+        if self.eof:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            self.received += len(chunk)
+            if self.received > self.max_bytes:
+                raise UploadTooLarge(f"Request body exceeds {self.max_bytes} bytes")
+            text = self._decoder.decode(chunk)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    async def peek(self) -> str:
+        """The next non-whitespace character, or "" at the end of the body."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not await self.fill():
+                return ""
+
+    async def expect(self, allowed: str) -> str:
+        """Consume one of the `allowed` structural characters."""
+        char = await self.peek()
+        if not char or char not in allowed:
+            found = repr(char) if char else "end of body"
+            raise ValueError(f"Invalid JSON: expected one of {' '.join(allowed)} at byte {self.offset}, found {found}")
+        self.pos += 1
+        return char
+
+    async def value(self) -> Any:
+        """Parse the next complete JSON value."""
+        await self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if len(self.buffer) - self.pos > self.max_item_bytes:
+                    raise UploadTooLarge(f"A single item exceeds {self.max_item_bytes} bytes (or is not valid JSON)")
+                if not await self.fill():
+                    raise ValueError(f"Invalid JSON: {e.msg} near byte {self.offset}") from e
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and await self.fill():
+                continue
+            self.pos = end
+            return value
+
+    @property
+    def offset(self) -> int:
+        """Approximate byte offset of the parse position, for error messages."""
+        return self.received - len(self.buffer[self.pos:].encode("utf-8"))
+
+
+async def iter_json_array(
+    chunks: AsyncIterator[bytes],
+    key: str,
+    max_bytes: int,
+    max_items: int,
+    max_item_bytes: int
+) -> AsyncIterator[Any]:
+    """
+    Yield the items of the top-level array `key` while the body streams in.
+
+    Other top-level fields are parsed and discarded.
+
+    Args:
+        chunks: Body chunks, e.g. `request.stream()`
+        key: Name of the array field in the top-level object
+        max_bytes: Largest accepted body
+        max_items: Largest accepted number of items
+        max_item_bytes: Largest accepted single item (or other field value)
+
+    Raises:
+        UploadTooLarge: When a limit is exceeded (reading stops there)
+        ValueError: When the body is not a JSON object with an array `key`
+    """
+    reader = _StreamReader(chunks, max_bytes, max_item_bytes)
+    found = False
+    await reader.expect("{")
+    if await reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            name = await reader.value()
+            if not isinstance(name, str):
+                raise ValueError(f"Invalid JSON: expected a field name at byte {reader.offset}")
+            await reader.expect(":")
+            if name == key and not found:
+                await reader.expect("[")
+                count = 0
+                if await reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        count += 1
+                        if count > max_items:
+                            raise UploadTooLarge(f"More than {max_items} items in {key}")
+                        yield await reader.value()
+                        if await reader.expect(",]") == "]":
+                            break
+                found = True
+            elif name == key:
+                raise ValueError(f"Duplicate field {key}")
+            else:
+                await reader.value()
+            if await reader.expect(",}") == "}":
+                break
+    if await reader.peek():
+        raise ValueError(f"Invalid JSON: unexpected data after the body at byte {reader.offset}")
+    if not found:
+        raise ValueError(f"Missing array field {key}")
@@ -0,0 +1,339 @@
+"""
+Warm restarts: cache snapshots, and warm-up before the service reports ready.
+
+Every SNAPSHOT_INTERVAL_SECONDS, and on shutdown, the semantic cache, the
+in-memory cache store (budget/insights results) and the chat access
+statistics are written to one snapshot file. On startup the file is
+memory-mapped and restored before the first request, so a fresh deploy serves
+cached answers at once. A warm-up task then replays the WARMUP_TOP_N most
+frequent stateless chat questions that are still not cached, as batch-priority
+LLM calls. `/ready` answers 503 until the warm-up finishes or
+WARMUP_TIMEOUT_SECONDS pass.
+
+Snapshot layout: an 8-byte magic, a little-endian uint32 header length, a JSON
+header with each section's offset, length and encoding, then the sections at
+8-byte aligned offsets. JSON sections are zlib-compressed. The semantic
+cache's feature vectors are raw uint32/float32 arrays read straight from the
+mapping, so restoring skips re-embedding every question. The retrieval index
+is not included, because it is rebuilt from the corpus in a few milliseconds.
+The SQLite cache store is already on disk.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.cache_store import InMemoryCacheStore, get_cache_store
+from app.services.prompt_stats import get_prompt_stats
+from app.services.semantic_cache import get_semantic_cache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"FCWARM01"
+SNAPSHOT_VERSION = 2
+_HEADER_LENGTH = struct.Struct("<I")
+
+# (encoding, payload): "json" payloads are zlib-compressed JSON, others raw array bytes
+Section = Tuple[str, bytes]
+
+
+def write_snapshot(path: str, sections: Dict[str, Section]) -> int:
+    """
+    Write sections to a snapshot file atomically.
+
+    Returns:
+        Size of the file in bytes
+    """
+    header: Dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "byteorder": sys.byteorder,
+        "sections": {},
+    }
+    # Offsets are relative to the end of the header, which is written first
+    offset = 0
+    for name, (encoding, payload) in sections.items():
+        offset += -offset % 8
+        header["sections"][name] = {"encoding": encoding, "offset": offset, "length": len(payload)}
+        offset += len(payload)
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-(len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(header_bytes)) % 8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC + _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+            written = 0
+            for _, payload in sections.values():
+                padding = -written % 8
+                f.write(b"\0" * padding + payload)
+                written += padding + len(payload)
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return size
+
+
+class SnapshotReader:
+    """Sections of a memory-mapped snapshot file."""
+
+    def __init__(self, mapping: mmap.mmap):
+        if mapping[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("not a warm-start snapshot")
+        start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+        (length,) = _HEADER_LENGTH.unpack_from(mapping, len(SNAPSHOT_MAGIC))
+        self.header = json.loads(mapping[start:start + length])
+        if self.header["version"] != SNAPSHOT_VERSION or self.header["byteorder"] != sys.byteorder:
+            raise ValueError(f"incompatible snapshot (version {self.header['version']}, {self.header['byteorder']})")
+        self._data = memoryview(mapping)[start + length:]
+        self._views: List[memoryview] = [self._data]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.header["sections"]
+
+    def json(self, name: str) -> Any:
+        """Decode a JSON section."""
+        section = self.header["sections"][name]
+        return json.loads(zlib.decompress(self._data[section["offset"]:section["offset"] + section["length"]]))
+
+    def array(self, name: str) -> memoryview:
+        """A raw array section as a typed view of the mapping (no copy)."""
+        section = self.header["sections"][name]
+        view = self._data[section["offset"]:section["offset"] + section["length"]].cast(section["encoding"])
+        self._views.append(view)
+        return view
+
+    def release(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+
+
+@contextmanager
+def open_snapshot(path: str) -> Iterator[SnapshotReader]:
+    """Memory-map a snapshot for reading."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        reader = SnapshotReader(mapping)
+        try:
+            yield reader
+        finally:
+            reader.release()
+
+
+def _json_section(value: Any) -> Section:
+    return "json", zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 1)
+
+
+def save_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Snapshot the process's warm state.
+
+    Returns:
+        Entry counts per section, file size and time taken
+    """
+    started = time.perf_counter()
+    sections: Dict[str, Section] = {}
+    counts: Dict[str, int] = {}
+
+    rows = get_prompt_stats().to_list()
+    sections["prompt_stats"] = _json_section(rows)
+    counts["prompt_stats"] = len(rows)
+
+    semantic = get_semantic_cache()
+    if semantic is not None:
+        exported, buckets, weights = semantic.export_entries()
+        sections["semantic"] = _json_section(exported)
+        sections["semantic.buckets"] = (buckets.typecode, buckets.tobytes())
+        sections["semantic.weights"] = (weights.typecode, weights.tobytes())
+        counts["semantic"] = len(exported["entries"])
+
+    store = get_cache_store()
+    if isinstance(store, InMemoryCacheStore):
+        rows = store.export_entries()
+        sections["cache_store"] = _json_section(rows)
+        counts["cache_store"] = len(rows)
+
+    size = write_snapshot(path, sections)
+    return {"entries": counts, "bytes": size, "seconds": round(time.perf_counter() - started, 4)}
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Restore warm state from a snapshot written by `save_snapshot`.
+
+    Returns:
+        Entries restored per section and time taken
+    """
+    started = time.perf_counter()
+    restored: Dict[str, int] = {}
+    with open_snapshot(path) as snapshot:
+        if "prompt_stats" in snapshot:
+            rows = snapshot.json("prompt_stats")
+            get_prompt_stats().merge(rows)
+            restored["prompt_stats"] = len(rows)
+
+        semantic = get_semantic_cache()
+        if semantic is not None and "semantic" in snapshot:
+            restored["semantic"] = semantic.import_entries(
+                snapshot.json("semantic"),
+                snapshot.array("semantic.buckets"),
+                snapshot.array("semantic.weights")
+            )
+
+        store = get_cache_store()
+        if isinstance(store, InMemoryCacheStore) and "cache_store" in snapshot:
+            restored["cache_store"] = store.import_entries(snapshot.json("cache_store"))
+    return {"entries": restored, "seconds": round(time.perf_counter() - started, 4)}
+
+
+class WarmStart:
+    """Restores snapshots on startup, warms the cache and saves snapshots periodically."""
+
+    def __init__(
+        self,
+        snapshot_path: str = "",
+        snapshot_interval_seconds: float = 300.0,
+        warmup_top_n: int = 20,
+        warmup_concurrency: int = 2,
+        warmup_timeout_seconds: float = 60.0
+    ):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval_seconds = snapshot_interval_seconds
+        self.warmup_top_n = warmup_top_n
+        self.warmup_concurrency = warmup_concurrency
+        self.warmup_timeout_seconds = warmup_timeout_seconds
+        self.state = "starting"
+        self.restored: Dict[str, Any] = {}
+        self.warmup: Dict[str, Any] = {"prompts": 0, "already_warm": 0, "generated": 0, "failed": 0}
+        self.last_snapshot: Dict[str, Any] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    async def start(self) -> None:
+        """Restore the snapshot, then warm up and snapshot in the background."""
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                self.restored = load_snapshot(self.snapshot_path)
+                logger.info(f"Restored warm state from {self.snapshot_path}: {self.restored}")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+        self.state = "warming"
+        self._tasks.append(asyncio.create_task(self._warm_up_until_ready(), name="warm-up"))
+        if self.snapshot_path and self.snapshot_interval_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._snapshot_loop(), name="snapshots"))
+
+    async def stop(self) -> None:
+        """Cancel the background tasks and write a final snapshot."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.snapshot_path:
+            await self.snapshot()
+
+    async def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Write a snapshot now (without blocking the event loop)."""
+        try:
+            self.last_snapshot = await asyncio.to_thread(save_snapshot, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write snapshot {self.snapshot_path}: {e}")
+            return None
+        self.last_snapshot["created_at"] = time.time()
+        return self.last_snapshot
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness and what was restored and warmed, for /ready."""
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "restored": self.restored,
+            "warmup": dict(self.warmup),
+            "last_snapshot": self.last_snapshot,
+        }
+
+    async def _warm_up_until_ready(self) -> None:
+        """Report ready once the warm-up finishes or its timeout passes (it keeps running after)."""
+        started = time.perf_counter()
+        warm_up = asyncio.create_task(self._warm_up())
+        try:
+            await asyncio.wait({warm_up}, timeout=self.warmup_timeout_seconds)
+            self.warmup["timed_out"] = not warm_up.done()
+            self.warmup["seconds"] = round(time.perf_counter() - started, 3)
+            self.state = "ready"
+            await warm_up
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+            self.state = "ready"
+        finally:
+            warm_up.cancel()
+
+    async def _warm_up(self) -> None:
+        """Replay the most frequent stateless questions that are not cached yet."""
+        from app.models import get_llm_client
+        from app.services.chat_service import ChatService
+
+        prompts = get_prompt_stats().top(self.warmup_top_n) if self.warmup_top_n > 0 else []
+        self.warmup["prompts"] = len(prompts)
+        if not prompts:
+            return
+        service = ChatService(get_llm_client(purpose="batch"), record_access=False)
+        semaphore = asyncio.Semaphore(max(1, self.warmup_concurrency))
+
+        async def warm(question: str, persona: Optional[str]) -> None:
+            async with semaphore:
+                try:
+                    result = await service.answer(question, persona)
+                except Exception as e:
+                    logger.warning(f"Warm-up of {question!r} failed: {e}")
+                    self.warmup["failed"] += 1
+                    return
+            if result["meta"].get("source") in ("cache", "retrieval"):
+                self.warmup["already_warm"] += 1
+            else:
+                self.warmup["generated"] += 1
+
+        await asyncio.gather(*(warm(question, persona) for question, persona, _ in prompts))
+        logger.info(f"Warm-up finished: {self.warmup}")
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval_seconds)
+            await self.snapshot()
+
+
+_warm_start: Optional[WarmStart] = None
+
+
+def get_warm_start() -> WarmStart:
+    """Return the process-wide warm-start manager configured from settings."""
+    global _warm_start
+    if _warm_start is None:
+        _warm_start = WarmStart(
+            snapshot_path=settings.snapshot_path,
+            snapshot_interval_seconds=settings.snapshot_interval_seconds,
+            warmup_top_n=settings.warmup_top_n,
+            warmup_concurrency=settings.warmup_concurrency,
+            warmup_timeout_seconds=settings.warmup_timeout_seconds
+        )
+    return _warm_start
+
+
+def reset_warm_start() -> None:
+    """Drop the process-wide warm-start manager (useful for testing)."""
+    global _warm_start
+    _warm_start = None
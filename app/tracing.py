@@ -0,0 +1,382 @@
+"""
+Lightweight span-based tracing.
+
+The current span lives in a context variable, so a span opened by the HTTP
+middleware is the parent of spans opened in the route, the services and the
+LLM client without passing anything around. Sampling is decided once per
+trace (an incoming W3C `traceparent` header's sampled flag wins, otherwise
+TRACING_SAMPLE_RATIO); unsampled traces use a shared no-op span and cost a
+context variable lookup per span.
+
+Finished traces are handed to the configured exporters: an in-memory ring
+buffer (served on /debug/traces) and, when TRACING_OTLP_DIR is set, OTLP JSON
+files that an OpenTelemetry collector's file receiver can ingest (written by a
+background thread, so the event loop never waits on the disk).
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "personal-finance-chatbot"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes",
+                 "status", "error", "sampled")
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        span_id: str,
+        parent_id: Optional[str] = None,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        sampled: bool = True,
+        start_ns: Optional[int] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.sampled = sampled
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        """Span duration (so far, if still open) in milliseconds."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed."""
+        if self.sampled:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def traceparent(self) -> str:
+        """W3C traceparent header value for propagating this span downstream."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representation used by the debug endpoint."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_unix_ms": self.start_ns / 1e6,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: Sequence[Span]) -> Dict[str, Any]:
+    """Encode spans as an OTLP/JSON ExportTraceServiceRequest."""
+    kinds = {"internal": 1, "server": 2, "client": 3}
+    encoded = []
+    for span in spans:
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": kinds.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        encoded.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": encoded}],
+        }]
+    }
+
+
+class SpanExporter:
+    """Receives the spans of each finished trace."""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+class RingBufferExporter(SpanExporter):
+    """Keeps the most recent traces in memory for the debug endpoint."""
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            trace_id = spans[0].trace_id
+            self._traces.setdefault(trace_id, []).extend(spans)
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.capacity:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[List[Span]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans is not None else None
+
+    def recent(self, limit: int = 50) -> List[List[Span]]:
+        """Most recent traces first."""
+        with self._lock:
+            return [list(spans) for spans in reversed(self._traces.values())][:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """
+    Appends one OTLP/JSON request per finished trace to a daily JSONL file.
+
+    Traces are queued and encoded and written by a background thread; when
+    the disk falls `max_pending` traces behind, new traces are dropped.
+    """
+
+    def __init__(self, directory: str, max_pending: int = 1000):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.dropped = 0
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def path_for(self, timestamp: float) -> str:
+        return os.path.join(self.directory, time.strftime("traces-%Y%m%d.jsonl", time.gmtime(timestamp)))
+
+    def export(self, spans: List[Span]) -> None:
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Block until every queued trace has been written."""
+        self._queue.join()
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="otlp-file-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                line = json.dumps(to_otlp(spans), separators=(",", ":"), default=str)
+                with open(self.path_for(time.time()), "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except Exception as e:
+                logger.warning(f"Writing OTLP trace file failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+# Shared span for unsampled traces: records nothing, but carries the decision to children
+_NOOP_SPAN = Span("unsampled", "0" * 32, "0" * 16, sampled=False, start_ns=0)
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans, applies sampling and exports finished traces."""
+
+    def __init__(
+        self,
+        sample_ratio: float = 1.0,
+        exporters: Optional[List[SpanExporter]] = None,
+        max_open_traces: int = 10_000
+    ):
+        self.sample_ratio = sample_ratio
+        self.exporters = list(exporters or [])
+        self.max_open_traces = max_open_traces
+        # trace id -> (open local spans, finished spans), oldest trace first; spans
+        # that are never ended would otherwise keep their trace here forever
+        self._traces: "OrderedDict[str, Tuple[int, List[Span]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def exporter(self, kind: type) -> Optional[SpanExporter]:
+        """Return the first configured exporter of a type."""
+        return next((e for e in self.exporters if isinstance(e, kind)), None)
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None,
+        traceparent: Optional[str] = None,
+        start_ns: Optional[int] = None,
+        new_trace: bool = False
+    ) -> Span:
+        """
+        Start a span under `parent` (default: the current span).
+
+        Without a parent, the span starts a new trace only for entry points
+        (`new_trace`, e.g. an HTTP request or a background job), continuing
+        the one named by `traceparent` if given; work outside any trace is not
+        recorded. Call `end_span` when the operation finishes.
+        """
+        parent = parent if parent is not None else current_span.get()
+        if parent is not None:
+            if not parent.sampled:
+                return _NOOP_SPAN
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif not new_trace:
+            return _NOOP_SPAN
+        else:
+            trace_id, parent_id, sampled = self._root_context(traceparent)
+            if not sampled:
+                return _NOOP_SPAN
+
+        span = Span(name, trace_id, _random_id(16), parent_id, kind, attributes, True, start_ns)
+        with self._lock:
+            open_spans, finished = self._traces.get(trace_id, (0, []))
+            self._traces[trace_id] = (open_spans + 1, finished)
+            while len(self._traces) > self.max_open_traces:
+                self._traces.popitem(last=False)
+        return span
+
+    def end_span(self, span: Span) -> None:
+        """Finish a span; the trace is exported once its last local span ends."""
+        if not span.sampled or span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns()
+        with self._lock:
+            open_spans, finished = self._traces.get(span.trace_id, (1, []))
+            finished.append(span)
+            if open_spans > 1:
+                self._traces[span.trace_id] = (open_spans - 1, finished)
+                return
+            self._traces.pop(span.trace_id, None)
+        for exporter in self.exporters:
+            try:
+                exporter.export(finished)
+            except Exception as e:
+                logger.warning(f"Trace exporter {type(exporter).__name__} failed: {e}")
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        new_trace: bool = False
+    ) -> Iterator[Span]:
+        """Run a block inside a child span of the current span (or a new trace)."""
+        span = self.start_span(name, attributes=attributes, new_trace=new_trace)
+        # Unsampled spans are made current too, so their children skip sampling
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            current_span.reset(token)
+            self.end_span(span)
+
+    def _root_context(self, traceparent: Optional[str]) -> Tuple[str, Optional[str], bool]:
+        match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if match:
+            return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+        return _random_id(32), None, random.random() < self.sample_ratio
+
+
+def _random_id(hex_digits: int) -> str:
+    return f"{random.getrandbits(hex_digits * 4):0{hex_digits}x}"
+
+
+def span(name: str, **attributes: Any):
+    """Context manager for a child span of the current span on the process tracer."""
+    return get_tracer().span(name, attributes)
+
+
+def traced(name: str):
+    """Decorator running an async function inside a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_span_attributes(**attributes: Any) -> None:
+    """Annotate the current span, if it is sampled."""
+    current = current_span.get()
+    if current is not None and current.sampled:
+        current.attributes.update(attributes)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer configured from settings."""
+    global _tracer
+    if _tracer is None:
+        exporters: List[SpanExporter] = [RingBufferExporter(settings.tracing_ring_buffer_traces)]
+        if settings.tracing_otlp_dir:
+            exporters.append(OTLPJsonFileExporter(settings.tracing_otlp_dir))
+        ratio = settings.tracing_sample_ratio if settings.tracing_enabled else 0.0
+        _tracer = Tracer(ratio, exporters, settings.tracing_max_open_traces)
+    return _tracer
+
+
+def reset_tracer() -> None:
+    """Drop the process-wide tracer (useful for testing)."""
+    global _tracer
+    _tracer = None
@@ -0,0 +1,72 @@
+"""
+Benchmark offline spending insights for many users on the mock backend.
+
+Writes one seeded transactions file per user to a temporary directory, then
+compares the nightly loop of sequential `POST /api/spending-insights` calls
+(in-process through the ASGI app, so without network overhead; timed on the
+first `--http-users` users) with `app.batch` at each `--workers` count. The
+analytics cache is disabled so every run does the same work.
+
+    python -m benchmarks.bench_batch [--users 10000] [--transactions 100] [--workers 1 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from app.batch import run_batch
+from app.config import settings
+from app.main import app
+from benchmarks.microbench import make_transactions
+
+
+async def http_loop(paths) -> float:
+    """Seconds for sequential API calls over the given user files."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for path in paths:
+            with open(path, "rb") as f:
+                response = await client.post(
+                    "/api/spending-insights", content=f.read(), headers={"content-type": "application/json"}
+                )
+            response.raise_for_status()
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--transactions", type=int, default=100, help="per user")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--http-users", type=int, default=1_000)
+    args = parser.parse_args()
+
+    settings.analytics_cache_enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        users = os.path.join(tmp, "users")
+        os.mkdir(users)
+        for i in range(args.users):
+            with open(os.path.join(users, f"user{i:06d}.json"), "w") as f:
+                json.dump({"transactions": make_transactions(args.transactions, seed=i)}, f)
+        print(f"{args.users} users x {args.transactions} transactions, {os.cpu_count()} CPUs")
+        print(f"{'mode':<20}{'users':>8}{'seconds':>9}{'users/s':>9}")
+
+        paths = sorted(os.path.join(users, name) for name in os.listdir(users))[:args.http_users]
+        seconds = asyncio.run(http_loop(paths))
+        print(f"{'http loop':<20}{len(paths):>8}{seconds:>9.1f}{len(paths) / seconds:>9.0f}")
+
+        for workers in dict.fromkeys(args.workers):
+            out = os.path.join(tmp, f"insights-{workers}.ndjson")
+            summary = asyncio.run(run_batch([users], out, workers=workers))
+            assert summary.succeeded == args.users, summary
+            mode = f"batch, {workers} worker{'s' if workers > 1 else ''}"
+            print(f"{mode:<20}{summary.succeeded:>8}{summary.seconds:>9.1f}{summary.users_per_second:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
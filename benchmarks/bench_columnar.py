@@ -0,0 +1,94 @@
+"""
+Benchmark the columnar spending insights encoding against the row encoding.
+
+Encodes the same seeded transactions both ways and times what the route does
+before any LLM call: parse and validate the JSON body into `InsightsRequest`,
+hand the transactions to the analytics layer, compute the aggregates and
+render the prompt. Peak memory of validation is measured with tracemalloc
+(in a separate pass, as tracing slows allocation down). Both encodings must
+produce the same aggregates and prompt.
+
+    python -m benchmarks.bench_columnar [--sizes 1000 10000 100000] [--repeats 3]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from app.routes.insights import InsightsRequest
+from app.services.analytics import summarize_transactions
+from app.services.prompt_templates import get_spending_insights_prompt
+from benchmarks.microbench import encode_columns, make_transactions
+
+STAGES = ("validate", "convert", "summarize", "prompt")
+
+
+def run_once(raw: str) -> Dict[str, Any]:
+    """Stage timings in milliseconds, plus the aggregates and prompt for the equivalence check."""
+    gc.collect()
+    timings = {}
+    started = time.perf_counter()
+    request = InsightsRequest.model_validate_json(raw)
+    timings["validate"] = time.perf_counter()
+    transactions = request.transaction_data()
+    timings["convert"] = time.perf_counter()
+    aggregates = summarize_transactions(transactions)
+    timings["summarize"] = time.perf_counter()
+    prompt = get_spending_insights_prompt(transactions, aggregates)
+    timings["prompt"] = time.perf_counter()
+
+    previous = started
+    result: Dict[str, Any] = {}
+    for stage in STAGES:
+        result[f"{stage}_ms"] = (timings[stage] - previous) * 1000
+        previous = timings[stage]
+    result["total_ms"] = (previous - started) * 1000
+    result["aggregates"] = aggregates
+    result["prompt"] = prompt
+    return result
+
+
+def peak_validation_mb(raw: str) -> float:
+    gc.collect()
+    tracemalloc.start()
+    request = InsightsRequest.model_validate_json(raw)
+    request.transaction_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'transactions':>12} {'encoding':<9}{'body MB':>9}"
+        + "".join(f"{stage + ' ms':>14}" for stage in STAGES)
+        + f"{'total ms':>10}{'peak MB':>9}"
+    )
+    for size in args.sizes:
+        rows = make_transactions(size)
+        bodies = {"rows": json.dumps({"transactions": rows}), "columns": json.dumps(encode_columns(rows))}
+        results = {}
+        for encoding, raw in bodies.items():
+            runs = [run_once(raw) for _ in range(args.repeats)]
+            best = min(runs, key=lambda run: run["total_ms"])
+            results[encoding] = best
+            print(
+                f"{size:>12} {encoding:<9}{len(raw) / 1e6:>9.2f}"
+                + "".join(f"{best[stage + '_ms']:>14.1f}" for stage in STAGES)
+                + f"{best['total_ms']:>10.1f}{peak_validation_mb(raw):>9.1f}"
+            )
+        assert results["rows"]["aggregates"] == results["columns"]["aggregates"], "aggregates differ"
+        assert results["rows"]["prompt"] == results["columns"]["prompt"], "prompts differ"
+        speedup = results["rows"]["total_ms"] / results["columns"]["total_ms"]
+        print(f"{'':>12} columns are {speedup:.1f}x faster end to end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark the local retrieval tier.
+
+Measures index build/load time, lookup latency and the share of chat questions
+answered without an LLM call ("LLM avoidance") on a sample of realistic
+traffic: common questions phrased several ways plus long-tail questions.
+
+    python -m benchmarks.bench_retrieval [--threshold 0.75] [--iterations 2000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app.services.retrieval import RetrievalIndex
+
+# (question, persona) pairs modelled on /api/generate traffic
+SAMPLE_QUERIES = [
+    ("How do I build an emergency fund?", "student"),
+    ("how do i build an emergency fund", None),
+    ("How much should I keep in my emergency fund?", "salaried"),
+    ("How big should an emergency fund be with irregular income?", "freelancer"),
+    ("What is the 50/30/20 rule?", None),
+    ("explain the 50 30 20 rule", "student"),
+    ("How does the 50/30/20 budget work for a family?", "parent"),
+    ("How can I save money?", "student"),
+    ("How can I save money on a tight budget?", "student"),
+    ("ways to save money", None),
+    ("How do I save more money each month?", "salaried"),
+    ("How should I budget my money?", "parent"),
+    ("How do I create a budget?", None),
+    ("Should I pay off debt or invest?", "salaried"),
+    ("pay off debt first or invest?", None),
+    ("How do I pay off credit card debt?", "student"),
+    ("debt snowball vs avalanche", None),
+    ("How do I improve my credit score?", None),
+    ("How do I build credit as a student?", "student"),
+    ("How much should I contribute to my 401k?", "salaried"),
+    ("Roth IRA vs traditional IRA", None),
+    ("How do I start investing?", "salaried"),
+    ("Are index funds good for beginners?", None),
+    ("What is compound interest?", None),
+    ("How should I pay off student loans?", "student"),
+    ("What is a 529 plan?", "parent"),
+    ("How do I budget with irregular income?", "freelancer"),
+    ("How much should I set aside for taxes as a freelancer?", "freelancer"),
+    ("How do I make my retirement savings last?", "retiree"),
+    ("How do I budget on a fixed income?", "retiree"),
+    ("How do I save for a house down payment?", None),
+    ("What is a sinking fund?", None),
+    # Long tail: should go to the LLM (possibly grounded)
+    ("Should I lease or buy my next car?", "salaried"),
+    ("Is it worth paying for a financial advisor?", None),
+    ("How do I split bills fairly with my partner?", None),
+    ("Should I buy bitcoin with my bonus?", "salaried"),
+    ("How do I negotiate a raise?", "salaried"),
+    ("What happens to my 401k if I change jobs?", "salaried"),
+    ("How much house can I afford on a $60k salary?", None),
+    ("Is whole life insurance a good investment?", "parent"),
+    ("How do I teach my kids about money?", "parent"),
+    ("Should I claim social security at 62 or 70?", "retiree"),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=0.75, help="direct-answer similarity threshold")
+    parser.add_argument("--grounding-threshold", type=float, default=0.25)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = RetrievalIndex.from_corpus()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.json")
+        index.save(path)
+        start = time.perf_counter()
+        RetrievalIndex.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for i in range(args.iterations):
+        question, persona = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        start = time.perf_counter()
+        index.search(question, persona)
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    answered = grounded = 0
+    for question, persona in SAMPLE_QUERIES:
+        hits = index.search(question, persona)
+        if hits and hits[0].score >= args.threshold:
+            answered += 1
+        elif any(hit.score >= args.grounding_threshold for hit in hits):
+            grounded += 1
+
+    total = len(SAMPLE_QUERIES)
+    print(f"index: {len(index.entries)} entries, {len(index.doc_entries)} questions")
+    print(f"build: {build_ms:.2f}ms  load (precomputed): {load_ms:.2f}ms")
+    print(
+        f"lookup: p50={percentile(latencies, 50):.1f}us p95={percentile(latencies, 95):.1f}us "
+        f"p99={percentile(latencies, 99):.1f}us mean={statistics.mean(latencies):.1f}us"
+    )
+    print(f"LLM avoidance @ {args.threshold}: {answered}/{total} ({answered / total:.0%})")
+    print(f"grounded LLM calls: {grounded}/{total}  ungrounded: {total - answered - grounded}/{total}")
+
+
+if __name__ == "__main__":
+    main()
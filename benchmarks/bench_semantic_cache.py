@@ -0,0 +1,88 @@
+"""
+Benchmark the semantic answer cache.
+
+Replays paraphrase pairs (should hit) and look-alike but different questions
+(should miss) against a cache padded to a realistic size, and reports hit
+rate, false hits and lookup latency.
+
+    python -m benchmarks.bench_semantic_cache [--threshold 0.85] [--entries 2048]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.semantic_cache import SemanticCache
+from benchmarks.bench_retrieval import SAMPLE_QUERIES, percentile
+
+# (cached question, later question, persona, same meaning?)
+PAIRS = [
+    ("How can I save money?", "ways to save money", "student", True),
+    ("Should I lease or buy a car?", "Is it better to lease or buy a car?", "salaried", True),
+    ("What is a Roth IRA?", "what's a roth ira", None, True),
+    ("How do I pay off credit card debt?", "how to pay off my credit card debts", None, True),
+    ("How much should I contribute to my 401k?", "how much should i contribute to 401k", "salaried", True),
+    ("Is it worth paying for a financial advisor?", "is a financial advisor worth paying for", None, True),
+    ("How do I split bills fairly with my partner?", "how to split bills with my partner fairly", None, True),
+    ("Should I buy bitcoin with my bonus?", "should I buy bitcoin with my bonus", "salaried", True),
+    ("How do I save for retirement?", "How do I save for college?", None, False),
+    ("Is $500 enough for an emergency fund?", "Is $5000 enough for an emergency fund?", None, False),
+    ("How do I pay off my credit card?", "How do I pay off my car loan?", None, False),
+    ("Should I lease or buy a car?", "Should I buy or lease a house?", None, False),
+    ("How can I save money?", "How can I save money?", "retiree", False),  # other persona
+]
+
+FILLER_WORDS = (
+    "save budget invest debt loan retire credit card house car tax fund income rent "
+    "college child stock bond ira roth insurance mortgage salary bonus"
+).split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--entries", type=int, default=2048, help="filler entries stored before measuring")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    cache = SemanticCache(threshold=args.threshold, max_entries=args.entries + len(PAIRS))
+    rng = random.Random(7)
+    payload = {"answer": "cached", "model": "bench", "meta": {}}
+    for i in range(args.entries):
+        words = " ".join(rng.choice(FILLER_WORDS) for _ in range(6))
+        cache.store(f"{words} {i}", rng.choice([None, "student", "salaried"]), payload)
+    for cached, _, persona, same in PAIRS:
+        if same or persona != "retiree":
+            cache.store(cached, "student" if persona == "retiree" else persona, {**payload, "answer": cached})
+
+    hits = false_hits = 0
+    for cached, later, persona, same in PAIRS:
+        hit = cache.lookup(later, persona)
+        if same and hit is not None and hit.result["answer"] == cached:
+            hits += 1
+        elif not same and hit is not None:
+            false_hits += 1
+
+    latencies = []
+    for i in range(args.iterations):
+        question, persona = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        start = time.perf_counter()
+        cache.lookup(question, persona)
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    same_total = sum(1 for pair in PAIRS if pair[3])
+    stats = cache.snapshot()
+    print(f"cache: {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
+    print(
+        f"paraphrase hits @ {args.threshold}: {hits}/{same_total}  "
+        f"false hits: {false_hits}/{len(PAIRS) - same_total}"
+    )
+    print(
+        f"lookup: p50={percentile(latencies, 50):.1f}us p95={percentile(latencies, 95):.1f}us "
+        f"p99={percentile(latencies, 99):.1f}us mean={statistics.mean(latencies):.1f}us "
+        f"candidates/lookup={stats['avg_candidates']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark response serialization per route.
+
+For each route, builds a representative payload with the deterministic
+fallbacks and times two paths:
+
+- "model": what FastAPI does for a returned dict, i.e. validate and dump it
+  through the route's `response_model`, then encode with the stdlib encoder
+  (`JSONResponse`)
+- "stdlib": the payload returned as a `JSONResponse`, skipping the model
+- "fast": the payload returned as a `FastJSONResponse` (orjson when installed),
+  which is what the routes do
+
+and the cost and ratio of gzip-compressing the body.
+
+    python -m benchmarks.bench_serialization [--budget-categories 200] [--nlu-items 500] [--repeats 7]
+"""
+import argparse
+import asyncio
+import gzip
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.config import settings
+from app.main import app
+from app.responses import FastJSONResponse, orjson
+from app.services.budget_service import BudgetService
+from app.services.insights_service import InsightsService
+from app.services.jobs import Job
+from app.services.nlu_service import NLUService
+from benchmarks.microbench import NLU_TEXTS, make_budget, make_transactions
+
+
+def route(path: str, method: str = "POST") -> APIRoute:
+    for candidate in app.router.routes:
+        if isinstance(candidate, APIRoute) and candidate.path == path and method in candidate.methods:
+            return candidate
+    raise LookupError(f"no route {method} {path}")
+
+
+def build_payloads(budget_categories: int, nlu_items: int) -> List[Tuple[str, APIRoute, Any]]:
+    """(label, route, payload) for every route with a fast path."""
+    budget = BudgetService(None)
+    insights = InsightsService(None)
+    nlu = NLUService(None)
+    income, expenses = make_budget(budget_categories)
+    transactions = make_transactions(10_000)
+    notes = [NLU_TEXTS["long"]] * 20
+
+    batch = Job(job_id="bench", kind="nlu_batch", payload={}, priority=0, dedupe_key="bench")
+    batch.status = "succeeded"
+    batch.result = {"results": [
+        nlu._generate_fallback_nlu(f"I spent ${i} on groceries and ${i * 3:,} on rent, which worries me")
+        for i in range(nlu_items)
+    ]}
+
+    dashboard = {
+        "aggregates": {"budget": None, "spending": None},
+        "budget": budget._generate_fallback_summary(income, expenses),
+        "insights": insights._generate_fallback_insights(transactions),
+        "nlu": [nlu._generate_fallback_nlu(text) for text in notes],
+        "meta": {"latency_ms": {}, "timed_out": [], "total_ms": 0.0},
+    }
+    return [
+        (f"budget-summary ({budget_categories} categories)", route("/api/budget-summary"),
+         budget._generate_fallback_summary(income, expenses)),
+        ("spending-insights", route("/api/spending-insights"), insights._generate_fallback_insights(transactions)),
+        ("nlu", route("/api/nlu"), nlu._generate_fallback_nlu(NLU_TEXTS["long"])),
+        (f"jobs/{{id}} (nlu batch of {nlu_items})", route("/api/jobs/{job_id}", "GET"), batch.to_dict()),
+        ("dashboard (20 notes)", route("/api/dashboard"), dashboard),
+    ]
+
+
+def best_of(fn: Callable[[], Any], repeats: int) -> float:
+    """Fastest of `repeats` timings in microseconds, each averaged over enough loops to take ~20ms."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - started > 0.02:
+            break
+        loops *= 2
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+    return min(timings) * 1e6
+
+
+def measure(api_route: APIRoute, payload: Any, repeats: int, gzip_level: int) -> Dict[str, float]:
+    loop = asyncio.new_event_loop()
+
+    def through_model() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=api_route.response_field, response_content=payload))
+        return JSONResponse(content).body
+
+    def stdlib() -> bytes:
+        return JSONResponse(payload).body
+
+    def fast() -> bytes:
+        return FastJSONResponse(payload).body
+
+    try:
+        assert through_model() == stdlib(), "payload does not match the response model"
+        body = fast()
+        return {
+            "model_us": best_of(through_model, repeats),
+            "stdlib_us": best_of(stdlib, repeats),
+            "fast_us": best_of(fast, repeats),
+            "bytes": len(body),
+            "gzip_us": best_of(lambda: gzip.compress(body, compresslevel=gzip_level, mtime=0), repeats),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=gzip_level, mtime=0)),
+        }
+    finally:
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-categories", type=int, default=200)
+    parser.add_argument("--nlu-items", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--gzip-level", type=int, default=settings.compression_gzip_level)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson is not None else 'stdlib json'}")
+    print(
+        f"{'route':<34}{'bytes':>9}{'model µs':>11}{'stdlib µs':>11}{'fast µs':>10}{'speedup':>9}"
+        f"{'gzip µs':>10}{'gzip %':>8}"
+    )
+    for label, api_route, payload in build_payloads(args.budget_categories, args.nlu_items):
+        r = measure(api_route, payload, args.repeats, args.gzip_level)
+        print(
+            f"{label:<34}{r['bytes']:>9}{r['model_us']:>11.1f}{r['stdlib_us']:>11.1f}{r['fast_us']:>10.1f}"
+            f"{r['model_us'] / r['fast_us']:>8.1f}x{r['gzip_us']:>10.1f}{r['gzip_bytes'] / r['bytes']:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
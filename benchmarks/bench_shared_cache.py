@@ -0,0 +1,160 @@
+"""
+Benchmark per-process against shared caching across uvicorn-style workers.
+
+Starts N worker processes and deals them one request stream round-robin, as
+the kernel spreads connections over `uvicorn --workers N`. Requests are either
+chat questions (paraphrases of a Zipf-distributed set of topics, through the
+semantic cache) or analytics requests (Zipf-distributed inputs, through the
+budget/insights key-value cache). A miss "calls the LLM" and stores the
+result. The same stream runs once with per-process caches (CACHE_BACKEND=memory)
+and once with one SQLite store shared by all workers (CACHE_BACKEND=sqlite).
+
+    python -m benchmarks.bench_shared_cache [--workers 4] [--requests 8000] [--llm-ms 0]
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.services.cache_store import InMemoryCacheStore, SQLiteCacheStore, cache_key
+from app.services.semantic_cache import SemanticCache
+from loadtest.common import percentile
+
+VERBS = ["save on", "pay off", "plan for", "budget for", "cut", "invest in", "refinance", "track"]
+THINGS = [
+    "groceries", "credit card debt", "a car loan", "my mortgage", "student loans", "taxes",
+    "retirement", "an emergency fund", "a house deposit", "childcare", "utilities", "travel",
+]
+TEMPLATES = ["How do I {verb} {thing}?", "ways to {verb} {thing}", "how can i {verb} {thing}", "tips to {verb} {thing}"]
+PERSONAS = ["student", "salaried", "retiree"]
+
+Request = Tuple[str, str, str]  # (kind, key or question, persona)
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    """Cumulative weights for picking rank r of n with probability proportional to 1 / (r + 1) ** s."""
+    return list(itertools.accumulate(1 / (rank + 1) ** s for rank in range(n)))
+
+
+def build_stream(requests: int, analytics_inputs: int, chat_share: float, skew: float, seed: int) -> List[Request]:
+    """The request stream shared by both runs."""
+    rng = random.Random(seed)
+    topics = [(verb, thing, persona) for verb in VERBS for thing in THINGS for persona in PERSONAS]
+    rng.shuffle(topics)
+    topic_weights = zipf_weights(len(topics), skew)
+    input_weights = zipf_weights(analytics_inputs, skew)
+    stream: List[Request] = []
+    for _ in range(requests):
+        if rng.random() < chat_share:
+            verb, thing, persona = rng.choices(topics, cum_weights=topic_weights)[0]
+            stream.append(("chat", rng.choice(TEMPLATES).format(verb=verb, thing=thing), persona))
+        else:
+            index = rng.choices(range(analytics_inputs), cum_weights=input_weights)[0]
+            stream.append(("analytics", f"input-{index}", ""))
+    return stream
+
+
+def run_worker(
+    backend: str,
+    path: str,
+    requests: List[Request],
+    llm_ms: float,
+    start_at: float,
+    results: "multiprocessing.Queue"
+) -> None:
+    """One worker process: its own caches, or handles on the shared store."""
+    if backend == "sqlite":
+        store: Any = SQLiteCacheStore(path)
+        semantic = SemanticCache(shared=store)
+    else:
+        store = InMemoryCacheStore()
+        semantic = SemanticCache()
+    counts = {"chat": [0, 0], "analytics": [0, 0]}  # [hits, lookups]
+    latencies: List[float] = []
+    time.sleep(max(0.0, start_at - time.time()))
+
+    for kind, text, persona in requests:
+        started = time.perf_counter()
+        if kind == "chat":
+            hit = semantic.lookup(text, persona) is not None
+            if not hit:
+                time.sleep(llm_ms / 1000)
+                semantic.store(text, persona, {"answer": f"answer to {text}", "model": "bench", "meta": {}}, 300)
+        else:
+            key = cache_key("bench", text)
+            hit = store.get("insights", key) is not None
+            if not hit:
+                time.sleep(llm_ms / 1000)
+                store.set("insights", key, {"top_categories": [], "red_flags": [], "recommendations": [text]})
+        latencies.append((time.perf_counter() - started) * 1000)
+        counts[kind][0] += hit
+        counts[kind][1] += 1
+    results.put({"counts": counts, "latencies": latencies})
+
+
+def run(backend: str, stream: List[Request], workers: int, llm_ms: float) -> Dict[str, Any]:
+    """Run the stream over `workers` processes and merge their results."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.db")
+        if backend == "sqlite":
+            SQLiteCacheStore(path).close()  # create the schema before the workers race for it
+        start_at = time.time() + 2.0  # leave time for the spawned interpreters to import
+        processes = [
+            context.Process(target=run_worker, args=(backend, path, stream[i::workers], llm_ms, start_at, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        merged = [results.get(timeout=600) for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.time() - start_at
+
+    totals = {kind: [sum(r["counts"][kind][i] for r in merged) for i in (0, 1)] for kind in ("chat", "analytics")}
+    latencies = [latency for r in merged for latency in r["latencies"]]
+    hits = sum(t[0] for t in totals.values())
+    return {
+        "backend": backend,
+        "hit_rate": hits / len(stream),
+        "chat_hit_rate": totals["chat"][0] / max(totals["chat"][1], 1),
+        "analytics_hit_rate": totals["analytics"][0] / max(totals["analytics"][1], 1),
+        "llm_calls": len(stream) - hits,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "requests_per_second": len(stream) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=8000)
+    parser.add_argument("--analytics-inputs", type=int, default=2000, help="distinct budget/insights inputs")
+    parser.add_argument("--chat-share", type=float, default=0.5)
+    parser.add_argument("--skew", type=float, default=0.9, help="Zipf exponent of input popularity")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="simulated LLM latency per miss")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stream = build_stream(args.requests, args.analytics_inputs, args.chat_share, args.skew, args.seed)
+    print(f"{args.requests} requests over {args.workers} workers, {args.chat_share:.0%} chat, zipf s={args.skew}")
+    print(
+        f"{'backend':<10}{'hit rate':>10}{'chat':>8}{'analytics':>11}"
+        f"{'LLM calls':>11}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}"
+    )
+    for backend in ("memory", "sqlite"):
+        r = run(backend, stream, args.workers, args.llm_ms)
+        print(
+            f"{r['backend']:<10}{r['hit_rate']:>10.1%}{r['chat_hit_rate']:>8.1%}{r['analytics_hit_rate']:>11.1%}"
+            f"{r['llm_calls']:>11}{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}{r['requests_per_second']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
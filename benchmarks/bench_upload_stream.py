@@ -0,0 +1,86 @@
+"""
+Benchmark streamed against buffered parsing of large spending insights uploads.
+
+"buffered" is what `/api/spending-insights` does before calling the LLM:
+join the body, validate it into `InsightsRequest`, dump the rows and compute
+the aggregates. "streamed" is `/api/spending-insights/stream`: parse the body
+chunk by chunk (64 KiB, as uvicorn delivers it), validating and accumulating
+each row and keeping only the prompt sample. Peak memory is measured with
+tracemalloc in a separate pass and excludes the body chunks themselves, which
+a server never holds all at once.
+
+    python -m benchmarks.bench_upload_stream [--sizes 10000 100000 500000]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from app.routes.insights import InsightsRequest, Transaction
+from app.services.analytics import SpendingAccumulator, summarize_transactions
+from app.services.upload_stream import iter_json_array
+from benchmarks.microbench import make_transactions
+
+CHUNK_BYTES = 64 * 1024
+PROMPT_ROWS = 200
+
+
+async def _chunks(chunks: List[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+
+def buffered(chunks: List[bytes]) -> Any:
+    request = InsightsRequest.model_validate_json(b"".join(chunks))
+    return summarize_transactions(request.transaction_data())
+
+
+def streamed(chunks: List[bytes]) -> Any:
+    async def run():
+        accumulator = SpendingAccumulator()
+        sample = []
+        rows = iter_json_array(_chunks(chunks), "transactions", 2 ** 40, 10 ** 9, 64 * 1024)
+        async for row in rows:
+            txn = Transaction.model_validate(row)
+            accumulator.add(txn.category, txn.amount)
+            if len(sample) < PROMPT_ROWS:
+                sample.append(txn.model_dump())
+        return accumulator.aggregates()
+    return asyncio.run(run())
+
+
+def measure(fn: Callable[[List[bytes]], Any], chunks: List[bytes]) -> Dict[str, Any]:
+    gc.collect()
+    started = time.perf_counter()
+    aggregates = fn(chunks)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    fn(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 1e6, "aggregates": aggregates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'transactions':>12}{'body MB':>9}  {'mode':<9}{'seconds':>9}{'peak MB':>9}")
+    for size in args.sizes:
+        body = json.dumps({"transactions": make_transactions(size)}).encode()
+        chunks = [body[i:i + CHUNK_BYTES] for i in range(0, len(body), CHUNK_BYTES)]
+        del body
+        results = {mode: measure(fn, chunks) for mode, fn in (("buffered", buffered), ("streamed", streamed))}
+        assert results["buffered"]["aggregates"] == results["streamed"]["aggregates"], "aggregates differ"
+        body_mb = sum(map(len, chunks)) / 1e6
+        for mode, r in results.items():
+            print(f"{size:>12}{body_mb:>9.1f}  {mode:<9}{r['seconds']:>9.2f}{r['peak_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
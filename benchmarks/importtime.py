@@ -0,0 +1,132 @@
+"""
+Import-time report for the app.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter,
+parses the per-module timings and summarizes where cold-start time goes:
+total import time, the slowest top-level packages (summed self time) and the
+slowest individual modules (self time).
+
+    python -m benchmarks.importtime [--module app.main] [--top 15] [--runs 3] [--json]
+    python -m benchmarks.importtime --budget-ms 1500   # exit 1 if the import takes longer
+
+With several runs, each module's fastest time is reported. APP_ENV and the
+other settings are taken from the environment, as for the app itself.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        One record per imported module: name, self_us, cumulative_us and
+        depth (0 for modules imported directly by the measured statement)
+    """
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append({
+                "name": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(indent) - 1) // 2,
+            })
+    return records
+
+
+def measure(module: str = "app.main", python: str = sys.executable) -> List[Dict[str, Any]]:
+    """Import `module` in a fresh interpreter and return its import-time records."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def summarize(runs: List[List[Dict[str, Any]]], top: int = 15) -> Dict[str, Any]:
+    """Fastest time per module across runs, grouped by top-level package."""
+    best: Dict[str, Dict[str, Any]] = {}
+    for records in runs:
+        for record in records:
+            current = best.get(record["name"])
+            if current is None or record["cumulative_us"] < current["cumulative_us"]:
+                best[record["name"]] = record
+
+    # Every module is charged once, to its top-level package, using self time
+    packages: Dict[str, int] = {}
+    for record in best.values():
+        package = record["name"].split(".")[0]
+        packages[package] = packages.get(package, 0) + record["self_us"]
+    total_us = sum(record["self_us"] for record in best.values())
+
+    by_self = sorted(best.values(), key=lambda r: r["self_us"], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(best),
+        "packages": [
+            {"package": name, "ms": round(us / 1000, 1), "share": round(us / total_us, 3) if total_us else 0.0}
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "slowest_modules": [
+            {
+                "module": r["name"],
+                "self_ms": round(r["self_us"] / 1000, 1),
+                "cumulative_ms": round(r["cumulative_us"] / 1000, 1),
+            }
+            for r in by_self
+        ],
+    }
+
+
+def print_summary(summary: Dict[str, Any], module: str) -> None:
+    print(f"import {module}: {summary['total_ms']:.1f}ms across {summary['modules']} modules")
+    print()
+    print(f"{'package':<32}{'ms':>10}{'share':>8}")
+    for row in summary["packages"]:
+        print(f"{row['package']:<32}{row['ms']:>10.1f}{row['share']:>8.1%}")
+    print()
+    print(f"{'module (self time)':<48}{'self ms':>10}{'cum ms':>10}")
+    for row in summary["slowest_modules"]:
+        print(f"{row['module']:<48}{row['self_ms']:>10.1f}{row['cumulative_ms']:>10.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, help="fail if the total import time exceeds this")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    summary = summarize([measure(args.module) for _ in range(args.runs)], args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, args.module)
+    if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+        print(f"import time {summary['total_ms']:.1f}ms exceeds the budget of {args.budget_ms:.0f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+"""
+Microbenchmarks for the Python hot paths.
+
+Covers JSON recovery from LLM output, the prompt builders, the deterministic
+fallbacks (budget summary, spending insights from 10 to 1M transactions, NLU),
+validation of large InsightsRequest bodies, row and columnar, the budget
+scenario evaluator and Monte Carlo forecasts. Inputs are
+generated from a fixed seed, timing runs with the garbage collector off (like
+timeit), and each benchmark reports the fastest of several repeats, which is
+the figure least disturbed by other load on the machine.
+
+    python -m benchmarks.microbench run [-k insights] [--quick] [--out results.json]
+    python -m benchmarks.microbench run --save-baseline      # update benchmarks/baselines/microbench.json
+    python -m benchmarks.microbench compare [results.json] [--threshold 0.15]
+
+`compare` runs the suite (or reads a saved run) and checks it against the
+stored baseline; it exits with status 1 when any benchmark is slower than the
+baseline by more than the threshold. A fixed calibration loop is timed right
+before every benchmark and comparisons use the ratio of the two, which cancels
+out most of the machine's speed and its drift during a run (CPU frequency,
+noisy neighbours), so baselines recorded elsewhere still compare fairly (pass
+--no-normalize to compare raw times).
+"""
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.fallback_mock import BUDGET_RESPONSE, INSIGHTS_RESPONSE
+from app.routes.insights import InsightsRequest
+from app.services import prompt_templates
+from app.services.analytics import summarize_budget, summarize_transactions
+from app.services.budget_service import BudgetService
+from app.services.forecast import forecast_from_history
+from app.services.insights_service import InsightsService
+from app.services.nlu_service import NLUService
+from app.services.scenarios import build_changes, evaluate_scenarios
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "microbench.json")
+
+SEED = 1234
+CATEGORIES = [
+    "Housing", "Food", "Transportation", "Entertainment", "Utilities",
+    "Health", "Shopping", "Education", "Travel", "Subscriptions",
+]
+MERCHANTS = ["Grocery Store", "Gas Station", "Coffee Shop", "Streaming Co", "Pharmacy", "Airline", "Bookstore"]
+NLU_TEXTS = {
+    "short": "I spent $500 on groceries last week",
+    "long": (
+        "This month was rough. Rent went up to $1,450.00 and I spent way too much on dining and "
+        "entertainment, about $620 in total. I did get a $2,000 bonus, which I saved, but the car "
+        "repair cost $780 and my credit card debt is now $3,200. I worry I'm not saving enough for "
+        "education and healthcare, and gas prices make transport expensive. Any advice on utilities "
+        "and shopping would be great."
+    ),
+}
+TRANSACTION_SIZES = [10, 1_000, 100_000, 1_000_000]
+VALIDATION_SIZES = [100, 10_000, 100_000]
+SCENARIO_SIZES = [100, 10_000]
+FORECAST_PATHS = [1_000, 10_000]
+# Sizes above this are skipped by --quick
+QUICK_MAX_SIZE = 10_000
+
+
+@dataclass
+class Benchmark:
+    """A timed callable; `setup` builds its inputs outside the timed region."""
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    size: int = 0
+
+
+@dataclass
+class Result:
+    """Per-call timings of one benchmark."""
+    best_ns: float  # fastest repeat, per call
+    median_ns: float
+    loops: int
+    repeats: int
+    calibration_ns: float = 0.0  # calibration loop timed just before
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "best_ns": round(self.best_ns, 1),
+            "median_ns": round(self.median_ns, 1),
+            "loops": self.loops,
+            "repeats": self.repeats,
+            "calibration_ns": round(self.calibration_ns, 1),
+        }
+
+
+def make_transactions(count: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.lognormvariate(3.5, 1.0), 2),
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "merchant": rng.choice(MERCHANTS),
+            "description": "",
+        }
+        for _ in range(count)
+    ]
+
+
+def encode_columns(transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The columnar request body for row transactions."""
+    columns: Dict[str, Any] = {
+        "amounts": [txn["amount"] for txn in transactions],
+        "dates": [txn["date"] for txn in transactions],
+    }
+    for field, name in (("category", "categories"), ("merchant", "merchants"), ("description", "descriptions")):
+        dictionary: Dict[str, int] = {}
+        codes = [dictionary.setdefault(txn.get(field, ""), len(dictionary)) for txn in transactions]
+        columns[name] = {"values": list(dictionary), "codes": codes}
+    return {"columns": columns}
+
+
+def make_budget(categories: int = 8, seed: int = SEED):
+    rng = random.Random(seed)
+    income = {"Salary": 5200.0, "Freelance": 640.0, "Investments": 120.0}
+    names = CATEGORIES + [f"Category {i}" for i in range(max(0, categories - len(CATEGORIES)))]
+    expenses = {name: round(rng.uniform(40, 1500), 2) for name in names[:categories]}
+    return income, expenses
+
+
+def _json_inputs() -> Dict[str, str]:
+    clean = json.dumps(BUDGET_RESPONSE)
+    pretty = json.dumps(INSIGHTS_RESPONSE, indent=2)
+    return {
+        "clean": clean,
+        "fenced": f"```json\n{pretty}\n```",
+        "noisy": f"Sure! Here is the analysis you asked for:\n\n{pretty}\n\nLet me know if you need anything else.",
+    }
+
+
+def build_suite() -> List[Benchmark]:
+    """All benchmarks, in reporting order."""
+    suite: List[Benchmark] = []
+    budget_service = BudgetService(None)
+    insights_service = InsightsService(None)
+    nlu_service = NLUService(None)
+
+    for kind, text in _json_inputs().items():
+        parse = budget_service._parse_json_response
+        suite.append(Benchmark(f"json_parse.{kind}", lambda text=text: lambda: parse(text)))
+
+    def budget_prompt():
+        income, expenses = make_budget()
+        aggregates = summarize_budget(income, expenses)
+        return lambda: prompt_templates.get_budget_summary_prompt(income, expenses, aggregates)
+
+    def insights_prompt(size):
+        def setup():
+            transactions = make_transactions(size)
+            aggregates = summarize_transactions(transactions)
+            return lambda: prompt_templates.get_spending_insights_prompt(transactions, aggregates)
+        return setup
+
+    grounding = [{"question": "What is an emergency fund?", "answer": "Savings for 3-6 months of expenses."}]
+    turns = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i} about budgeting and saving."}
+        for i in range(8)
+    ]
+    suite += [
+        Benchmark("prompt.budget_summary", budget_prompt),
+        Benchmark("prompt.spending_insights[10]", insights_prompt(10), 10),
+        Benchmark("prompt.spending_insights[1000]", insights_prompt(1000), 1000),
+        Benchmark("prompt.nlu", lambda: lambda: prompt_templates.get_nlu_prompt(NLU_TEXTS["long"])),
+        Benchmark(
+            "prompt.persona",
+            lambda: lambda: prompt_templates.get_persona_prompt("How do I save money?", "student", grounding)
+        ),
+        Benchmark("prompt.general", lambda: lambda: prompt_templates.get_general_prompt("What is a Roth IRA?")),
+        Benchmark(
+            "prompt.conversation_summary",
+            lambda: lambda: prompt_templates.get_conversation_summary_prompt("The user is saving for a car.", turns)
+        ),
+    ]
+
+    for categories in (8, 1000):
+        def fallback_summary(categories=categories):
+            income, expenses = make_budget(categories)
+            return lambda: budget_service._generate_fallback_summary(income, expenses)
+        suite.append(Benchmark(f"fallback.summary[{categories}]", fallback_summary, categories))
+
+    for size in TRANSACTION_SIZES:
+        def fallback_insights(size=size):
+            transactions = make_transactions(size)
+            return lambda: insights_service._generate_fallback_insights(transactions)
+        suite.append(Benchmark(f"fallback.insights[{size}]", fallback_insights, size))
+
+    for kind, text in NLU_TEXTS.items():
+        fallback_nlu = nlu_service._generate_fallback_nlu
+        suite.append(Benchmark(f"fallback.nlu.{kind}", lambda text=text: lambda: fallback_nlu(text)))
+
+    for size in VALIDATION_SIZES:
+        def validate_python(size=size):
+            body = {"transactions": make_transactions(size)}
+            return lambda: InsightsRequest.model_validate(body)
+
+        def validate_json(size=size):
+            raw = json.dumps({"transactions": make_transactions(size)})
+            return lambda: InsightsRequest.model_validate_json(raw)
+
+        def validate_columns_json(size=size):
+            raw = json.dumps(encode_columns(make_transactions(size)))
+            return lambda: InsightsRequest.model_validate_json(raw).transaction_data()
+        suite.append(Benchmark(f"validate.insights_request[{size}]", validate_python, size))
+        suite.append(Benchmark(f"validate.insights_request_json[{size}]", validate_json, size))
+        suite.append(Benchmark(f"validate.insights_columns_json[{size}]", validate_columns_json, size))
+
+    for size in SCENARIO_SIZES:
+        def scenarios(size=size):
+            income, expenses = make_budget()
+            categories = [*expenses, *income]
+            # Ten candidate changes for each of the first log10(size) expense categories
+            steps = [round(-0.5 + i * 0.05, 2) for i in range(10)]
+            grid = {category: steps for category in list(expenses)[:len(str(size)) - 1]}
+
+            def evaluate():
+                results = evaluate_scenarios(income, expenses, build_changes(categories, grid=grid), 20_000, 1_000)
+                return [results.scenario(i) for i in results.rank("months_to_goal", 3)]
+            return evaluate
+        suite.append(Benchmark(f"scenarios.evaluate[{size}]", scenarios, size))
+
+    for paths in FORECAST_PATHS:
+        def forecast(paths=paths):
+            # A year of history in ten categories, five years ahead
+            transactions = make_transactions(1_000)
+            income = [4200.0, 0.0, 6100.0, 3900.0, 5200.0, 2500.0, 7000.0, 4800.0, 0.0, 5500.0, 4100.0, 6000.0]
+            return lambda: forecast_from_history(transactions, income, 2_000.0, 60, paths, 20_000.0, seed=SEED)
+        suite.append(Benchmark(f"forecast.monte_carlo[{paths}x60]", forecast, paths))
+
+    return suite
+
+
+def time_callable(func: Callable[[], Any], repeats: int = 5, min_time: float = 0.1, max_time: float = 10.0) -> Result:
+    """
+    Time `func` like timeit: pick a loop count that runs for at least `min_time`, then repeat.
+
+    Slow callables get fewer repeats (at least 3) so one benchmark stays within `max_time`.
+    """
+    func()  # warm-up: imports, caches, first-call allocations
+    loops = 1
+    while True:
+        elapsed = _run(func, loops)
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    repeats = max(3, min(repeats, int(max_time / max(elapsed, 1e-9))))
+    samples = [elapsed] + [_run(func, loops) for _ in range(repeats - 1)]
+    per_call = sorted(sample / loops * 1e9 for sample in samples)
+    return Result(per_call[0], per_call[len(per_call) // 2], loops, repeats)
+
+
+def _run(func: Callable[[], Any], loops: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def calibrate() -> float:
+    """Time a fixed pure-Python workload (ns); the ratio between machines scales baselines."""
+    def workload():
+        totals: Dict[str, float] = {}
+        for i in range(2000):
+            key = CATEGORIES[i % len(CATEGORIES)]
+            totals[key] = totals.get(key, 0.0) + i * 0.5
+        return json.dumps(sorted(totals.items()))
+    return time_callable(workload, repeats=5, min_time=0.05).best_ns
+
+
+def run_suite(
+    patterns: Optional[List[str]] = None,
+    quick: bool = False,
+    repeats: int = 7,
+    min_time: float = 0.1,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """Run the selected benchmarks and return a results document."""
+    results: Dict[str, Any] = {}
+    calibrations: List[float] = []
+    for benchmark in build_suite():
+        if patterns and not any(fnmatch.fnmatch(benchmark.name, f"*{p}*") for p in patterns):
+            continue
+        if quick and benchmark.size > QUICK_MAX_SIZE:
+            continue
+        func = benchmark.setup()
+        calibrations.append(calibrate())
+        result = time_callable(func, repeats=repeats, min_time=min_time)
+        result.calibration_ns = calibrations[-1]
+        del func
+        gc.collect()
+        results[benchmark.name] = result.to_dict()
+        if verbose:
+            print(f"{benchmark.name:<42}{format_ns(result.best_ns):>12}{format_ns(result.median_ns):>12}", flush=True)
+    calibrations.sort()
+    calibration = calibrations[len(calibrations) // 2] if calibrations else calibrate()
+    return {"meta": environment(calibration), "results": results}
+
+
+def environment(calibration_ns: float) -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "calibration_ns": round(calibration_ns, 1),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.15,
+    normalize: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Compare a run against a baseline.
+
+    Returns:
+        One row per benchmark present in both, with the relative change and a
+        status of "regression", "improvement" or "ok"
+    """
+    rows = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        expected = reference["best_ns"]
+        if normalize:
+            expected *= _calibration(result, current) / _calibration(reference, baseline)
+        change = result["best_ns"] / expected - 1
+        status = "regression" if change > threshold else "improvement" if change < -threshold else "ok"
+        rows.append({
+            "name": name,
+            "baseline_ns": expected,
+            "current_ns": result["best_ns"],
+            "change": change,
+            "status": status,
+        })
+    return rows
+
+
+def _calibration(result: Dict[str, Any], document: Dict[str, Any]) -> float:
+    return result.get("calibration_ns") or document["meta"]["calibration_ns"]
+
+
+def format_ns(ns: float) -> str:
+    for unit, factor in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= factor:
+            return f"{ns / factor:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(document: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    compare_parser = commands.add_parser("compare", help="compare a run with the baseline")
+    compare_parser.add_argument("results", nargs="?", help="saved run (default: run the suite now)")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown that fails")
+    compare_parser.add_argument("--no-normalize", action="store_true", help="compare raw times")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("-k", dest="patterns", action="append", help="only benchmarks whose name contains this")
+        sub.add_argument("--quick", action="store_true", help=f"skip sizes above {QUICK_MAX_SIZE:,}")
+        sub.add_argument("--repeats", type=int, default=7, help="more repeats steady noisy machines")
+        sub.add_argument("--baseline", default=BASELINE_PATH)
+    run_parser.add_argument("--out", help="write the results JSON here")
+    run_parser.add_argument("--save-baseline", action="store_true", help="merge the results into the baseline")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        print(f"{'benchmark':<42}{'best':>12}{'median':>12}")
+        document = run_suite(args.patterns, args.quick, args.repeats)
+        if args.out:
+            _save(document, args.out)
+        if args.save_baseline:
+            if os.path.exists(args.baseline) and (args.patterns or args.quick):
+                # A partial run only replaces the benchmarks it ran
+                stored = _load(args.baseline)
+                stored["results"].update(document["results"])
+                document = stored
+            _save(document, args.baseline)
+            print(f"baseline written to {args.baseline}")
+        return 0
+
+    baseline = _load(args.baseline)
+    if args.results:
+        current = _load(args.results)
+    else:
+        print(f"{'benchmark':<42}{'best':>12}{'median':>12}")
+        current = run_suite(args.patterns, args.quick, args.repeats)
+        print()
+    rows = compare(current, baseline, args.threshold, normalize=not args.no_normalize)
+    print(f"{'benchmark':<42}{'baseline':>12}{'current':>12}{'change':>9}")
+    for row in rows:
+        flag = {"regression": "  REGRESSION", "improvement": "  improved"}.get(row["status"], "")
+        print(
+            f"{row['name']:<42}{format_ns(row['baseline_ns']):>12}{format_ns(row['current_ns']):>12}"
+            f"{row['change']:>+9.1%}{flag}"
+        )
+    regressions = [row for row in rows if row["status"] == "regression"]
+    missing = sorted(set(current["results"]) - set(baseline["results"]))
+    if missing:
+        print(f"not in baseline: {', '.join(missing)}")
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%} in {len(rows)} benchmark(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -263,6 +263,93 @@ function createTopCategoriesChart(categories) {
 // Chat Functions
 let chatHistory = [];
 
+// Server-side chat memory is keyed by this id (one conversation per page load)
+const chatSessionId = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `session-${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// Streaming chat over /ws/chat (falls back to /api/generate if unavailable)
+let chatSocket = null;
+let chatSocketReady = null;
+const chatHandlers = {};
+let activeConversationId = null;
+
+function connectChatSocket() {
+    if (chatSocket && chatSocket.readyState <= WebSocket.OPEN) {
+        return chatSocketReady;
+    }
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    chatSocket = new WebSocket(`${protocol}//${window.location.host}/ws/chat`);
+    chatSocketReady = new Promise((resolve, reject) => {
+        chatSocket.onopen = () => resolve(chatSocket);
+        chatSocket.onerror = () => reject(new Error('WebSocket unavailable'));
+    });
+    chatSocket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        const handler = chatHandlers[message.id];
+        if (handler) handler(message);
+    };
+    chatSocket.onclose = () => {
+        // Fail any conversation still waiting on this socket
+        Object.keys(chatHandlers).forEach(id => {
+            chatHandlers[id]({ type: 'error', id, detail: 'Connection closed' });
+        });
+        chatSocket = null;
+    };
+    return chatSocketReady;
+}
+
+function setStopButtonVisible(visible) {
+    const stopButton = document.getElementById('stopButton');
+    if (stopButton) stopButton.style.display = visible ? 'inline-block' : 'none';
+}
+
+function stopGeneration() {
+    if (chatSocket && activeConversationId) {
+        chatSocket.send(JSON.stringify({ type: 'cancel', id: activeConversationId }));
+    }
+}
+
+async function streamChatAnswer(message, persona, loadingId) {
+    const socket = await connectChatSocket();
+    const conversationId = `c-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
+    const bubble = document.getElementById(loadingId);
+    let streamed = '';
+
+    return new Promise((resolve, reject) => {
+        chatHandlers[conversationId] = (event) => {
+            if (event.type === 'delta') {
+                streamed += event.text;
+                bubble.textContent = streamed;
+                bubble.parentElement.scrollTop = bubble.parentElement.scrollHeight;
+                return;
+            }
+            delete chatHandlers[conversationId];
+            activeConversationId = null;
+            setStopButtonVisible(false);
+            if (event.type === 'done') {
+                bubble.textContent = event.answer;
+                resolve(event.answer);
+            } else if (event.type === 'cancelled') {
+                bubble.textContent = streamed ? `${streamed} [stopped]` : '[stopped]';
+                resolve(streamed);
+            } else {
+                reject(new Error(event.detail || 'Streaming failed'));
+            }
+        };
+        activeConversationId = conversationId;
+        setStopButtonVisible(true);
+        socket.send(JSON.stringify({
+            type: 'start',
+            id: conversationId,
+            prompt: message,
+            persona: persona,
+            max_tokens: 512,
+            session_id: chatSessionId
+        }));
+    });
+}
+
 async function sendMessage(event) {
     if (event) event.preventDefault();
     
@@ -285,22 +372,27 @@ async function sendMessage(event) {
     const loadingId = addMessageToChat('Thinking...', 'bot', true);
     
     try {
-        const data = await fetchAPI('/api/generate', {
-            method: 'POST',
-            body: JSON.stringify({
-                prompt: message,
-                persona: persona,
-                stream: false,
-                max_tokens: 512
-            })
-        });
-        
-        // Remove loading message
-        document.getElementById(loadingId).remove();
+        let answer;
+        try {
+            answer = await streamChatAnswer(message, persona, loadingId);
+        } catch (streamError) {
+            if (streamError.message !== 'WebSocket unavailable') throw streamError;
+            
+            const data = await fetchAPI('/api/generate', {
+                method: 'POST',
+                body: JSON.stringify({
+                    prompt: message,
+                    persona: persona,
+                    stream: false,
+                    max_tokens: 512,
+                    session_id: chatSessionId
+                })
+            });
+            answer = data.answer;
+            document.getElementById(loadingId).textContent = answer;
+        }
         
-        // Add bot response
-        addMessageToChat(data.answer, 'bot');
-        chatHistory.push({ role: 'assistant', content: data.answer });
+        chatHistory.push({ role: 'assistant', content: answer });
         
     } catch (error) {
         document.getElementById(loadingId).remove();
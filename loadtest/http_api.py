@@ -0,0 +1,281 @@
+"""
+Load test for the HTTP API.
+
+Drives every /api/* route from concurrent workers with a weighted mix of
+seeded, deterministic requests and reports throughput and latency
+percentiles per scenario. Run the API against the LLM stand-in so calls take
+realistic time without spending quota:
+
+    python -m loadtest.llm_standin --port 9000 --latency lognormal:400,0.5 --token-rate 80 --seed 1
+    APP_ENV=prod GROQ_API_KEY=standin GROQ_BASE_URL=http://localhost:9000 \\
+        OLLAMA_BASE_URL=http://localhost:9000 uvicorn app.main:app --port 8000
+    python -m loadtest.http_api --url http://localhost:8000 --concurrency 32 --duration 60 --seed 1
+
+The jobs scenario submits a spending-insights job and polls it to completion;
+its latency is submission to result.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from loadtest.common import percentile
+
+CATEGORIES = ["Housing", "Food", "Transportation", "Entertainment", "Utilities", "Health", "Shopping"]
+QUESTIONS = [
+    "How can I build an emergency fund?",
+    "Should I pay off debt or invest?",
+    "How do I save for my kids' college?",
+    "How do I budget with irregular income?",
+    "What is the 50/30/20 rule?",
+    "Is it worth refinancing my car loan?",
+]
+PERSONAS = ["student", "salaried", "parent", "freelancer", None]
+NOTES = [
+    "I spent $500 on groceries last week",
+    "Got a $2000 bonus and want to save it",
+    "Worried about my credit card bill",
+    "Rent went up by $150 this month",
+]
+
+# Scenario name -> relative weight in the request mix
+DEFAULT_MIX = {"budget": 3, "insights": 3, "nlu": 2, "generate": 3, "dashboard": 1, "jobs": 1}
+
+Scenario = Callable[[httpx.AsyncClient, random.Random, int], Awaitable[int]]
+
+
+def make_transactions(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "category": rng.choice(CATEGORIES),
+            "amount": round(rng.uniform(5, 400), 2),
+            "date": f"2024-01-{rng.randint(1, 28):02d}",
+            "merchant": f"Merchant {rng.randint(1, 50)}",
+        }
+        for _ in range(count)
+    ]
+
+
+def make_budget(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "income": {"Salary": round(rng.uniform(2000, 9000), 2), "Freelance": round(rng.uniform(0, 1500), 2)},
+        "expenses": {category: round(rng.uniform(50, 1500), 2) for category in rng.sample(CATEGORIES, 4)},
+    }
+
+
+async def _post(client: httpx.AsyncClient, path: str, payload: Dict[str, Any]) -> int:
+    response = await client.post(path, json=payload)
+    return response.status_code
+
+
+async def budget_scenario(client: httpx.AsyncClient, rng: random.Random, transactions: int) -> int:
+    return await _post(client, "/api/budget-summary", make_budget(rng))
+
+
+async def insights_scenario(client: httpx.AsyncClient, rng: random.Random, transactions: int) -> int:
+    return await _post(client, "/api/spending-insights", {"transactions": make_transactions(rng, transactions)})
+
+
+async def nlu_scenario(client: httpx.AsyncClient, rng: random.Random, transactions: int) -> int:
+    return await _post(client, "/api/nlu", {"text": rng.choice(NOTES), "persona": "general"})
+
+
+async def generate_scenario(client: httpx.AsyncClient, rng: random.Random, transactions: int) -> int:
+    return await _post(client, "/api/generate", {"prompt": rng.choice(QUESTIONS), "persona": rng.choice(PERSONAS)})
+
+
+async def dashboard_scenario(client: httpx.AsyncClient, rng: random.Random, transactions: int) -> int:
+    payload = dict(make_budget(rng), transactions=make_transactions(rng, transactions), notes=rng.sample(NOTES, 2))
+    return await _post(client, "/api/dashboard", payload)
+
+
+async def jobs_scenario(
+    client: httpx.AsyncClient,
+    rng: random.Random,
+    transactions: int,
+    poll_interval: float = 0.05,
+    timeout: float = 60.0
+) -> int:
+    payload = {"transactions": make_transactions(rng, transactions)}
+    response = await client.post("/api/jobs/spending-insights", json=payload)
+    if response.status_code != 202:
+        return response.status_code
+    status_url = response.json()["status_url"]
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        response = await client.get(status_url)
+        if response.status_code != 200:
+            return response.status_code
+        status = response.json()["status"]
+        if status == "succeeded":
+            return 200
+        if status in ("failed", "cancelled"):
+            return 500
+        await asyncio.sleep(poll_interval)
+    return 504
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "budget": budget_scenario,
+    "insights": insights_scenario,
+    "nlu": nlu_scenario,
+    "generate": generate_scenario,
+    "dashboard": dashboard_scenario,
+    "jobs": jobs_scenario,
+}
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    concurrency: int = 8,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None,
+    mix: Optional[Dict[str, int]] = None,
+    seed: Optional[int] = None,
+    transactions: int = 20
+) -> Dict[str, Any]:
+    """
+    Run the request mix until `duration` seconds pass or `requests` scenarios complete.
+
+    Each worker has its own RNG derived from `seed`, so a run sends the same
+    sequence of requests every time (the interleaving depends on the server).
+
+    Returns:
+        Report with overall and per-scenario counts, throughput and latency percentiles
+    """
+    if duration is None and requests is None:
+        raise ValueError("Set a duration or a number of requests")
+    mix = mix or DEFAULT_MIX
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    results: Dict[str, List[Tuple[float, int]]] = {name: [] for name in names}
+    errors: Dict[str, int] = {}
+    issued = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    async def worker(index: int) -> None:
+        nonlocal issued
+        rng = random.Random(f"{seed}-{index}" if seed is not None else None)
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if requests is not None:
+                if issued >= requests:
+                    return
+                issued += 1
+            name = rng.choices(names, weights)[0]
+            call_started = time.perf_counter()
+            try:
+                status = await SCENARIOS[name](client, rng, transactions)
+            except httpx.HTTPError as e:
+                status = 0
+                key = f"{name}: {type(e).__name__}"
+                errors[key] = errors.get(key, 0) + 1
+            results[name].append((time.perf_counter() - call_started, status))
+
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return build_report(results, elapsed, errors)
+
+
+def build_report(
+    results: Dict[str, List[Tuple[float, int]]],
+    elapsed: float,
+    errors: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Summarize (latency seconds, status) samples per scenario."""
+    def summarize(samples: List[Tuple[float, int]]) -> Dict[str, Any]:
+        latencies = [latency for latency, _ in samples]
+        statuses: Dict[str, int] = {}
+        for _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        ok = sum(1 for _, status in samples if 200 <= status < 300)
+        return {
+            "requests": len(samples),
+            "ok": ok,
+            "failed": len(samples) - ok,
+            "statuses": statuses,
+            "rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        }
+
+    all_samples = [sample for samples in results.values() for sample in samples]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(all_samples),
+        "scenarios": {name: summarize(samples) for name, samples in results.items() if samples},
+        "transport_errors": errors or {},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'scenario':<12}{'requests':>9}{'failed':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report["scenarios"].items()) + [("total", report["total"])]
+    for name, row in rows:
+        print(
+            f"{name:<12}{row['requests']:>9}{row['failed']:>8}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        )
+    print(f"elapsed: {report['elapsed_s']:.2f}s")
+    for name, row in rows[:-1]:
+        failed = {status: count for status, count in row["statuses"].items() if not status.startswith("2")}
+        if failed:
+            print(f"{name} failures by status: {failed}")
+    for error, count in report["transport_errors"].items():
+        print(f"transport error {error}: {count}")
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse "budget=3,generate=1" into a scenario mix."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, help="seconds to run (default 30 unless --requests is set)")
+    parser.add_argument("--requests", type=int, help="stop after this many scenarios")
+    parser.add_argument("--mix", type=parse_mix, help="weights, e.g. budget=3,insights=3,generate=2")
+    parser.add_argument("--transactions", type=int, default=20, help="transactions per insights/dashboard request")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    duration = args.duration if args.duration is not None or args.requests is not None else 30.0
+    # Expire idle connections before uvicorn's 5s keep-alive timeout closes them under a request
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency, keepalive_expiry=4.0
+    )
+    async with httpx.AsyncClient(base_url=args.url, timeout=120.0, limits=limits) as client:
+        report = await run_load(
+            client,
+            concurrency=args.concurrency,
+            duration=duration,
+            requests=args.requests,
+            mix=args.mix,
+            seed=args.seed,
+            transactions=args.transactions
+        )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
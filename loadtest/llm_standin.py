@@ -0,0 +1,371 @@
+"""
+Local stand-in for the LLM backends, for load tests that do not spend quota.
+
+Speaks enough of both upstream APIs for the app's clients:
+
+- Groq/OpenAI `POST /openai/v1/chat/completions` (JSON, or SSE with `stream`),
+  with `x-ratelimit-*` headers when a tokens-per-minute quota is set
+- Ollama `POST /api/generate` (JSON, or NDJSON with `stream`)
+
+Unlike the mock client, calls take time: a sampled time to first token, then
+output at a fixed token rate, so concurrency limits, pacing and streaming
+behave as they would against a real backend. Errors (500) and rate limit
+rejections (429 with retry-after) can be injected at a given rate. Answers
+come from a corpus of `{"match": regex, "response": text or object}` entries
+(first match on the last user message wins); the default corpus returns the
+mock client's canned answers for the app's prompts.
+
+    python -m loadtest.llm_standin --port 9000 --latency lognormal:400,0.5 --token-rate 80 --seed 1
+    APP_ENV=prod GROQ_API_KEY=standin GROQ_BASE_URL=http://localhost:9000 \\
+        OLLAMA_BASE_URL=http://localhost:9000 uvicorn app.main:app --port 8000
+
+Latency specs (milliseconds): `fixed:300`, `uniform:100,900`,
+`lognormal:<median>,<sigma>` or `exp:<mean>`.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Pattern, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.models.fallback_mock import (
+    BUDGET_RESPONSE,
+    GENERAL_RESPONSE,
+    INSIGHTS_RESPONSE,
+    NLU_RESPONSE,
+    PARENT_RESPONSE,
+    SALARIED_RESPONSE,
+    STUDENT_RESPONSE,
+)
+from app.models.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Keyed on phrases from app/services/prompt_templates.py
+DEFAULT_CORPUS = [
+    {"match": "spending analysis assistant", "response": INSIGHTS_RESPONSE},
+    {"match": "financial analysis assistant", "response": BUDGET_RESPONSE},
+    {"match": "natural language understanding assistant", "response": NLU_RESPONSE},
+    {"match": "running summary", "response": {"summary": "The user asked for budgeting and savings advice."}},
+    {"match": '"persona_context": "student"', "response": STUDENT_RESPONSE},
+    {"match": '"persona_context": "parent"', "response": PARENT_RESPONSE},
+    {"match": '"persona_context": "salaried"', "response": SALARIED_RESPONSE},
+    {"match": "", "response": GENERAL_RESPONSE},
+]
+
+
+class LatencyDistribution:
+    """Samples delays in seconds from a spec such as "lognormal:400,0.5" (milliseconds)."""
+
+    KINDS = ("fixed", "uniform", "lognormal", "exp")
+
+    def __init__(self, spec: str):
+        kind, _, args = spec.partition(":")
+        try:
+            params = [float(value) for value in args.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exp": 1}.get(kind)
+        if expected is None or len(params) != expected:
+            raise ValueError(f"Invalid latency spec: {spec!r} (use one of {', '.join(self.KINDS)})")
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            ms = median * math.exp(rng.gauss(0.0, sigma))
+        else:
+            ms = rng.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, ms) / 1000
+
+
+@dataclass
+class StandInConfig:
+    """Behaviour of the stand-in server."""
+    latency: LatencyDistribution = field(default_factory=lambda: LatencyDistribution("fixed:0"))
+    token_rate: float = 0.0  # output tokens per second; 0 sends the whole answer at once
+    chunk_tokens: int = 4  # tokens per streamed chunk
+    error_rate: float = 0.0  # share of calls answered with a 500
+    rate_limit_rate: float = 0.0  # share of calls answered with a 429
+    retry_after: float = 1.0  # seconds, sent with injected and quota 429s
+    tokens_per_minute: int = 0  # quota reported in x-ratelimit-* headers and enforced; 0 = unlimited
+    corpus: List[Dict[str, Any]] = field(default_factory=lambda: list(DEFAULT_CORPUS))
+    seed: Optional[int] = None
+
+
+class StandIn:
+    """Shared state of a stand-in server: RNG, corpus, quota and call counts."""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.corpus: List[Tuple[Pattern[str], str]] = [
+            (re.compile(entry["match"]), _as_text(entry["response"])) for entry in config.corpus
+        ]
+        self.calls: Dict[str, int] = {"ok": 0, "error": 0, "rate_limited": 0}
+        self._quota_used: List[Tuple[float, int]] = []
+
+    def respond(self, prompt: str) -> str:
+        """Answer text for a prompt (empty when no corpus entry matches)."""
+        for pattern, text in self.corpus:
+            if pattern.search(prompt):
+                return text
+        return ""
+
+    def inject(self) -> Optional[str]:
+        """Fault to inject for the next call: "error", "rate_limited" or None."""
+        roll = self.rng.random()
+        if roll < self.config.error_rate:
+            return "error"
+        if roll < self.config.error_rate + self.config.rate_limit_rate:
+            return "rate_limited"
+        return None
+
+    def consume_quota(self, tokens: int) -> Optional[Dict[str, str]]:
+        """
+        Charge a call against the tokens-per-minute quota.
+
+        Returns:
+            The x-ratelimit-* headers to send, or None if the quota is exhausted
+        """
+        limit = self.config.tokens_per_minute
+        if limit <= 0:
+            return {}
+        now = time.monotonic()
+        self._quota_used = [(at, used) for at, used in self._quota_used if now - at < 60]
+        used = sum(spent for _, spent in self._quota_used)
+        if used + tokens > limit and self._quota_used:
+            return None
+        self._quota_used.append((now, tokens))
+        reset = 60 - (now - self._quota_used[0][0])
+        return {
+            "x-ratelimit-limit-tokens": str(limit),
+            "x-ratelimit-remaining-tokens": str(max(0, limit - used - tokens)),
+            "x-ratelimit-reset-tokens": f"{reset:.2f}s",
+        }
+
+    def chunks(self, text: str) -> List[str]:
+        size = max(1, self.config.chunk_tokens * CHARS_PER_TOKEN)
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def chunk_delay(self) -> float:
+        rate = self.config.token_rate
+        return self.config.chunk_tokens / rate if rate > 0 else 0.0
+
+    def generation_time(self, text: str) -> float:
+        rate = self.config.token_rate
+        return estimate_tokens(text) / rate if rate > 0 else 0.0
+
+
+def _as_text(response: Any) -> str:
+    return response if isinstance(response, str) else json.dumps(response)
+
+
+def _error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": "standin_error"}}, status_code=status, headers=headers)
+
+
+def create_app(config: Optional[StandInConfig] = None) -> FastAPI:
+    """Build the stand-in ASGI app."""
+    standin = StandIn(config or StandInConfig())
+    app = FastAPI(title="LLM stand-in")
+    app.state.standin = standin
+
+    def admit(prompt: str, max_tokens: int) -> Tuple[Optional[JSONResponse], Dict[str, str]]:
+        """Apply fault injection and the quota; returns an error response or the quota headers."""
+        fault = standin.inject()
+        retry_after = {"retry-after": f"{standin.config.retry_after:g}"}
+        if fault == "error":
+            standin.calls["error"] += 1
+            return _error(500, "Injected server error"), {}
+        if fault == "rate_limited":
+            standin.calls["rate_limited"] += 1
+            return _error(429, "Injected rate limit", retry_after), {}
+        headers = standin.consume_quota(estimate_tokens(prompt) + max_tokens)
+        if headers is None:
+            standin.calls["rate_limited"] += 1
+            return _error(429, "Tokens per minute quota exhausted", retry_after), {}
+        standin.calls["ok"] += 1
+        return None, headers
+
+    @app.post("/openai/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        model = body.get("model", "standin")
+        rejected, headers = admit(prompt, int(body.get("max_tokens") or 512))
+        if rejected is not None:
+            return rejected
+
+        text = standin.respond(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        first_token = standin.config.latency.sample(standin.rng)
+
+        if not body.get("stream"):
+            generation = standin.generation_time(text)
+            await asyncio.sleep(first_token + generation)
+            completion_tokens = estimate_tokens(text)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "system_fingerprint": "fp_standin",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_time": round(first_token, 4),
+                    "completion_time": round(generation, 4),
+                    "total_time": round(first_token + generation, 4),
+                },
+            }, headers=headers)
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str]) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "system_fingerprint": "fp_standin",
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        async def sse() -> AsyncIterator[str]:
+            await asyncio.sleep(first_token)
+            for i, piece in enumerate(standin.chunks(text)):
+                if i:
+                    await asyncio.sleep(standin.chunk_delay())
+                yield event({"role": "assistant", "content": piece}, None)
+            yield event({"role": "assistant", "content": ""}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream", headers=headers)
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt", "")
+        model = body.get("model", "standin")
+        options = body.get("options") or {}
+        rejected, _ = admit(prompt, int(options.get("num_predict") or 512))
+        if rejected is not None:
+            return rejected
+
+        text = standin.respond(prompt)
+        first_token = standin.config.latency.sample(standin.rng)
+
+        def done_fields(duration: float) -> Dict[str, Any]:
+            return {
+                "done": True,
+                "total_duration": int(duration * 1e9),
+                "prompt_eval_count": estimate_tokens(prompt),
+                "eval_count": estimate_tokens(text),
+            }
+
+        if not body.get("stream", True):
+            generation = standin.generation_time(text)
+            await asyncio.sleep(first_token + generation)
+            return JSONResponse({
+                "model": model,
+                "created_at": _ollama_time(),
+                "response": text,
+                **done_fields(first_token + generation),
+            })
+
+        async def ndjson() -> AsyncIterator[str]:
+            started = time.perf_counter()
+            await asyncio.sleep(first_token)
+            for i, piece in enumerate(standin.chunks(text)):
+                if i:
+                    await asyncio.sleep(standin.chunk_delay())
+                line = {"model": model, "created_at": _ollama_time(), "response": piece, "done": False}
+                yield json.dumps(line) + "\n"
+            final = {"model": model, "created_at": _ollama_time(), "response": ""}
+            yield json.dumps({**final, **done_fields(time.perf_counter() - started)}) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    @app.get("/openai/v1/models")
+    @app.get("/v1/models")
+    async def models():
+        """Model list, as used by health checks."""
+        return {"object": "list", "data": [{"id": "standin", "object": "model"}]}
+
+    @app.get("/stats")
+    async def stats():
+        """Calls answered so far, by outcome."""
+        return dict(standin.calls)
+
+    return app
+
+
+def _ollama_time() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Read a corpus file: a JSON list of {"match": regex, "response": text or object}."""
+    with open(path, encoding="utf-8") as f:
+        corpus = json.load(f)
+    if not isinstance(corpus, list) or not all(isinstance(e, dict) and "response" in e for e in corpus):
+        raise ValueError(f"{path}: expected a list of {{\"match\", \"response\"}} objects")
+    return [{"match": entry.get("match", ""), "response": entry["response"]} for entry in corpus]
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="lognormal:400,0.5", help="time to first token distribution (ms)")
+    parser.add_argument("--token-rate", type=float, default=80.0, help="output tokens per second (0 = instant)")
+    parser.add_argument("--chunk-tokens", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--tpm", type=int, default=0, help="tokens-per-minute quota (0 = unlimited)")
+    parser.add_argument("--corpus", help="JSON corpus file (default: the mock client's answers)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        latency=LatencyDistribution(args.latency),
+        token_rate=args.token_rate,
+        chunk_tokens=args.chunk_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        tokens_per_minute=args.tpm,
+        corpus=load_corpus(args.corpus) if args.corpus else list(DEFAULT_CORPUS),
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
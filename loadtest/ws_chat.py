@@ -0,0 +1,107 @@
+"""
+Load test for the /ws/chat streaming endpoint.
+
+Run the API in local mode with a per-chunk mock delay so streaming behaves
+like a real backend, then drive it with concurrent connections:
+
+    MOCK_STREAM_DELAY_MS=20 uvicorn app.main:app --port 8000
+    python -m loadtest.ws_chat --url ws://localhost:8000/ws/chat --connections 50 --conversations 4
+
+Reports time to first frame, total latency percentiles, frames per answer,
+and the share of conversations cancelled mid-stream (--cancel-ratio).
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Dict
+
+import websockets
+
+from loadtest.common import percentile
+
+QUESTIONS = [
+    ("How can I build an emergency fund?", "student"),
+    ("Should I pay off debt or invest?", "salaried"),
+    ("How do I save for my kids' college?", "parent"),
+    ("How do I budget with irregular income?", "freelancer"),
+    ("What is the 50/30/20 rule?", None),
+]
+
+
+async def run_connection(url: str, conversations: int, rounds: int, cancel_ratio: float, stats: Dict) -> None:
+    """Run `rounds` batches of concurrent conversations over one WebSocket."""
+    async with websockets.connect(url, max_size=None) as ws:
+        for round_index in range(rounds):
+            started: Dict[str, float] = {}
+            first_frame: Dict[str, float] = {}
+            frames: Dict[str, int] = {}
+            to_cancel = set()
+
+            for i in range(conversations):
+                conversation_id = f"r{round_index}-c{i}"
+                prompt, persona = random.choice(QUESTIONS)
+                started[conversation_id] = time.perf_counter()
+                frames[conversation_id] = 0
+                if random.random() < cancel_ratio:
+                    to_cancel.add(conversation_id)
+                await ws.send(json.dumps(
+                    {"type": "start", "id": conversation_id, "prompt": prompt, "persona": persona}
+                ))
+
+            pending = set(started)
+            while pending:
+                message = json.loads(await ws.recv())
+                conversation_id = message.get("id")
+                now = time.perf_counter()
+                if message["type"] == "delta":
+                    frames[conversation_id] += 1
+                    if conversation_id not in first_frame:
+                        first_frame[conversation_id] = now - started[conversation_id]
+                        if conversation_id in to_cancel:
+                            await ws.send(json.dumps({"type": "cancel", "id": conversation_id}))
+                    continue
+
+                pending.discard(conversation_id)
+                stats[message["type"]] = stats.get(message["type"], 0) + 1
+                if message["type"] == "done":
+                    stats["latency"].append(now - started[conversation_id])
+                    stats["frames"].append(frames[conversation_id])
+                if conversation_id in first_frame:
+                    stats["ttff"].append(first_frame[conversation_id])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/ws/chat")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=2, help="concurrent conversations per connection")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--cancel-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stats = {"latency": [], "ttff": [], "frames": []}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_connection(args.url, args.conversations, args.rounds, args.cancel_ratio, stats)
+        for _ in range(args.connections)
+    ])
+    elapsed = time.perf_counter() - start
+
+    completed = stats.get("done", 0)
+    print(f"conversations: done={completed} cancelled={stats.get('cancelled', 0)} errors={stats.get('error', 0)}")
+    print(f"throughput: {completed / elapsed:.1f} answers/s over {elapsed:.2f}s")
+    for name in ("ttff", "latency"):
+        values = stats[name]
+        print(
+            f"{name}: p50={percentile(values, 50) * 1000:.1f}ms "
+            f"p95={percentile(values, 95) * 1000:.1f}ms p99={percentile(values, 99) * 1000:.1f}ms"
+        )
+    if stats["frames"]:
+        print(f"frames per answer: mean={statistics.mean(stats['frames']):.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
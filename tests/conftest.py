@@ -1,6 +1,27 @@
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def reset_semantic_cache():
+    """Start every test with empty caches and no warm-up history."""
+    from app.services.cache_store import reset_cache_store
+    from app.services.health import reset_prober
+    from app.services.prompt_stats import reset_prompt_stats
+    from app.services.semantic_cache import reset_semantic_cache
+    from app.services.warm_start import reset_warm_start
+    reset_cache_store()
+    reset_semantic_cache()
+    reset_prompt_stats()
+    reset_warm_start()
+    reset_prober()
+    yield
+    reset_semantic_cache()
+    reset_cache_store()
+    reset_prompt_stats()
+    reset_warm_start()
+    reset_prober()
+
+
 @pytest.fixture
 def mock_llm_client():
     """Fixture that provides a mock LLM client for testing."""
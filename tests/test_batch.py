@@ -0,0 +1,99 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from app.batch import find_inputs, run_batch
+from app.main import app
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from benchmarks.microbench import encode_columns, make_transactions
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+@pytest.fixture
+def users(tmp_path):
+    directory = tmp_path / "users"
+    directory.mkdir()
+    for i in range(6):
+        rows = make_transactions(40, seed=i)
+        (directory / f"user{i}.json").write_text(json.dumps(encode_columns(rows) if i % 2 else {"transactions": rows}))
+    (directory / "broken.json").write_text('{"transactions": [{"category": "Food"}]}')
+    (directory / "notes.txt").write_text("not an input")
+    return directory
+
+
+def read_output(path):
+    return {record["user_id"]: record for record in map(json.loads, path.read_text().splitlines())}
+
+
+@pytest.mark.asyncio
+async def test_batch_writes_one_line_per_user(users, tmp_path):
+    out = tmp_path / "insights.ndjson"
+    summary = await run_batch([str(users)], str(out), workers=1, concurrency=2)
+    assert (summary.total, summary.succeeded, summary.failed, summary.skipped) == (7, 6, 1, 0)
+
+    records = read_output(out)
+    assert len(out.read_text().splitlines()) == len(records) == 7
+    assert "transactions.0.amount: Field required" in records["broken"]["error"]
+    client = TestClient(app)
+    for i in range(6):
+        body = json.loads((users / f"user{i}.json").read_text())
+        assert records[f"user{i}"]["insights"] == client.post("/api/spending-insights", json=body).json()
+
+
+@pytest.mark.asyncio
+async def test_batch_resumes_from_partial_output(users, tmp_path):
+    out = tmp_path / "insights.ndjson"
+    with ThreadPoolExecutor(2) as executor:
+        await run_batch([str(users)], str(out), executor=executor)
+        complete = read_output(out)
+
+        # A crash mid-write leaves a partial last line; failed users are retried
+        lines = [line for line in out.read_text().splitlines() if '"user2"' not in line and '"user4"' not in line]
+        out.write_text("\n".join(lines) + '\n{"user_id": "user2", "insi')
+        summary = await run_batch([str(users)], str(out), executor=executor)
+        assert (summary.skipped, summary.succeeded, summary.failed) == (4, 2, 1)
+        assert read_output(out) == complete
+        assert len(out.read_text().splitlines()) == 7
+
+        summary = await run_batch([str(users)], str(out), executor=executor, restart=True)
+        assert (summary.skipped, summary.succeeded) == (0, 6)
+    assert len(out.read_text().splitlines()) == 7
+
+
+class UnavailableClient(FallbackMockClient):
+    """Mock client whose upstream is down."""
+
+    async def generate(self, prompt, **kwargs):
+        raise RuntimeError("upstream unavailable")
+
+
+@pytest.mark.asyncio
+async def test_llm_outage_is_retried_on_resume(users, tmp_path, monkeypatch):
+    """Users whose LLM call failed are not checkpointed with fallback insights."""
+    out = tmp_path / "insights.ndjson"
+    with ThreadPoolExecutor(2) as executor:
+        monkeypatch.setattr("app.batch.get_llm_client", lambda purpose: UnavailableClient())
+        summary = await run_batch([str(users)], str(out), executor=executor)
+        assert (summary.succeeded, summary.failed) == (0, 7)
+        assert read_output(out)["user0"]["error"] == "Insights failed: upstream unavailable"
+
+        monkeypatch.undo()
+        summary = await run_batch([str(users)], str(out), executor=executor)
+        assert (summary.skipped, summary.succeeded, summary.failed) == (0, 6, 1)
+    assert all("insights" in read_output(out)[f"user{i}"] for i in range(6))
+
+
+def test_duplicate_user_ids_are_rejected(users, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "user1.json").write_text("{}")
+    assert len(find_inputs([str(users)])) == 7
+    with pytest.raises(ValueError, match="Duplicate user id user1"):
+        find_inputs([str(users), str(other / "user1.json")])
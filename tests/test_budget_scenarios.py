@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.services.analytics import summarize_budget
+from app.services.budget_service import BudgetService
+from app.services.scenarios import build_changes, evaluate_scenarios
+
+INCOME = {"Salary": 5000.0, "Freelance": 500.0}
+EXPENSES = {"Rent": 1500.0, "Dining": 400.0, "Groceries": 350.0, "Fun": 150.0}
+CATEGORIES = [*EXPENSES, *INCOME]
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+def test_vectorized_figures_match_summarize_budget():
+    scenarios = [{}, {"Dining": -0.2, "Rent": 0.05}, {"Freelance": -1.0, "Fun": 0.5}]
+    results = evaluate_scenarios(INCOME, EXPENSES, build_changes(CATEGORIES, scenarios), 10_000, 2_000)
+    for i, changes in enumerate(scenarios):
+        income = {name: amount * (1 + changes.get(name, 0)) for name, amount in INCOME.items()}
+        expenses = {name: amount * (1 + changes.get(name, 0)) for name, amount in EXPENSES.items()}
+        expected = summarize_budget(income, expenses)
+        scenario = results.scenario(i)
+        assert scenario["changes"] == changes
+        assert scenario["total_expenses"] == pytest.approx(expected.total_expenses)
+        assert scenario["savings_rate"] == pytest.approx(expected.savings_rate)
+        assert scenario["category_percentages"] == pytest.approx(expected.category_percentages)
+        assert scenario["months_to_goal"] == int(np.ceil(8_000 / expected.savings))
+
+
+def test_grid_expands_to_every_combination_and_ranks():
+    grid = {"Dining": [-0.5, -0.25, 0.0], "Fun": [-0.5, 0.0], "Rent": [0.0, 0.1]}
+    changes = build_changes(CATEGORIES, [{"Dining": -0.5, "Fun": -0.5}], grid)
+    assert changes.shape == (13, len(CATEGORIES))
+    assert len({tuple(row) for row in changes[1:]}) == 12
+
+    results = evaluate_scenarios(INCOME, EXPENSES, changes)
+    best = [results.scenario(i)["changes"] for i in results.rank("savings_rate", 2)]
+    # Equal figures: the explicit scenario comes first, then the next best grid point
+    assert best == [{"Dining": -0.5, "Fun": -0.5}, {"Dining": -0.5, "Fun": -0.5}]
+    assert results.rank("savings_rate", 3)[2] != 0
+
+
+def test_goal_edge_cases():
+    results = evaluate_scenarios({"Salary": 1000.0}, {"Rent": 1000.0}, build_changes(["Rent", "Salary"], [{}]), 500)
+    assert results.scenario(0)["months_to_goal"] is None
+    results = evaluate_scenarios({}, {"Rent": 1000.0}, build_changes(["Rent"], [{}]), 500, current_savings=600)
+    assert results.scenario(0)["months_to_goal"] == 0
+    assert results.scenario(0)["savings_rate"] == 0
+
+
+@pytest.mark.parametrize("scenarios, grid, message", [
+    ([{"Travel": 0.1}], None, "Unknown category"),
+    ([{"Rent": -1.5}], None, "at least -1"),
+    ([], {"Rent": [0.0] * 300, "Dining": [0.0] * 300}, "at most"),
+])
+def test_invalid_changes(scenarios, grid, message):
+    with pytest.raises(ValueError, match=message):
+        build_changes(CATEGORIES, scenarios, grid, max_count=50_000)
+
+
+@pytest.mark.asyncio
+async def test_only_best_scenarios_reach_the_llm(mock_llm_client):
+    prompts = []
+    generate = mock_llm_client.generate
+
+    async def recording_generate(prompt, **kwargs):
+        prompts.append(prompt)
+        return await generate(prompt, **kwargs)
+    mock_llm_client.generate = recording_generate
+
+    grid = {"Dining": list(np.linspace(-0.5, 0, 21)), "Fun": list(np.linspace(-0.5, 0, 21))}
+    result = await BudgetService(mock_llm_client).compare_scenarios(INCOME, EXPENSES, grid=grid, top_n=3)
+    assert result["evaluated"] == 441
+    assert len(prompts) == 1
+    assert [s["description"] for s in result["scenarios"]] == [
+        "Dining -50%, Fun -50%", "Dining -50%, Fun -48%", "Dining -50%, Fun -45%"
+    ]
+    assert all(s["description"] in prompts[0] and s["commentary"].startswith(s["description"])
+               for s in result["scenarios"])
+    assert result["baseline"]["savings"] == 3100.0
+
+
+def test_endpoint():
+    client = TestClient(app)
+    body = {
+        "income": INCOME,
+        "expenses": EXPENSES,
+        "scenarios": [{"Dining": -0.2, "Rent": 0.05}],
+        "savings_goal": 10_000,
+        "rank_by": "months_to_goal",
+    }
+    response = client.post("/api/budget-scenarios", json=body)
+    assert response.status_code == 200
+    scenario = response.json()["scenarios"][0]
+    assert scenario["description"] == "Rent +5%, Dining -20%"
+    assert scenario["months_to_goal"] == 4
+
+    assert client.post("/api/budget-scenarios", json={**body, "scenarios": [{"Travel": 0.1}]}).status_code == 422
+    assert client.post("/api/budget-scenarios", json={**body, "scenarios": []}).status_code == 422
+    assert client.post("/api/budget-scenarios", json={**body, "savings_goal": None}).status_code == 422
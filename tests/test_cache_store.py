@@ -0,0 +1,132 @@
+import sqlite3
+import subprocess
+import sys
+import time
+import pytest
+from app.config import settings
+from app.models.fallback_mock import FallbackMockClient
+from app.services.cache_store import InMemoryCacheStore, SQLiteCacheStore, get_cache_store
+from app.services.insights_service import InsightsService
+from app.services.semantic_cache import SemanticCache, get_semantic_cache
+
+
+class CountingClient(FallbackMockClient):
+    """Mock client that counts generate calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return await super().generate(prompt, **kwargs)
+
+
+def make_store(kind, tmp_path, **kwargs):
+    if kind == "sqlite":
+        return SQLiteCacheStore(str(tmp_path / "cache.db"), **kwargs)
+    return InMemoryCacheStore(**kwargs)
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_ttl_and_bounded_eviction(kind, tmp_path, monkeypatch):
+    """Entries expire after their TTL; the least recently used go first beyond the bounds."""
+    monkeypatch.setattr("app.services.cache_store.TOUCH_INTERVAL_SECONDS", 0.0)
+    store = make_store(kind, tmp_path, max_entries=3, max_bytes=10_000)
+    store.set("ns", "short", {"v": 0}, ttl_seconds=0.05)
+    assert store.get("ns", "short") == {"v": 0}
+    time.sleep(0.1)
+    assert store.get("ns", "short") is None
+
+    for i in range(3):
+        store.set("ns", f"k{i}", {"v": i})
+        time.sleep(0.01)
+    assert store.get("ns", "k0") == {"v": 0}
+    store.set("ns", "k3", {"v": 3})
+    assert store.get("ns", "k1") is None
+    assert [store.get("ns", f"k{i}") for i in (0, 2, 3)] == [{"v": 0}, {"v": 2}, {"v": 3}]
+
+    store.set("other", "a", {"v": "x" * 6_000})
+    store.set("other", "b", {"v": "x" * 6_000})
+    snapshot = store.snapshot()
+    assert snapshot["bytes"] <= 10_000
+    assert store.get("other", "a") is None and store.get("other", "b") is not None
+    assert snapshot["evictions"]["lru"] >= 1 and snapshot["evictions"]["memory"] >= 1
+
+
+def test_sqlite_store_is_shared_across_processes(tmp_path):
+    """A value written by another process is read here, and the totals stay consistent."""
+    path = str(tmp_path / "cache.db")
+    store = SQLiteCacheStore(path, max_entries=50)
+    writer = (
+        "from app.services.cache_store import SQLiteCacheStore\n"
+        f"store = SQLiteCacheStore({path!r}, max_entries=50)\n"
+        "for i in range(100):\n"
+        "    store.set('ns', f'w{i}', {'i': i})\n"
+    )
+    subprocess.run([sys.executable, "-c", writer], check=True, timeout=60)
+    assert store.get("ns", "w99") == {"i": 99}
+    assert store.get("ns", "w0") is None
+    assert store.snapshot()["entries"] == 50
+
+    cursor, changes = store.changes_since("ns", 0)
+    assert len(changes) == 50 and changes[-1][0] == "w99"
+    store.set("ns", "mine", {"i": -1})
+    assert [key for key, _, _ in store.changes_since("ns", cursor)[1]] == ["mine"]
+
+
+def test_sqlite_reads_do_not_wait_for_the_write_lock(tmp_path, monkeypatch):
+    """Hits stay read-only while another worker writes; a blocked write gives up quickly as an error."""
+    monkeypatch.setattr("app.services.cache_store.TOUCH_INTERVAL_SECONDS", 0.0)
+    path = str(tmp_path / "cache.db")
+    store = SQLiteCacheStore(path, busy_timeout_ms=20)
+    store.set("ns", "k", {"v": 1})
+
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    started = time.perf_counter()
+    assert store.get("ns", "k") == {"v": 1}
+    store.set("ns", "k2", {"v": 2})
+    assert time.perf_counter() - started < 1.0
+    assert store.snapshot()["errors"] == 1
+    other.execute("ROLLBACK")
+    other.close()
+
+    store.set("ns", "k2", {"v": 2})
+    assert store.get("ns", "k2") == {"v": 2}
+    assert store.snapshot()["errors"] == 1
+
+
+def test_semantic_cache_shares_entries_between_workers(tmp_path):
+    """A paraphrase hits in a worker that never saw the original question."""
+    path = str(tmp_path / "cache.db")
+    worker_a = SemanticCache(shared=SQLiteCacheStore(path))
+    worker_b = SemanticCache(shared=SQLiteCacheStore(path))
+
+    worker_a.store("How can I save money?", "student", {"answer": "Cook at home."}, tokens=300)
+    hit = worker_b.lookup("ways to save money", "student")
+    assert hit is not None and hit.result["answer"] == "Cook at home."
+    assert worker_b.lookup("ways to save money", "retiree") is None
+    assert len(worker_b) == 1
+
+
+@pytest.mark.asyncio
+async def test_analytics_results_are_reused(tmp_path, monkeypatch, sample_transactions):
+    """Identical insights requests are answered once; other input still reaches the LLM."""
+    monkeypatch.setattr(settings, "cache_backend", "sqlite")
+    monkeypatch.setattr(settings, "cache_sqlite_path", str(tmp_path / "cache.db"))
+    assert get_semantic_cache().shared is get_cache_store()
+
+    client = CountingClient()
+    service = InsightsService(client)
+    first = await service.generate_insights(sample_transactions)
+    assert await service.generate_insights(sample_transactions) == first
+    assert client.calls == 1
+
+    await service.generate_insights(sample_transactions[:2])
+    assert client.calls == 2
+    assert get_cache_store().snapshot()["hits"] == 1
+
+    monkeypatch.setattr(settings, "analytics_cache_enabled", False)
+    await service.generate_insights(sample_transactions)
+    assert client.calls == 3
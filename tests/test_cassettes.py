@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import json
+import time
+import pytest
+from app.config import settings
+from app.models import ModelFactory
+from app.models.cassettes import CassetteMiss, CassetteStore, RecordingLLMClient, ReplayLLMClient, cassette_key
+from app.models.fallback_mock import FallbackMockClient
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path):
+    """Replayed calls return the recorded text, streamed or not, from compressed files."""
+    store = CassetteStore(str(tmp_path))
+    recorder = RecordingLLMClient(FallbackMockClient(chunk_delay=0.02), store)
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+
+    text = await recorder.generate("budget for a student", history=history)
+    stream = await recorder.generate("spending insights", stream=True)
+    streamed = [chunk async for chunk in stream]
+
+    keys = store.keys()
+    assert len(keys) == 2
+    assert cassette_key("budget for a student", history=history) in keys
+    with gzip.open(store.path_for(cassette_key("spending insights")), "rt") as f:
+        cassette = json.load(f)
+    assert cassette["chunks"] == streamed and len(cassette["delays_ms"]) == len(streamed)
+
+    replay = ReplayLLMClient(store, time_scale=0)
+    assert await replay.generate("budget for a student", history=history) == text
+    replayed = await replay.generate("spending insights", stream=True)
+    assert [chunk async for chunk in replayed] == streamed
+    assert await replay.generate("spending insights") == "".join(streamed)
+
+
+@pytest.mark.asyncio
+async def test_replay_timing_is_scaled(tmp_path):
+    """Recorded delays are replayed as recorded, scaled, or skipped."""
+    store = CassetteStore(str(tmp_path))
+    recorder = RecordingLLMClient(FallbackMockClient(chunk_delay=0.01), store)
+    stream = await recorder.generate("student advice", stream=True)
+    chunks = [chunk async for chunk in stream]
+    recorded = sum(store.load(cassette_key("student advice"))["delays_ms"]) / 1000
+    assert recorded >= 0.01 * len(chunks)
+
+    async def replay_time(scale):
+        started = time.perf_counter()
+        replayed = await ReplayLLMClient(store, time_scale=scale).generate("student advice", stream=True)
+        assert [chunk async for chunk in replayed] == chunks
+        return time.perf_counter() - started
+
+    assert await replay_time(1.0) >= recorded * 0.9
+    assert await replay_time(0) < recorded / 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_stream_is_not_recorded(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    recorder = RecordingLLMClient(FallbackMockClient(), store)
+    stream = await recorder.generate("budget", stream=True)
+    await stream.__anext__()
+    await stream.aclose()
+    assert store.keys() == []
+
+
+@pytest.mark.asyncio
+async def test_replay_miss(tmp_path):
+    """A request without a cassette raises, or goes to the fallback client."""
+    store = CassetteStore(str(tmp_path))
+    with pytest.raises(CassetteMiss):
+        await ReplayLLMClient(store).generate("never recorded")
+
+    fallback = FallbackMockClient()
+    replay = ReplayLLMClient(store, fallback=fallback)
+    assert await replay.generate("budget") == await fallback.generate("budget")
+
+
+@pytest.mark.asyncio
+async def test_factory_modes(tmp_path, monkeypatch):
+    """LLM_CASSETTE_MODE routes the factory's clients through the recorder or the replayer."""
+    monkeypatch.setattr(settings, "llm_cassette_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "llm_cassette_mode", "record")
+    recorder = ModelFactory.get_client()
+    assert isinstance(recorder, RecordingLLMClient)
+    answer = await recorder.generate("How do I budget?")
+
+    ModelFactory.reset()
+    monkeypatch.setattr(settings, "llm_cassette_mode", "replay")
+    monkeypatch.setattr(settings, "llm_cassette_time_scale", 0.0)
+    replay = ModelFactory.get_client()
+    assert isinstance(replay, ReplayLLMClient)
+    assert await asyncio.wait_for(replay.generate("How do I budget?"), 1) == answer
@@ -0,0 +1,122 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from app.models.groq_client import GroqClient
+from app.models.tokens import estimate_messages_tokens, estimate_tokens
+from app.services.chat_memory import (
+    ChatMemory,
+    ChatSession,
+    InMemorySessionStore,
+    SQLiteSessionStore,
+    reset_chat_memory,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Reset factory and chat memory singletons around each test."""
+    ModelFactory.reset()
+    reset_chat_memory()
+    yield
+    ModelFactory.reset()
+    reset_chat_memory()
+
+
+@pytest.fixture
+def memory():
+    """Chat memory keeping two exchanges verbatim."""
+    return ChatMemory(InMemorySessionStore(ttl_seconds=60), history_turns=2, token_budget=2000)
+
+
+@pytest.mark.asyncio
+async def test_history_keeps_recent_turns(memory):
+    """Only the last N exchanges are sent verbatim."""
+    client = FallbackMockClient()
+    for i in range(4):
+        memory.record_exchange("s1", f"question {i}", f"answer {i}", client)
+    await memory.drain()
+
+    history = memory.get_history("s1", "next question")
+    contents = [m["content"] for m in history if m["role"] != "system"]
+    assert contents == ["question 2", "answer 2", "question 3", "answer 3"]
+
+
+@pytest.mark.asyncio
+async def test_older_turns_are_summarized(memory):
+    """Turns beyond the window are folded into a summary in the background."""
+    client = FallbackMockClient()
+    for i in range(3):
+        memory.record_exchange("s1", f"question {i}", f"answer {i}", client)
+    await memory.drain()
+
+    session = memory.store.get("s1")
+    assert len(session.turns) == 4
+    assert "question 0" in session.summary
+
+    history = memory.get_history("s1", "next question")
+    assert history[0]["role"] == "system"
+    assert "question 0" in history[0]["content"]
+
+
+def test_history_respects_token_budget():
+    """History is trimmed so prompt plus history stays within the budget."""
+    store = InMemorySessionStore(ttl_seconds=60)
+    memory = ChatMemory(store, history_turns=10, token_budget=300)
+    session = ChatSession(session_id="s1")
+    for i in range(10):
+        session.turns.append({"role": "user", "content": "q" * 200})
+        session.turns.append({"role": "assistant", "content": "a" * 200})
+    store.save(session)
+
+    prompt = "p" * 400
+    history = memory.get_history("s1", prompt)
+    assert history
+    assert estimate_tokens(prompt) + estimate_messages_tokens(history) <= 300
+    assert history[0]["role"] == "user"
+
+
+def test_in_memory_store_expires_sessions():
+    """Sessions past their TTL are dropped."""
+    store = InMemorySessionStore(ttl_seconds=60)
+    session = ChatSession(session_id="s1")
+    store.save(session)
+    session.updated_at -= 120
+    assert store.get("s1") is None
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    """The SQLite backend persists turns and summaries."""
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path, ttl_seconds=60)
+    store.save(ChatSession(session_id="s1", turns=[{"role": "user", "content": "hi"}], summary="s"))
+
+    restored = SQLiteSessionStore(path, ttl_seconds=60).get("s1")
+    assert restored.turns == [{"role": "user", "content": "hi"}]
+    assert restored.summary == "s"
+
+
+def test_groq_messages_carry_history(monkeypatch):
+    """Groq requests send real chat history between the system and user messages."""
+    monkeypatch.setattr(settings, "groq_api_key", "test-key")
+    history = [{"role": "user", "content": "I earn $3000"}, {"role": "assistant", "content": "Noted"}]
+
+    messages = GroqClient()._build_messages("How much should I save?", history)
+
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[1]["content"] == "I earn $3000"
+    assert messages[-1]["content"] == "How much should I save?"
+
+
+def test_generate_endpoint_multi_turn():
+    """Session-backed chat sends prior turns with later requests."""
+    with TestClient(app) as client:
+        payload = {"prompt": "I earn $3000 a month", "persona": "student", "session_id": "abc"}
+        first = client.post("/api/generate", json=payload).json()
+        second = client.post("/api/generate", json={**payload, "prompt": "How much should I save?"}).json()
+
+    assert first["meta"]["history_messages"] == 0
+    assert second["meta"]["history_messages"] == 2
+    assert second["meta"]["session_id"] == "abc"
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.models import ModelFactory
+from app.services.streaming import coalesce_chunks, JSONFieldStreamer
+
+
+@pytest.fixture(autouse=True)
+def reset_model_factory(monkeypatch):
+    """Reset model factory and stream every answer from the LLM."""
+    monkeypatch.setattr(settings, "retrieval_enabled", False)
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+async def _chunks(parts, delay=0.0):
+    for part in parts:
+        if delay:
+            await asyncio.sleep(delay)
+        yield part
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_by_size():
+    """Small chunks are merged into frames of at least max_chars."""
+    frames = [f async for f in coalesce_chunks(_chunks(["ab"] * 10), max_chars=6, max_delay=10)]
+    assert "".join(frames) == "ab" * 10
+    assert frames[0] == "abababab"[:6]
+    assert len(frames) == 4
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_by_time():
+    """A slow upstream still produces frames once max_delay elapses."""
+    frames = [f async for f in coalesce_chunks(_chunks(["a", "b", "c"], delay=0.03), max_chars=1000, max_delay=0.01)]
+    assert frames == ["a", "b", "c"]
+
+
+def test_json_field_streamer_handles_split_escapes():
+    """The answer text is decoded incrementally, even across chunk boundaries."""
+    raw = json.dumps({"answer": 'Save "20%"\nof pay é', "confidence": 0.9})
+    streamer = JSONFieldStreamer("answer")
+    text = "".join(streamer.feed(raw[i:i + 3]) for i in range(0, len(raw), 3))
+    assert text == 'Save "20%"\nof pay é'
+    assert streamer.finished
+
+
+def test_ws_chat_streams_answer():
+    """Deltas reassemble into the final answer."""
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "start", "id": "c1", "prompt": "How do I save?", "persona": "student"})
+            deltas = []
+            while True:
+                message = ws.receive_json()
+                if message["type"] == "delta":
+                    deltas.append(message["text"])
+                else:
+                    break
+
+    assert message["type"] == "done"
+    assert message["id"] == "c1"
+    assert "".join(deltas) == message["answer"]
+    assert message["meta"]["persona"] == "student"
+
+
+def test_ws_chat_rejects_bad_frames_without_closing():
+    """Malformed JSON and out-of-range max_tokens get error frames; the connection stays usable."""
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_text("{not json")
+            assert ws.receive_json() == {"type": "error", "id": None, "detail": "Malformed message: expected JSON"}
+            ws.send_json({"type": "start", "id": "big", "prompt": "How do I save?", "max_tokens": 10 ** 6})
+            error = ws.receive_json()
+            assert error["type"] == "error" and error["id"] == "big" and "max_tokens" in error["detail"]
+
+            ws.send_json({"type": "start", "id": "ok", "prompt": "How do I save?"})
+            while (message := ws.receive_json())["type"] == "delta":
+                pass
+    assert message["type"] == "done"
+
+
+def test_ws_chat_cancel_and_concurrency(monkeypatch):
+    """Conversations run concurrently and one can be cancelled mid-stream."""
+    monkeypatch.setattr(settings, "mock_stream_delay_ms", 20)
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "start", "id": "slow", "prompt": "How do I invest?"})
+            ws.send_json({"type": "start", "id": "fast", "prompt": "How do I save?", "persona": "parent"})
+            ws.send_json({"type": "cancel", "id": "slow"})
+
+            finished = {}
+            while len(finished) < 2:
+                message = ws.receive_json()
+                if message["type"] != "delta":
+                    finished[message["id"]] = message["type"]
+
+    assert finished == {"slow": "cancelled", "fast": "done"}
+
+
+def test_ws_chat_cancel_closes_upstream_stream(monkeypatch):
+    """Cancelling mid-stream closes the client's token stream."""
+    from app.models.fallback_mock import FallbackMockClient
+
+    closed = []
+
+    class TrackingClient(FallbackMockClient):
+        async def _stream_response(self, response):
+            try:
+                for i in range(0, len(response), 5):
+                    await asyncio.sleep(0.01)
+                    yield response[i:i + 5]
+            finally:
+                closed.append(True)
+
+    monkeypatch.setattr(settings, "ws_frame_max_delay_ms", 1)
+    with TestClient(app) as client:
+        ModelFactory._mock_instance = TrackingClient()
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "start", "id": "c1", "prompt": "How do I save?", "persona": "student"})
+            assert ws.receive_json()["type"] == "delta"
+            ws.send_json({"type": "cancel", "id": "c1"})
+            message = ws.receive_json()
+            while message["type"] == "delta":
+                message = ws.receive_json()
+
+    assert message == {"type": "cancelled", "id": "c1"}
+    assert closed == [True]
@@ -0,0 +1,70 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.services.analytics import TransactionColumns, summarize_transactions
+from app.services.prompt_templates import get_spending_insights_prompt
+from benchmarks.microbench import encode_columns, make_transactions
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+def test_columns_summarize_and_render_like_rows():
+    rows = make_transactions(500) + [{"category": "Gifts", "amount": 0.0, "date": "2024-02-01",
+                                      "merchant": "", "description": "it's \"quoted\""}]
+    columns = TransactionColumns.from_wire(encode_columns(rows)["columns"])
+
+    aggregates = summarize_transactions(rows)
+    assert summarize_transactions(columns) == aggregates
+    assert aggregates.category_totals["Gifts"] == 0
+    assert get_spending_insights_prompt(columns, aggregates) == get_spending_insights_prompt(rows, aggregates)
+
+
+def test_repeated_and_unused_dictionary_values():
+    columns = TransactionColumns(
+        amounts=[10.0, -5.0, 30.0],
+        dates=["2024-01-01"] * 3,
+        categories=["Food", "Unused", "Food"],
+        category_codes=[0, 2, 0],
+    )
+    aggregates = summarize_transactions(columns)
+    assert aggregates.category_totals == {"Food": 45.0}
+    assert aggregates.small_transaction_count == 2
+    assert "'merchant': ''" in get_spending_insights_prompt(columns)
+
+
+def test_endpoint_accepts_either_encoding(sample_transactions):
+    client = TestClient(app)
+    by_rows = client.post("/api/spending-insights", json={"transactions": sample_transactions})
+    by_columns = client.post("/api/spending-insights", json=encode_columns(sample_transactions))
+    assert by_rows.status_code == by_columns.status_code == 200
+    assert by_columns.json() == by_rows.json()
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"transactions": [], "columns": {"amounts": [], "dates": [], "categories": {"values": [], "codes": []}}},
+    {"columns": {"amounts": [1.0], "dates": [], "categories": {"values": ["Food"], "codes": [0]}}},
+    {"columns": {"amounts": [1.0], "dates": ["2024-01-01"], "categories": {"values": ["Food"], "codes": [1]}}},
+    {"columns": {"amounts": [1.0], "dates": ["2024-01-01"], "categories": {"values": ["Food"], "codes": [0]},
+                 "merchants": {"values": ["Shop"], "codes": []}}},
+])
+def test_invalid_columns_are_rejected(body):
+    assert TestClient(app).post("/api/spending-insights", json=body).status_code == 422
+
+
+def test_columnar_job(sample_transactions):
+    with TestClient(app) as client:
+        expected = client.post("/api/spending-insights", json={"transactions": sample_transactions}).json()
+        submission = client.post("/api/jobs/spending-insights", json=encode_columns(sample_transactions)).json()
+        deadline = time.monotonic() + 5
+        while (job := client.get(submission["status_url"]).json())["status"] != "succeeded":
+            assert job["status"] != "failed" and time.monotonic() < deadline
+            time.sleep(0.02)
+        assert job["result"] == expected
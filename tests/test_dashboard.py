@@ -0,0 +1,99 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from app.services.dashboard_service import DashboardService
+
+INCOME = {"Salary": 5000}
+EXPENSES = {"Rent": 1500, "Food": 500}
+TRANSACTIONS = [
+    {"category": "Food", "amount": 300, "date": "2024-01-15"},
+    {"category": "Entertainment", "amount": 100, "date": "2024-01-16"},
+]
+NOTES = ["I spent $500 on groceries", "Got a $2000 bonus"]
+
+
+class SlowMockClient(FallbackMockClient):
+    """Mock client that takes a fixed time per call."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    async def generate(self, prompt, max_tokens=512, stream=False, response_schema=None, history=None):
+        await asyncio.sleep(self.delay)
+        return await super().generate(prompt, max_tokens, stream, response_schema, history)
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+@pytest.mark.asyncio
+async def test_sections_run_concurrently():
+    """Total latency tracks the slowest section, not the sum of all sections."""
+    client = SlowMockClient(0.2)
+    service = DashboardService(client, client, client, deadline_seconds=5)
+
+    started = time.perf_counter()
+    payload = await service.build(INCOME, EXPENSES, TRANSACTIONS, NOTES)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5
+    assert payload["meta"]["timed_out"] == []
+    assert set(payload["meta"]["latency_ms"]) == {"budget", "insights", "nlu"}
+    assert len(payload["nlu"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_aggregates_are_authoritative():
+    """Budget and insights figures come from the shared aggregates."""
+    client = FallbackMockClient()
+    payload = await DashboardService(client, client, client).build(INCOME, EXPENSES, TRANSACTIONS)
+
+    assert payload["aggregates"]["budget"]["total_income"] == 5000
+    assert payload["budget"]["total_expenses"] == 2000
+    assert payload["budget"]["savings_rate"] == pytest.approx(60.0)
+    assert payload["insights"]["top_categories"][0] == {"category": "Food", "amount": 300, "percentage": 75.0}
+    assert payload["nlu"] is None
+
+
+@pytest.mark.asyncio
+async def test_deadline_falls_back_for_slow_sections():
+    """A section still running at the deadline is replaced by its fallback."""
+    fast, slow = FallbackMockClient(), SlowMockClient(5)
+    service = DashboardService(fast, slow, fast, deadline_seconds=0.2)
+
+    started = time.perf_counter()
+    payload = await service.build(INCOME, EXPENSES, TRANSACTIONS, NOTES)
+
+    assert time.perf_counter() - started < 1
+    assert payload["meta"]["timed_out"] == ["insights"]
+    assert payload["insights"]["top_categories"][0]["category"] == "Food"
+    assert payload["insights"]["red_flags"] is not None
+    assert payload["budget"]["total_income"] == 5000
+
+
+def test_dashboard_endpoint_streams_sections():
+    """?stream=true yields NDJSON sections, aggregates first and meta last."""
+    client = TestClient(app)
+    body = {"income": INCOME, "expenses": EXPENSES, "transactions": TRANSACTIONS, "notes": NOTES[:1]}
+
+    response = client.post("/api/dashboard?stream=true", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    sections = [json.loads(line) for line in response.text.splitlines() if line]
+    names = [section["section"] for section in sections]
+    assert names[0] == "aggregates" and names[-1] == "meta"
+    assert set(names) == {"aggregates", "budget", "insights", "nlu", "meta"}
+
+    combined = client.post("/api/dashboard", json=body).json()
+    assert combined["budget"]["total_income"] == 5000
+    assert len(combined["nlu"]) == 1
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.services.analytics import TransactionColumns
+from app.services.chat_service import ChatService
+from app.services.forecast import MonthlyDistribution, forecast_context, forecast_from_history, monthly_totals
+from benchmarks.microbench import encode_columns, make_transactions
+
+HISTORY = [
+    {"category": "Rent", "amount": 1000.0, "date": "2024-01-01"},
+    {"category": "Food", "amount": 300.0, "date": "2024-01-15"},
+    {"category": "Food", "amount": 100.0, "date": "2024-01-28"},
+    {"category": "Rent", "amount": 1000.0, "date": "2024-03-01"},
+]
+FREELANCE_INCOME = [4200.0, 0.0, 6100.0, 3900.0, 5200.0, 2500.0]
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+def test_monthly_totals_fill_gaps():
+    months, totals = monthly_totals(HISTORY)
+    assert months == 3
+    assert totals["Rent"].tolist() == [1000.0, 0.0, 1000.0]
+    assert totals["Food"].tolist() == [400.0, 0.0, 0.0]
+    with pytest.raises(ValueError, match="YYYY-MM"):
+        monthly_totals([{"category": "Rent", "amount": 1.0, "date": "yesterday"}])
+
+
+def test_negative_expense_amounts_count_as_spending():
+    """Bank exports that sign expenses negative forecast the same spending."""
+    signed = [dict(txn, amount=-txn["amount"]) for txn in HISTORY]
+    assert monthly_totals(signed)[1]["Rent"].tolist() == [1000.0, 0.0, 1000.0]
+
+    forecast = forecast_from_history(
+        [{"category": "Rent", "amount": -1400.0, "date": "2024-01-01"}], [3000.0], months=3, paths=10, seed=1
+    )
+    assert forecast.expected_expenses == pytest.approx({"Rent": 1400.0})
+
+
+def test_fit_matches_mean_variance_and_empty_months():
+    fixed = MonthlyDistribution.fit([2500.0])
+    assert (fixed.p_zero, fixed.sigma) == (0.0, 0.0) and fixed.mean == pytest.approx(2500.0)
+
+    fitted = MonthlyDistribution.fit(FREELANCE_INCOME)
+    positive = np.array([v for v in FREELANCE_INCOME if v > 0])
+    assert fitted.p_zero == pytest.approx(1 / 6)
+    assert fitted.mean == pytest.approx(positive.mean() * 5 / 6)
+    draws = np.zeros(200_000)
+    fitted.sample_into(draws, np.random.default_rng(0))
+    assert (draws == 0).mean() == pytest.approx(1 / 6, abs=0.01)
+    assert draws[draws > 0].std() == pytest.approx(positive.std(ddof=1), rel=0.05)
+
+    assert MonthlyDistribution.fit([0.0, -5.0]).mean == 0.0
+
+
+def test_deterministic_history_gives_exact_bands():
+    forecast = forecast_from_history(
+        HISTORY, [3000.0], starting_balance=500.0, months=12, paths=200, savings_goal=10_000.0, seed=1
+    )
+    # Rent 1000 in 2 of 3 months, food 400 in 1 of 3: expected spending 800 a month
+    assert forecast.expected_expenses == pytest.approx({"Rent": 2000 / 3, "Food": 400 / 3})
+    assert forecast.expected_income == pytest.approx(3000.0)
+    assert forecast.balance_percentiles["p5"][0] >= 500 + 3000 - 1400
+    assert forecast.balance_percentiles["p95"][0] <= 500 + 3000
+    assert forecast.shortfall_probability == 0.0
+    assert forecast.goal_probability[0] == 0.0 and forecast.goal_probability[-1] == 1.0
+    assert forecast.goal_probability == sorted(forecast.goal_probability)
+    assert forecast.median_months_to_goal == 5
+
+
+def test_seed_reproduces_runs_and_encodings_agree():
+    rows = make_transactions(2_000)
+    columns = TransactionColumns.from_wire(encode_columns(rows)["columns"])
+    first = forecast_from_history(rows, FREELANCE_INCOME, months=36, paths=2_000, savings_goal=5_000.0, seed=42)
+    again = forecast_from_history(columns, FREELANCE_INCOME, months=36, paths=2_000, savings_goal=5_000.0, seed=42)
+    assert first.to_dict() == again.to_dict()
+    other = forecast_from_history(rows, FREELANCE_INCOME, months=36, paths=2_000, seed=43)
+    assert other.balance_percentiles != first.balance_percentiles
+
+    unseeded = forecast_from_history(rows, FREELANCE_INCOME, months=36, paths=2_000)
+    replay = forecast_from_history(rows, FREELANCE_INCOME, months=36, paths=2_000, seed=unseeded.seed)
+    assert replay.to_dict() == unseeded.to_dict()
+
+
+def test_context_passages():
+    forecast = forecast_from_history(HISTORY, FREELANCE_INCOME, 1_000.0, 24, 1_000, 8_000.0, seed=7)
+    context = forecast_context(forecast)
+    assert len(context) == 4
+    assert "after 12 months" in context[1] and "after 24 months" in context[1]
+    assert "savings goal of 8,000" in context[3]
+
+
+def test_forecast_endpoint():
+    client = TestClient(app)
+    body = {"transactions": HISTORY, "monthly_income": FREELANCE_INCOME, "savings_goal": 8_000, "seed": 3}
+    response = client.post("/api/forecast", json={**body, "months": 12, "paths": 500})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["seed"] == 3 and len(result["balance_percentiles"]["p50"]) == 12
+    assert result["context"][0].startswith("The user's cash flow was simulated over 500 paths")
+    assert client.post("/api/forecast", json={**body, "months": 12, "paths": 500}).json() == result
+
+    assert client.post("/api/forecast", json={**body, "paths": 10 ** 9}).status_code == 422
+    assert client.post("/api/forecast", json={**body, "monthly_income": []}).status_code == 422
+    bad_date = [{"category": "Rent", "amount": 1.0, "date": "soon"}]
+    assert client.post("/api/forecast", json={**body, "transactions": bad_date}).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_forecast_grounds_advice_without_sharing_it(mock_llm_client):
+    prompts = []
+    generate = mock_llm_client.generate
+
+    async def recording_generate(prompt, **kwargs):
+        prompts.append(prompt)
+        return await generate(prompt, **kwargs)
+    mock_llm_client.generate = recording_generate
+
+    context = forecast_context(forecast_from_history(HISTORY, FREELANCE_INCOME, 0.0, 12, 500, seed=1))
+    service = ChatService(mock_llm_client, retriever=None, record_access=False)
+    result = await service.answer("How much should I keep as a buffer?", persona="freelancer", context=context)
+    assert result["answer"]
+    assert "USER'S FINANCIAL PICTURE" in prompts[0] and context[1] in prompts[0]
+    assert service.prepare("How much should I keep as a buffer?", "freelancer", context=context).cacheable is False
+
+
+def test_generate_with_forecast():
+    body = {
+        "prompt": "Can I afford a new laptop this year?",
+        "persona": "freelancer",
+        "forecast": {"transactions": HISTORY, "monthly_income": FREELANCE_INCOME, "paths": 500, "seed": 1},
+    }
+    client = TestClient(app)
+    assert client.post("/api/generate", json=body).status_code == 200
+    body["forecast"]["monthly_income"] = [-1.0]
+    assert client.post("/api/generate", json=body).status_code == 422
@@ -0,0 +1,69 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.services import health as health_module
+from app.services.health import HealthProber
+
+
+def wait_for(client, path, status_code, timeout=10):
+    deadline = time.monotonic() + timeout
+    while (response := client.get(path)).status_code != status_code and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return response
+
+
+def test_probes_do_not_touch_llm_clients(monkeypatch):
+    """/live and /ready are answered from memory, without building a client."""
+    def no_client(*args, **kwargs):
+        raise AssertionError("probes must not create LLM clients")
+
+    monkeypatch.setattr(ModelFactory, "get_client", no_client)
+    client = TestClient(app)
+    live = client.get("/live")
+    assert live.status_code == 200 and live.json() == {"status": "alive"}
+    # Not started, so the warm-up has not finished
+    ready = client.get("/ready")
+    assert ready.status_code == 503 and ready.json()["warm_start"] == "starting"
+
+
+def test_ready_follows_backend_checks(monkeypatch):
+    """A backend must fail twice in a row to take the instance out of rotation, and comes back on success."""
+    outcome = {"fail": True}
+
+    async def fake_probe(client):
+        if outcome["fail"]:
+            raise ConnectionError("refused")
+
+    monkeypatch.setitem(health_module.PROBES, "fake", fake_probe)
+    prober = HealthProber(["fake"], interval_seconds=0.02, failure_threshold=2)
+    monkeypatch.setattr(health_module, "_prober", prober)
+
+    with TestClient(app) as client:
+        response = wait_for(client, "/ready", 503)
+        deadline = time.monotonic() + 10
+        while response.json()["backends"]["fake"]["healthy"] is not False and time.monotonic() < deadline:
+            response = client.get("/ready")
+        backend = response.json()["backends"]["fake"]
+        assert backend["healthy"] is False and backend["consecutive_failures"] >= 2
+        assert backend["error"] == "ConnectionError: refused"
+        assert client.get("/live").status_code == 200
+
+        outcome["fail"] = False
+        response = wait_for(client, "/ready", 200)
+        assert response.status_code == 200
+        assert response.json()["backends"]["fake"]["latency_ms"] is not None
+
+
+def test_ready_reports_saturation(monkeypatch):
+    monkeypatch.setattr(health_module, "_prober", HealthProber([], max_llm_queue_depth=0))
+    with TestClient(app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["saturated"] is True
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        HealthProber(["nope"])
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.services.jobs import FAILED, SUCCEEDED, JobManager, JobQueueFull, reset_job_manager
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Reset factory and job manager singletons around each test."""
+    ModelFactory.reset()
+    reset_job_manager()
+    yield
+    ModelFactory.reset()
+    reset_job_manager()
+
+
+async def wait_finished(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, "job did not finish"
+        await job.wait_for_change(job.version, 0.1)
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_priority_order():
+    """With one busy worker, queued jobs run lowest priority number first."""
+    manager = JobManager(workers=1)
+    gate = asyncio.Event()
+    order = []
+
+    async def handler(payload, progress):
+        if payload["name"] == "blocker":
+            await gate.wait()
+        order.append(payload["name"])
+        return payload["name"]
+
+    manager.register("work", handler)
+    await manager.start()
+    blocker, _ = manager.submit("work", {"name": "blocker"})
+    await asyncio.sleep(0)
+    manager.submit("work", {"name": "batch"}, priority=5)
+    manager.submit("work", {"name": "urgent"}, priority=0)
+    last, _ = manager.submit("work", {"name": "normal"}, priority=2)
+    gate.set()
+    await wait_finished(last)
+    await manager.stop()
+
+    assert order == ["blocker", "urgent", "normal", "batch"]
+    assert blocker.result == "blocker"
+
+
+@pytest.mark.asyncio
+async def test_identical_submissions_share_a_job():
+    """Duplicates dedupe onto the queued or finished job, but failed jobs are retried."""
+    manager = JobManager(workers=2)
+    calls = []
+
+    async def handler(payload, progress):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise ValueError("boom")
+        progress(0.5, "halfway")
+        return {"ok": True}
+
+    manager.register("work", handler)
+    first, deduplicated = manager.submit("work", {"a": 1, "b": 2})
+    second, second_dedup = manager.submit("work", {"b": 2, "a": 1})
+    assert not deduplicated and second_dedup
+    assert second is first
+    await wait_finished(first)
+    assert first.status == SUCCEEDED and first.progress == 1.0
+    assert manager.submit("work", {"a": 1, "b": 2})[0] is first
+
+    failed, _ = manager.submit("work", {"fail": True})
+    await wait_finished(failed)
+    assert failed.status == FAILED and failed.error == "boom"
+    retried, retried_dedup = manager.submit("work", {"fail": True})
+    assert retried is not failed and not retried_dedup
+    await wait_finished(retried)
+    await manager.stop()
+
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_results_expire_and_queue_is_bounded():
+    """Finished jobs disappear after the TTL; a full queue rejects submissions."""
+    manager = JobManager(workers=1, max_queue=1, result_ttl_seconds=0)
+    gate = asyncio.Event()
+
+    async def handler(payload, progress):
+        await gate.wait()
+        return payload
+
+    manager.register("work", handler)
+    running, _ = manager.submit("work", {"n": 1})
+    await asyncio.sleep(0)
+    manager.submit("work", {"n": 2})
+    with pytest.raises(JobQueueFull):
+        manager.submit("work", {"n": 3})
+
+    gate.set()
+    await wait_finished(running)
+    assert manager.get(running.job_id) is None
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_bounded_and_drop_their_input():
+    """Only the most recently used finished jobs are kept, without their payloads."""
+    manager = JobManager(workers=1, max_retained=2)
+
+    async def handler(payload, progress):
+        return payload["n"]
+
+    manager.register("work", handler)
+    jobs = []
+    for n in range(3):
+        job, _ = manager.submit("work", {"n": n})
+        await wait_finished(job)
+        jobs.append(job)
+        if n == 1:
+            assert manager.get(jobs[0].job_id) is jobs[0]  # refresh
+
+    assert all(job.payload is None and job.result == n for n, job in enumerate(jobs))
+    assert manager.get(jobs[1].job_id) is None
+    assert manager.get(jobs[0].job_id) is jobs[0] and manager.get(jobs[2].job_id) is jobs[2]
+    rerun, deduplicated = manager.submit("work", {"n": 1})
+    assert not deduplicated
+    await wait_finished(rerun)
+    await manager.stop()
+
+
+def test_spending_insights_job_endpoint(sample_transactions):
+    """Submitting returns 202 at once; polling eventually yields the insights."""
+    with TestClient(app) as client:
+        response = client.post("/api/jobs/spending-insights", json={"transactions": sample_transactions})
+        assert response.status_code == 202
+        submission = response.json()
+        assert submission["status_url"] == f"/api/jobs/{submission['job_id']}"
+
+        duplicate = client.post("/api/jobs/spending-insights", json={"transactions": sample_transactions}).json()
+        assert duplicate["job_id"] == submission["job_id"]
+        assert duplicate["deduplicated"] is True
+
+        deadline = time.monotonic() + 5
+        while True:
+            job = client.get(submission["status_url"]).json()
+            if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+                break
+            time.sleep(0.02)
+
+        assert job["status"] == "succeeded"
+        assert "top_categories" in job["result"]
+        assert client.get("/api/jobs/does-not-exist").status_code == 404
+
+
+def test_nlu_batch_job_events():
+    """The SSE stream reports progress and ends with the result."""
+    items = [{"text": f"I spent ${i * 10} on groceries", "persona": "student"} for i in range(1, 4)]
+    with TestClient(app) as client:
+        submission = client.post("/api/jobs/nlu-batch", json={"items": items}).json()
+
+        events = []
+        with client.stream("GET", submission["events_url"]) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            event = None
+            for line in response.iter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    events.append((event, json.loads(line[len("data: "):])))
+
+        assert events[-1][0] == "result"
+        assert len(events[-1][1]["result"]["results"]) == 3
+        assert all(kind == "progress" for kind, _ in events[:-1])
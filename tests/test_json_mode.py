@@ -0,0 +1,83 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.metrics import json_parse_total, service_fallback_total
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from app.services.json_parsing import parse_json_response
+from app.services.nlu_service import NLUService
+from app.services.prompt_templates import (
+    get_persona_prompt,
+    NLU_SCHEMA,
+    PERSONA_ADVICE_SCHEMA,
+    SPENDING_INSIGHTS_SCHEMA,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Reset parse and fallback counters before each test."""
+    json_parse_total.reset()
+    service_fallback_total.reset()
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+def test_parse_fast_path():
+    """Bare JSON objects are parsed with a single json.loads."""
+    assert parse_json_response('{"a": 1}', purpose="test") == {"a": 1}
+    assert json_parse_total.value(purpose="test", outcome="fast") == 1
+
+
+def test_parse_recovers_fenced_output():
+    """Fenced or chatty output is still recovered and counted separately."""
+    assert parse_json_response('```json\n{"a": 1}\n```', purpose="test") == {"a": 1}
+    assert parse_json_response('Sure! {"b": 2} Hope this helps.', purpose="test") == {"b": 2}
+    assert json_parse_total.value(purpose="test", outcome="recovered") == 2
+
+
+def test_parse_failure_raises_value_error():
+    """Unrecoverable output raises ValueError and counts a failure."""
+    with pytest.raises(ValueError):
+        parse_json_response("no json here", purpose="test")
+    assert json_parse_total.value(purpose="test", outcome="failed") == 1
+
+
+@pytest.mark.asyncio
+async def test_mock_honours_response_schema():
+    """The mock returns a bare JSON object matching the requested schema."""
+    client = FallbackMockClient()
+
+    insights = json.loads(await client.generate("analyze", response_schema=SPENDING_INSIGHTS_SCHEMA))
+    assert set(SPENDING_INSIGHTS_SCHEMA["required"]).issubset(insights)
+
+    advice = json.loads(await client.generate(
+        get_persona_prompt("How do I save?", "parent"),
+        response_schema=PERSONA_ADVICE_SCHEMA
+    ))
+    assert advice["persona_context"] == "parent"
+
+
+@pytest.mark.asyncio
+async def test_service_fallback_is_counted():
+    """A failing LLM call is counted as a fallback activation."""
+
+    class BrokenClient(FallbackMockClient):
+        async def generate(self, prompt, max_tokens=512, stream=False, response_schema=None):
+            raise RuntimeError("backend down")
+
+    result = await NLUService(BrokenClient()).analyze_text("I spent $20 on food")
+    assert set(NLU_SCHEMA["required"]).issubset(result)
+    assert service_fallback_total.value(service="nlu") == 1
+
+
+def test_metrics_endpoint_exports_parse_counters():
+    """JSON parse outcomes are exposed on /metrics."""
+    client = TestClient(app)
+    client.post("/api/nlu", json={"text": "I spent $500 on groceries", "persona": "student"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'llm_json_parse_total{purpose="nlu",outcome="fast"} 1.0' in response.text
@@ -0,0 +1,114 @@
+import json
+import random
+import time
+import httpx
+import pytest
+from groq import AsyncGroq
+from app.config import settings
+from app.main import app
+from app.models import ModelFactory
+from app.models.groq_client import GroqClient
+from app.models.ollama_granite import OllamaGraniteClient
+from app.services.jobs import get_job_manager, reset_job_manager
+from app.services.prompt_templates import BUDGET_SUMMARY_SCHEMA, get_budget_summary_prompt
+from loadtest.http_api import run_load
+from loadtest.llm_standin import LatencyDistribution, StandInConfig, create_app
+
+STANDIN_URL = "http://standin"
+
+
+def groq_client(standin_app, monkeypatch) -> GroqClient:
+    """Groq client whose HTTP calls go to the stand-in app in-process."""
+    monkeypatch.setattr(settings, "groq_api_key", "standin")
+    monkeypatch.setattr(settings, "groq_rate_limit_enabled", False)
+    client = GroqClient()
+    client.client = AsyncGroq(
+        api_key="standin",
+        base_url=STANDIN_URL,
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=standin_app))
+    )
+    return client
+
+
+def ollama_client(standin_app) -> OllamaGraniteClient:
+    client = OllamaGraniteClient()
+    client.base_url = STANDIN_URL
+    client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=standin_app))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_groq_client_against_standin(monkeypatch):
+    """The Groq SDK parses the stand-in's completions, streamed and not."""
+    client = groq_client(create_app(StandInConfig(token_rate=0)), monkeypatch)
+    prompt = get_budget_summary_prompt({"Salary": 5000}, {"Rent": 1500})
+
+    answer = json.loads(await client.generate(prompt, response_schema=BUDGET_SUMMARY_SCHEMA))
+    assert answer["total_income"] == 5000.0
+
+    stream = await client.generate(prompt, stream=True)
+    streamed = "".join([chunk async for chunk in stream])
+    assert json.loads(streamed) == answer
+
+
+@pytest.mark.asyncio
+async def test_ollama_client_against_standin():
+    """The Ollama client reads the stand-in's JSON and NDJSON responses."""
+    client = ollama_client(create_app(StandInConfig(corpus=[{"match": "", "response": "plain answer"}])))
+
+    assert await client.generate("anything") == "plain answer"
+    stream = await client.generate("anything", stream=True)
+    assert "".join([chunk async for chunk in stream]) == "plain answer"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_injected_faults(monkeypatch):
+    """Injected 429s carry retry-after; injected 500s surface as client errors."""
+    standin_app = create_app(StandInConfig(rate_limit_rate=1.0, retry_after=2))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=standin_app), base_url=STANDIN_URL) as http:
+        response = await http.post("/api/generate", json={"prompt": "hi", "stream": False})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+
+    client = groq_client(create_app(StandInConfig(error_rate=1.0)), monkeypatch)
+    with pytest.raises(RuntimeError, match="Groq API error"):
+        await client.generate("hi")
+
+
+@pytest.mark.asyncio
+async def test_latency_is_seeded_and_applied():
+    """Seeded latency samples repeat, and calls wait at least the time to first token."""
+    distribution = LatencyDistribution("lognormal:100,0.5")
+    first = [distribution.sample(random.Random(7)) for _ in range(3)]
+    assert first == [distribution.sample(random.Random(7)) for _ in range(3)]
+    with pytest.raises(ValueError):
+        LatencyDistribution("normal:1")
+
+    client = ollama_client(create_app(StandInConfig(latency=LatencyDistribution("fixed:100"))))
+    started = time.perf_counter()
+    await client.generate("hello")
+    assert time.perf_counter() - started >= 0.1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_run_load_reports_every_scenario():
+    """The load generator exercises each /api route and reports percentiles."""
+    ModelFactory.reset()
+    reset_job_manager()
+    await get_job_manager().start()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=30) as client:
+            report = await run_load(client, concurrency=4, requests=24, seed=3, transactions=5)
+    finally:
+        await get_job_manager().stop()
+        reset_job_manager()
+        ModelFactory.reset()
+
+    assert report["total"]["requests"] == 24
+    assert report["total"]["failed"] == 0, report["scenarios"]
+    assert report["total"]["p50_ms"] <= report["total"]["p99_ms"]
+    assert set(report["scenarios"]) <= {"budget", "insights", "nlu", "generate", "dashboard", "jobs"}
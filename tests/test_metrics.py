@@ -0,0 +1,108 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.metrics import (
+    Histogram,
+    http_request_duration_seconds,
+    llm_in_flight,
+    llm_requests_total,
+    llm_time_to_first_token_seconds,
+    llm_tokens_total,
+    registry,
+)
+from app.models import ModelFactory, get_llm_client
+from app.models.fallback_mock import FallbackMockClient
+
+MOCK_LABELS = {"backend": "mock", "model": "mock-local"}
+
+
+class SubclassedMockClient(FallbackMockClient):
+    """Client whose generate delegates to its parent's instrumented generate."""
+
+    async def generate(self, prompt, max_tokens=512, stream=False, response_schema=None, history=None):
+        return await super().generate(prompt, max_tokens, stream, response_schema, history)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    ModelFactory.reset()
+    registry.reset()
+    yield
+    ModelFactory.reset()
+    registry.reset()
+
+
+def test_histogram_exposition_is_cumulative():
+    """Buckets are rendered cumulatively with +Inf, sum and count."""
+    histogram = Histogram("test_latency_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, route="/x")
+
+    lines = histogram.collect()
+    assert 'test_latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{route="/x"} 4' in lines
+    assert histogram.sum(route="/x") == pytest.approx(4.05)
+
+
+@pytest.mark.asyncio
+async def test_llm_calls_are_instrumented_once_per_call():
+    """Subclasses are instrumented automatically, and super() calls are not double counted."""
+    client = SubclassedMockClient(chunk_delay=0)
+    await client.generate("How do I build an emergency fund?")
+
+    labels = dict(MOCK_LABELS, purpose="general")
+    assert llm_requests_total.value(outcome="ok", **labels) == 1
+    assert llm_time_to_first_token_seconds.count(**labels) == 1
+    assert llm_tokens_total.value(direction="input", **labels) > 0
+    assert llm_tokens_total.value(direction="output", **labels) > 0
+    assert llm_in_flight.value(backend="mock") == 0
+
+
+@pytest.mark.asyncio
+async def test_streams_record_first_token_and_purpose():
+    """Streams hold the in-flight gauge until closed and carry the caller's purpose."""
+    client = get_llm_client(purpose="chat")
+    stream = await client.generate("Tips for saving money", stream=True)
+
+    labels = dict(MOCK_LABELS, purpose="chat")
+    assert llm_in_flight.value(backend="mock") == 1
+    chunks = [chunk async for chunk in stream]
+    assert chunks
+    assert llm_in_flight.value(backend="mock") == 0
+    assert llm_time_to_first_token_seconds.count(**labels) == 1
+    assert llm_requests_total.value(outcome="ok", **labels) == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_before_iterating_finishes_the_call():
+    """A stream that is closed without being read still leaves the in-flight gauge."""
+    client = get_llm_client(purpose="chat")
+    stream = await client.generate("Tips for saving money", stream=True)
+    assert llm_in_flight.value(backend="mock") == 1
+
+    await stream.aclose()
+    await stream.aclose()
+    assert llm_in_flight.value(backend="mock") == 0
+    assert llm_requests_total.value(outcome="cancelled", **MOCK_LABELS, purpose="chat") == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+    await FallbackMockClient(chunk_delay=0).generate("How do I save?")
+    assert llm_requests_total.value(outcome="ok", purpose="general", **MOCK_LABELS) == 0
+
+
+def test_route_latency_uses_route_template():
+    """Requests are labelled by route template and exported on /metrics."""
+    client = TestClient(app)
+    client.get("/api/jobs/does-not-exist")
+
+    assert http_request_duration_seconds.count(route="/api/jobs/{job_id}", method="GET", status="404") == 1
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_bucket{route="/api/jobs/{job_id}",method="GET",status="404",le="+Inf"} 1' \
+        in body
+    assert "# TYPE llm_request_duration_seconds histogram" in body
@@ -0,0 +1,33 @@
+from benchmarks.microbench import build_suite, compare, time_callable
+
+
+def run_document(calibration_ns, **timings):
+    return {
+        "meta": {"calibration_ns": calibration_ns},
+        "results": {name: {"best_ns": ns, "calibration_ns": calibration_ns} for name, ns in timings.items()},
+    }
+
+
+def test_compare_flags_regressions_relative_to_calibration():
+    """A machine twice as slow is not a regression; a benchmark slower than its calibration is."""
+    baseline = run_document(1000.0, parse=100.0, prompt=200.0, nlu=300.0)
+    current = run_document(2000.0, parse=200.0, prompt=600.0, nlu=300.0)
+
+    rows = {row["name"]: row for row in compare(current, baseline, threshold=0.15)}
+    assert rows["parse"]["status"] == "ok"
+    assert rows["prompt"]["status"] == "regression"
+    assert rows["nlu"]["status"] == "improvement"
+
+    raw = {row["name"]: row["status"] for row in compare(current, baseline, normalize=False)}
+    assert raw == {"parse": "regression", "prompt": "regression", "nlu": "ok"}
+
+
+def test_suite_benchmarks_run():
+    """Every small benchmark builds its inputs and runs."""
+    suite = [benchmark for benchmark in build_suite() if benchmark.size <= 1000]
+    assert {"json_parse.noisy", "fallback.insights[10]", "validate.insights_request[100]"} <= {b.name for b in suite}
+    for benchmark in suite:
+        benchmark.setup()()
+
+    result = time_callable(lambda: sum(range(100)), repeats=3, min_time=0.001)
+    assert result.repeats == 3 and 0 < result.best_ns <= result.median_ns
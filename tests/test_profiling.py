@@ -0,0 +1,93 @@
+import marshal
+import pstats
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.models import ModelFactory
+from app.profiling import ProfileStore, reset_profile_store
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+BUDGET = {"income": {"Salary": 5000}, "expenses": {"Rent": 1500, "Food": 500}}
+
+
+@pytest.fixture(autouse=True)
+def profiling_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    monkeypatch.setattr(settings, "profiling_dir", str(tmp_path / "profiles"))
+    monkeypatch.setattr(settings, "profiling_interval_ms", 1.0)
+    ModelFactory.reset()
+    reset_profile_store()
+    yield
+    reset_profile_store()
+
+
+def test_profile_requires_admin_token():
+    """X-Profile without the right token is ignored, and the admin endpoints refuse it."""
+    client = TestClient(app)
+    response = client.post("/api/budget-summary", json=BUDGET, headers={"X-Profile": "cprofile"})
+    assert "X-Profile-Id" not in response.headers
+
+    wrong = {"X-Profile": "cprofile", "X-Admin-Token": "guess"}
+    assert "X-Profile-Id" not in client.post("/api/budget-summary", json=BUDGET, headers=wrong).headers
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "guess"}).status_code == 403
+
+
+def test_cprofile_artifact_covers_async_service_path(tmp_path):
+    """A cProfile run is listed and its pstats include the route and service coroutines."""
+    client = TestClient(app)
+    response = client.post("/api/budget-summary", json=BUDGET, headers=dict(ADMIN, **{"X-Profile": "cprofile"}))
+    profile_id = response.headers["X-Profile-Id"]
+
+    listed = client.get("/admin/profiles", headers=ADMIN).json()["profiles"]
+    assert listed[0]["id"] == profile_id
+    assert listed[0]["route"] == "/api/budget-summary"
+    assert listed[0]["status"] == 200
+
+    artifact = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN)
+    path = tmp_path / "profile.pstats"
+    path.write_bytes(artifact.content)
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert {"create_budget_summary", "generate_summary", "_validate_summary"} <= functions
+
+
+def test_failed_profile_save_still_returns_the_response(monkeypatch):
+    """A profile that cannot be written is logged and the request is answered without an id."""
+    def disk_full(self, meta, artifact, extension):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(ProfileStore, "save", disk_full)
+    client = TestClient(app)
+    response = client.post("/api/budget-summary", json=BUDGET, headers=dict(ADMIN, **{"X-Profile": "cprofile"}))
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_sampling_profile_records_collapsed_stacks():
+    """Sampling mode writes collapsed stacks of the event loop thread."""
+    client = TestClient(app)
+    transactions = [
+        {"category": f"Cat{i % 40}", "amount": i % 90 + 1.5, "date": "2024-01-15", "merchant": "Store"}
+        for i in range(40000)
+    ]
+    response = client.post(
+        "/api/spending-insights",
+        json={"transactions": transactions},
+        headers=dict(ADMIN, **{"X-Profile": "sample"})
+    )
+    profile_id = response.headers["X-Profile-Id"]
+
+    meta = client.get("/admin/profiles", headers=ADMIN).json()["profiles"][0]
+    assert meta["mode"] == "sample" and meta["summary"]["samples"] > 0
+    collapsed = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN).text
+    stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_store_keeps_a_bounded_ring(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=2)
+    ids = [store.save({"n": n}, marshal.dumps({}), "pstats") for n in range(4)]
+
+    assert [profile["id"] for profile in store.list()] == ids[:1:-1]
+    assert store.get(ids[0]) is None
+    assert len(list(tmp_path.iterdir())) == 4
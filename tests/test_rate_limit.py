@@ -0,0 +1,186 @@
+import asyncio
+import httpx
+import pytest
+from groq import RateLimitError
+from app.config import settings
+from app.models import groq_client as groq_module
+from app.models.groq_client import GroqClient
+from app.models.rate_limit import (
+    RateLimiter,
+    RateLimitExceeded,
+    parse_duration,
+    reset_rate_limiter,
+    retry_after_seconds,
+)
+
+
+class FakeClock:
+    """Manual clock; sleeping advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def groq_settings(monkeypatch):
+    """Give GroqClient a key and a fresh limiter."""
+    monkeypatch.setattr(settings, "groq_api_key", "test-key")
+    reset_rate_limiter()
+    yield
+    reset_rate_limiter()
+
+
+def test_parse_duration():
+    """Groq reset durations and Retry-After values are read as seconds."""
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("1h2m3s") == pytest.approx(3723)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration("") is None
+    assert retry_after_seconds({"x-ratelimit-reset-tokens": "1.5s"}) == pytest.approx(1.5)
+
+
+@pytest.mark.asyncio
+async def test_sustained_throughput_stays_under_quota():
+    """After the initial burst, calls are paced at the refill rate."""
+    clock = FakeClock()
+    limiter = RateLimiter(1000, 6000, headroom=1.0, clock=clock, sleep=clock.sleep)
+    start = clock.now
+    dispatched = []
+    for _ in range(30):
+        await limiter.acquire(600, deadline=clock.now + 600)
+        dispatched.append(clock.now - start)
+
+    # 10 calls fit the bucket, then one every 6s (600 tokens at 100 tokens/s)
+    assert dispatched[9] == 0
+    assert dispatched[10] == pytest.approx(6.0)
+    assert dispatched[29] == pytest.approx(120.0)
+    for i, at in enumerate(dispatched):
+        assert (i + 1) * 600 <= 6000 + at * 100 + 1e-6
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_are_staggered():
+    """Callers arriving together are spread out instead of retrying in lockstep."""
+    clock = FakeClock()
+    waits = []
+
+    async def record_sleep(seconds):
+        waits.append(seconds)
+        await asyncio.sleep(0)
+
+    limiter = RateLimiter(1000, 600, headroom=1.0, clock=clock, sleep=record_sleep)
+    await limiter.acquire(600, deadline=clock.now + 60)  # drain the bucket
+    await asyncio.gather(*(limiter.acquire(300, deadline=clock.now + 600) for _ in range(4)))
+
+    # Each reservation queues behind the previous one: 300 tokens at 10 tokens/s
+    assert waits == pytest.approx([30.0, 60.0, 90.0, 120.0])
+
+
+@pytest.mark.asyncio
+async def test_budget_beyond_deadline_is_rejected():
+    """A call that could only go out after its deadline fails fast with a retry hint."""
+    clock = FakeClock()
+    limiter = RateLimiter(1000, 600, headroom=1.0, clock=clock, sleep=clock.sleep)
+    await limiter.acquire(600, deadline=clock.now + 1)
+    with pytest.raises(RateLimitExceeded) as error:
+        await limiter.acquire(600, deadline=clock.now + 5)
+    assert error.value.retry_after == pytest.approx(60.0)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_refunds_its_reservation():
+    """A caller cancelled while waiting does not leave its tokens reserved."""
+    clock = FakeClock()
+    limiter = RateLimiter(1000, 600, headroom=1.0, clock=clock)
+    await limiter.acquire(600, deadline=clock.now + 60)  # drain the bucket
+    waiter = asyncio.create_task(limiter.acquire(300, deadline=clock.now + 600))
+    await asyncio.sleep(0)
+    assert limiter.tokens.available() == -300
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.tokens.available() == 0
+    assert limiter.requests.available() == 999
+
+
+def test_headers_correct_the_budget():
+    """x-ratelimit-* headers resize the token budget and block on an exhausted daily quota."""
+    clock = FakeClock()
+    limiter = RateLimiter(30, 6000, headroom=0.5, clock=clock, sleep=clock.sleep)
+    limiter.observe({
+        "x-ratelimit-limit-tokens": "12000",
+        "x-ratelimit-remaining-tokens": "1000",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2m",
+    })
+    assert limiter.tokens.capacity == 6000
+    assert limiter.tokens.available() == 1000
+    assert limiter.blocked_until == pytest.approx(clock.now + 120)
+
+
+class FakeRaw:
+    def __init__(self, completion, headers):
+        self.headers = headers
+        self._completion = completion
+
+    async def parse(self):
+        return self._completion
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions(.with_raw_response)."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.with_raw_response = self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+        if self.calls <= self.failures:
+            response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+            raise RateLimitError("Rate limit reached", response=response, body=None)
+        message = type("Message", (), {"content": '{"answer": "ok"}'})
+        choice = type("Choice", (), {"message": message})
+        usage = type("Usage", (), {"total_tokens": 42})
+        completion = type("Completion", (), {"choices": [choice], "usage": usage})
+        return FakeRaw(completion, {"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "5900"})
+
+
+def make_client(failures, monkeypatch):
+    monkeypatch.setattr(groq_module, "backoff_delay", lambda attempt, retry_after=None: 0.001)
+    client = GroqClient()
+    completions = FakeCompletions(failures)
+    client.client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})})()
+    return client, completions
+
+
+@pytest.mark.asyncio
+async def test_groq_client_retries_429(monkeypatch):
+    """429 responses are retried and the budget is settled with the real usage."""
+    client, completions = make_client(failures=2, monkeypatch=monkeypatch)
+    result = await client.generate("How do I save?", max_tokens=100)
+
+    assert result == '{"answer": "ok"}'
+    assert completions.calls == 3
+    assert client.rate_limiter.tokens.available() <= 5900
+
+
+@pytest.mark.asyncio
+async def test_groq_client_gives_up_after_max_retries(monkeypatch):
+    """Persistent 429s surface as RateLimitExceeded, not a generic RuntimeError."""
+    monkeypatch.setattr(settings, "groq_max_retries", 1)
+    client, completions = make_client(failures=5, monkeypatch=monkeypatch)
+    with pytest.raises(RateLimitExceeded):
+        await client.generate("How do I save?", max_tokens=100)
+    assert completions.calls == 2
@@ -0,0 +1,96 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from app.responses import FastJSONResponse, accepted_encoding, dumps
+from app.routes.budget import BudgetResponse
+from app.routes.insights import InsightsResponse
+from app.routes.nlu import NLUResponse
+from app.services.budget_service import BudgetService
+from app.services.insights_service import InsightsService
+from app.services.nlu_service import NLUService
+
+TRANSACTIONS = [
+    {"category": f"Category {i % 12}", "amount": 10.0 + i, "date": "2024-01-15", "merchant": "Shop"}
+    for i in range(200)
+]
+
+
+class ChattyClient(FallbackMockClient):
+    """Returns extra keys and non-string list items, as real models sometimes do."""
+
+    async def generate(self, prompt, max_tokens=512, stream=False, response_schema=None, history=None):
+        return json.dumps({
+            "suggestion_list": ["Cook at home", {"tip": "cancel gym"}, None],
+            "red_flags": "none",
+            "recommendations": [42],
+            "sentiment": "ecstatic",
+            "entities": [{"type": "MONEY", "value": 500}, "garbage"],
+            "keywords": ["rent"],
+            "reasoning": "model commentary that is not part of the API",
+        })
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+@pytest.mark.asyncio
+async def test_services_return_exact_response_shapes():
+    """Validated service output equals what the response models would produce, so routes can skip them."""
+    client = ChattyClient()
+    summary = await BudgetService(client).generate_summary({"Salary": 5000}, {"Rent": 1500})
+    insights = await InsightsService(client).generate_insights(TRANSACTIONS)
+    nlu = await NLUService(client).analyze_text("I spent $500 on rent")
+
+    assert summary == BudgetResponse.model_validate(summary).model_dump()
+    assert summary["suggestion_list"] == ["Cook at home", '{"tip": "cancel gym"}']
+    assert insights == InsightsResponse.model_validate(insights).model_dump()
+    assert insights["red_flags"] == [] and insights["recommendations"] == ["42"]
+    assert nlu == NLUResponse.model_validate(nlu).model_dump()
+    assert nlu["sentiment"] == "neutral"
+    assert nlu["entities"] == [{"type": "MONEY", "value": "500", "text": ""}]
+
+
+def test_fast_response_matches_stdlib_encoding():
+    payload = {"name": "café", "values": [1, 2.5, None, True], "nested": {"a": []}}
+    assert json.loads(dumps(payload)) == payload
+    assert FastJSONResponse(payload).body == dumps(payload)
+
+
+def test_accepted_encoding():
+    assert accepted_encoding("gzip, deflate") == "gzip"
+    assert accepted_encoding("gzip;q=0, identity") is None
+    assert accepted_encoding("") is None
+
+
+def test_large_responses_are_compressed():
+    client = TestClient(app)
+    response = client.post("/api/spending-insights", json={"transactions": TRANSACTIONS})
+    assert response.status_code == 200
+    assert response.json() == InsightsResponse.model_validate(response.json()).model_dump()
+
+    raw = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert raw.headers["content-encoding"] == "gzip"
+    assert int(raw.headers["content-length"]) < len(raw.content)
+    assert json.loads(raw.content)["info"]["title"] == "Personal Finance Chatbot API"
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    identity = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_streamed_responses_are_not_compressed():
+    client = TestClient(app)
+    body = {"income": {"Salary": 5000}, "expenses": {"Rent": 1500}, "transactions": TRANSACTIONS}
+    headers = {"Accept-Encoding": "gzip"}
+    with client.stream("POST", "/api/dashboard?stream=true", json=body, headers=headers) as response:
+        assert "content-encoding" not in response.headers
+        sections = [json.loads(line)["section"] for line in response.iter_lines() if line]
+    assert sections[0] == "aggregates" and sections[-1] == "meta"
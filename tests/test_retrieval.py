@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from app.services.chat_service import ChatService
+from app.services.retrieval import RetrievalIndex
+
+
+@pytest.fixture(autouse=True)
+def reset_model_factory():
+    """Reset model factory before each test."""
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+@pytest.fixture(scope="module")
+def index():
+    """Index over the bundled answer corpus."""
+    return RetrievalIndex.from_corpus()
+
+
+class RecordingClient(FallbackMockClient):
+    """Mock client that remembers the prompts it was sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return await super().generate(prompt, **kwargs)
+
+
+def test_common_question_matches_corpus(index):
+    """Paraphrased common questions score above the answer threshold."""
+    hits = index.search("how do I build an emergency fund", persona="student")
+    assert hits[0].entry_id == "emergency-fund"
+    assert hits[0].score > 0.9
+
+
+def test_persona_specific_entries(index):
+    """Persona-tagged entries win ties and are hidden from other personas."""
+    assert index.search("How do I build an emergency fund?", "freelancer")[0].entry_id == "emergency-fund-freelancer"
+    assert all(hit.entry_id != "college-savings" for hit in index.search("What is a 529 plan?", "student"))
+
+
+def test_index_save_and_load(index, tmp_path):
+    """A precomputed index returns the same results as a freshly built one."""
+    path = str(tmp_path / "index.json")
+    index.save(path)
+    loaded = RetrievalIndex.load(path)
+
+    query = "what is the 50/30/20 rule"
+    assert [(h.entry_id, round(h.score, 6)) for h in loaded.search(query)] == \
+        [(h.entry_id, round(h.score, 6)) for h in index.search(query)]
+
+
+@pytest.mark.asyncio
+async def test_direct_answer_skips_llm(index):
+    """A close match is answered from the corpus without calling the LLM."""
+    client = RecordingClient()
+    result = await ChatService(client, retriever=index).answer("What is the 50/30/20 rule?")
+
+    assert client.prompts == []
+    assert result["meta"]["source"] == "retrieval"
+    assert "50%" in result["answer"]
+
+
+@pytest.mark.parametrize("question", [
+    "How do I create a budget for my small business?",
+    "Should I not build an emergency fund?",
+    "Is $20,000 enough for an emergency fund?",
+])
+@pytest.mark.asyncio
+async def test_off_topic_or_negated_questions_reach_the_llm(index, question):
+    """Familiar words alone, a negation or specific amounts do not get a canned answer."""
+    client = RecordingClient()
+    result = await ChatService(client, retriever=index).answer(question)
+
+    assert len(client.prompts) == 1
+    assert result["meta"].get("source") != "retrieval"
+
+
+@pytest.mark.asyncio
+async def test_partial_match_grounds_prompt(index):
+    """Weaker matches are passed to the LLM as reference notes."""
+    client = RecordingClient()
+    await ChatService(client, retriever=index).answer("How much house can I afford?", persona="salaried")
+
+    assert len(client.prompts) == 1
+    assert "REFERENCE NOTES" in client.prompts[0]
+    assert "down payment" in client.prompts[0]
+
+
+def test_generate_endpoint_uses_retrieval():
+    """/api/generate reports retrieval answers in its meta."""
+    response = TestClient(app).post("/api/generate", json={"prompt": "What is compound interest?"})
+
+    assert response.status_code == 200
+    assert response.json()["meta"]["retrieval_id"] == "compound-interest"
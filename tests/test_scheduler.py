@@ -0,0 +1,180 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.metrics import scheduler_tokens_total
+from app.models import ModelFactory, get_llm_client
+from app.models.fallback_mock import FallbackMockClient
+from app.models.scheduler import (
+    LLMScheduler,
+    ScheduledLLMClient,
+    current_tenant,
+    reset_scheduler,
+    tenant_from_headers,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Reset factory and scheduler singletons around each test."""
+    ModelFactory.reset()
+    reset_scheduler()
+    yield
+    ModelFactory.reset()
+    reset_scheduler()
+
+
+async def serve_in_order(scheduler, requests):
+    """Queue requests behind a held slot and return the order they are admitted in."""
+    order = []
+    await scheduler.acquire("interactive", "holder", 1)
+
+    async def call(name, priority_class, tenant, cost):
+        await scheduler.acquire(priority_class, tenant, cost)
+        order.append(name)
+        scheduler.release()
+
+    tasks = []
+    for request in requests:
+        tasks.append(asyncio.create_task(call(*request)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_priority_classes_are_served_in_order():
+    """Interactive calls overtake queued budget, insights and batch calls."""
+    order = await serve_in_order(LLMScheduler(max_concurrency=1), [
+        ("batch", "batch", "t1", 500),
+        ("insights", "insights", "t1", 1000),
+        ("budget", "budget", "t1", 800),
+        ("chat", "interactive", "t1", 600),
+    ])
+    assert order == ["chat", "budget", "insights", "batch"]
+
+
+@pytest.mark.asyncio
+async def test_fair_queueing_across_tenants():
+    """A tenant with a backlog of large calls does not starve a light tenant."""
+    requests = [(f"heavy-{i}", "batch", "heavy", 1000) for i in range(5)]
+    requests += [(f"light-{i}", "batch", "light", 500) for i in range(2)]
+    order = await serve_in_order(LLMScheduler(max_concurrency=1), requests)
+
+    assert order.index("light-1") < order.index("heavy-2")
+    assert order[:3] == ["light-0", "heavy-0", "light-1"]
+
+
+@pytest.mark.asyncio
+async def test_tenant_weights_scale_the_share():
+    """A tenant with weight 2 is admitted about twice as often under contention."""
+    requests = [(f"{tenant}-{i}", "batch", tenant, 100) for i in range(6) for tenant in ("gold", "basic")]
+    order = await serve_in_order(LLMScheduler(max_concurrency=1, tenant_weights={"gold": 2.0}), requests)
+
+    first_six = order[:6]
+    assert sum(name.startswith("gold") for name in first_six) == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    """Cancelling a queued call removes it from the queue depth."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    await scheduler.acquire("interactive", "t", 1)
+    waiter = asyncio.create_task(scheduler.acquire("batch", "t", 1))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth("batch") == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.queue_depth() == 0
+
+    scheduler.release()
+    assert scheduler.in_flight == 0
+    assert scheduler.snapshot()["classes"]["batch"]["requests"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_slot_until_closed():
+    """A streaming call keeps its slot until the stream is consumed or closed."""
+    scheduler = LLMScheduler(max_concurrency=1, tenant_weights={"streamer": 1.0})
+    client = ScheduledLLMClient(FallbackMockClient(chunk_delay=0), "interactive", scheduler)
+    token = current_tenant.set("streamer")
+    try:
+        before = scheduler_tokens_total.value(priority_class="interactive", tenant="streamer")
+        stream = await client.generate("How do I save money?", max_tokens=100, stream=True)
+        assert scheduler.in_flight == 1
+        await stream.__anext__()
+        await stream.aclose()
+    finally:
+        current_tenant.reset(token)
+
+    assert scheduler.in_flight == 0
+    assert scheduler_tokens_total.value(priority_class="interactive", tenant="streamer") > before
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_before_iterating_releases_slot():
+    """Closing a stream that was never read (e.g. a client that disconnected) frees its slot."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    client = ScheduledLLMClient(FallbackMockClient(chunk_delay=0), "interactive", scheduler)
+    stream = await client.generate("hi", stream=True)
+    await stream.aclose()
+    await stream.aclose()
+    assert scheduler.in_flight == 0
+
+    stream = await asyncio.wait_for(client.generate("hi", stream=True), timeout=1)
+    assert "".join([chunk async for chunk in stream])
+    assert scheduler.in_flight == 0
+
+
+def test_tenant_from_headers():
+    """Explicit tenant ids win; API keys are hashed."""
+    assert tenant_from_headers({"x-tenant-id": "acme", "x-api-key": "secret"}) == "acme"
+    hashed = tenant_from_headers({"x-api-key": "secret"})
+    assert hashed.startswith("key-") and "secret" not in hashed
+    assert tenant_from_headers({}) == "anonymous"
+
+
+def test_get_llm_client_is_scheduled_by_purpose(monkeypatch):
+    """Purposes map to priority classes; the scheduler can be switched off."""
+    assert get_llm_client(purpose="batch").priority_class == "batch"
+    assert get_llm_client(purpose="chat").priority_class == "interactive"
+    monkeypatch.setattr(settings, "llm_scheduler_enabled", False)
+    assert not isinstance(get_llm_client(purpose="chat"), ScheduledLLMClient)
+
+
+def test_requests_are_charged_to_their_tenant(monkeypatch):
+    """The tenant header of an HTTP request reaches the scheduler's accounting."""
+    monkeypatch.setattr(settings, "retrieval_enabled", False)
+    monkeypatch.setattr(settings, "llm_tenant_weights", {"acme": 2.0})
+    client = TestClient(app)
+    for tenant in ("acme", "other"):
+        before = scheduler_tokens_total.value(priority_class="interactive", tenant=tenant)
+        response = client.post(
+            "/api/generate",
+            json={"prompt": f"Should {tenant} refinance my mortgage?"},
+            headers={"X-Tenant-ID": "acme" if tenant == "acme" else "unlisted-tenant"}
+        )
+        assert response.status_code == 200
+        assert scheduler_tokens_total.value(priority_class="interactive", tenant=tenant) > before
+    assert scheduler_tokens_total.value(priority_class="interactive", tenant="unlisted-tenant") == 0
+
+
+@pytest.mark.asyncio
+async def test_finish_times_of_idle_tenants_are_dropped():
+    """Per-tenant fair-share state does not grow with the number of tenants seen."""
+    scheduler = LLMScheduler(max_concurrency=1)
+    client = ScheduledLLMClient(FallbackMockClient(chunk_delay=0), "batch", scheduler)
+    for i in range(50):
+        token = current_tenant.set(f"tenant-{i}")
+        try:
+            await client.generate("How do I save money?", max_tokens=50)
+        finally:
+            current_tenant.reset(token)
+    assert scheduler._tenant_finish == {}
+
+    order = await serve_in_order(scheduler, [(f"t{i}", "batch", f"t{i}", 100) for i in range(10)])
+    assert len(order) == 10 and scheduler._tenant_finish == {}
@@ -0,0 +1,152 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.metrics import semantic_cache_lookups_total
+from app.models import ModelFactory
+from app.models.fallback_mock import FallbackMockClient
+from app.services.chat_service import ChatService
+from app.services.semantic_cache import SemanticCache, cosine, embed
+
+
+@pytest.fixture(autouse=True)
+def reset_model_factory(monkeypatch):
+    """Reset the model factory and keep retrieval out of the way."""
+    monkeypatch.setattr(settings, "retrieval_enabled", False)
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+class CountingClient(FallbackMockClient):
+    """Mock client that counts generate calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return await super().generate(prompt, **kwargs)
+
+
+def result(answer):
+    return {"answer": answer, "model": "test", "meta": {"persona": "general"}}
+
+
+def test_paraphrases_are_similar():
+    """Stop words and inflections do not change the embedding much."""
+    assert cosine(embed("How can I save money?"), embed("ways to save money")) > 0.99
+    assert cosine(embed("Should I lease or buy a car?"), embed("Is it better to lease or buy a car?")) > 0.99
+    assert cosine(embed("How do I save for retirement"), embed("How do I save for college")) < 0.5
+    # Different amounts are different questions
+    assert cosine(embed("Is $500 enough for an emergency fund"), embed("Is $5000 enough for an emergency fund")) < 0.85
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Should I pay off my credit card debt first?", "Should I not pay off my credit card debt first?"),
+    ("Should I invest in stocks?", "Should I not invest in stocks?"),
+    ("Should I invest in stocks?", "Shouldn't I invest in stocks?"),
+    ("Is a traditional IRA better than a Roth IRA?", "Is a Roth IRA better than a traditional IRA?"),
+    ("Is $5,000 enough for an emergency fund?", "Is $6,000 enough for an emergency fund?"),
+])
+def test_opposite_questions_do_not_hit(stored, asked):
+    """Negation, reversed comparisons and changed amounts are different questions."""
+    cache = SemanticCache(threshold=0.85)
+    cache.store(stored, None, result("a"))
+    assert cache.lookup(asked, None) is None
+    assert cache.lookup(stored, None) is not None
+
+
+def test_lookup_hits_paraphrase_for_same_persona_only():
+    """Entries are partitioned by persona."""
+    cache = SemanticCache(threshold=0.85)
+    cache.store("How can I save money?", "student", result("Cook at home."), tokens=300)
+
+    hit = cache.lookup("ways to save money", "student")
+    assert hit is not None
+    assert hit.result["answer"] == "Cook at home."
+    assert hit.similarity > 0.99
+
+    assert cache.lookup("ways to save money", "retiree") is None
+    assert cache.lookup("How do I improve my credit score?", "student") is None
+
+    stats = cache.snapshot()
+    assert stats["hits"] == 1
+    assert stats["lookups"] == 3
+    assert stats["tokens_saved"] == 300
+
+
+def test_lru_eviction_and_memory_bound():
+    """The least recently used entry goes first; the byte budget is enforced."""
+    cache = SemanticCache(max_entries=2)
+    cache.store("What is a Roth IRA?", None, result("a"))
+    cache.store("How do I start investing?", None, result("b"))
+    assert cache.lookup("What is a Roth IRA?", None) is not None  # refresh
+    cache.store("How do I negotiate a raise?", None, result("c"))
+
+    assert len(cache) == 2
+    assert cache.lookup("How do I start investing?", None) is None
+    assert cache.lookup("What is a Roth IRA?", None) is not None
+    assert cache.snapshot()["evictions"] == {"lru": 1}
+
+    small = SemanticCache(max_bytes=20000)
+    for i in range(20):
+        small.store(f"question number {i} about budgeting {i * 7919}", None, result("x" * 200))
+    assert small.size_bytes <= 20000
+    assert 0 < len(small) < 20
+
+
+def test_expired_entries_are_not_served():
+    """Entries past their TTL are dropped on lookup."""
+    cache = SemanticCache(ttl_seconds=-1)
+    cache.store("How can I save money?", None, result("a"))
+    assert cache.lookup("How can I save money?", None) is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_service_serves_paraphrase_from_cache():
+    """The second, paraphrased question does not reach the LLM."""
+    client = CountingClient()
+    cache = SemanticCache()
+    service = ChatService(client, cache=cache)
+
+    first = await service.answer("How can I save money?", persona="student")
+    second = await service.answer("ways to save money", persona="student")
+
+    assert client.calls == 1
+    assert second["answer"] == first["answer"]
+    assert second["meta"]["source"] == "cache"
+    assert second["meta"]["cache_similarity"] > 0.85
+    assert "source" not in first["meta"]
+
+
+@pytest.mark.asyncio
+async def test_session_requests_bypass_cache():
+    """Answers that depend on conversation history are neither served nor stored."""
+    client = CountingClient()
+    cache = SemanticCache()
+    service = ChatService(client, cache=cache)
+
+    await service.answer("How can I save money?", session_id="s1")
+    await service.answer("How can I save money?", session_id="s1")
+    await service.memory.drain()
+
+    assert client.calls >= 2
+    assert len(cache) == 0
+
+
+def test_generate_endpoint_reports_cache_hits():
+    """/api/generate answers repeated questions from the cache and counts the hit."""
+    before = semantic_cache_lookups_total.value(outcome="hit")
+    client = TestClient(app)
+    client.post("/api/generate", json={"prompt": "Should I lease or buy a car?", "persona": "salaried"})
+    response = client.post(
+        "/api/generate", json={"prompt": "is it better to lease or buy a car", "persona": "salaried"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["meta"]["source"] == "cache"
+    assert semantic_cache_lookups_total.value(outcome="hit") == before + 1
+    assert "chat_semantic_cache_tokens_saved_total" in client.get("/metrics").text
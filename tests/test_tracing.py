@@ -0,0 +1,120 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.models import ModelFactory
+from app.services.json_parsing import parse_json_response
+from app.tracing import OTLPJsonFileExporter, RingBufferExporter, Tracer, get_tracer, reset_tracer
+
+BUDGET = {"income": {"Salary": 5000}, "expenses": {"Rent": 1500, "Food": 500}}
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(settings, "tracing_debug_endpoint", True)
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    ModelFactory.reset()
+    reset_tracer()
+    yield
+    ModelFactory.reset()
+    reset_tracer()
+
+
+def test_budget_request_is_traced_end_to_end():
+    """The request span parents validation, the handler, the service, the LLM call and parsing."""
+    client = TestClient(app, headers=ADMIN)
+    response = client.post("/api/budget-summary", json=BUDGET)
+    trace_id = response.headers["X-Trace-Id"]
+
+    trace = client.get(f"/debug/traces/{trace_id}").json()
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert trace["name"] == "POST /api/budget-summary"
+    assert {"request.validate", "handler", "budget.generate_summary", "prompt.build", "scheduler.wait",
+            "llm.generate", "json.parse"} <= set(spans)
+
+    by_id = {span["span_id"]: span for span in trace["spans"]}
+    ancestors, parent = [], spans["llm.generate"]["parent_id"]
+    while parent in by_id:
+        ancestors.append(by_id[parent]["name"])
+        parent = by_id[parent]["parent_id"]
+    assert ancestors == ["budget.generate_summary", "handler", "POST /api/budget-summary"]
+    assert spans["llm.generate"]["attributes"]["backend"] == "mock"
+    assert spans["llm.generate"]["attributes"]["llm.output_tokens"] > 0
+
+    listed = client.get("/debug/traces").json()["traces"]
+    assert listed[0]["trace_id"] == trace_id
+
+
+def test_incoming_traceparent_is_continued_or_dropped():
+    """An incoming traceparent keeps its trace id; its unsampled flag turns tracing off."""
+    client = TestClient(app, headers=ADMIN)
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    response = client.get("/health", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    assert response.headers["X-Trace-Id"] == trace_id
+    root = client.get(f"/debug/traces/{trace_id}").json()["spans"][0]
+    assert root["parent_id"] == parent_id
+
+    response = client.get("/health", headers={"traceparent": f"00-{'1' * 32}-{parent_id}-00"})
+    assert "X-Trace-Id" not in response.headers
+
+
+def test_sample_ratio_zero_records_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "tracing_sample_ratio", 0.0)
+    client = TestClient(app, headers=ADMIN)
+    response = client.post("/api/budget-summary", json=BUDGET)
+
+    assert response.status_code == 200
+    assert "X-Trace-Id" not in response.headers
+    assert client.get("/debug/traces").json()["traces"] == []
+
+
+def test_debug_endpoints_need_the_admin_token(monkeypatch):
+    """Traces are only served to admins, and not at all unless the endpoint is enabled."""
+    client = TestClient(app)
+    trace_id = client.get("/health").headers["X-Trace-Id"]
+    assert client.get("/debug/traces").status_code == 403
+    assert client.get(f"/debug/traces/{trace_id}", headers={"X-Admin-Token": "guess"}).status_code == 403
+    assert client.get(f"/debug/traces/{trace_id}", headers=ADMIN).status_code == 200
+
+    monkeypatch.setattr(settings, "tracing_debug_endpoint", False)
+    assert client.get("/debug/traces", headers=ADMIN).status_code == 404
+    monkeypatch.setattr(settings, "tracing_debug_endpoint", True)
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert client.get("/debug/traces").status_code == 404
+
+
+def test_spans_outside_a_trace_are_not_recorded():
+    parse_json_response('{"a": 1}')
+    assert get_tracer().exporter(RingBufferExporter).recent() == []
+
+
+def test_otlp_file_exporter_writes_trace_requests(tmp_path):
+    """Each finished trace becomes one OTLP/JSON line with hex ids and nanosecond timestamps."""
+    exporter = OTLPJsonFileExporter(str(tmp_path))
+    tracer = Tracer(1.0, [exporter])
+    with tracer.span("job budget_summary", {"attempt": 1}, new_trace=True):
+        with pytest.raises(ValueError):
+            with tracer.span("json.parse"):
+                raise ValueError("bad json")
+    exporter.flush()
+
+    lines = [line for path in tmp_path.iterdir() for line in path.read_text().splitlines()]
+    assert len(lines) == 1
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    child, root = spans
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert child["parentSpanId"] == root["spanId"]
+    assert child["status"] == {"code": 2, "message": "ValueError: bad json"}
+    assert root["attributes"] == [{"key": "attempt", "value": {"intValue": "1"}}]
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+
+def test_traces_with_unfinished_spans_are_bounded():
+    """Spans that never end do not keep their traces forever."""
+    tracer = Tracer(1.0, [RingBufferExporter()], max_open_traces=3)
+    for i in range(10):
+        tracer.start_span(f"leaked-{i}", new_trace=True)
+    assert len(tracer._traces) == 3
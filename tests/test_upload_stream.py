@@ -0,0 +1,101 @@
+import json
+import tracemalloc
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.models import ModelFactory
+from app.services.upload_stream import UploadTooLarge, iter_json_array
+from benchmarks.microbench import make_transactions
+
+ROWS = [{"category": "Café", "amount": 12.5 + i, "date": "2024-01-15", "merchant": 'say "hi"'} for i in range(50)]
+
+
+@pytest.fixture(autouse=True)
+def reset_factory():
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def collect(data: bytes, size: int, **limits):
+    limits = {"max_bytes": 10 ** 9, "max_items": 10 ** 6, "max_item_bytes": 10 ** 5, **limits}
+    return [item async for item in iter_json_array(chunked(data, size), "transactions", **limits)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+async def test_items_are_parsed_across_chunk_boundaries(chunk_size):
+    body = json.dumps({"note": [1, {"a": 2}], "transactions": ROWS, "n": 123456}, indent=1).encode()
+    assert await collect(body, chunk_size) == ROWS
+    assert await collect(b'{"transactions": [12345]}', 1) == [12345]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [
+    b'[1]', b'{"transactions": [1, 2', b'{"transactions": [1 2]}', b'{"transactions": [1]} x',
+    b'{"other": 1}', b'{"transactions": [1], "transactions": [2]}',
+])
+async def test_malformed_bodies_raise_value_error(body):
+    with pytest.raises(ValueError):
+        await collect(body, 3)
+
+
+@pytest.mark.asyncio
+async def test_limits_stop_reading():
+    body = json.dumps({"transactions": ROWS}).encode()
+    with pytest.raises(UploadTooLarge):
+        await collect(body, 64, max_items=10)
+    with pytest.raises(UploadTooLarge):
+        await collect(body, 64, max_bytes=1000)
+    with pytest.raises(UploadTooLarge):
+        await collect(json.dumps({"transactions": [{"note": "x" * 5000}]}).encode(), 64, max_item_bytes=1000)
+
+
+@pytest.mark.asyncio
+async def test_memory_does_not_grow_with_body_size():
+    row = json.dumps(ROWS[0]).encode()
+
+    async def body(rows):
+        yield b'{"transactions": ['
+        for i in range(rows):
+            yield row + (b"," if i < rows - 1 else b"]}")
+
+    peaks = []
+    for rows in (1_000, 20_000):
+        tracemalloc.start()
+        count = 0
+        async for _ in iter_json_array(body(rows), "transactions", 10 ** 9, 10 ** 6, 10 ** 5):
+            count += 1
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert count == rows
+    assert peaks[1] < peaks[0] * 2 + 100_000
+
+
+def test_streamed_endpoint_matches_buffered_endpoint():
+    transactions = make_transactions(300)
+    client = TestClient(app)
+    buffered = client.post("/api/spending-insights", json={"transactions": transactions})
+    streamed = client.post("/api/spending-insights/stream", content=json.dumps({"transactions": transactions}))
+    assert streamed.status_code == 200
+    assert streamed.json() == buffered.json()
+
+
+def test_streamed_endpoint_errors(monkeypatch):
+    client = TestClient(app)
+    bad_row = {"transactions": [ROWS[0], {"category": "Food", "amount": "lots", "date": "2024-01-15"}]}
+    response = client.post("/api/spending-insights/stream", content=json.dumps(bad_row))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "transactions", 1, "amount"]
+
+    assert client.post("/api/spending-insights/stream", content=b'{"transactions": [').status_code == 422
+
+    monkeypatch.setattr(settings, "stream_upload_max_rows", 10)
+    response = client.post("/api/spending-insights/stream", content=json.dumps({"transactions": ROWS}))
+    assert response.status_code == 413
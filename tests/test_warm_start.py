@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.models import ModelFactory
+from app.services import semantic_cache as semantic_cache_module
+from app.services.cache_store import get_cache_store, reset_cache_store
+from app.services.prompt_stats import get_prompt_stats, reset_prompt_stats
+from app.services.semantic_cache import get_semantic_cache, reset_semantic_cache
+from app.services.warm_start import WarmStart, get_warm_start, load_snapshot, save_snapshot
+
+
+@pytest.fixture(autouse=True)
+def local_settings(monkeypatch):
+    """Keep retrieval from answering the test questions and start with a fresh factory."""
+    monkeypatch.setattr(settings, "retrieval_enabled", False)
+    ModelFactory.reset()
+    yield
+    ModelFactory.reset()
+
+
+def result(answer):
+    return {"answer": answer, "model": "test", "meta": {"persona": "student"}}
+
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    """Caches and access statistics survive a restart without re-embedding cached questions."""
+    get_semantic_cache().store("How can I save money?", "student", result("Cook at home."), tokens=300)
+    get_cache_store().set("insights", "abc", {"red_flags": ["coffee"]})
+    for _ in range(3):
+        get_prompt_stats().record("How can I save money?", "student")
+
+    path = str(tmp_path / "warm.snap")
+    saved = save_snapshot(path)
+    assert saved["entries"] == {"prompt_stats": 1, "semantic": 1, "cache_store": 1}
+    assert os.path.getsize(path) == saved["bytes"]
+
+    reset_semantic_cache()
+    reset_cache_store()
+    reset_prompt_stats()
+
+    def no_embedding(text):
+        raise AssertionError("restored entries should reuse their stored vectors")
+
+    monkeypatch.setattr(semantic_cache_module, "embed", no_embedding)
+    restored = load_snapshot(path)
+    monkeypatch.undo()
+    assert restored["entries"] == {"prompt_stats": 1, "semantic": 1, "cache_store": 1}
+
+    hit = get_semantic_cache().lookup("ways to save money", "student")
+    assert hit is not None and hit.result["answer"] == "Cook at home."
+    assert get_cache_store().get("insights", "abc") == {"red_flags": ["coffee"]}
+    assert get_prompt_stats().top(1) == [("How can I save money?", "student", 3)]
+
+
+@pytest.mark.asyncio
+async def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "warm.snap"
+    path.write_bytes(b"not a snapshot")
+    warm_start = WarmStart(snapshot_path=str(path), snapshot_interval_seconds=0)
+    await warm_start.start()
+    while not warm_start.ready:
+        await asyncio.sleep(0.01)
+    await warm_start.stop()
+    assert warm_start.ready and warm_start.restored == {}
+    # The final snapshot replaced the unreadable file
+    assert load_snapshot(str(path))["entries"]["prompt_stats"] == 0
+
+
+def test_ready_after_warm_up(tmp_path, monkeypatch):
+    """/ready turns 200 once the most frequent questions are cached; shutdown writes a snapshot."""
+    path = str(tmp_path / "warm.snap")
+    monkeypatch.setattr(settings, "snapshot_path", path)
+    monkeypatch.setattr(settings, "warmup_top_n", 2)
+    stats = get_prompt_stats()
+    for question, count in [("Should I lease a car?", 5), ("Is gold a good investment?", 3), ("What is APR?", 1)]:
+        for _ in range(count):
+            stats.record(question, "salaried")
+
+    assert TestClient(app).get("/ready").status_code == 503
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10
+        while (response := client.get("/ready")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert response.status_code == 200
+        assert response.json()["warmup"]["generated"] == 2
+
+        cached = client.post("/api/generate", json={"prompt": "Should I lease a car?", "persona": "salaried"})
+        assert cached.json()["meta"]["source"] == "cache"
+        assert get_semantic_cache().lookup("What is APR?", "salaried") is None
+
+    assert get_warm_start().last_snapshot["entries"]["semantic"] == 2
+    assert os.path.exists(path)